@@ -0,0 +1,368 @@
+"""
+Read-only JSON API for posts, comments, categories and tags.
+
+A small WSGI application, separate from the Streamlit app, for clients that
+only need the content: a mobile app, embeddable widgets, crawlers. It reads
+through the same db functions the app uses (and so the same query cache).
+
+    GET /api/posts                     ?limit=&cursor=&category=&tag=
+    GET /api/posts/<id>
+    GET /api/posts/<id>/comments       ?limit=&cursor=
+    GET /api/categories
+    GET /api/tags
+
+Lists are newest first and paginated by an opaque ``next_cursor`` (a keyset
+seek, like the admin pages). Every response carries a weak ETag and a
+Last-Modified derived from ``updated_at`` (or the newest comment), which are
+computed with index-only queries *before* the response is built; a
+conditional GET that matches gets a 304 without loading anything else.
+Bodies are gzip-compressed for clients that accept it, and encoded bodies
+are kept in a small LRU keyed by ETag, so a repeated request is a lookup.
+
+This process does not see the cache invalidations of the Streamlit process,
+so each request first reads a cheap data version (newest post and user
+``updated_at``, the stat counters, newest comment and user) and clears the
+query and response caches when it moved.
+
+    python api.py                     # serve on API_HOST:API_PORT
+    gunicorn api:application          # or any WSGI server
+"""
+
+import argparse
+import base64
+import datetime
+import email.utils
+import gzip
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+from collections import OrderedDict
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from cache import query_cache
+from config import (
+    API_HOST, API_PORT, API_PAGE_SIZE, API_CACHE_MAX_AGE, API_CORS_ORIGIN, API_GZIP_MIN_BYTES,
+    API_RESPONSE_CACHE_ENTRIES, MAX_PAGE_SIZE
+)
+from db import (
+    get_categories, get_comments, get_connection, get_post, get_post_summaries, get_tag_counts, split_page
+)
+from media import media_url
+from utils import parse_tags
+
+logger = logging.getLogger(__name__)
+
+POST_FIELDS = ["id", "title", "excerpt", "content", "content_html", "category", "author_name", "author_bio",
+               "status", "published_at", "created_at", "updated_at"]
+SUMMARY_FIELDS = ["id", "title", "excerpt", "category", "author_name", "published_at", "created_at", "updated_at"]
+COMMENT_FIELDS = ["id", "post_id", "username", "content", "created_at"]
+
+STATUS_LINES = {200: "200 OK", 304: "304 Not Modified", 400: "400 Bad Request", 404: "404 Not Found",
+                405: "405 Method Not Allowed"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseCache:
+    """
+    LRU of encoded response bodies keyed by (ETag, content encoding).
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(API_RESPONSE_CACHE_ENTRIES)
+
+_data_version = None
+_data_version_lock = threading.Lock()
+
+DATA_VERSION_QUERY = """
+SELECT (SELECT MAX(updated_at) FROM posts),
+       (SELECT group_concat(name || '=' || value) FROM counters
+        WHERE name IN ('posts', 'published_posts', 'comments', 'users')),
+       (SELECT MAX(id) FROM comments),
+       (SELECT MAX(id) FROM users),
+       (SELECT MAX(updated_at) FROM users)
+"""
+
+
+def sync_data_version(conn):
+    """
+    Clear this process's caches if another process changed the data.
+
+    The first request clears them too: anything cached before it was read
+    without a version to compare against.
+
+    Returns:
+        tuple: The current data version; its first item is the newest post ``updated_at``
+    """
+    global _data_version
+    version = tuple(conn.execute(DATA_VERSION_QUERY).fetchone())
+    with _data_version_lock:
+        if version != _data_version:
+            query_cache.clear()
+            response_cache.clear()
+            _data_version = version
+    return version
+
+
+# Helpers
+def _http_date(value):
+    # Stored timestamps ("YYYY-MM-DD HH:MM:SS[.ffffff]") as an HTTP date, to the second
+    if not value:
+        return None
+    try:
+        moment = datetime.datetime.fromisoformat(str(value)[:19])
+    except ValueError:
+        return None
+    return email.utils.format_datetime(moment.replace(tzinfo=datetime.timezone.utc), usegmt=True)
+
+def _etag(*parts):
+    return 'W/"' + hashlib.sha1(repr(parts).encode()).hexdigest()[:24] + '"'
+
+def _encode_cursor(cursor):
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode().rstrip("=")
+
+def _decode_cursor(value):
+    if not value:
+        return None
+    try:
+        created, row_id = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        return str(created), int(row_id)
+    except (ValueError, TypeError):
+        raise ApiError(400, "Invalid cursor")
+
+def _limit(params):
+    try:
+        limit = int(params.get("limit", API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, "limit must be a number")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _not_modified(environ, etag, last_modified):
+    # If-None-Match wins over If-Modified-Since (RFC 9110, 13.2.2)
+    if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in tags
+
+    if_modified_since = environ.get("HTTP_IF_MODIFIED_SINCE")
+    if if_modified_since and last_modified:
+        try:
+            return (email.utils.parsedate_to_datetime(last_modified)
+                    <= email.utils.parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def _accepts_gzip(environ):
+    for coding in environ.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+def _pick(row, fields):
+    return {field: row.get(field) for field in fields}
+
+
+# Endpoints. Each returns (etag, last_modified, build) where build() makes the payload.
+def posts_endpoint(conn, version, params):
+    limit = _limit(params)
+    cursor = _decode_cursor(params.get("cursor"))
+    category = params.get("category") or None
+    tags = parse_tags(params.get("tag")) or None
+    tag_mode = "all" if params.get("tag_mode") == "all" else "any"
+
+    def build():
+        rows, next_cursor = split_page(
+            get_post_summaries("card", status="published", category=category, tag=tags, tag_mode=tag_mode,
+                               limit=limit + 1, cursor=cursor), limit)
+        items = []
+        for row in rows:
+            item = _pick(row, SUMMARY_FIELDS)
+            item["tags"] = parse_tags(row.get("tags"))
+            item["image_url"] = media_url(row.get("image_url"), "card")
+            items.append(item)
+        return {"items": items, "next_cursor": _encode_cursor(next_cursor)}
+
+    return _etag("posts", version, limit, cursor, category, tags, tag_mode), _http_date(version[0]), build
+
+def post_endpoint(conn, version, params, post_id):
+    row = conn.execute("""
+    SELECT p.updated_at, p.author_id, u.updated_at FROM posts p JOIN users u ON u.id = p.author_id
+    WHERE p.id = ? AND p.status = 'published'
+    """, (post_id,)).fetchone()
+    if row is None:
+        raise ApiError(404, "Post not found")
+
+    def build():
+        post = get_post(post_id)
+        item = _pick(post, POST_FIELDS)
+        item["tags"] = parse_tags(post.get("tags"))
+        item["image_url"] = media_url(post.get("featured_image"), "hero")
+        return item
+
+    # The author's row is in the ETag because their name and bio are part of the post
+    return _etag("post", post_id, *row), _http_date(row[0]), build
+
+def comments_endpoint(conn, version, params, post_id):
+    if conn.execute("SELECT 1 FROM posts WHERE id = ? AND status = 'published'", (post_id,)).fetchone() is None:
+        raise ApiError(404, "Post not found")
+    limit = _limit(params)
+    cursor = _decode_cursor(params.get("cursor"))
+    count, newest_id, newest = conn.execute(
+        "SELECT COUNT(*), MAX(id), MAX(created_at) FROM comments WHERE post_id = ?", (post_id,)).fetchone()
+
+    def build():
+        rows, next_cursor = split_page(get_comments(post_id, limit=limit + 1, cursor=cursor), limit)
+        return {"items": [_pick(row, COMMENT_FIELDS) for row in rows], "next_cursor": _encode_cursor(next_cursor)}
+
+    return _etag("comments", post_id, count, newest_id, limit, cursor), _http_date(newest), build
+
+def categories_endpoint(conn, version, params):
+    return _etag("categories", version), _http_date(version[0]), lambda: {"items": get_categories()}
+
+def tags_endpoint(conn, version, params):
+    def build():
+        return {"items": [{"name": name, "posts": count} for name, count in get_tag_counts()]}
+    return _etag("tags", version), _http_date(version[0]), build
+
+ROUTES = [
+    (re.compile(r"^/api/posts/?$"), posts_endpoint),
+    (re.compile(r"^/api/posts/(\d+)/?$"), post_endpoint),
+    (re.compile(r"^/api/posts/(\d+)/comments/?$"), comments_endpoint),
+    (re.compile(r"^/api/categories/?$"), categories_endpoint),
+    (re.compile(r"^/api/tags/?$"), tags_endpoint),
+]
+
+
+def _respond(start_response, status, headers, body, head=False):
+    # A HEAD response has the headers, including the length, of the GET it stands for
+    start_response(STATUS_LINES[status], headers + [("Content-Length", str(len(body)))])
+    return [] if head else [body]
+
+def application(environ, start_response):
+    """
+    WSGI entry point.
+    """
+    base_headers = [("Access-Control-Allow-Origin", API_CORS_ORIGIN), ("Vary", "Accept-Encoding")]
+    method = environ.get("REQUEST_METHOD", "GET")
+    path = environ.get("PATH_INFO", "") or "/"
+    try:
+        if method not in ("GET", "HEAD"):
+            raise ApiError(405, "Only GET and HEAD are supported")
+        params = {key: values[-1] for key, values in parse_qs(environ.get("QUERY_STRING", "")).items()}
+
+        for pattern, endpoint in ROUTES:
+            match = pattern.match(path)
+            if match:
+                break
+        else:
+            raise ApiError(404, "Not found")
+
+        with get_connection() as conn:
+            version = sync_data_version(conn)
+            args = [int(group) for group in match.groups()]
+            etag, last_modified, build = endpoint(conn, version, params, *args)
+
+        headers = base_headers + [("ETag", etag), ("Cache-Control", f"public, max-age={API_CACHE_MAX_AGE}")]
+        if last_modified:
+            headers.append(("Last-Modified", last_modified))
+        if _not_modified(environ, etag, last_modified):
+            start_response(STATUS_LINES[304], headers)
+            return []
+
+        wants_gzip = _accepts_gzip(environ)
+        cached = response_cache.get((etag, wants_gzip))
+        if cached is None:
+            body = json.dumps(build(), separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+            use_gzip = wants_gzip and len(body) >= API_GZIP_MIN_BYTES
+            if use_gzip:
+                body = gzip.compress(body, compresslevel=6)
+            response_cache.put((etag, wants_gzip), (body, use_gzip))
+        else:
+            body, use_gzip = cached
+
+        headers.append(("Content-Type", "application/json; charset=utf-8"))
+        if use_gzip:
+            headers.append(("Content-Encoding", "gzip"))
+        status = 200
+    except ApiError as e:
+        status, body = e.status, json.dumps({"error": str(e)}).encode("utf-8")
+        headers = base_headers + [("Content-Type", "application/json; charset=utf-8"), ("Cache-Control", "no-store")]
+        if status == 405:
+            headers.append(("Allow", "GET, HEAD"))
+
+    return _respond(start_response, status, headers, body, head=method == "HEAD")
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_api_server(host=API_HOST, port=API_PORT):
+    """
+    Create a threaded stdlib server for ``application`` (call serve_forever on it).
+    """
+    return make_server(host, port, application, server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the read-only JSON API.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    from db import init_db
+    init_db()
+    server = make_api_server(args.host, args.port)
+    print(f"Serving the JSON API on http://{args.host}:{server.server_port}/api/posts")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
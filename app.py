@@ -1,19 +1,46 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import datetime
 import os
+import tempfile
 import time
 from utils import (
-    is_valid_email, hash_password, format_datetime, get_image_as_base64,
-    truncate_text, create_card_html, check_scheduled_posts, load_css,
-    generate_social_share_links
+    is_valid_email, format_datetime, get_image_as_base64, create_card_html,
+    generate_social_share_links, check_scheduled_posts
 )
 from config import (
-    APP_NAME, APP_ICON, APP_DESCRIPTION, DB_NAME, DEFAULT_ADMIN_USERNAME,
-    DEFAULT_ADMIN_PASSWORD, DEFAULT_ADMIN_EMAIL, DEFAULT_CATEGORIES,
-    DEFAULT_TAGS, LIGHT_THEME, DARK_THEME, SOCIAL_LINKS, CONTACT_INFO
+    APP_NAME, APP_ICON, APP_DESCRIPTION, DEFAULT_ADMIN_USERNAME,
+    SOCIAL_LINKS, CONTACT_INFO, SEARCH_RESULTS_PER_PAGE,
+    HOME_PAGE_SIZE, ADMIN_PAGE_SIZE, COMMENTS_PAGE_SIZE, MAX_PAGE_SIZE, DEFAULT_ADMIN_EMAIL, STATIC_SITE_DIR,
+    PERF_SAMPLE_RATE, SQL_TRACE_ENABLED, SQL_SLOW_MS, SQL_SLOW_LOG
 )
+from db import (
+    init_db, split_page, authenticate, register, get_user_profile, update_user_profile,
+    get_users, update_user_role, delete_user, create_post, update_post,
+    get_post, get_post_summaries, get_scheduled_posts, delete_post, add_comment,
+    get_comments, get_user_comments, add_subscriber, get_subscribers,
+    add_contact_message, get_contact_messages, mark_message_as_read,
+    delete_contact_message, get_categories, get_tags, get_tag_counts,
+    get_dashboard_stats, get_subscriber_count, get_related_posts, get_post_views, get_post_view_totals,
+    get_view_stats
+)
+from cache import cache_stats
+from fragments import post_fragment, comments_fragment, fragment_stats
+from scheduler import start_scheduler
+from feeds import start_feeds
+from views import start_view_buffer, record_view, pending_views
+from theme_assets import build_theme_assets, theme_snippet
+from subscribers import export_subscribers_csv, import_subscribers_csv
+from static_site import build_site
+from newsletter import (
+    smtp_configured, create_newsletter, start_newsletter_send, start_newsletters, send_test_email,
+    get_newsletters, get_failed_deliveries, pause_newsletter, resume_newsletter
+)
+from media import store_image, media_url, media_file
+from search import search_posts
+from perf import begin_rerun, end_rerun, set_route, section, timed, perf_summary, rerun_buffer
+from sqltrace import sql_tracer
+from profiling import start_profile, finish_profile, list_profiles, load_profile
 
 # Set page configuration
 st.set_page_config(
@@ -23,6 +50,18 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Profile this rerun for an admin who asked with ?profile_rerun=1 or from the
+# Performance page (profiling.py). The profile is finished in the finally
+# block at the bottom; one left by a rerun that stopped before reaching it is
+# finished here, or by profiling.py's watchdog if the thread has gone.
+finish_profile()
+if st.session_state.get("user_role") == "admin" and (st.query_params.pop("profile_rerun", None)
+                                                     or st.session_state.pop("profile_next_rerun", False)):
+    start_profile()
+
+# Time this rerun for the admin Performance page (perf.py)
+begin_rerun()
+
 # Initialize session states
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
@@ -33,688 +72,119 @@ if 'user_role' not in st.session_state:
 if 'theme' not in st.session_state:
     st.session_state.theme = "light"
 
-# Database setup
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    # Create users table
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        email TEXT UNIQUE NOT NULL,
-        role TEXT NOT NULL,
-        bio TEXT,
-        profile_image TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-
-    # Create posts table
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS posts (
-        id INTEGER PRIMARY KEY,
-        title TEXT NOT NULL,
-        content TEXT NOT NULL,
-        author_id INTEGER NOT NULL,
-        category TEXT NOT NULL,
-        tags TEXT,
-        featured_image TEXT,
-        status TEXT NOT NULL,
-        published_at TIMESTAMP,
-        scheduled_for TIMESTAMP,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (author_id) REFERENCES users (id)
-    )
-    ''')
-
-    # Create comments table
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS comments (
-        id INTEGER PRIMARY KEY,
-        post_id INTEGER NOT NULL,
-        user_id INTEGER NOT NULL,
-        content TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (post_id) REFERENCES posts (id),
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    )
-    ''')
-
-    # Create subscribers table
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS subscribers (
-        id INTEGER PRIMARY KEY,
-        email TEXT UNIQUE NOT NULL,
-        name TEXT,
-        subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-
-    # Create contact messages table
-    c.execute('''
-    CREATE TABLE IF NOT EXISTS contact_messages (
-        id INTEGER PRIMARY KEY,
-        name TEXT NOT NULL,
-        email TEXT NOT NULL,
-        subject TEXT NOT NULL,
-        message TEXT NOT NULL,
-        read BOOLEAN DEFAULT 0,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-
-    # Check if admin user exists, if not create one
-    c.execute("SELECT * FROM users WHERE username = ?", (DEFAULT_ADMIN_USERNAME,))
-    if not c.fetchone():
-        # Create admin user
-        hashed_password = hash_password(DEFAULT_ADMIN_PASSWORD)
-        c.execute("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
-                 (DEFAULT_ADMIN_USERNAME, hashed_password, DEFAULT_ADMIN_EMAIL, 'admin'))
-
-    conn.commit()
-    conn.close()
-
-# Initialize database
-init_db()
+# Initialize database, background workers and theme stylesheets (once per process)
+with section("startup"):
+    init_db()
+    if start_scheduler() is None:
+        # SCHEDULER_ENABLED=0: publish whatever is due on each rerun instead
+        check_scheduled_posts()
+    start_feeds()
+    start_view_buffer()
+    start_newsletters()
+    build_theme_assets()
 
 # Authentication functions
 def login(username, password):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    hashed_password = hash_password(password)
-    c.execute("SELECT id, role FROM users WHERE username = ? AND password = ?", (username, hashed_password))
-    user = c.fetchone()
-
-    conn.close()
+    user = authenticate(username, password)
 
     if user:
         st.session_state.logged_in = True
         st.session_state.username = username
-        st.session_state.user_role = user[1]
-        st.session_state.user_id = user[0]
+        st.session_state.user_role = user['role']
+        st.session_state.user_id = user['id']
         return True
     return False
 
-def register(username, password, email, role='user', bio=None):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    try:
-        hashed_password = hash_password(password)
-        c.execute("""
-        INSERT INTO users (username, password, email, role, bio)
-        VALUES (?, ?, ?, ?, ?)
-        """, (username, hashed_password, email, role, bio))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False
-
 def logout():
     st.session_state.logged_in = False
     st.session_state.username = ""
     st.session_state.user_role = ""
     st.session_state.user_id = None
 
-def get_user_profile(user_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    c.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-    user = c.fetchone()
-
-    conn.close()
-    return dict(user) if user else None
-
-def update_user_profile(user_id, bio=None, profile_image=None):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    if bio is not None and profile_image is not None:
-        c.execute("UPDATE users SET bio = ?, profile_image = ? WHERE id = ?",
-                 (bio, profile_image, user_id))
-    elif bio is not None:
-        c.execute("UPDATE users SET bio = ? WHERE id = ?", (bio, user_id))
-    elif profile_image is not None:
-        c.execute("UPDATE users SET profile_image = ? WHERE id = ?",
-                 (profile_image, user_id))
-
-    conn.commit()
-    conn.close()
-
-# Blog post functions
-def create_post(title, content, author_id, category, tags, status, featured_image=None, scheduled_for=None):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    published_at = datetime.datetime.now() if status == 'published' else None
-
-    c.execute("""
-    INSERT INTO posts (title, content, author_id, category, tags, featured_image, status, published_at, scheduled_for)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (title, content, author_id, category, tags, featured_image, status, published_at, scheduled_for))
-
-    conn.commit()
-    conn.close()
-
-def update_post(post_id, title, content, category, tags, status, featured_image=None, scheduled_for=None):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    published_at = datetime.datetime.now() if status == 'published' else None
-    updated_at = datetime.datetime.now()
-
-    if featured_image is not None:
-        c.execute("""
-        UPDATE posts
-        SET title = ?, content = ?, category = ?, tags = ?, featured_image = ?, status = ?,
-            published_at = ?, scheduled_for = ?, updated_at = ?
-        WHERE id = ?
-        """, (title, content, category, tags, featured_image, status, published_at, scheduled_for, updated_at, post_id))
-    else:
-        c.execute("""
-        UPDATE posts
-        SET title = ?, content = ?, category = ?, tags = ?, status = ?,
-            published_at = ?, scheduled_for = ?, updated_at = ?
-        WHERE id = ?
-        """, (title, content, category, tags, status, published_at, scheduled_for, updated_at, post_id))
-
-    conn.commit()
-    conn.close()
-
-def get_post(post_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    c.execute("""
-    SELECT p.*, u.username as author_name, u.bio as author_bio, u.profile_image as author_image
-    FROM posts p
-    JOIN users u ON p.author_id = u.id
-    WHERE p.id = ?
-    """, (post_id,))
-
-    post = c.fetchone()
-    conn.close()
-
-    return dict(post) if post else None
-
-def get_posts(status=None, category=None, tag=None, search_term=None, author_id=None, limit=None):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    query = """
-    SELECT p.*, u.username as author_name
-    FROM posts p
-    JOIN users u ON p.author_id = u.id
-    WHERE 1=1
+# Pagination helpers
+def get_keyset_page(key, fetch, page_size=ADMIN_PAGE_SIZE, created_key="created_at"):
     """
-    params = []
-
-    if status:
-        query += " AND p.status = ?"
-        params.append(status)
-
-    if category:
-        query += " AND p.category = ?"
-        params.append(category)
-
-    if tag:
-        query += " AND p.tags LIKE ?"
-        params.append(f"%{tag}%")
-
-    if search_term:
-        query += " AND (p.title LIKE ? OR p.content LIKE ?)"
-        params.extend([f"%{search_term}%", f"%{search_term}%"])
-
-    if author_id:
-        query += " AND p.author_id = ?"
-        params.append(author_id)
-
-    query += " ORDER BY p.created_at DESC"
-
-    if limit:
-        query += " LIMIT ?"
-        params.append(limit)
-
-    c.execute(query, params)
-    posts = [dict(row) for row in c.fetchall()]
-
-    conn.close()
-    return posts
-
-def delete_post(post_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    # First delete all comments associated with the post
-    c.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
-
-    # Then delete the post
-    c.execute("DELETE FROM posts WHERE id = ?", (post_id,))
-
-    conn.commit()
-    conn.close()
-
-def add_comment(post_id, user_id, content):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    c.execute("""
-    INSERT INTO comments (post_id, user_id, content)
-    VALUES (?, ?, ?)
-    """, (post_id, user_id, content))
-
-    conn.commit()
-    conn.close()
-
-def get_comments(post_id):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    c.execute("""
-    SELECT c.*, u.username, u.profile_image
-    FROM comments c
-    JOIN users u ON c.user_id = u.id
-    WHERE c.post_id = ?
-    ORDER BY c.created_at DESC
-    """, (post_id,))
-
-    comments = [dict(row) for row in c.fetchall()]
-    conn.close()
-
-    return comments
-
-def delete_comment(comment_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    c.execute("DELETE FROM comments WHERE id = ?", (comment_id,))
-
-    conn.commit()
-    conn.close()
-
-def add_subscriber(email, name=None):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    try:
-        c.execute("INSERT INTO subscribers (email, name) VALUES (?, ?)", (email, name))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False
-
-def get_subscribers():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    c.execute("SELECT * FROM subscribers ORDER BY subscribed_at DESC")
-    subscribers = [dict(row) for row in c.fetchall()]
-
-    conn.close()
-    return subscribers
-
-def add_contact_message(name, email, subject, message):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    c.execute("""
-    INSERT INTO contact_messages (name, email, subject, message)
-    VALUES (?, ?, ?, ?)
-    """, (name, email, subject, message))
-
-    conn.commit()
-    conn.close()
-
-def get_contact_messages(unread_only=False):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    if unread_only:
-        c.execute("SELECT * FROM contact_messages WHERE read = 0 ORDER BY created_at DESC")
-    else:
-        c.execute("SELECT * FROM contact_messages ORDER BY created_at DESC")
-
-    messages = [dict(row) for row in c.fetchall()]
-
-    conn.close()
-    return messages
-
-def mark_message_as_read(message_id):
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    c.execute("UPDATE contact_messages SET read = 1 WHERE id = ?", (message_id,))
-
-    conn.commit()
-    conn.close()
+    Fetch the current page of a newest-first listing.
 
-# Helper functions
-def get_categories():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+    The cursors of the pages visited so far are kept in session state under
+    ``key``, so "Older" is a keyset seek rather than an OFFSET scan.
+    ``fetch`` is called as ``fetch(limit=..., cursor=...)``.
 
-    c.execute("SELECT DISTINCT category FROM posts")
-    categories = [row[0] for row in c.fetchall()]
-
-    # If no categories exist yet, return default categories
-    if not categories:
-        categories = DEFAULT_CATEGORIES
-
-    conn.close()
-    return categories
-
-def get_tags():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    c.execute("SELECT tags FROM posts")
-    tag_lists = [row[0] for row in c.fetchall() if row[0]]
-
-    all_tags = []
-    for tag_list in tag_lists:
-        tags = [tag.strip() for tag in tag_list.split(',')]
-        all_tags.extend(tags)
-
-    unique_tags = list(set(all_tags))
-
-    # If no tags exist yet, return default tags
-    if not unique_tags:
-        unique_tags = DEFAULT_TAGS
-
-    conn.close()
-    return unique_tags
-
-def get_post_count():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    c.execute("SELECT COUNT(*) FROM posts")
-    count = c.fetchone()[0]
-
-    conn.close()
-    return count
-
-def get_user_count():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    c.execute("SELECT COUNT(*) FROM users")
-    count = c.fetchone()[0]
-
-    conn.close()
-    return count
-
-def get_comment_count():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-
-    c.execute("SELECT COUNT(*) FROM comments")
-    count = c.fetchone()[0]
+    Returns:
+        tuple: (rows, next_cursor) to pass on to show_page_controls
+    """
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+
+    while True:
+        rows, next_cursor = split_page(fetch(limit=page_size + 1, cursor=cursors[-1]), page_size, created_key)
+        # The page emptied out (e.g. its last row was deleted), step back one
+        if rows or len(cursors) == 1:
+            return rows, next_cursor
+        cursors.pop()
+
+def show_page_controls(key, next_cursor):
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+    if len(cursors) == 1 and next_cursor is None:
+        return
 
-    conn.close()
-    return count
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("← Newer", disabled=len(cursors) == 1, key=f"{key}_newer", on_click=cursors.pop)
+    with col2:
+        st.markdown(f"<p style='text-align:center;'>Page {len(cursors)}</p>", unsafe_allow_html=True)
+    with col3:
+        st.button("Older →", disabled=next_cursor is None, key=f"{key}_older",
+                  on_click=lambda: cursors.append(next_cursor))
 
-def get_subscriber_count():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
+def get_loaded_rows(key, fetch, page_size, filters=None, created_key="created_at"):
+    """
+    Fetch the rows of a "Load more" listing.
 
-    c.execute("SELECT COUNT(*) FROM subscribers")
-    count = c.fetchone()[0]
+    Each click of show_load_more appends the cursor where the listing ends,
+    and the next page is a keyset seek from it, as in get_keyset_page.
+    ``fetch`` is called as ``fetch(limit=page_size + 1, cursor=...)`` per
+    page, so pages already shown are query cache hits. Cursors are re-chained
+    from the rows returned, so rows added or deleted meanwhile are neither
+    skipped nor repeated. The listing starts over whenever ``filters`` changes.
 
-    conn.close()
-    return count
+    Returns:
+        tuple: (rows, has_more)
+    """
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    state = st.session_state.get(key)
+    if state is None or state["filters"] != filters:
+        state = st.session_state[key] = {"filters": filters, "cursors": [None], "next_cursor": None}
+
+    cursors = state["cursors"]
+    rows = []
+    for index, cursor in enumerate(cursors):
+        page, next_cursor = split_page(fetch(limit=page_size + 1, cursor=cursor), page_size, created_key)
+        rows.extend(page)
+        if index + 1 < len(cursors):
+            if next_cursor is None:
+                del cursors[index + 1:]
+                break
+            cursors[index + 1] = next_cursor
+
+    state["next_cursor"] = next_cursor
+    return rows, next_cursor is not None
+
+def show_load_more(key, has_more, label="Load more"):
+    if has_more:
+        state = st.session_state[key]
+        st.button(label, key=f"{key}_more", on_click=lambda: state["cursors"].append(state["next_cursor"]))
 
 # Apply theme
+@timed()
 def apply_theme():
-    # Load custom CSS
-    try:
-        load_css("style.css")
-    except:
-        pass
-
-    # Set theme based on user preference
-    if st.session_state.theme == "dark":
-        base_theme = DARK_THEME
-        shadow_intensity = "0.3"
-        glow_intensity = "0.8"
-    else:
-        base_theme = LIGHT_THEME
-        shadow_intensity = "0.1"
-        glow_intensity = "0.3"
-
-    # Create a complete theme with fallbacks for missing keys
-    theme = {
-        "background_color": base_theme.get("background_color", "#FFFFFF" if st.session_state.theme == "light" else "#121212"),
-        "text_color": base_theme.get("text_color", "#333333" if st.session_state.theme == "light" else "#F0F0F0"),
-        "card_background": base_theme.get("card_background", "#F9F9F9" if st.session_state.theme == "light" else "#1E1E1E"),
-        "accent_color": base_theme.get("accent_color", "#0066FF" if st.session_state.theme == "light" else "#2979FF"),
-        "secondary_color": base_theme.get("secondary_color", "#6610F2" if st.session_state.theme == "light" else "#7C4DFF"),
-        "highlight_color": base_theme.get("highlight_color", "#00B8D9" if st.session_state.theme == "light" else "#00E5FF"),
-        "success_color": base_theme.get("success_color", "#36B37E" if st.session_state.theme == "light" else "#00E676"),
-        "warning_color": base_theme.get("warning_color", "#FFAB00" if st.session_state.theme == "light" else "#FFEA00"),
-        "error_color": base_theme.get("error_color", "#FF5630" if st.session_state.theme == "light" else "#FF1744")
-    }
-
-    st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Roboto:wght@300;400;500;700&family=Source+Code+Pro:wght@400;500&display=swap');
-    @import url('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css');
-
-    :root {{
-        --background-color: {theme['background_color']};
-        --text-color: {theme['text_color']};
-        --card-background: {theme['card_background']};
-        --accent-color: {theme['accent_color']};
-        --secondary-color: {theme['secondary_color']};
-        --highlight-color: {theme['highlight_color']};
-        --success-color: {theme['success_color']};
-        --warning-color: {theme['warning_color']};
-        --error-color: {theme['error_color']};
-    }}
-
-    .stApp {{
-        background-color: var(--background-color);
-        color: var(--text-color);
-        font-family: 'Roboto', sans-serif;
-    }}
-
-    /* Modern input fields */
-    .stTextInput > div > div > input,
-    .stTextArea > div > div > textarea,
-    .stSelectbox > div > div,
-    .stMultiselect > div > div {{
-        background-color: var(--card-background);
-        color: var(--text-color);
-        border-radius: 8px;
-        border: 1px solid rgba(128, 128, 128, 0.2);
-        transition: all 0.3s ease;
-    }}
-
-    .stTextInput > div > div > input:focus,
-    .stTextArea > div > div > textarea:focus {{
-        border-color: var(--accent-color);
-        box-shadow: 0 0 0 2px rgba(var(--accent-color), 0.2);
-    }}
-
-    /* Buttons with hover effects */
-    .stButton>button {{
-        background-color: var(--accent-color);
-        color: white;
-        border-radius: 8px;
-        border: none;
-        padding: 0.5rem 1rem;
-        font-weight: 500;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 5px rgba(0, 0, 0, {shadow_intensity});
-    }}
-
-    .stButton>button:hover {{
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0, 0, 0, {shadow_intensity});
-        filter: brightness(110%);
-    }}
-
-    .stButton>button:active {{
-        transform: translateY(0);
-    }}
-
-    /* Secondary button style */
-    .secondary-button > button {{
-        background-color: var(--secondary-color);
-    }}
-
-    /* Success button style */
-    .success-button > button {{
-        background-color: var(--success-color);
-    }}
-
-    /* Warning button style */
-    .warning-button > button {{
-        background-color: var(--warning-color);
-    }}
-
-    /* Error button style */
-    .error-button > button {{
-        background-color: var(--error-color);
-    }}
-
-    /* Modern cards with hover effect */
-    .card {{
-        background-color: var(--card-background);
-        padding: 20px;
-        border-radius: 12px;
-        margin-bottom: 20px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, {shadow_intensity});
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-        border: 1px solid rgba(128, 128, 128, 0.1);
-    }}
-
-    .card:hover {{
-        transform: translateY(-5px);
-        box-shadow: 0 8px 15px rgba(0, 0, 0, {shadow_intensity});
-    }}
-
-    /* Tech-themed glowing accents */
-    .tech-accent {{
-        position: relative;
-    }}
-
-    .tech-accent::after {{
-        content: '';
-        position: absolute;
-        left: 0;
-        bottom: -2px;
-        width: 100%;
-        height: 2px;
-        background-color: var(--highlight-color);
-        box-shadow: 0 0 8px rgba(var(--highlight-color), {glow_intensity});
-    }}
-
-    /* Links with hover effect */
-    a {{
-        color: var(--accent-color);
-        text-decoration: none;
-        transition: all 0.2s ease;
-        position: relative;
-    }}
-
-    a:hover {{
-        color: var(--highlight-color);
-    }}
-
-    a:hover::after {{
-        content: '';
-        position: absolute;
-        left: 0;
-        bottom: -2px;
-        width: 100%;
-        height: 1px;
-        background-color: var(--highlight-color);
-    }}
-
-    /* Headings with tech accent */
-    h1, h2, h3, h4, h5, h6 {{
-        color: var(--text-color);
-        font-weight: 500;
-    }}
-
-    /* Blog title with tech styling */
-    .blog-title {{
-        font-size: 2.5rem;
-        font-weight: 700;
-        color: var(--accent-color);
-        margin-bottom: 1rem;
-        text-shadow: 0 0 10px rgba(var(--accent-color), 0.3);
-    }}
-
-    .blog-subtitle {{
-        font-size: 1.2rem;
-        color: var(--secondary-color);
-        margin-bottom: 2rem;
-        font-weight: 300;
-    }}
-
-    /* Code blocks with tech styling */
-    code {{
-        font-family: 'Source Code Pro', monospace;
-        background-color: rgba(0, 0, 0, 0.1);
-        padding: 2px 5px;
-        border-radius: 4px;
-        font-size: 0.9em;
-    }}
-
-    /* Sidebar styling */
-    .css-1d391kg, .css-163ttbj {{  /* Target sidebar */
-        background-color: var(--card-background);
-        border-right: 1px solid rgba(128, 128, 128, 0.1);
-    }}
-
-    /* User profile section in sidebar */
-    .user-profile {{
-        background: linear-gradient(135deg, var(--accent-color) 0%, var(--secondary-color) 100%);
-        padding: 15px;
-        border-radius: 10px;
-        color: white;
-        margin-bottom: 20px;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, {shadow_intensity});
-    }}
-
-    /* Footer styling */
-    .footer {{
-        text-align: center;
-        padding: 2rem 0;
-        margin-top: 3rem;
-        border-top: 1px solid rgba(128, 128, 128, 0.2);
-        font-size: 0.9rem;
-    }}
-    </style>
-    """, unsafe_allow_html=True)
+    # The stylesheet for each theme is built once per process (theme_assets.py)
+    st.markdown(theme_snippet(st.session_state.theme), unsafe_allow_html=True)
 
 apply_theme()
 
-# Check for scheduled posts that should be published
-published_count = check_scheduled_posts()
-if published_count > 0:
-    st.toast(f"{published_count} scheduled posts have been published")
-
 # Sidebar
-with st.sidebar:
+with st.sidebar, section("sidebar"):
     st.title(APP_NAME)
 
     # User Authentication Section at the top
@@ -795,8 +265,8 @@ with st.sidebar:
                 st.session_state.admin_page = "Dashboard"
 
             # Use radio button to update the admin_page in session state
-            admin_page = st.radio("", ["Dashboard", "Manage Posts", "Manage Users", "Messages", "Subscribers"],
-                                 index=["Dashboard", "Manage Posts", "Manage Users", "Messages", "Subscribers"].index(st.session_state.admin_page),
+            admin_page = st.radio("", ["Dashboard", "Manage Posts", "Manage Users", "Messages", "Subscribers", "Performance"],
+                                 index=["Dashboard", "Manage Posts", "Manage Users", "Messages", "Subscribers", "Performance"].index(st.session_state.admin_page),
                                  horizontal=True,
                                  key="admin_page_radio")
 
@@ -804,11 +274,11 @@ with st.sidebar:
             st.session_state.admin_page = admin_page
 
             # Show unread message count for admin
-            unread_messages = get_contact_messages(unread_only=True)
-            if unread_messages:
+            unread_count = get_dashboard_stats()["unread_messages"]
+            if unread_count:
                 st.markdown(f"""
                 <div style="background-color: var(--warning-color); color: black; padding: 8px 12px; border-radius: 8px; margin-top: 10px;">
-                    <strong>📬 {len(unread_messages)} unread messages</strong>
+                    <strong>📬 {unread_count} unread messages</strong>
                 </div>
                 """, unsafe_allow_html=True)
 
@@ -844,6 +314,7 @@ with st.sidebar:
     # Categories
     st.subheader("📚 Categories")
     categories = get_categories()
+    selected_category = "All"
     if categories:
         selected_category = st.selectbox("", ["All"] + categories)
         if selected_category != "All" and page == "Home":
@@ -855,9 +326,18 @@ with st.sidebar:
 
     # Tags
     st.subheader("🏷️ Popular Tags")
-    tags = get_tags()
+    tag_counts = get_tag_counts()
+    tags = [name for name, _count in tag_counts] or get_tags()
+    tag_usage = dict(tag_counts)
+    selected_tags = []
+    tag_mode = "any"
     if tags:
-        selected_tags = st.multiselect("", tags)
+        selected_tags = st.multiselect("", tags,
+                                       format_func=lambda tag: f"{tag} ({tag_usage[tag]})" if tag in tag_usage else tag)
+        if len(selected_tags) > 1:
+            tag_mode = st.radio("Match", ["any", "all"], horizontal=True,
+                                format_func=lambda mode: "Any tag" if mode == "any" else "All tags",
+                                key="sidebar_tag_mode")
         if selected_tags and page == "Home":
             st.markdown(f"""
             <div style="background-color: var(--secondary-color); color: white; padding: 8px 12px; border-radius: 8px; margin-top: 10px;">
@@ -895,7 +375,8 @@ with st.sidebar:
     """, unsafe_allow_html=True)
 
 # Main content
-def show_home():
+@timed()
+def show_home(category_filter=None, tag_filter=None, tag_mode="any"):
     # Hero section with tech-themed styling
     st.markdown(f"""
     <div style="text-align: center; padding: 40px 20px; margin-bottom: 30px; background: linear-gradient(135deg, rgba(0,102,255,0.1) 0%, rgba(102,16,242,0.1) 100%); border-radius: 15px;">
@@ -908,10 +389,6 @@ def show_home():
     </div>
     """, unsafe_allow_html=True)
 
-    # Filter posts based on sidebar selections
-    category_filter = None if 'selected_category' not in locals() or selected_category == "All" else selected_category
-    tag_filter = selected_tags[0] if 'selected_tags' in locals() and selected_tags else None
-
     # Featured posts with enhanced styling
     st.markdown("""
     <h2 class="tech-accent" style="display: inline-block; margin-bottom: 20px;">
@@ -921,29 +398,14 @@ def show_home():
     </h2>
     """, unsafe_allow_html=True)
 
-    featured_posts = get_posts(status="published", category=category_filter, tag=tag_filter, limit=3)
+    featured_posts = get_post_summaries("card", status="published", category=category_filter, tag=tag_filter,
+                                        tag_mode=tag_mode, limit=3)
 
     if featured_posts:
         cols = st.columns(min(len(featured_posts), 3))
         for i, post in enumerate(featured_posts):
             with cols[i % 3]:
-                image_html = ""
-                if post.get('featured_image'):
-                    image_html = f'<img src="{post["featured_image"]}" style="width:100%; height:180px; object-fit:cover; border-radius:8px; margin-bottom:15px;">'
-                else:
-                    # Default image if none provided
-                    image_html = f'<div style="width:100%; height:180px; background:linear-gradient(135deg, var(--accent-color) 0%, var(--secondary-color) 100%); border-radius:8px; margin-bottom:15px; display:flex; align-items:center; justify-content:center;"><span style="color:white; font-size:3rem;">📚</span></div>'
-
-                st.markdown(f"""
-                <div class="card">
-                    {image_html}
-                    <span style="color:var(--secondary-color); font-size:0.8rem; text-transform:uppercase; letter-spacing:1px;">{post['category']}</span>
-                    <h3 style="margin-top:5px;">{post['title']}</h3>
-                    <p style="color:var(--highlight-color); font-size:0.9rem;"><em>By {post['author_name']} • {format_datetime(post['published_at'])[:10]}</em></p>
-                    <p>{truncate_text(post['content'], 100)}</p>
-                    <a href="?post_id={post['id']}" style="display:inline-block; margin-top:10px; font-weight:500;">Read more →</a>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(post_fragment("featured", post, st.session_state.theme), unsafe_allow_html=True)
     else:
         st.markdown("""
         <div style="background-color:var(--card-background); padding:30px; border-radius:10px; text-align:center; border:1px dashed rgba(128,128,128,0.3);">
@@ -961,45 +423,20 @@ def show_home():
     </h2>
     """, unsafe_allow_html=True)
 
-    recent_posts = get_posts(status="published", category=category_filter, tag=tag_filter, limit=5)
+    recent_posts, has_more = get_loaded_rows(
+        "home_recent",
+        lambda limit, cursor: get_post_summaries("card", status="published", category=category_filter,
+                                                 tag=tag_filter, tag_mode=tag_mode, limit=limit, cursor=cursor),
+        HOME_PAGE_SIZE,
+        filters=(category_filter, tuple(tag_filter or ()), tag_mode),
+    )
 
     for post in recent_posts:
-        image_html = ""
-        if post.get('featured_image'):
-            image_html = f'<img src="{post["featured_image"]}" style="width:100%; height:200px; object-fit:cover; border-radius:8px;">'
-        else:
-            # Default image with gradient if none provided
-            image_html = f'<div style="width:100%; height:200px; background:linear-gradient(135deg, var(--accent-color) 0%, var(--secondary-color) 100%); border-radius:8px; display:flex; align-items:center; justify-content:center;"><span style="color:white; font-size:3rem;">📚</span></div>'
-
-        # Format tags with tech styling
-        if post.get('tags'):
-            tags_list = post['tags'].split(',')
-            tags_html = '<div style="margin-top:10px;">'
-            for tag in tags_list:
-                tag = tag.strip()
-                tags_html += f'<span style="display:inline-block; background-color:rgba(0,0,0,0.1); padding:3px 8px; border-radius:15px; font-size:0.8rem; margin-right:5px; margin-bottom:5px;">{tag}</span>'
-            tags_html += '</div>'
-        else:
-            tags_html = ""
+        st.markdown(post_fragment("recent", post, st.session_state.theme), unsafe_allow_html=True)
 
-        st.markdown(f"""
-        <div class="card">
-            <div style="display:flex; flex-wrap:wrap; gap:20px;">
-                <div style="flex:1; min-width:200px; max-width:300px;">
-                    {image_html}
-                </div>
-                <div style="flex:2; min-width:300px;">
-                    <span style="color:var(--secondary-color); font-size:0.8rem; text-transform:uppercase; letter-spacing:1px;">{post['category']}</span>
-                    <h2 style="margin-top:5px; margin-bottom:10px;">{post['title']}</h2>
-                    <p style="color:var(--highlight-color); font-size:0.9rem;"><em>By {post['author_name']} • {format_datetime(post['published_at'])[:10]}</em></p>
-                    <p>{truncate_text(post['content'], 200)}</p>
-                    {tags_html}
-                    <a href="?post_id={post['id']}" style="display:inline-block; margin-top:15px; font-weight:500; padding:8px 15px; background-color:var(--accent-color); color:white; border-radius:5px; text-decoration:none;">Read more →</a>
-                </div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    show_load_more("home_recent", has_more, "Load more posts")
 
+@timed()
 def show_post(post_id):
     post = get_post(post_id)
 
@@ -1007,29 +444,18 @@ def show_post(post_id):
         st.error("Post not found")
         return
 
-    # Increase view count or analytics could be added here
+    # Count one view per post per session; views.py batches the writes
+    viewed_posts = st.session_state.setdefault("viewed_posts", set())
+    if post['status'] == 'published' and post['id'] not in viewed_posts:
+        viewed_posts.add(post['id'])
+        record_view(post['id'])
 
     # Featured image as header with title overlay for a modern look
-    if post.get('featured_image'):
-        st.markdown(f"""
-        <div style="position: relative; margin-bottom: 30px;">
-            <img src="{post['featured_image']}" style="width: 100%; height: 350px; object-fit: cover; border-radius: 15px; filter: brightness(0.7);">
-            <div style="position: absolute; bottom: 0; left: 0; right: 0; padding: 30px; background: linear-gradient(0deg, rgba(0,0,0,0.7) 0%, rgba(0,0,0,0) 100%);">
-                <span style="color: white; font-size: 0.9rem; text-transform: uppercase; letter-spacing: 1px; background-color: var(--accent-color); padding: 5px 10px; border-radius: 4px;">{post['category']}</span>
-                <h1 style="color: white; margin-top: 10px; margin-bottom: 5px; font-size: 2.5rem; text-shadow: 0 2px 4px rgba(0,0,0,0.5);">{post['title']}</h1>
-                <p style="color: rgba(255,255,255,0.9); margin-bottom: 0;">By <strong>{post['author_name']}</strong> • {format_datetime(post['published_at'])}</p>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-    else:
-        # If no featured image, use a gradient background
-        st.markdown(f"""
-        <div style="background: linear-gradient(135deg, var(--accent-color) 0%, var(--secondary-color) 100%); padding: 40px; border-radius: 15px; margin-bottom: 30px;">
-            <span style="color: white; font-size: 0.9rem; text-transform: uppercase; letter-spacing: 1px; background-color: rgba(255,255,255,0.2); padding: 5px 10px; border-radius: 4px;">{post['category']}</span>
-            <h1 style="color: white; margin-top: 15px; margin-bottom: 10px; font-size: 2.5rem; text-shadow: 0 2px 4px rgba(0,0,0,0.3);">{post['title']}</h1>
-            <p style="color: rgba(255,255,255,0.9); margin-bottom: 0;">By <strong>{post['author_name']}</strong> • {format_datetime(post['published_at'])}</p>
-        </div>
-        """, unsafe_allow_html=True)
+    st.markdown(post_fragment("hero", post, st.session_state.theme), unsafe_allow_html=True)
+
+    if post['status'] == 'published':
+        views = get_post_views(post['id']) + pending_views(post['id'])
+        st.caption(f"👁️ {views:,} {'view' if views == 1 else 'views'}")
 
     # Author info and metadata in a card
     st.markdown("""
@@ -1041,7 +467,7 @@ def show_post(post_id):
     with col1:
         # Author profile
         if post.get('author_image'):
-            st.image(post['author_image'], width=120)
+            st.image(media_file(post['author_image'], "avatar"), width=120)
         else:
             st.markdown("""
             <div style="width: 120px; height: 120px; background-color: var(--accent-color); border-radius: 50%; display: flex; align-items: center; justify-content: center; color: white; font-size: 2.5rem;">
@@ -1075,12 +501,14 @@ def show_post(post_id):
         tags_html += '</div>'
         st.markdown(tags_html, unsafe_allow_html=True)
 
-    # Post content with enhanced styling
-    st.markdown(f"""
-    <div class="blog-content" style="font-size: 1.1rem; line-height: 1.7; margin-bottom: 40px;">
-        {post["content"]}
-    </div>
-    """, unsafe_allow_html=True)
+    # Post content, rendered from Markdown and sanitized when it was saved.
+    # Built without indentation so Streamlit's own Markdown pass leaves it alone;
+    # render_markdown keeps each <pre> on one line for the same reason.
+    st.markdown(
+        '<div class="blog-content" style="font-size: 1.1rem; line-height: 1.7; margin-bottom: 40px;">\n\n'
+        f"{post['content_html']}\n\n</div>",
+        unsafe_allow_html=True
+    )
 
     # Social sharing buttons with modern styling
     st.markdown("""
@@ -1131,33 +559,17 @@ def show_post(post_id):
     </h2>
     """, unsafe_allow_html=True)
 
-    related_posts = get_posts(
-        status="published",
-        category=post['category'],
-        limit=3
-    )
-
-    related_posts = [p for p in related_posts if p['id'] != post['id']][:3]
+    related_posts = get_related_posts(post['id'], limit=3)
+    if not related_posts:
+        # Not in the related posts index (unpublished, or no words in common)
+        related_posts = get_post_summaries("card", status="published", category=post['category'], limit=4)
+        related_posts = [p for p in related_posts if p['id'] != post['id']][:3]
 
     if related_posts:
         cols = st.columns(min(len(related_posts), 3))
         for i, related in enumerate(related_posts):
             with cols[i]:
-                image_html = ""
-                if related.get('featured_image'):
-                    image_html = f'<img src="{related["featured_image"]}" style="width:100%; height:120px; object-fit:cover; border-radius:8px; margin-bottom:10px;">'
-                else:
-                    # Default image if none provided
-                    image_html = f'<div style="width:100%; height:120px; background:linear-gradient(135deg, var(--accent-color) 0%, var(--secondary-color) 100%); border-radius:8px; margin-bottom:10px; display:flex; align-items:center; justify-content:center;"><span style="color:white; font-size:2rem;">📚</span></div>'
-
-                st.markdown(f"""
-                <div class="card">
-                    {image_html}
-                    <h4 style="margin-top:0;">{related['title']}</h4>
-                    <p><em>By {related['author_name']}</em></p>
-                    <a href="?post_id={related['id']}" style="display:inline-block; margin-top:10px;">Read more →</a>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(post_fragment("related", related, st.session_state.theme), unsafe_allow_html=True)
     else:
         st.markdown("""
         <div style="background-color: var(--card-background); padding: 20px; border-radius: 10px; text-align: center; margin-bottom: 30px;">
@@ -1174,30 +586,17 @@ def show_post(post_id):
     </h2>
     """, unsafe_allow_html=True)
 
-    comments = get_comments(post_id)
+    comments, has_more_comments = get_loaded_rows(
+        "post_comments",
+        lambda limit, cursor: get_comments(post_id, limit=limit, cursor=cursor),
+        COMMENTS_PAGE_SIZE,
+        filters=post_id,
+    )
 
     if comments:
-        for comment in comments:
-            profile_img = comment.get('profile_image', '')
-            if profile_img:
-                profile_html = f'<img src="{profile_img}" style="width:50px; height:50px; border-radius:50%; margin-right:15px;">'
-            else:
-                profile_html = f'<div style="width:50px; height:50px; background-color:var(--accent-color); border-radius:50%; margin-right:15px; display:flex; align-items:center; justify-content:center; color:white; font-weight:bold;">{comment["username"][0].upper()}</div>'
+        st.markdown(comments_fragment(post_id, comments, st.session_state.theme), unsafe_allow_html=True)
 
-            st.markdown(f"""
-            <div class="card" style="margin-bottom:15px;">
-                <div style="display:flex; align-items:center;">
-                    {profile_html}
-                    <div>
-                        <p style="margin:0; font-weight:500;">{comment['username']}</p>
-                        <p style="margin:0; font-size:0.8rem; opacity:0.7;">{format_datetime(comment['created_at'])}</p>
-                    </div>
-                </div>
-                <div style="margin-top:15px; padding-left:65px;">
-                    <p style="margin:0;">{comment['content']}</p>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        show_load_more("post_comments", has_more_comments, "Load more comments")
     else:
         st.markdown("""
         <div style="background-color: var(--card-background); padding: 30px; border-radius: 10px; text-align: center; margin-bottom: 20px; border: 1px dashed rgba(128,128,128,0.3);">
@@ -1230,6 +629,7 @@ def show_post(post_id):
         </div>
         """, unsafe_allow_html=True)
 
+@timed()
 def show_about():
     st.title("About Me & EduRishi")
 
@@ -1285,6 +685,7 @@ def show_about():
         with cols[i]:
             st.markdown(f"[{platform.capitalize()}]({link})")
 
+@timed()
 def show_contact():
     st.title("Contact Me")
 
@@ -1329,49 +730,67 @@ def show_contact():
         st.subheader("Address")
         st.write(CONTACT_INFO['address'])
 
+@timed()
 def show_search():
     st.title("Search Blog Posts")
 
-    search_term = st.text_input("Search for posts", placeholder="Enter keywords...")
+    search_term = st.text_input("Search for posts", placeholder="Enter keywords...",
+                                help='Use "quotes" for exact phrases and a trailing * for prefixes, e.g. quant*')
 
     col1, col2 = st.columns(2)
     with col1:
         search_category = st.selectbox("Filter by Category", ["All"] + get_categories())
     with col2:
         search_tags = st.multiselect("Filter by Tags", get_tags())
+        search_tag_mode = "any"
+        if len(search_tags) > 1:
+            search_tag_mode = st.radio("Match", ["any", "all"], horizontal=True,
+                                       format_func=lambda mode: "Any tag" if mode == "any" else "All tags",
+                                       key="search_tag_mode")
 
     if st.button("Search") or search_term or search_category != "All" or search_tags:
         category_filter = None if search_category == "All" else search_category
-        tag_filter = search_tags[0] if search_tags else None
 
-        search_results = get_posts(
+        # Start from the first page whenever the search criteria change
+        criteria = (search_term, search_category, tuple(search_tags), search_tag_mode)
+        if st.session_state.get("search_criteria") != criteria:
+            st.session_state.search_criteria = criteria
+            st.session_state.search_page = 1
+        search_page = st.session_state.get("search_page", 1)
+
+        search_results, total_results = search_posts(
+            search_term,
             status="published",
             category=category_filter,
-            tag=tag_filter,
-            search_term=search_term
+            tag=search_tags,
+            tag_mode=search_tag_mode,
+            page=search_page,
+            per_page=SEARCH_RESULTS_PER_PAGE
         )
 
         if search_results:
-            st.success(f"Found {len(search_results)} results")
+            total_pages = (total_results + SEARCH_RESULTS_PER_PAGE - 1) // SEARCH_RESULTS_PER_PAGE
+            st.success(f"Found {total_results} results")
             for post in search_results:
-                image_html = ""
-                if post.get('featured_image'):
-                    image_html = f'<img src="{post["featured_image"]}" style="width:100px; height:100px; object-fit:cover; border-radius:5px; margin-right:15px; float:left;">'
+                st.markdown(post_fragment("search", post, st.session_state.theme), unsafe_allow_html=True)
 
-                st.markdown(f"""
-                <div class="card">
-                    {image_html}
-                    <h3>{post['title']}</h3>
-                    <p><em>By {post['author_name']} on {format_datetime(post['published_at'])[:10]}</em></p>
-                    <p>Category: {post['category']} {f"| Tags: {post['tags']}" if post.get('tags') else ""}</p>
-                    <p>{truncate_text(post['content'], 150)}</p>
-                    <div style="clear:both;"></div>
-                    <a href="?post_id={post['id']}">Read more</a>
-                </div>
-                """, unsafe_allow_html=True)
+            if total_pages > 1:
+                col1, col2, col3 = st.columns([1, 2, 1])
+                with col1:
+                    if st.button("← Previous", disabled=search_page <= 1, key="search_prev"):
+                        st.session_state.search_page = search_page - 1
+                        st.rerun()
+                with col2:
+                    st.markdown(f"<p style='text-align:center;'>Page {search_page} of {total_pages}</p>",
+                                unsafe_allow_html=True)
+                with col3:
+                    if st.button("Next →", disabled=search_page >= total_pages, key="search_next"):
+                        st.session_state.search_page = search_page + 1
+                        st.rerun()
         else:
             st.info("No posts found matching your criteria")
 
+@timed()
 def show_user_profile():
     if not st.session_state.logged_in:
         st.error("Please login to view your profile")
@@ -1393,12 +812,22 @@ def show_user_profile():
 
         with col1:
             if user.get('profile_image'):
-                st.image(user['profile_image'], width=200)
+                st.image(media_file(user['profile_image'], "avatar"), width=200)
             else:
                 st.image("https://via.placeholder.com/200?text=Profile", width=200)
 
+            profile_upload = st.file_uploader("Profile Picture", type=["png", "jpg", "jpeg", "gif", "webp"],
+                                              key="profile_image_upload")
             if st.button("Upload Profile Picture"):
-                st.info("Feature coming soon!")
+                if profile_upload is None:
+                    st.error("Choose an image to upload")
+                else:
+                    try:
+                        update_user_profile(user_id, profile_image=store_image(profile_upload.getvalue()))
+                        st.success("Profile picture updated!")
+                        st.rerun()
+                    except ValueError as e:
+                        st.error(str(e))
 
         with col2:
             st.subheader(user['username'])
@@ -1417,7 +846,8 @@ def show_user_profile():
 
     with tab2:
         st.subheader("My Posts")
-        user_posts = get_posts(author_id=user_id)
+        user_posts, next_cursor = get_keyset_page(
+            "my_posts", lambda limit, cursor: get_post_summaries("admin", author_id=user_id, limit=limit, cursor=cursor))
 
         if user_posts:
             for post in user_posts:
@@ -1438,26 +868,16 @@ def show_user_profile():
         else:
             st.info("You haven't created any posts yet")
 
+        show_page_controls("my_posts", next_cursor)
+
         if st.button("Create New Post"):
             st.query_params.update({"create_post": "true"})
 
     with tab3:
         st.subheader("My Comments")
 
-        conn = sqlite3.connect(DB_NAME)
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-
-        c.execute("""
-        SELECT c.*, p.title as post_title, p.id as post_id
-        FROM comments c
-        JOIN posts p ON c.post_id = p.id
-        WHERE c.user_id = ?
-        ORDER BY c.created_at DESC
-        """, (user_id,))
-
-        user_comments = [dict(row) for row in c.fetchall()]
-        conn.close()
+        user_comments, next_cursor = get_keyset_page(
+            "my_comments", lambda limit, cursor: get_user_comments(user_id, limit=limit, cursor=cursor))
 
         if user_comments:
             for comment in user_comments:
@@ -1471,40 +891,47 @@ def show_user_profile():
         else:
             st.info("You haven't made any comments yet")
 
+        show_page_controls("my_comments", next_cursor)
+
+@timed()
 def admin_dashboard():
     st.title("Admin Dashboard")
 
     # Stats
+    stats = get_dashboard_stats()
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total Posts", get_post_count())
-
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM posts WHERE status = 'published'")
-        published_posts = c.fetchone()[0]
-        conn.close()
-
-        st.metric("Published Posts", published_posts)
+        st.metric("Total Posts", stats["posts"])
+        st.metric("Published Posts", stats["published_posts"])
 
     with col2:
-        st.metric("Total Users", get_user_count())
-        st.metric("Total Comments", get_comment_count())
+        st.metric("Total Users", stats["users"])
+        st.metric("Total Comments", stats["comments"])
 
     with col3:
-        st.metric("Newsletter Subscribers", get_subscriber_count())
+        st.metric("Newsletter Subscribers", stats["subscribers"])
+        st.metric("Unread Messages", stats["unread_messages"])
+
+    # Post views (counts still buffered in this process are included in the total)
+    st.header("Post Views")
+    view_stats = get_view_stats(days=30)
+    col1, col2 = st.columns(2)
+    col1.metric("Total Views", f"{stats['views'] + pending_views():,}")
+    col2.metric("Views (Last 30 Days)", f"{view_stats['recent']:,}")
 
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM contact_messages WHERE read = 0")
-        unread_messages = c.fetchone()[0]
-        conn.close()
+    if view_stats['daily']:
+        daily_df = pd.DataFrame(view_stats['daily'], columns=['Day', 'Views']).set_index('Day')
+        st.bar_chart(daily_df)
 
-        st.metric("Unread Messages", unread_messages)
+    if view_stats['top_posts']:
+        st.subheader("Most Viewed Posts (Last 30 Days)")
+        top_df = pd.DataFrame(view_stats['top_posts'])[['id', 'title', 'views']]
+        top_df.columns = ['ID', 'Title', 'Views']
+        st.dataframe(top_df, hide_index=True)
 
     # Recent activity
     st.header("Recent Posts")
-    recent_posts = get_posts(limit=5)
+    recent_posts = get_post_summaries("admin", limit=5)
 
     if recent_posts:
         posts_df = pd.DataFrame(recent_posts)
@@ -1515,20 +942,7 @@ def admin_dashboard():
 
     # Scheduled posts
     st.header("Scheduled Posts")
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    c.execute("""
-    SELECT p.*, u.username as author_name
-    FROM posts p
-    JOIN users u ON p.author_id = u.id
-    WHERE p.status = 'scheduled' AND p.scheduled_for > datetime('now')
-    ORDER BY p.scheduled_for ASC
-    """)
-
-    scheduled_posts = [dict(row) for row in c.fetchall()]
-    conn.close()
+    scheduled_posts = get_scheduled_posts()
 
     if scheduled_posts:
         for post in scheduled_posts:
@@ -1543,6 +957,35 @@ def admin_dashboard():
     else:
         st.info("No scheduled posts")
 
+    # Query cache effectiveness for this server process
+    with st.expander("Query Cache"):
+        cache_info = cache_stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Hit Rate", f"{cache_info['total']['hit_rate']:.0%}")
+        col2.metric("Hits / Misses", f"{cache_info['total']['hits']} / {cache_info['total']['misses']}")
+        col3.metric("Entries", f"{cache_info['entries']} / {cache_info['max_entries']}")
+        if cache_info['namespaces']:
+            st.dataframe(pd.DataFrame.from_dict(cache_info['namespaces'], orient="index"))
+
+        fragment_info = fragment_stats()
+        st.caption(
+            f"Rendered HTML fragments: {fragment_info['entries']} cached "
+            f"({fragment_info['chars'] / 1024:.0f} KB), "
+            f"{fragment_info['hits']} hits / {fragment_info['misses']} misses"
+        )
+
+    # Static HTML copy of the published posts (static_site.py)
+    with st.expander("Static Site"):
+        st.caption(f"Anonymous readers can be served the static pages in `{STATIC_SITE_DIR}`. "
+                   "Only pages whose posts changed since the last build are rendered again.")
+        col1, col2 = st.columns(2)
+        col1.button("Update Static Site", key="static_site_build", on_click=rebuild_static_site)
+        col2.button("Rebuild Every Page", key="static_site_full", on_click=rebuild_static_site, args=(True,))
+        report = st.session_state.get("static_site_report")
+        if report:
+            st.success(f"{report['pages']} pages: {report['rendered']} rendered, {report['written']} written, "
+                       f"{report['removed']} removed in {report['seconds']}s")
+
     # Quick actions
     st.header("Quick Actions")
     col1, col2, col3 = st.columns(3)
@@ -1561,6 +1004,10 @@ def admin_dashboard():
             st.session_state.admin_page = "Manage Users"
             st.rerun()
 
+def rebuild_static_site(full=False):
+    st.session_state.static_site_report = build_site(full=full)
+
+@timed()
 def create_new_post():
     st.title("Create New Post")
 
@@ -1583,9 +1030,10 @@ def create_new_post():
         suggested_tags = ", ".join(existing_tags[:3]) if existing_tags else "technology, education"
         post_tags = st.text_input("Tags (comma separated)", value=suggested_tags)
 
-    # Featured image upload (placeholder - would need file storage in a real app)
+    # Featured image: an upload goes to the media store and takes precedence over a URL
     st.subheader("Featured Image")
-    st.info("Image upload functionality would be implemented with cloud storage in a production app")
+    featured_image_upload = st.file_uploader("Upload an image", type=["png", "jpg", "jpeg", "gif", "webp"],
+                                             key="create_post_image")
     featured_image_url = st.text_input("Image URL (optional)", placeholder="https://example.com/image.jpg")
 
     col1, col2 = st.columns(2)
@@ -1606,51 +1054,48 @@ def create_new_post():
             if not post_title or not post_content or not post_category:
                 st.error("Title, content, and category are required")
             else:
-                create_post(
-                    post_title,
-                    post_content,
-                    st.session_state.user_id,
-                    post_category,
-                    post_tags,
-                    post_status,
-                    featured_image_url if featured_image_url else None,
-                    scheduled_datetime
-                )
-                st.success("Post created successfully!")
-                st.query_params.clear()
-                st.rerun()
+                try:
+                    if featured_image_upload is not None:
+                        featured_image = store_image(featured_image_upload.getvalue())
+                    else:
+                        featured_image = featured_image_url if featured_image_url else None
+
+                    create_post(
+                        post_title,
+                        post_content,
+                        st.session_state.user_id,
+                        post_category,
+                        post_tags,
+                        post_status,
+                        featured_image,
+                        scheduled_datetime
+                    )
+                    st.success("Post created successfully!")
+                    st.query_params.clear()
+                    st.rerun()
+                except ValueError as e:
+                    st.error(f"Could not save the featured image: {e}")
 
     with col2:
         if st.button("Cancel"):
             st.query_params.clear()
             st.rerun()
 
+@timed()
 def manage_posts():
     st.title("Manage Posts")
 
     tab1, tab2, tab3 = st.tabs(["All Posts", "Published", "Drafts & Scheduled"])
 
     with tab1:
-        posts = get_posts()
+        posts, next_cursor = get_keyset_page(
+            "manage_all", lambda limit, cursor: get_post_summaries("admin", limit=limit, cursor=cursor))
 
         if posts:
             for post in posts:
                 col1, col2 = st.columns([3, 1])
                 with col1:
-                    status_color = {
-                        "published": "green",
-                        "draft": "gray",
-                        "scheduled": "blue"
-                    }.get(post['status'], "gray")
-
-                    st.markdown(f"""
-                    <div class="card">
-                        <h3>{post['title']}</h3>
-                        <p><em>By {post['author_name']} | Status: <span style="color:{status_color}">{post['status'].capitalize()}</span></em></p>
-                        <p>Category: {post['category']} {f"| Tags: {post['tags']}" if post.get('tags') else ""}</p>
-                        <a href="?post_id={post['id']}">View</a>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    st.markdown(post_fragment("admin", post, st.session_state.theme), unsafe_allow_html=True)
 
                 with col2:
                     st.button("Edit", key=f"edit_{post['id']}",
@@ -1667,45 +1112,40 @@ def manage_posts():
         else:
             st.info("No posts available")
 
+        show_page_controls("manage_all", next_cursor)
+
     with tab2:
-        published_posts = get_posts(status="published")
+        published_posts, next_cursor = get_keyset_page(
+            "manage_published",
+            lambda limit, cursor: get_post_summaries("admin", status="published", limit=limit, cursor=cursor))
 
         if published_posts:
+            view_totals = get_post_view_totals([post['id'] for post in published_posts])
             for post in published_posts:
                 col1, col2 = st.columns([3, 1])
                 with col1:
-                    st.markdown(f"""
-                    <div class="card">
-                        <h3>{post['title']}</h3>
-                        <p><em>By {post['author_name']} | Published: {format_datetime(post['published_at'])[:10]}</em></p>
-                        <p>Category: {post['category']}</p>
-                        <a href="?post_id={post['id']}">View</a>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    st.markdown(post_fragment("admin_published", post, st.session_state.theme),
+                                unsafe_allow_html=True)
 
                 with col2:
                     st.button("Edit", key=f"edit_pub_{post['id']}",
                              on_click=lambda id=post['id']: st.query_params.update({"edit_post_id": id}))
+                    st.caption(f"👁️ {view_totals.get(post['id'], 0):,} views")
         else:
             st.info("No published posts")
 
+        show_page_controls("manage_published", next_cursor)
+
     with tab3:
-        draft_scheduled_posts = get_posts(status="draft") + get_posts(status="scheduled")
+        draft_scheduled_posts, next_cursor = get_keyset_page(
+            "manage_drafts",
+            lambda limit, cursor: get_post_summaries("admin", status=["draft", "scheduled"], limit=limit, cursor=cursor))
 
         if draft_scheduled_posts:
             for post in draft_scheduled_posts:
                 col1, col2 = st.columns([3, 1])
                 with col1:
-                    status_text = f"Scheduled for: {format_datetime(post['scheduled_for'])}" if post['status'] == "scheduled" else "Draft"
-
-                    st.markdown(f"""
-                    <div class="card">
-                        <h3>{post['title']}</h3>
-                        <p><em>By {post['author_name']} | {status_text}</em></p>
-                        <p>Category: {post['category']}</p>
-                        <a href="?post_id={post['id']}">View</a>
-                    </div>
-                    """, unsafe_allow_html=True)
+                    st.markdown(post_fragment("admin_draft", post, st.session_state.theme), unsafe_allow_html=True)
 
                 with col2:
                     st.button("Edit", key=f"edit_ds_{post['id']}",
@@ -1713,10 +1153,13 @@ def manage_posts():
         else:
             st.info("No drafts or scheduled posts")
 
+        show_page_controls("manage_drafts", next_cursor)
+
     st.divider()
     if st.button("Create New Post", key="manage_create_post"):
         st.query_params.update({"create_post": "true"})
 
+@timed()
 def edit_post(post_id):
     post = get_post(post_id)
 
@@ -1747,9 +1190,12 @@ def edit_post(post_id):
     # Featured image
     st.subheader("Featured Image")
     if post.get('featured_image'):
-        st.image(post['featured_image'], width=300)
-        st.write("Current featured image URL:", post['featured_image'])
+        st.image(media_file(post['featured_image'], "card"), width=300)
+        if not post['featured_image'].startswith("media:"):
+            st.write("Current featured image URL:", post['featured_image'])
 
+    featured_image_upload = st.file_uploader("Upload a new image", type=["png", "jpg", "jpeg", "gif", "webp"],
+                                             key="edit_post_image")
     featured_image_url = st.text_input("New Image URL (leave empty to keep current)", "")
 
     col1, col2 = st.columns(2)
@@ -1787,47 +1233,47 @@ def edit_post(post_id):
             if not post_title or not post_content or not post_category:
                 st.error("Title, content, and category are required")
             else:
-                # Use the new image URL if provided, otherwise keep the existing one
-                image_to_use = featured_image_url if featured_image_url else post.get('featured_image')
-
-                update_post(
-                    post_id,
-                    post_title,
-                    post_content,
-                    post_category,
-                    post_tags,
-                    post_status,
-                    image_to_use,
-                    scheduled_datetime
-                )
-                st.success("Post updated successfully!")
-                # Remove query param and refresh
-                st.query_params.clear()
-                st.rerun()
+                try:
+                    # Use a new upload or image URL if provided, otherwise keep the existing one
+                    if featured_image_upload is not None:
+                        image_to_use = store_image(featured_image_upload.getvalue())
+                    else:
+                        image_to_use = featured_image_url if featured_image_url else post.get('featured_image')
+
+                    update_post(
+                        post_id,
+                        post_title,
+                        post_content,
+                        post_category,
+                        post_tags,
+                        post_status,
+                        image_to_use,
+                        scheduled_datetime
+                    )
+                    st.success("Post updated successfully!")
+                    # Remove query param and refresh
+                    st.query_params.clear()
+                    st.rerun()
+                except ValueError as e:
+                    st.error(f"Could not save the featured image: {e}")
 
     with col2:
         if st.button("Cancel"):
             st.query_params.clear()
             st.rerun()
 
+@timed()
 def manage_users():
     st.title("Manage Users")
 
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    c.execute("SELECT * FROM users ORDER BY created_at DESC")
-    users = [dict(row) for row in c.fetchall()]
-
-    conn.close()
+    users, next_cursor = get_keyset_page("manage_users", get_users)
 
     if users:
         for user in users:
             col1, col2, col3 = st.columns([3, 1, 1])
             with col1:
                 profile_img = user.get('profile_image', '')
-                profile_html = f'<img src="{profile_img}" style="width:50px; height:50px; border-radius:50%; margin-right:10px; float:left;">' if profile_img else ''
+                profile_html = f'<img src="{media_url(profile_img, "avatar")}" style="width:50px; height:50px; border-radius:50%; margin-right:10px; float:left;">' if profile_img else ''
 
                 st.markdown(f"""
                 <div class="card">
@@ -1849,31 +1295,15 @@ def manage_users():
 
             with col3:
                 if st.button("Update", key=f"update_{user['id']}"):
-                    conn = sqlite3.connect(DB_NAME)
-                    c = conn.cursor()
-                    c.execute("UPDATE users SET role = ? WHERE id = ?", (new_role, user['id']))
-                    conn.commit()
-                    conn.close()
+                    update_user_role(user['id'], new_role)
                     st.success(f"User {user['username']} updated to {new_role}")
                     st.rerun()
 
                 if user['username'] != DEFAULT_ADMIN_USERNAME and st.button("Delete", key=f"delete_{user['id']}"):
                     if st.session_state.get(f"confirm_delete_user_{user['id']}", False):
-                        conn = sqlite3.connect(DB_NAME)
-                        c = conn.cursor()
-
-                        # Delete user's comments
-                        c.execute("DELETE FROM comments WHERE user_id = ?", (user['id'],))
-
-                        # Set user's posts to admin
+                        # Delete the user's comments and hand their posts to the admin
                         admin_id = 1  # Assuming admin has ID 1
-                        c.execute("UPDATE posts SET author_id = ? WHERE author_id = ?", (admin_id, user['id']))
-
-                        # Delete the user
-                        c.execute("DELETE FROM users WHERE id = ?", (user['id'],))
-
-                        conn.commit()
-                        conn.close()
+                        delete_user(user['id'], reassign_posts_to=admin_id)
                         st.success(f"User {user['username']} deleted")
                         st.rerun()
                     else:
@@ -1882,23 +1312,29 @@ def manage_users():
     else:
         st.info("No users found")
 
+    show_page_controls("manage_users", next_cursor)
+
+@timed()
 def view_messages():
     st.title("Contact Messages")
 
     tab1, tab2 = st.tabs(["All Messages", "Unread Messages"])
 
     with tab1:
-        messages = get_contact_messages()
-        display_messages(messages)
+        messages, next_cursor = get_keyset_page("messages_all", get_contact_messages)
+        display_messages(messages, "all")
+        show_page_controls("messages_all", next_cursor)
 
     with tab2:
-        unread_messages = get_contact_messages(unread_only=True)
+        unread_messages, next_cursor = get_keyset_page(
+            "messages_unread", lambda limit, cursor: get_contact_messages(unread_only=True, limit=limit, cursor=cursor))
         if unread_messages:
-            display_messages(unread_messages)
+            display_messages(unread_messages, "unread")
         else:
             st.info("No unread messages")
+        show_page_controls("messages_unread", next_cursor)
 
-def display_messages(messages):
+def display_messages(messages, key_prefix):
     if messages:
         for msg in messages:
             read_status = "" if msg.get('read', 0) else "🔵 "
@@ -1912,121 +1348,289 @@ def display_messages(messages):
                 col1, col2 = st.columns(2)
                 with col1:
                     if not msg.get('read', 0):
-                        if st.button("Mark as Read", key=f"read_{msg['id']}"):
+                        if st.button("Mark as Read", key=f"{key_prefix}_read_{msg['id']}"):
                             mark_message_as_read(msg['id'])
                             st.success("Message marked as read")
                             st.rerun()
 
                 with col2:
-                    if st.button("Delete", key=f"delete_msg_{msg['id']}"):
-                        conn = sqlite3.connect(DB_NAME)
-                        c = conn.cursor()
-                        c.execute("DELETE FROM contact_messages WHERE id = ?", (msg['id'],))
-                        conn.commit()
-                        conn.close()
+                    if st.button("Delete", key=f"{key_prefix}_delete_msg_{msg['id']}"):
+                        delete_contact_message(msg['id'])
                         st.success("Message deleted")
                         st.rerun()
     else:
         st.info("No messages found")
 
+@timed()
 def manage_subscribers():
     st.title("Newsletter Subscribers")
 
-    subscribers = get_subscribers()
+    import_subscribers_form()
 
-    if subscribers:
+    total = get_subscriber_count()
+    if total:
         # Display subscriber count
-        st.metric("Total Subscribers", len(subscribers))
+        st.metric("Total Subscribers", total)
 
-        # Export option
+        # Export option: streamed from the database into a temporary file
         if st.button("Export Subscribers CSV"):
-            subscribers_df = pd.DataFrame(subscribers)
-            subscribers_df = subscribers_df[['email', 'name', 'subscribed_at']]
-            subscribers_df.columns = ['Email', 'Name', 'Subscribed At']
-
-            # Convert to CSV
-            csv = subscribers_df.to_csv(index=False)
-
-            # Create download button
-            st.download_button(
-                label="Download CSV",
-                data=csv,
-                file_name="subscribers.csv",
-                mime="text/csv"
-            )
-
-        # Display subscribers in a table
+            with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as out:
+                exported = export_subscribers_csv(out)
+                out.seek(0)
+
+                # Create download button
+                st.download_button(
+                    label=f"Download CSV ({exported} subscribers)",
+                    data=out.read().encode("utf-8"),
+                    file_name="subscribers.csv",
+                    mime="text/csv"
+                )
+
+        # Display one page of subscribers in a table
+        subscribers, next_cursor = get_keyset_page("subscribers", get_subscribers, created_key="subscribed_at")
         subscribers_df = pd.DataFrame(subscribers)
         subscribers_df['subscribed_at'] = subscribers_df['subscribed_at'].apply(lambda x: format_datetime(x)[:10] if x else '')
         subscribers_df = subscribers_df[['email', 'name', 'subscribed_at']]
         subscribers_df.columns = ['Email', 'Name', 'Subscribed At']
 
         st.dataframe(subscribers_df)
+        show_page_controls("subscribers", next_cursor)
 
         # Bulk actions
         st.subheader("Bulk Actions")
-        st.warning("In a production app, this would connect to an email service to send newsletters")
+        if not smtp_configured():
+            st.warning("Set SMTP_HOST (or the [smtp] section of secrets.toml) to send newsletters")
 
         subject = st.text_input("Email Subject")
-        message = st.text_area("Email Message")
+        message = st.text_area("Email Message", help="Markdown; sent as plain text with an HTML version")
+        test_address = st.text_input("Test Recipient", value=DEFAULT_ADMIN_EMAIL)
 
-        if st.button("Send Test Email"):
-            st.success("Test email would be sent in a production environment")
+        if st.button("Send Test Email", disabled=not smtp_configured()):
+            if not subject or not message or not is_valid_email(test_address):
+                st.error("Subject, message and a valid test recipient are required")
+            else:
+                try:
+                    send_test_email(subject, message, test_address)
+                    st.success(f"Test email sent to {test_address}")
+                except Exception as e:
+                    st.error(f"Sending the test email failed: {e}")
 
-        if st.button("Send to All Subscribers"):
+        if st.button("Send to All Subscribers", disabled=not smtp_configured()):
             if not subject or not message:
                 st.error("Subject and message are required")
             else:
-                st.success(f"Newsletter would be sent to {len(subscribers)} subscribers in a production environment")
+                # Delivery runs on a background thread; progress is read from the send log
+                start_newsletter_send(create_newsletter(subject, message))
+                st.success(f"Sending newsletter to {total} subscribers in the background")
+
+        show_newsletter_progress()
     else:
         st.info("No subscribers yet")
 
+def import_subscribers_form():
+    with st.expander("Import Subscribers from CSV"):
+        st.caption("One subscriber per row, with an Email column and optionally a Name column (the export's "
+                   "format works). Invalid rows and addresses already subscribed are skipped and listed.")
+        uploaded = st.file_uploader("CSV file", type=["csv"], key="subscriber_import_file")
+
+        if uploaded is not None and st.button("Import Subscribers"):
+            progress_bar = st.progress(0.0, text="Importing...")
+
+            def show_progress(report, fraction):
+                progress_bar.progress(fraction or 0.0, text=f"{report['rows']} rows read, {report['imported']} imported")
+
+            with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as rejected:
+                report = import_subscribers_csv(uploaded, rejected, progress=show_progress)
+                progress_bar.progress(1.0, text=f"{report['rows']} rows read")
+                st.success(f"Imported {report['imported']} subscribers "
+                           f"({report['duplicates']} duplicates, {report['invalid']} invalid rows skipped)")
+
+                if report['duplicates'] or report['invalid']:
+                    rejected.seek(0)
+                    st.dataframe(pd.read_csv(rejected, nrows=100, dtype=str, keep_default_na=False))
+                    rejected.seek(0)
+                    st.download_button(
+                        label="Download Rejected Rows",
+                        data=rejected.read().encode("utf-8"),
+                        file_name="rejected_subscribers.csv",
+                        mime="text/csv"
+                    )
+
+def show_newsletter_progress():
+    newsletters = get_newsletters(limit=5)
+    if not newsletters:
+        return
+
+    st.subheader("Recent Newsletters")
+    st.button("Refresh Progress", key="newsletter_refresh")
+    for newsletter in newsletters:
+        done = newsletter['sent'] + newsletter['failed']
+        st.markdown(f"**{newsletter['subject']}** · {newsletter['status']}"
+                    f"{' (sending now)' if newsletter['running'] else ''}")
+        st.progress(done / newsletter['recipients'] if newsletter['recipients'] else 1.0,
+                    text=f"{newsletter['sent']} sent, {newsletter['failed']} failed, "
+                         f"{newsletter['pending']} pending of {newsletter['recipients']}")
+
+        if newsletter['status'] == "sending":
+            st.button("Pause", key=f"newsletter_pause_{newsletter['id']}",
+                      on_click=lambda id=newsletter['id']: pause_newsletter(id))
+        elif newsletter['status'] == "paused":
+            st.button("Resume", key=f"newsletter_resume_{newsletter['id']}", disabled=not smtp_configured(),
+                      on_click=lambda id=newsletter['id']: resume_newsletter(id))
+
+        if newsletter['failed']:
+            with st.expander(f"Failed deliveries ({newsletter['failed']})"):
+                st.dataframe(pd.DataFrame(get_failed_deliveries(newsletter['id'])))
+
+@timed()
+def show_performance():
+    st.title("Performance")
+    st.caption(f"Wall time of up to {rerun_buffer.size} recent sampled reruns in this server process "
+               f"({PERF_SAMPLE_RATE:.0%} of reruns are sampled; set PERF_SAMPLE_RATE=0 to turn timing off). "
+               "Section and function figures are totals per rerun that used them.")
+    col1, col2 = st.columns(2)
+    col1.button("Refresh", key="perf_refresh")
+    col2.button("Clear", key="perf_clear", on_click=rerun_buffer.clear)
+
+    # Statement totals from the opt-in SQL tracer (sqltrace.py)
+    if SQL_TRACE_ENABLED:
+        with st.expander("SQL Statements"):
+            st.caption(f"Statements slower than {SQL_SLOW_MS:g} ms are logged with their query plan to "
+                       f"`{SQL_SLOW_LOG}`; summarize it with `python sqltrace.py`.")
+            statements = sql_tracer.stats(top=25)
+            if statements:
+                statements_df = pd.DataFrame(statements)[
+                    ['fingerprint', 'count', 'total_ms', 'avg_ms', 'max_ms', 'rows', 'slow']]
+                statements_df.columns = ['Statement', 'Count', 'Total (ms)', 'Avg (ms)', 'Max (ms)', 'Rows', 'Slow']
+                st.dataframe(statements_df, hide_index=True)
+            st.button("Reset Statement Totals", key="perf_sql_reset", on_click=sql_tracer.reset)
+
+    # Single-rerun CPU and memory profiles (profiling.py)
+    with st.expander("Profiles"):
+        st.caption("Open any page with `?profile_rerun=1` to profile that rerun with cProfile and tracemalloc, "
+                   "or profile the rerun this button starts.")
+        st.button("Profile Next Rerun", key="perf_profile_next",
+                  on_click=lambda: st.session_state.update(profile_next_rerun=True))
+        profiles = list_profiles()
+        if profiles:
+            names = {f"{datetime.datetime.fromtimestamp(profile['started']):%Y-%m-%d %H:%M:%S} · "
+                     f"{profile['route']} · {profile['ms']} ms": profile['name'] for profile in profiles}
+            selected = st.selectbox("Profile", list(names), key="perf_profile")
+            profile = load_profile(names[selected])
+            if profile:
+                col1, col2 = st.columns(2)
+                col1.metric("Wall Time", f"{profile['ms']} ms")
+                col2.metric("Peak Traced Memory", f"{profile['peak_kb']:,} KB" if profile['peak_kb'] is not None
+                            else "not traced")
+
+                st.subheader("Top Functions by Cumulative Time")
+                functions_df = pd.DataFrame(profile['functions'])
+                functions_df.columns = ['Function', 'Calls', 'Own Time (ms)', 'Cumulative (ms)']
+                st.dataframe(functions_df, hide_index=True)
+
+                st.subheader("Top Allocation Sites")
+                if profile['memory']:
+                    memory_df = pd.DataFrame(profile['memory'])
+                    memory_df.columns = ['Site', 'Size (KB)', 'Size Change (KB)', 'Blocks Change']
+                    st.dataframe(memory_df, hide_index=True)
+                else:
+                    st.info("No memory recorded: another profile was tracing memory at the time")
+
+                with open(profile['prof_path'], "rb") as f:
+                    st.download_button("Download .prof", f.read(), file_name=f"{profile['name']}.prof",
+                                       key="perf_profile_download")
+        else:
+            st.info("No profiles yet")
+
+    summary = perf_summary()
+    if not summary["reruns"]:
+        st.info("No reruns recorded yet")
+        return
+
+    timing_columns = {"reruns": "Reruns", "calls_per_rerun": "Calls / Rerun", "p50_ms": "p50 (ms)",
+                      "p95_ms": "p95 (ms)", "max_ms": "Max (ms)"}
+
+    def timing_table(rows):
+        return pd.DataFrame.from_dict(rows, orient="index").rename(columns=timing_columns)
+
+    st.header("Routes")
+    st.dataframe(timing_table(summary["routes"]))
+
+    st.header("Sections")
+    st.dataframe(timing_table(summary["sections"]))
+
+    st.header("Data Functions")
+    st.dataframe(timing_table(summary["functions"]))
+
+    st.header("Slowest Recent Reruns")
+    slowest_df = pd.DataFrame([{
+        "Started": datetime.datetime.fromtimestamp(rerun["started"]).strftime("%Y-%m-%d %H:%M:%S"),
+        "Route": rerun["route"],
+        "Total (ms)": rerun["ms"],
+        "Slowest Sections": ", ".join(f"{name} {ms} ms" for name, ms in rerun["top"]),
+    } for rerun in summary["slowest"]])
+    st.dataframe(slowest_df, hide_index=True)
+
 # Main app logic
-query_params = st.query_params.to_dict()
-
-# Handle query parameters for navigation
-if "post_id" in query_params:
-    show_post(int(query_params["post_id"][0]))
-elif "edit_post_id" in query_params and st.session_state.logged_in and st.session_state.user_role == "admin":
-    edit_post(int(query_params["edit_post_id"][0]))
-elif "create_post" in query_params and st.session_state.logged_in:
-    create_new_post()
-elif "profile" in query_params and st.session_state.logged_in:
-    show_user_profile()
-# Admin panel
-elif st.session_state.logged_in and st.session_state.user_role == "admin" and 'admin_page' in st.session_state:
-    if st.session_state.admin_page == "Dashboard":
-        admin_dashboard()
-    elif st.session_state.admin_page == "Manage Posts":
-        manage_posts()
-    elif st.session_state.admin_page == "Manage Users":
-        manage_users()
-    elif st.session_state.admin_page == "Messages":
-        view_messages()
-    elif st.session_state.admin_page == "Subscribers":
-        manage_subscribers()
-# Regular navigation
-else:
-    if 'page' in locals():
-        if page == "Home":
-            show_home()
-        elif page == "About":
-            show_about()
-        elif page == "Contact":
-            show_contact()
-        elif page == "Search":
-            show_search()
+try:
+    query_params = st.query_params.to_dict()
+
+    # Handle query parameters for navigation
+    if "post_id" in query_params:
+        set_route("post")
+        show_post(int(query_params["post_id"]))
+    elif "edit_post_id" in query_params and st.session_state.logged_in and st.session_state.user_role == "admin":
+        set_route("edit_post")
+        edit_post(int(query_params["edit_post_id"]))
+    elif "create_post" in query_params and st.session_state.logged_in:
+        set_route("create_post")
+        create_new_post()
+    elif "profile" in query_params and st.session_state.logged_in:
+        set_route("profile")
+        show_user_profile()
+    # Admin panel
+    elif st.session_state.logged_in and st.session_state.user_role == "admin" and 'admin_page' in st.session_state:
+        set_route(f"admin/{st.session_state.admin_page}")
+        if st.session_state.admin_page == "Dashboard":
+            admin_dashboard()
+        elif st.session_state.admin_page == "Manage Posts":
+            manage_posts()
+        elif st.session_state.admin_page == "Manage Users":
+            manage_users()
+        elif st.session_state.admin_page == "Messages":
+            view_messages()
+        elif st.session_state.admin_page == "Subscribers":
+            manage_subscribers()
+        elif st.session_state.admin_page == "Performance":
+            show_performance()
+    # Regular navigation
     else:
-        # Default to home if no page is selected
-        show_home()
+        set_route(page.lower() if 'page' in locals() else "home")
+        if 'page' in locals():
+            if page == "Home":
+                show_home(
+                    None if selected_category == "All" else selected_category,
+                    selected_tags,
+                    tag_mode
+                )
+            elif page == "About":
+                show_about()
+            elif page == "Contact":
+                show_contact()
+            elif page == "Search":
+                show_search()
+        else:
+            # Default to home if no page is selected
+            show_home(None if selected_category == "All" else selected_category, selected_tags, tag_mode)
 
-# Footer with social media links from config
-social_links_html = ""
-for platform, url in SOCIAL_LINKS.items():
-    icon_class = f"fab fa-{platform.lower()}"
-    social_links_html += f'<a href="{url}" target="_blank" style="margin: 0 10px;"><i class="{icon_class}"></i> {platform.capitalize()}</a>'
+    # Footer with social media links from config
+    with section("footer"):
+        social_links_html = ""
+        for platform, url in SOCIAL_LINKS.items():
+            icon_class = f"fab fa-{platform.lower()}"
+            social_links_html += f'<a href="{url}" target="_blank" style="margin: 0 10px;"><i class="{icon_class}"></i> {platform.capitalize()}</a>'
 
-st.markdown(f"""
+        st.markdown(f"""
 <div class="footer">
     <div style="display: flex; justify-content: center; margin-bottom: 15px; flex-wrap: wrap;">
         {social_links_html}
@@ -2035,4 +1639,10 @@ st.markdown(f"""
     <p style="font-size: 0.8rem; opacity: 0.7;">Exploring Technology, Quantum Physics, and AI</p>
     <div style="width: 50px; height: 3px; background: linear-gradient(90deg, var(--accent-color), var(--secondary-color)); margin: 15px auto;"></div>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+    # File this rerun's timings for the Performance page
+    end_rerun()
+finally:
+    # Also reached when a page raises or calls st.rerun() or st.stop()
+    finish_profile()
\ No newline at end of file
@@ -0,0 +1,627 @@
+"""
+Bulk export and import of blog content.
+
+An archive is a zip file of JSON Lines plus the images the rows refer to:
+
+    manifest.json    format version, archive ID and row counts
+    users.jsonl      authors and commenters (password hashes only on request)
+    posts.jsonl      posts with their tags; stored images point into media/
+    comments.jsonl   comments, referring to posts and users by archive ID
+    media/           original image files, named by content hash
+
+``export_archive`` streams each table from a cursor into the zip inside one
+read transaction, so the files agree with each other.
+
+``import_archive`` loads such an archive (zipped or unpacked), or a folder
+of Markdown files with YAML front matter, ARCHIVE_CHUNK_SIZE rows per
+transaction with executemany. For the duration of the load the triggers and
+non-unique indexes on posts, comments and post_tags are dropped (see
+migrations.defer_schema); they are rebuilt once at the end together with the
+search index, counters and related posts.
+
+Every row imported is recorded in ``archive_id_map`` under the archive's ID,
+mapping its ID in the archive to its new ID here. Comments find their posts
+and authors through it, and importing the same archive again, for instance
+after an interrupted run, skips whatever is already there.
+
+    python archive.py --export blog.zip
+    python archive.py --import blog.zip
+    python archive.py --import posts/ --author admin      # Markdown folder
+"""
+
+import argparse
+import datetime
+import hashlib
+import io
+import json
+import logging
+import os
+import posixpath
+import re
+import sys
+import uuid
+import zipfile
+
+import yaml
+
+from cache import invalidate
+from config import ARCHIVE_CHUNK_SIZE, DEFAULT_ADMIN_USERNAME, DEFAULT_CATEGORIES, FEEDS_ENABLED
+from db import get_connection, make_excerpt
+from feeds import notify_feeds, update_feeds
+from markup import RENDERER_VERSION, render_markdown
+from media import is_media_ref, media_original, store_image
+from migrations import defer_schema, restore_schema
+from utils import parse_tags
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = "edurishi-blog-archive"
+ARCHIVE_VERSION = 1
+MEDIA_FOLDER = "media/"
+POST_STATUSES = ("draft", "published", "scheduled")
+
+# Tables whose triggers and secondary indexes are set aside during an import
+DEFERRED_TABLES = ("posts", "comments", "post_tags")
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+_FRONT_MATTER = re.compile(r"\A---[ \t]*\r?\n(.*?)\r?\n(?:---|\.\.\.)[ \t]*(?:\r?\n|\Z)", re.DOTALL)
+_HEADING = re.compile(r"\A#[ \t]+(.+?)[ \t#]*(?:\r?\n|\Z)")
+
+USER_COLUMNS = ["id", "username", "email", "role", "bio", "profile_image", "created_at"]
+POST_COLUMNS = ["id", "title", "content", "author_id", "category", "tags", "featured_image", "status",
+                "published_at", "scheduled_for", "created_at", "updated_at"]
+COMMENT_COLUMNS = ["id", "post_id", "user_id", "content", "created_at"]
+
+
+# Export
+def _archive_image(value, media):
+    # Media references become paths inside the archive; URLs are kept as they are
+    if not is_media_ref(value):
+        return value
+    original = media_original(value)
+    name = MEDIA_FOLDER + os.path.basename(original)
+    media[name] = original
+    return name
+
+def _write_jsonl(zf, name, cursor, convert, chunk_size):
+    written = 0
+    with zf.open(name, "w", force_zip64=True) as out:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            out.write("".join(json.dumps(convert(row), ensure_ascii=False) + "\n" for row in rows).encode("utf-8"))
+            written += len(rows)
+    return written
+
+def export_archive(path, include_passwords=False, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Write every user, post and comment, and the images they use, to a zip archive.
+
+    Args:
+        path (str): Archive to create
+        include_passwords (bool): Also export password hashes, so imported
+            accounts can log in with their old passwords
+
+    Returns:
+        dict: The manifest written to the archive
+    """
+    media = {}
+    counts = {}
+    user_columns = USER_COLUMNS + (["password"] if include_passwords else [])
+
+    def convert_user(row):
+        user = dict(row)
+        user["profile_image"] = _archive_image(user["profile_image"], media)
+        return user
+
+    def convert_post(row):
+        post = dict(row)
+        post["tags"] = parse_tags(post["tags"])
+        post["featured_image"] = _archive_image(post["featured_image"], media)
+        return post
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf, get_connection() as conn:
+        # One read transaction: every file sees the same snapshot
+        conn.execute("BEGIN")
+        counts["users"] = _write_jsonl(zf, "users.jsonl", conn.execute(
+            f"SELECT {', '.join(user_columns)} FROM users ORDER BY id"), convert_user, chunk_size)
+        counts["posts"] = _write_jsonl(zf, "posts.jsonl", conn.execute(
+            f"SELECT {', '.join(POST_COLUMNS)} FROM posts ORDER BY id"), convert_post, chunk_size)
+        counts["comments"] = _write_jsonl(zf, "comments.jsonl", conn.execute(
+            f"SELECT {', '.join(COMMENT_COLUMNS)} FROM comments ORDER BY id"), dict, chunk_size)
+
+        counts["media"] = 0
+        for name, original in sorted(media.items()):
+            if os.path.exists(original):
+                # Images are already compressed
+                zf.write(original, name, compress_type=zipfile.ZIP_STORED)
+                counts["media"] += 1
+            else:
+                logger.warning("Media file %s is missing; exporting without it", original)
+
+        manifest = {
+            "format": ARCHIVE_FORMAT,
+            "version": ARCHIVE_VERSION,
+            "archive_id": uuid.uuid4().hex,
+            "exported_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "includes_passwords": include_passwords,
+            "counts": counts,
+        }
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+    return manifest
+
+
+# Import
+class _ArchiveFiles:
+    """
+    Members of an archive, whether zipped or unpacked into a folder.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path) if os.path.isfile(path) else None
+
+    def exists(self, name):
+        if self.zip is not None:
+            try:
+                self.zip.getinfo(name)
+                return True
+            except KeyError:
+                return False
+        return os.path.isfile(os.path.join(self.path, name))
+
+    def open(self, name):
+        if self.zip is not None:
+            return self.zip.open(name)
+        return open(os.path.join(self.path, name), "rb")
+
+    def read(self, name):
+        with self.open(name) as f:
+            return f.read()
+
+    def rows(self, name):
+        if not self.exists(name):
+            return
+        with self.open(name) as raw:
+            for line in io.TextIOWrapper(raw, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _timestamp(value):
+    # YAML front matter gives dates and datetimes; the database stores text
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, datetime.date):
+        return value.strftime("%Y-%m-%d 00:00:00")
+    return str(value) if value else None
+
+
+class _Importer:
+    """
+    State shared by the stages of one import.
+
+    Args:
+        archive_id (str): Key of this import in archive_id_map
+        load_media (callable): ``load_media(name)`` returns image bytes
+        default_author_id (int): Author for posts whose author is unknown
+        render (bool): Render Markdown to HTML now rather than on first view
+        chunk_size (int): Rows per transaction
+        progress (callable): ``progress(stage, report)`` after each chunk
+    """
+
+    def __init__(self, archive_id, load_media, default_author_id, render, chunk_size, progress):
+        self.archive_id = archive_id
+        self.load_media = load_media
+        self.default_author_id = default_author_id
+        self.render = render
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.report = {"users": 0, "users_matched": 0, "posts": 0, "comments": 0,
+                       "already_imported": 0, "orphaned_comments": 0, "missing_media": 0}
+        self.users = {}
+        self.tag_ids = {}
+        self.media = {}
+
+    def _mapped(self, conn, kind, old_ids):
+        mapped = {}
+        old_ids = [str(old_id) for old_id in old_ids]
+        for start in range(0, len(old_ids), 500):
+            chunk = old_ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            mapped.update(conn.execute(f"""
+            SELECT old_id, new_id FROM archive_id_map
+            WHERE archive_id = ? AND kind = ? AND old_id IN ({placeholders})
+            """, [self.archive_id, kind] + chunk).fetchall())
+        return mapped
+
+    def _remember(self, conn, kind, pairs):
+        conn.executemany("INSERT OR REPLACE INTO archive_id_map (archive_id, kind, old_id, new_id) VALUES (?, ?, ?, ?)",
+                         [(self.archive_id, kind, str(old_id), new_id) for old_id, new_id in pairs])
+
+    def _image(self, value):
+        # Archive paths are stored in the media store; anything else is a URL
+        if not value or "://" in value or value.startswith("data:"):
+            return value
+        if value not in self.media and (os.path.isabs(value) or posixpath.normpath(value).startswith("..")):
+            logger.warning("Skipping image %s: outside the archive", value)
+            self.report["missing_media"] += 1
+            self.media[value] = None
+        if value not in self.media:
+            try:
+                self.media[value] = store_image(self.load_media(value))
+            except (OSError, KeyError, ValueError) as e:
+                logger.warning("Skipping image %s: %s", value, e)
+                self.report["missing_media"] += 1
+                self.media[value] = None
+        return self.media[value]
+
+    def _next_id(self, conn, table):
+        # Called under BEGIN IMMEDIATE, so nobody else can take these IDs
+        return conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0] + 1
+
+    def import_users(self, rows):
+        for chunk in _chunks(rows, self.chunk_size):
+            with get_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self.users.update((int(old), new) for old, new in
+                                  self._mapped(conn, "user", [row["id"] for row in chunk]).items())
+
+                new_rows, matched = [], []
+                next_id = self._next_id(conn, "users")
+                for row in chunk:
+                    if row["id"] in self.users:
+                        self.report["already_imported"] += 1
+                        continue
+                    # Someone already here under the same username or email is the same person
+                    existing = conn.execute("SELECT id FROM users WHERE username = ? OR email = ?",
+                                            (row["username"], row["email"])).fetchone()
+                    if existing is not None:
+                        matched.append((row["id"], existing[0]))
+                        continue
+                    # Without an exported hash the account cannot log in until its password is reset
+                    password = row.get("password") or "!" + uuid.uuid4().hex
+                    new_rows.append((next_id, row["username"], password, row["email"], row.get("role") or "user",
+                                     row.get("bio"), self._image(row.get("profile_image")),
+                                     row.get("created_at")))
+                    matched.append((row["id"], next_id))
+                    next_id += 1
+
+                conn.executemany("""
+                INSERT INTO users (id, username, password, email, role, bio, profile_image, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                """, new_rows)
+                self._remember(conn, "user", matched)
+
+            self.users.update(matched)
+            self.report["users"] += len(new_rows)
+            self.report["users_matched"] += len(matched) - len(new_rows)
+            self._report("users")
+
+    def import_posts(self, rows):
+        """
+        Insert posts given as dicts with an ``old_id`` and POST_COLUMNS
+        (``author_id`` already resolved, ``tags`` a list).
+        """
+        for chunk in _chunks(rows, self.chunk_size):
+            # Skip what an earlier run imported before paying for rendering;
+            # checked again under the lock below
+            with get_connection() as conn:
+                seen = self._mapped(conn, "post", [post["old_id"] for post in chunk])
+            self.report["already_imported"] += sum(str(post["old_id"]) in seen for post in chunk)
+            chunk = [post for post in chunk if str(post["old_id"]) not in seen]
+            if not chunk:
+                self._report("posts")
+                continue
+
+            prepared = []
+            for post in chunk:
+                content = post.get("content") or ""
+                status = post.get("status") if post.get("status") in POST_STATUSES else "draft"
+                # Rendering and image processing happen before the write lock is taken
+                content_html = render_markdown(content) if self.render else None
+                prepared.append((post, content, status, content_html, make_excerpt(content, content_html),
+                                 parse_tags(post.get("tags")), self._image(post.get("featured_image"))))
+
+            with get_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                done = self._mapped(conn, "post", [post["old_id"] for post in chunk])
+                next_id = self._next_id(conn, "posts")
+
+                post_rows, post_tags, pairs = [], [], []
+                for post, content, status, content_html, excerpt, tags, featured_image in prepared:
+                    if str(post["old_id"]) in done:
+                        self.report["already_imported"] += 1
+                        continue
+                    post_rows.append((
+                        next_id, post.get("title") or "Untitled", content, content_html,
+                        RENDERER_VERSION if self.render else None, excerpt,
+                        post.get("author_id") or self.default_author_id, post.get("category") or DEFAULT_CATEGORIES[0],
+                        ", ".join(tags), featured_image, status,
+                        post.get("published_at"), post.get("scheduled_for"), post.get("created_at"),
+                        post.get("updated_at") or post.get("created_at")))
+                    post_tags.extend((next_id, name) for name in tags)
+                    pairs.append((post["old_id"], next_id))
+                    next_id += 1
+
+                conn.executemany("""
+                INSERT INTO posts (id, title, content, content_html, content_renderer, excerpt, author_id, category,
+                                   tags, featured_image, status, published_at, scheduled_for, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                        COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+                """, post_rows)
+                self._insert_tags(conn, post_tags)
+                self._remember(conn, "post", pairs)
+
+            self.report["posts"] += len(post_rows)
+            self._report("posts")
+
+    def _insert_tags(self, conn, post_tags):
+        new_names = sorted({name for _post_id, name in post_tags if name.lower() not in self.tag_ids})
+        if new_names:
+            conn.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for name in new_names])
+            for start in range(0, len(new_names), 500):
+                chunk = new_names[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                self.tag_ids.update((name.lower(), tag_id) for tag_id, name in conn.execute(
+                    f"SELECT id, name FROM tags WHERE name IN ({placeholders})", chunk))
+        conn.executemany("INSERT OR IGNORE INTO post_tags (post_id, tag_id) VALUES (?, ?)",
+                         [(post_id, self.tag_ids[name.lower()]) for post_id, name in post_tags])
+
+    def import_comments(self, rows):
+        for chunk in _chunks(rows, self.chunk_size):
+            with get_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                done = self._mapped(conn, "comment", [row["id"] for row in chunk])
+                posts = self._mapped(conn, "post", {row["post_id"] for row in chunk})
+                next_id = self._next_id(conn, "comments")
+
+                comment_rows, pairs = [], []
+                for row in chunk:
+                    if str(row["id"]) in done:
+                        self.report["already_imported"] += 1
+                        continue
+                    post_id = posts.get(str(row["post_id"]))
+                    if post_id is None:
+                        self.report["orphaned_comments"] += 1
+                        continue
+                    comment_rows.append((next_id, post_id, self.users.get(row["user_id"], self.default_author_id),
+                                         row["content"], row.get("created_at")))
+                    pairs.append((row["id"], next_id))
+                    next_id += 1
+
+                conn.executemany("""
+                INSERT INTO comments (id, post_id, user_id, content, created_at)
+                VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                """, comment_rows)
+                self._remember(conn, "comment", pairs)
+
+            self.report["comments"] += len(comment_rows)
+            self._report("comments")
+
+    def _report(self, stage):
+        if self.progress is not None:
+            self.progress(stage, dict(self.report))
+
+
+def parse_markdown_post(text, fallback_title=None):
+    """
+    Split a Markdown file into its YAML front matter and body.
+
+    A leading ``# Heading`` becomes the title when the front matter has none.
+
+    Returns:
+        tuple: (metadata dict, Markdown body)
+    """
+    match = _FRONT_MATTER.match(text)
+    meta = {}
+    if match:
+        meta = yaml.safe_load(match.group(1)) or {}
+        if not isinstance(meta, dict):
+            meta = {}
+        text = text[match.end():]
+    text = text.lstrip("\r\n")
+
+    if not meta.get("title"):
+        heading = _HEADING.match(text)
+        if heading:
+            meta["title"] = heading.group(1)
+            text = text[heading.end():].lstrip("\r\n")
+        elif fallback_title:
+            meta["title"] = fallback_title
+    return meta, text.rstrip() + "\n"
+
+def _markdown_posts(folder, authors):
+    """
+    Yield post dicts for import_posts from every Markdown file under ``folder``.
+    """
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(MARKDOWN_EXTENSIONS))
+
+    for path in paths:
+        relative = os.path.relpath(path, folder).replace(os.sep, "/")
+        with open(path, encoding="utf-8-sig") as f:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            meta, body = parse_markdown_post(f.read(), stem.replace("-", " ").replace("_", " ").title())
+
+        status = meta.get("status") or ("draft" if meta.get("draft") else "published")
+        created_at = _timestamp(meta.get("date") or meta.get("created_at"))
+        image = meta.get("featured_image") or meta.get("image") or meta.get("cover")
+        if image and "://" not in str(image):
+            # Relative to the Markdown file
+            image = os.path.relpath(os.path.join(os.path.dirname(path), str(image)), folder).replace(os.sep, "/")
+        tags = meta.get("tags") or meta.get("keywords") or []
+        category = meta.get("category") or (meta.get("categories") or [None])[0]
+
+        yield {
+            "old_id": relative,
+            "title": str(meta["title"]),
+            "content": body,
+            "author_id": authors(meta.get("author")),
+            "category": str(category) if category else None,
+            "tags": [str(tag) for tag in tags] if isinstance(tags, list) else str(tags),
+            "featured_image": image,
+            "status": status,
+            "published_at": _timestamp(meta.get("published_at")) or (created_at if status == "published" else None),
+            "scheduled_for": _timestamp(meta.get("scheduled_for")),
+            "created_at": created_at,
+            "updated_at": _timestamp(meta.get("updated") or meta.get("updated_at")),
+        }
+
+def _author_lookup(default_author_id):
+    cache = {}
+
+    def author_id(username):
+        if not username:
+            return default_author_id
+        username = str(username)
+        if username not in cache:
+            with get_connection() as conn:
+                row = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+            if row is None:
+                logger.warning("Unknown author %r; using the default author", username)
+            cache[username] = row[0] if row else default_author_id
+        return cache[username]
+    return author_id
+
+def import_archive(path, default_author=DEFAULT_ADMIN_USERNAME, render=True, rebuild_related=True,
+                   chunk_size=ARCHIVE_CHUNK_SIZE, progress=None):
+    """
+    Import an archive written by export_archive, or a folder of Markdown files.
+
+    Args:
+        path (str): Zip archive, unpacked archive folder, or Markdown folder
+        default_author (str): Username credited with posts and comments whose
+            author is missing or unknown
+        render (bool): Render post HTML now; otherwise it is rendered on first
+            view or by ``python markup.py --backfill``
+        rebuild_related (bool): Rebuild the related posts index afterwards
+        chunk_size (int): Rows per transaction
+        progress (callable): ``progress(stage, report)`` after each chunk
+
+    Returns:
+        dict: Counts of what was imported and skipped
+    """
+    with get_connection() as conn:
+        row = conn.execute("SELECT id FROM users WHERE username = ?", (default_author,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown default author {default_author!r}")
+    default_author_id = row[0]
+
+    files = None
+    if os.path.isdir(path) and not os.path.isfile(os.path.join(path, "manifest.json")):
+        folder = os.path.abspath(path)
+        archive_id = "markdown:" + hashlib.sha256(folder.encode("utf-8")).hexdigest()[:16]
+
+        def load_media(name):
+            with open(os.path.join(folder, name), "rb") as f:
+                return f.read()
+    else:
+        files = _ArchiveFiles(path)
+        manifest = json.loads(files.read("manifest.json"))
+        if manifest.get("format") != ARCHIVE_FORMAT or manifest.get("version", 0) > ARCHIVE_VERSION:
+            files.close()
+            raise ValueError(f"{path} is not a supported archive")
+        archive_id = manifest["archive_id"]
+        load_media = files.read
+
+    importer = _Importer(archive_id, load_media, default_author_id, render, chunk_size, progress)
+    try:
+        with get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR IGNORE INTO archive_imports (archive_id, source) VALUES (?, ?)",
+                         (archive_id, os.path.abspath(path)))
+            defer_schema(conn, DEFERRED_TABLES)
+
+        if files is None:
+            importer.import_posts(_markdown_posts(folder, _author_lookup(default_author_id)))
+        else:
+            importer.import_users(files.rows("users.jsonl"))
+            importer.import_posts(dict(row, old_id=row["id"], author_id=importer.users.get(row.get("author_id")))
+                                  for row in files.rows("posts.jsonl"))
+            importer.import_comments(files.rows("comments.jsonl"))
+    finally:
+        if files is not None:
+            files.close()
+        with get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            restore_schema(conn)
+
+    if rebuild_related:
+        from related import rebuild_index
+        with get_connection() as conn:
+            rebuild_index(conn)
+
+    with get_connection() as conn:
+        conn.execute("""
+        UPDATE archive_imports SET finished_at = CURRENT_TIMESTAMP, counts = ? WHERE archive_id = ?
+        """, (json.dumps(importer.report), archive_id))
+    invalidate("posts", "users")
+
+    # The rows bypassed db.py, which normally tells the feed writer
+    if importer.report["posts"] and FEEDS_ENABLED and not notify_feeds():
+        update_feeds()
+    return importer.report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import blog posts, comments and authors.")
+    parser.add_argument("--export", metavar="PATH", help="write everything to a zip archive at PATH")
+    parser.add_argument("--include-passwords", action="store_true",
+                        help="with --export, include password hashes")
+    parser.add_argument("--import", dest="import_path", metavar="PATH",
+                        help="import an archive, or a folder of Markdown files with front matter")
+    parser.add_argument("--author", default=DEFAULT_ADMIN_USERNAME,
+                        help="username credited when a post's author is missing or unknown")
+    parser.add_argument("--no-render", action="store_true",
+                        help="leave HTML rendering to first view or `python markup.py --backfill`")
+    parser.add_argument("--no-related", action="store_true", help="skip rebuilding the related posts index")
+    parser.add_argument("--chunk-size", type=int, default=ARCHIVE_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if not (args.export or args.import_path):
+        parser.print_help()
+        return 0
+
+    from db import init_db
+    init_db()
+
+    if args.export:
+        manifest = export_archive(args.export, args.include_passwords, args.chunk_size)
+        print(f"Exported {', '.join(f'{count} {name}' for name, count in manifest['counts'].items())} "
+              f"to {args.export}")
+
+    if args.import_path:
+        def show(stage, report):
+            print(f"\r{stage}: {report[stage]} imported", end="", flush=True)
+
+        try:
+            report = import_archive(args.import_path, args.author, render=not args.no_render,
+                                    rebuild_related=not args.no_related, chunk_size=args.chunk_size,
+                                    progress=show)
+        except ValueError as e:
+            print(f"\n{e}")
+            return 1
+        print("\n" + ", ".join(f"{count} {name.replace('_', ' ')}" for name, count in report.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
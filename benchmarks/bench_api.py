@@ -0,0 +1,228 @@
+"""
+Load-test and sanity-check the read-only JSON API.
+
+Seeds a throwaway database with published posts, tags and comments, then
+measures requests per second and latency percentiles for each endpoint:
+
+* in process, through the WSGI application with environs built by
+  wsgiref.util.setup_testing_defaults (the stdlib's test client), for a
+  plain GET, a gzip GET and a conditional GET answered with 304,
+* over HTTP against the threaded stdlib server, with concurrent clients.
+
+It also checks that:
+
+* ETags are stable, a matching If-None-Match or If-Modified-Since gets a 304
+  with no body, and gzip bodies decode to the plain body,
+* a change written by another process (a separate SQLite connection),
+  including an edit to a post's author, changes the ETag and the content
+  on the next request,
+* the keyset cursor walks the whole post list without repeats.
+
+    python benchmarks/bench_api.py --posts 10000
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from wsgiref.util import setup_testing_defaults
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ["quantum", "learning", "research", "network", "physics", "model", "qubit", "data", "theory",
+         "student", "university", "energy", "signal", "vector", "graph", "lattice", "neural", "python"]
+
+
+def seed(db, posts, comments_per_post, seed=7):
+    rng = random.Random(seed)
+    categories = ["AI", "Technology", "Quantum Physics", "Research"]
+    with db.get_connection() as conn:
+        conn.executemany("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
+                         [(f"author{i}", "x", f"author{i}@example.org", "user") for i in range(20)])
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+        rows = []
+        for i in range(posts):
+            content = "\n\n".join(" ".join(rng.choice(WORDS) for _ in range(80)) for _ in range(4))
+            rows.append((i + 1, f"Post {i + 1}", content, db.render_markdown(content), db.RENDERER_VERSION,
+                         db.make_excerpt(content), rng.choice(user_ids), rng.choice(categories),
+                         ", ".join(rng.sample(WORDS, 3)), f"2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}"))
+        conn.executemany("""
+        INSERT INTO posts (id, title, content, content_html, content_renderer, excerpt, author_id, category, tags,
+                           status, published_at, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'published', CURRENT_TIMESTAMP, ?, '2024-01-01 00:00:00')
+        """, rows)
+        for post_id, *_rest, tags, _created in rows:
+            db.sync_post_tags(conn, post_id, tags)
+        conn.executemany("INSERT INTO comments (post_id, user_id, content) VALUES (?, ?, ?)",
+                         [(post_id, rng.choice(user_ids), f"Comment {j} on post {post_id}")
+                          for post_id, *_ in rows for j in range(comments_per_post)])
+
+def call(app, path, headers=None, method="GET"):
+    """
+    Returns:
+        tuple: (status code, headers dict, body bytes)
+    """
+    path, _, query = path.partition("?")
+    environ = {"REQUEST_METHOD": method, "PATH_INFO": path, "QUERY_STRING": query}
+    for name, value in (headers or {}).items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = value
+    setup_testing_defaults(environ)
+    response = {}
+
+    def start_response(status, response_headers):
+        response["status"] = int(status.split()[0])
+        response["headers"] = dict(response_headers)
+
+    body = b"".join(app(environ, start_response))
+    return response["status"], response["headers"], body
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+def load_in_process(app, paths, headers, requests):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(requests):
+        begin = time.perf_counter()
+        status, _headers, _body = call(app, paths[i % len(paths)], headers(i) if callable(headers) else headers)
+        latencies.append(time.perf_counter() - begin)
+        assert status in (200, 304), status
+    elapsed = time.perf_counter() - start
+    return dict(requests_per_second=round(requests / elapsed), **percentiles(latencies))
+
+def load_over_http(port, paths, headers, requests, clients):
+    latencies, lock = [], threading.Lock()
+    per_client = requests // clients
+
+    def client(offset):
+        mine = []
+        for i in range(per_client):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            begin = time.perf_counter()
+            conn.request("GET", paths[(offset + i) % len(paths)], headers=headers)
+            response = conn.getresponse()
+            response.read()
+            mine.append(time.perf_counter() - begin)
+            conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(n * 7919,)) for n in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return dict(requests_per_second=round(len(latencies) / elapsed), clients=clients, **percentiles(latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the read-only JSON API.")
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=5, help="comments per post")
+    parser.add_argument("--requests", type=int, default=5000, help="requests per scenario")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent HTTP clients")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        import db
+        import api
+
+        db.init_db()
+        seed(db, args.posts, args.comments)
+        app = api.application
+        rng = random.Random(3)
+        post_paths = [f"/api/posts/{rng.randint(1, args.posts)}" for _ in range(200)]
+        scenarios = {
+            "post list": ["/api/posts", "/api/posts?category=AI", "/api/posts?tag=quantum", "/api/posts?limit=50"],
+            "single post": post_paths,
+            "comments": [path + "/comments" for path in post_paths],
+            "tags": ["/api/tags"],
+        }
+
+        checks = {}
+        status, headers, plain = call(app, "/api/posts/1")
+        status_gz, headers_gz, zipped = call(app, "/api/posts/1", {"Accept-Encoding": "gzip"})
+        checks["gzip_decodes_to_plain"] = headers_gz.get("Content-Encoding") == "gzip" and gzip.decompress(zipped) == plain
+        checks["gzip_ratio"] = round(len(plain) / len(zipped), 1)
+        checks["etag_stable"] = headers["ETag"] == call(app, "/api/posts/1")[1]["ETag"] == headers_gz["ETag"]
+        status, _headers, body = call(app, "/api/posts/1", {"If-None-Match": headers["ETag"]})
+        checks["if_none_match_304"] = status == 304 and body == b""
+        status, _headers, body = call(app, "/api/posts/1", {"If-Modified-Since": headers["Last-Modified"]})
+        checks["if_modified_since_304"] = status == 304 and body == b""
+        head_status, head_headers, head_body = call(app, "/api/posts/1", method="HEAD")
+        checks["head_matches_get"] = head_body == b"" and head_headers["Content-Length"] == str(len(plain))
+        checks["missing_post_404"] = call(app, "/api/posts/999999999")[0] == 404
+        checks["bad_cursor_400"] = call(app, "/api/posts?cursor=nonsense")[0] == 400
+
+        # Another process edits post 1 and adds a comment; this process's caches must notice
+        other = sqlite3.connect(os.environ["DB_NAME"])
+        other.execute("UPDATE posts SET title = 'Edited elsewhere', updated_at = '2030-01-01 00:00:00' WHERE id = 1")
+        other.execute("INSERT INTO comments (post_id, user_id, content) VALUES (1, 1, 'A new comment')")
+        other.commit()
+        other.close()
+        status, headers_after, body = call(app, "/api/posts/1", {"If-None-Match": headers["ETag"]})
+        checks["sees_other_process_edit"] = status == 200 and json.loads(body)["title"] == "Edited elsewhere"
+        comments = json.loads(call(app, "/api/posts/1/comments")[2])["items"]
+        checks["sees_other_process_comment"] = comments[0]["content"] == "A new comment"
+
+        other = sqlite3.connect(os.environ["DB_NAME"])
+        other.execute("UPDATE users SET bio = 'Edited elsewhere' WHERE id = (SELECT author_id FROM posts WHERE id = 1)")
+        other.commit()
+        other.close()
+        status, _headers, body = call(app, "/api/posts/1", {"If-None-Match": headers_after["ETag"]})
+        checks["sees_other_process_author_edit"] = status == 200 and json.loads(body)["author_bio"] == "Edited elsewhere"
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = json.loads(call(app, "/api/posts?limit=100" + (f"&cursor={cursor}" if cursor else ""))[2])
+            seen.extend(item["id"] for item in page["items"])
+            pages += 1
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        checks["cursor_walks_every_post_once"] = len(seen) == len(set(seen)) == args.posts
+
+        results = {"checks": checks, "in_process": {}, "http": {}}
+        for name, paths in scenarios.items():
+            etags = {path: call(app, path)[1]["ETag"] for path in paths}
+            def cold(i):
+                # No query cache and no response cache: every request does the full work
+                api.query_cache.clear()
+                api.response_cache.clear()
+                return {}
+            results["in_process"][f"{name}, uncached"] = load_in_process(app, paths, cold, args.requests // 5)
+            results["in_process"][f"{name}, GET"] = load_in_process(app, paths, {}, args.requests)
+            results["in_process"][f"{name}, GET gzip"] = load_in_process(app, paths, {"Accept-Encoding": "gzip"},
+                                                                         args.requests)
+            results["in_process"][f"{name}, conditional 304"] = load_in_process(
+                app, paths, lambda i: {"If-None-Match": etags[paths[i % len(paths)]]}, args.requests)
+
+        server = api.make_api_server("127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        for name in ("post list", "single post"):
+            results["http"][f"{name}, GET gzip"] = load_over_http(
+                server.server_port, scenarios[name], {"Accept-Encoding": "gzip"}, args.requests, args.clients)
+        server.shutdown()
+        db.get_pool().close()
+
+    print(json.dumps({"posts": args.posts, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
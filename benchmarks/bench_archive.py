@@ -0,0 +1,186 @@
+"""
+Benchmark and sanity-check post archive export and import.
+
+Seeds a throwaway database with posts, tags, comments and a few authors,
+exports it, then imports the archive into a second, empty database and
+reports:
+
+* export time and archive size,
+* import throughput in posts per second, with HTML rendered during the
+  import and with rendering left for later,
+* that the copy matches: row counts, every comment on the right post, the
+  search index, the counters, and the same indexes and triggers as before,
+* that importing the same archive again adds nothing,
+* that the feeds and sitemap were brought up to date afterwards,
+* a folder of Markdown files with front matter,
+* the old path for comparison: create_post once per post.
+
+    python benchmarks/bench_archive.py --posts 100000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ["quantum", "learning", "research", "network", "physics", "model", "qubit", "data", "theory",
+         "student", "university", "energy", "signal", "vector", "graph", "lattice", "neural", "python"]
+
+
+def use_database(db, path):
+    # Point the process-wide pool at another database file
+    db.get_pool().close()
+    db._pool = None
+    db.DB_NAME = path
+    db._db_initialized = False
+    db.init_db()
+
+def make_content(rng, words):
+    paragraphs = []
+    for _ in range(4):
+        paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(words // 4)))
+    paragraphs.insert(1, "## Section\n\n- **" + rng.choice(WORDS) + "** point\n- `code` point")
+    return "\n\n".join(paragraphs)
+
+def seed(db, posts, comments_per_post, words, seed=7):
+    rng = random.Random(seed)
+    categories = ["AI", "Technology", "Quantum Physics", "Research"]
+    with db.get_connection() as conn:
+        conn.executemany("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
+                         [(f"author{i}", "x", f"author{i}@example.org", "user") for i in range(20)])
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+
+    for start in range(0, posts, 5000):
+        rows = []
+        for i in range(start, min(start + 5000, posts)):
+            tags = rng.sample(WORDS, 3)
+            rows.append((i + 1, f"Post {i + 1}", make_content(rng, words), rng.choice(user_ids),
+                         rng.choice(categories), ", ".join(tags), "published"))
+        with db.get_connection() as conn:
+            conn.executemany("""
+            INSERT INTO posts (id, title, content, author_id, category, tags, status, published_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            """, rows)
+            for post_id, _title, _content, _author, _category, tags, _status in rows:
+                db.sync_post_tags(conn, post_id, tags)
+            conn.executemany("INSERT INTO comments (post_id, user_id, content) VALUES (?, ?, ?)",
+                             [(post_id, rng.choice(user_ids), f"Comment {j} on Post {post_id}")
+                              for post_id, *_ in rows for j in range(comments_per_post)])
+
+def schema_objects(conn):
+    return sorted(tuple(row) for row in conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE type IN ('index', 'trigger') AND sql IS NOT NULL"))
+
+def verify(db, expected):
+    from migrations import recount
+    with db.get_connection() as conn:
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                  for table in ("posts", "comments", "post_tags")}
+        misplaced = conn.execute("""
+        SELECT COUNT(*) FROM comments c JOIN posts p ON p.id = c.post_id
+        WHERE c.content NOT LIKE '% on ' || p.title
+        """).fetchone()[0]
+        fts = conn.execute("SELECT COUNT(*) FROM posts_fts WHERE posts_fts MATCH 'lattice'").fetchone()[0]
+        like = conn.execute("SELECT COUNT(*) FROM posts WHERE content LIKE '%lattice%'").fetchone()[0]
+        drift = {name: values for name, values in recount(conn).items() if values[0] != values[1]}
+        objects = schema_objects(conn)
+    return {
+        "counts_match": counts == expected["counts"],
+        "comments_on_right_post": misplaced == 0,
+        "search_index_complete": fts == like,
+        "counters_correct": not drift,
+        "indexes_and_triggers_restored": objects == expected["objects"],
+    }
+
+def write_markdown(folder, count, seed=11):
+    rng = random.Random(seed)
+    for i in range(count):
+        section = os.path.join(folder, f"section{i % 10}")
+        os.makedirs(section, exist_ok=True)
+        with open(os.path.join(section, f"note-{i}.md"), "w", encoding="utf-8") as f:
+            f.write(f"---\ntitle: \"Note {i}: {rng.choice(WORDS)}\"\nauthor: author{i % 20}\n"
+                    f"date: 2024-0{1 + i % 9}-1{i % 10}\ntags: [{rng.choice(WORDS)}, {rng.choice(WORDS)}]\n"
+                    f"category: Research\n---\n\n{make_content(rng, 120)}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark post archive export and import.")
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--comments", type=int, default=2, help="comments per post")
+    parser.add_argument("--words", type=int, default=200, help="words per post")
+    parser.add_argument("--markdown-files", type=int, default=5000)
+    parser.add_argument("--baseline-posts", type=int, default=1000,
+                        help="posts created one create_post call at a time, for the baseline")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "source.db")
+        os.environ["FEEDS_DIR"] = os.path.join(tmp, "site")
+        import db
+        from archive import export_archive, import_archive
+
+        db.init_db()
+        seed(db, args.posts, args.comments, args.words)
+        with db.get_connection() as conn:
+            expected = {"counts": {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                                   for table in ("posts", "comments", "post_tags")},
+                        "objects": schema_objects(conn)}
+
+        results = {}
+        path = os.path.join(tmp, "blog.zip")
+        start = time.perf_counter()
+        manifest = export_archive(path)
+        results["export"] = {"seconds": round(time.perf_counter() - start, 1),
+                             "archive_mb": round(os.path.getsize(path) / 2 ** 20, 1),
+                             "counts": manifest["counts"]}
+
+        for render in (True, False):
+            use_database(db, os.path.join(tmp, f"target-{render}.db"))
+            start = time.perf_counter()
+            report = import_archive(path, render=render, rebuild_related=False)
+            elapsed = time.perf_counter() - start
+            results[f"import, render={render}"] = dict(
+                seconds=round(elapsed, 1), posts_per_second=round(args.posts / elapsed), report=report,
+                **verify(db, expected))
+        results["feeds_updated_after_import"] = os.path.exists(os.path.join(os.environ["FEEDS_DIR"], "sitemap.xml"))
+
+        start = time.perf_counter()
+        report = import_archive(path, rebuild_related=False)
+        results["import again"] = {"seconds": round(time.perf_counter() - start, 1),
+                                   "added_nothing": report["posts"] == report["comments"] == report["users"] == 0,
+                                   "already_imported": report["already_imported"]}
+
+        folder = os.path.join(tmp, "markdown")
+        write_markdown(folder, args.markdown_files)
+        start = time.perf_counter()
+        report = import_archive(folder, rebuild_related=False)
+        elapsed = time.perf_counter() - start
+        results[f"markdown folder, {args.markdown_files} files"] = {
+            "seconds": round(elapsed, 1), "posts_per_second": round(args.markdown_files / elapsed), "report": report}
+
+        use_database(db, os.path.join(tmp, "baseline.db"))
+        rng = random.Random(3)
+        start = time.perf_counter()
+        for i in range(args.baseline_posts):
+            db.create_post(f"Post {i}", make_content(rng, args.words), 1, "AI", "quantum, data", "draft")
+        elapsed = time.perf_counter() - start
+        results["create_post per post (before)"] = {
+            "posts_per_second": round(args.baseline_posts / elapsed),
+            "estimated_seconds": round(args.posts * elapsed / args.baseline_posts, 1),
+        }
+        db.get_pool().close()
+
+    print(json.dumps({"posts": args.posts, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
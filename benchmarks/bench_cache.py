@@ -0,0 +1,102 @@
+"""
+Measure the query cache on the reads a home page and a post page make.
+
+Seeds a throwaway database, then times the same set of reads uncached (the
+functions' ``uncached`` originals), warm (every read a cache hit) and after
+a comment is added to one post (only that post's comments reload):
+
+    python benchmarks/bench_cache.py --posts 2000 --comments 20
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def seed(posts, comments, seed=7):
+    import db
+    db.init_db()
+
+    rng = random.Random(seed)
+    words = ["quantum", "learning", "research", "lorem", "ipsum", "education", "network", "physics"]
+    categories = ["AI", "Technology", "Quantum Physics", "Research"]
+
+    for i in range(posts):
+        content = " ".join(rng.choice(words) for _ in range(400))
+        tags = ", ".join(rng.sample(words, 3))
+        post_id = db.create_post(f"Post {i}", content, 1, rng.choice(categories), tags, "published")
+        for j in range(comments if i < 50 else 0):
+            db.add_comment(post_id, 1, f"Comment {j} on post {i}")
+
+
+def page_reads(db, post_id, cached=True):
+    def call(func, *args, **kwargs):
+        return (func if cached else func.uncached)(*args, **kwargs)
+
+    # Sidebar, home page and the post page with its comments and related posts
+    call(db.get_categories)
+    call(db.get_tag_counts)
+    call(db.get_post_summaries, "card", status="published", limit=3)
+    call(db.get_post_summaries, "card", status="published", limit=6)
+    post = call(db.get_post, post_id)
+    call(db.get_post_summaries, "card", status="published", category=post["category"], limit=3)
+    call(db.get_comments, post_id, limit=21)
+
+
+def measure(load, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the query cache on page reads.")
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--comments", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        seed(args.posts, args.comments)
+
+        import db
+        from cache import cache_stats
+
+        results = {
+            "uncached": measure(lambda: page_reads(db, 1, cached=False), args.repeat),
+        }
+        page_reads(db, 1)
+        results["warm"] = measure(lambda: page_reads(db, 1), args.repeat)
+
+        def after_comment():
+            db.add_comment(2, 1, "new comment")
+            page_reads(db, 1)
+            page_reads(db, 2)
+
+        page_reads(db, 2)
+        results["comment on another post, then both pages"] = measure(after_comment, args.repeat)
+        results["cache"] = cache_stats()
+        db.get_pool().close()
+
+    print(json.dumps({"posts": args.posts, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Count SQLite connections opened while rendering pages of the blog.
+
+Renders app.py headlessly with Streamlit's AppTest harness and counts every
+``sqlite3.connect`` call made during each rerun. Run it from the repository
+root against a scratch database:
+
+    DB_NAME=/tmp/bench.db python benchmarks/bench_connections.py --reruns 5
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest
+
+
+class ConnectCounter:
+    """
+    Wrap sqlite3.connect and count calls.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self._connect = sqlite3.connect
+
+    def __enter__(self):
+        def counting_connect(*args, **kwargs):
+            self.calls += 1
+            return self._connect(*args, **kwargs)
+
+        sqlite3.connect = counting_connect
+        return self
+
+    def __exit__(self, *exc):
+        sqlite3.connect = self._connect
+
+
+def measure(page_state, reruns):
+    app = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=30)
+    for key, value in page_state.items():
+        app.session_state[key] = value
+
+    # The first run of a fresh AppTest also pays for module imports and
+    # schema setup; measure steady-state reruns only.
+    app.run()
+
+    per_render = []
+    with ConnectCounter() as counter:
+        for _ in range(reruns):
+            before = counter.calls
+            app.run()
+            per_render.append(counter.calls - before)
+
+    return {
+        "connections_per_render": sum(per_render) / len(per_render),
+        "renders": per_render,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reruns", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    pages = {
+        "home (anonymous)": {},
+        "admin dashboard": {
+            "logged_in": True, "username": "admin", "user_role": "admin",
+            "user_id": 1, "admin_page": "Dashboard",
+        },
+    }
+    results = {name: measure(state, args.reruns) for name, state in pages.items()}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
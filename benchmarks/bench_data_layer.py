@@ -0,0 +1,190 @@
+"""
+Microbenchmarks for the data functions app.py calls.
+
+Seeds a throwaway database with seed.py (or copies an existing one with
+--db) and times each function many times with varied arguments:
+
+* get_posts with every combination of the status, category, tag, search
+  and author filters, plus the tag_mode="all" form,
+* get_post, get_comments (first page), get_tags, get_categories,
+  get_tag_counts and the dashboard count helpers,
+* authenticate (right and wrong password) and register.
+
+Query results are normally cached (cache.py), so the cache is cleared
+before every timed call: the figures are the database cost. A few cached
+cases are timed as well for comparison. Each case reports p50/p95/p99 in
+milliseconds, rows returned per call and rows per second. Save a run with
+--output and pass it to a later run with --baseline to add the p50 ratio
+(new / old) for every case.
+
+    python benchmarks/bench_data_layer.py --posts 20000 --output before.json
+    python benchmarks/bench_data_layer.py --posts 20000 --baseline before.json
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FILTERS = ("status", "category", "tag", "search_term", "author_id")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+def run_case(call, make_args, iterations, clear=None):
+    """
+    Time ``call(*make_args(i))`` ``iterations`` times.
+
+    Args:
+        clear (callable, optional): Run before each call, outside the timing
+
+    Returns:
+        dict: Percentiles, rows per call and rows per second
+    """
+    latencies, rows = [], 0
+    for i in range(iterations):
+        args = make_args(i)
+        if clear is not None:
+            clear()
+        begin = time.perf_counter()
+        result = call(*args)
+        latencies.append(time.perf_counter() - begin)
+        rows += len(result) if isinstance(result, (list, tuple)) else 1
+    total = sum(latencies)
+    return dict(calls=iterations, **percentiles(latencies), rows_per_call=round(rows / iterations, 1),
+                rows_per_second=round(rows / total) if total else None)
+
+def copy_database(source, target):
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+def sample_arguments(db, rng, count=200):
+    # Real values to filter on, drawn from the database with a seeded RNG
+    with db.get_connection() as conn:
+        categories = sorted(row[0] for row in conn.execute("SELECT DISTINCT category FROM posts"))
+        tags = [row[0] for row in conn.execute("""
+        SELECT t.name FROM tags t JOIN post_tags pt ON pt.tag_id = t.id
+        GROUP BY t.id ORDER BY COUNT(*) DESC, t.name LIMIT 40
+        """)]
+        authors = [row[0] for row in conn.execute("SELECT DISTINCT author_id FROM posts ORDER BY author_id")]
+        published = [row[0] for row in conn.execute("SELECT id FROM posts WHERE status = 'published' ORDER BY id")]
+        post_ids = rng.sample(published, min(count, len(published))) or [1]
+        placeholders = ", ".join("?" for _ in post_ids)
+        titles = [row[0] for row in conn.execute(f"SELECT title FROM posts WHERE id IN ({placeholders})", post_ids)]
+    return {
+        "status": ["published"],
+        "category": categories,
+        "tag": tags,
+        "search_term": [title.split()[0] for title in titles if title.split()] or ["quantum"],
+        "author_id": authors,
+        "post_id": post_ids,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the data layer functions app.py calls.")
+    parser.add_argument("--db", help="benchmark a copy of this database instead of seeding one")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--comments", type=float, default=5.0, help="average comments per published post")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=200, help="calls per case")
+    parser.add_argument("--limit", type=int, default=10, help="limit passed to get_posts, as the app does")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--baseline", help="results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        os.environ["FEEDS_ENABLED"] = "0"
+        if args.db:
+            copy_database(args.db, os.environ["DB_NAME"])
+        import db
+        from cache import query_cache
+
+        db.init_db()
+        setup = {}
+        if not args.db:
+            from seed import seed_database
+            # Fixed end date, so the rows are identical run to run
+            setup = seed_database(args.users, args.posts, args.comments, seed=args.seed,
+                                  end=datetime.datetime(2025, 1, 1), rebuild_related=False)
+        stats = db.get_dashboard_stats()
+        rng = random.Random(args.seed)
+        values = sample_arguments(db, rng)
+        pick = lambda name, i: values[name][(i * 7919 + FILTERS.index(name)) % len(values[name])]
+        cold = query_cache.clear
+        cases = {}
+
+        for size in range(len(FILTERS) + 1):
+            for combo in itertools.combinations(FILTERS, size):
+                cases["get_posts(" + ", ".join(combo) + ")"] = run_case(
+                    lambda filters: db.get_posts.uncached(limit=args.limit, **filters),
+                    lambda i, combo=combo: ({field: pick(field, i) for field in combo},), args.iterations, cold)
+        cases["get_posts(status, tags all)"] = run_case(
+            lambda tags: db.get_posts.uncached(status="published", tag=tags, tag_mode="all", limit=args.limit),
+            lambda i: ([pick("tag", i), pick("tag", i + 1)],), args.iterations, cold)
+        cases["get_posts(status), cached"] = run_case(
+            lambda: db.get_posts(status="published", limit=args.limit), lambda i: (), args.iterations)
+
+        post_id = lambda i: (values["post_id"][i % len(values["post_id"])],)
+        cases["get_post"] = run_case(db.get_post.uncached, post_id, args.iterations, cold)
+        cases["get_post, cached"] = run_case(db.get_post, lambda i: (values["post_id"][i % 5],), args.iterations)
+        cases["get_comments(first page)"] = run_case(
+            lambda post: db.split_page(db.get_comments.uncached(post, limit=11), 10)[0], post_id,
+            args.iterations, cold)
+        cases["get_comments(all)"] = run_case(db.get_comments.uncached, post_id, args.iterations, cold)
+        cases["get_tags"] = run_case(db.get_tags, lambda i: (), args.iterations, cold)
+        cases["get_tag_counts(limit=20)"] = run_case(db.get_tag_counts.uncached, lambda i: (20,), args.iterations,
+                                                     cold)
+        cases["get_categories"] = run_case(db.get_categories, lambda i: (), args.iterations, cold)
+        for helper in ("get_post_count", "get_published_post_count", "get_user_count", "get_comment_count",
+                       "get_subscriber_count", "get_unread_message_count", "get_dashboard_stats"):
+            cases[helper] = run_case(getattr(db, helper), lambda i: (), args.iterations, cold)
+
+        users = lambda i: (f"user{1 + i % max(1, args.users)}",)
+        cases["authenticate(right password)"] = run_case(lambda user: db.authenticate(user, "password"), users,
+                                                         args.iterations)
+        cases["authenticate(wrong password)"] = run_case(lambda user: db.authenticate(user, "wrong"), users,
+                                                         args.iterations)
+        cases["register"] = run_case(lambda n: db.register(f"bench{n}", "password", f"bench{n}@example.org"),
+                                     lambda i: (i,), args.iterations)
+        db.get_pool().close()
+
+    results = {
+        "scale": {name: stats[name] for name in ("posts", "published_posts", "users", "comments", "subscribers")},
+        "seed_seconds": setup.get("seconds"),
+        "iterations": args.iterations,
+        "cases": cases,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["cases"]
+        for name, case in cases.items():
+            if name in baseline and baseline[name]["p50_ms"]:
+                case["p50_vs_baseline"] = round(case["p50_ms"] / baseline[name]["p50_ms"], 2)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Benchmark and sanity-check the pre-rendered feeds and sitemap.
+
+Seeds a throwaway database with published posts and reports:
+
+* a full write of every feed and sitemap file, its time and its peak Python
+  memory (tracemalloc) next to the size of the sitemap on disk and the
+  peak for building the same sitemap as one string,
+* an update with nothing changed (should write nothing),
+* which files an edit, a scheduled publish (through
+  utils.check_scheduled_posts) and a delete rewrite,
+* that every file parses as XML, the sitemap lists each published post
+  once, and a post leaves the feeds and sitemap when deleted,
+* that the writer thread folds a burst of notifications into one update,
+  and waits out its debounce while notifications keep arriving.
+
+    python benchmarks/bench_feeds.py --posts 100000
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ["quantum", "learning", "research", "network", "physics", "model", "qubit", "data", "theory",
+         "student", "university", "energy", "signal", "vector", "graph", "lattice", "neural", "python"]
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def seed(db, posts, seed=7):
+    rng = random.Random(seed)
+    categories = ["AI", "Technology", "Quantum Physics", "Research"]
+    with db.get_connection() as conn:
+        conn.executemany("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
+                         [(f"author{i}", "x", f"author{i}@example.org", "user") for i in range(20)])
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+
+    for start in range(0, posts, 10000):
+        rows = []
+        for i in range(start, min(start + 10000, posts)):
+            content = " ".join(rng.choice(WORDS) for _ in range(60))
+            published = datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=i)
+            rows.append((i + 1, f"Post {i + 1}", content, db.make_excerpt(content), rng.choice(user_ids),
+                         rng.choice(categories), ", ".join(rng.sample(WORDS, 3)), published, published))
+        with db.get_connection() as conn:
+            conn.executemany("""
+            INSERT INTO posts (id, title, content, excerpt, author_id, category, tags, status, published_at,
+                               created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 'published', ?, ?)
+            """, rows)
+            for post_id, *_rest, tags, _published, _created in rows:
+                db.sync_post_tags(conn, post_id, tags)
+
+def sitemap_as_string(db, feeds):
+    # The approach the streaming writer avoids: every URL in one string
+    with db.get_connection() as conn:
+        rows = conn.execute(f"SELECT id, {feeds.LASTMOD_SQL} FROM posts WHERE status = 'published' ORDER BY id")
+        return feeds.SITEMAP_HEADER + "".join(feeds._sitemap_url(feeds.post_url(post_id), lastmod)
+                                              for post_id, lastmod in rows) + feeds.SITEMAP_FOOTER
+
+def peak_mb(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return round(peak / 2 ** 20, 2)
+
+def written_files(out_dir, since):
+    written = []
+    for root, _dirs, files in os.walk(out_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(".xml") and os.stat(path).st_mtime_ns > since:
+                written.append(os.path.relpath(path, out_dir))
+    return sorted(written)
+
+def sitemap_urls(out_dir):
+    urls = []
+    for sitemap in ET.parse(os.path.join(out_dir, "sitemap.xml")).getroot():
+        path = sitemap.find(f"{SITEMAP_NS}loc").text.split("/", 3)[3]
+        urls += [url.find(f"{SITEMAP_NS}loc").text for url in ET.parse(os.path.join(out_dir, path)).getroot()]
+    return urls
+
+def feed_links(out_dir, path):
+    return [item.find("link").text for item in ET.parse(os.path.join(out_dir, path)).getroot().iter("item")]
+
+def timed_update(feeds, out_dir):
+    # Report which files an update rewrote (mtime resolution needs the pause)
+    time.sleep(0.01)
+    since = time.time_ns()
+    report = feeds.update_feeds(out_dir)
+    report["files_written"] = written_files(out_dir, since)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pre-rendered feeds and sitemap.")
+    parser.add_argument("--posts", type=int, default=100000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        out_dir = os.environ["FEEDS_DIR"] = os.path.join(tmp, "site")
+        import db
+        import feeds
+        import utils
+
+        db.init_db()
+        seed(db, args.posts)
+        results, checks = {}, {}
+
+        results["full write"] = feeds.update_feeds(out_dir, full=True)
+        sitemap_bytes = sum(os.path.getsize(os.path.join(out_dir, "sitemaps", name))
+                            for name in os.listdir(os.path.join(out_dir, "sitemaps")))
+        results["memory"] = {
+            "sitemap_on_disk_mb": round(sitemap_bytes / 2 ** 20, 2),
+            "full write peak_mb": peak_mb(lambda: feeds.update_feeds(out_dir, full=True)),
+            "sitemap as one string peak_mb": peak_mb(lambda: sitemap_as_string(db, feeds)),
+        }
+        results["no changes"] = timed_update(feeds, out_dir)
+
+        post = db.get_post(args.posts // 2)
+        db.update_post(post["id"], post["title"] + " (updated)", post["content"], post["category"], post["tags"],
+                       "published")
+        results["after editing one post"] = timed_update(feeds, out_dir)
+
+        due = (datetime.datetime.now() - datetime.timedelta(minutes=1)).strftime("%Y-%m-%d %H:%M:%S")
+        scheduled_id = db.create_post("Scheduled post", "Goes out on time.", 1, "AI", "qubit", "scheduled",
+                                      scheduled_for=due)
+        time.sleep(0.01)
+        since = time.time_ns()
+        checks["check_scheduled_posts_published"] = utils.check_scheduled_posts() == 1
+        results["after a scheduled publish"] = {"files_written": written_files(out_dir, since)}
+        checks["scheduled_post_in_site_feed"] = feeds.post_url(scheduled_id) in feed_links(out_dir, "feeds/rss.xml")
+
+        deleted = args.posts // 3
+        db.delete_post(deleted)
+        results["after deleting one post"] = timed_update(feeds, out_dir)
+
+        urls = sitemap_urls(out_dir)
+        published = db.get_published_post_count()
+        checks["sitemap_lists_each_post_once"] = len(urls) == len(set(urls)) == published + 1
+        checks["deleted_post_gone"] = (feeds.post_url(deleted) not in urls and not any(
+            feeds.post_url(deleted) in feed_links(out_dir, path)
+            for path in ("feeds/rss.xml", "feeds/category/ai/rss.xml")))
+        parsed = 0
+        for root, _dirs, files in os.walk(out_dir):
+            for name in files:
+                if name.endswith(".xml"):
+                    ET.parse(os.path.join(root, name))
+                    parsed += 1
+        checks["all_files_parse"] = parsed
+
+        writer = feeds.FeedWriter(lambda: feeds.update_feeds(out_dir), debounce_seconds=0.2)
+        writer.start()
+        for _ in range(50):
+            writer.notify()
+        time.sleep(1)
+        writer.stop()
+        checks["burst_of_50_notifications_updates"] = writer.updates
+
+        # Changes arriving while the writer waits must not cut the wait short:
+        # 10 notifications 0.1s apart with a 0.5s debounce make two updates
+        writer = feeds.FeedWriter(lambda: feeds.update_feeds(out_dir), debounce_seconds=0.5)
+        writer.start()
+        for _ in range(10):
+            writer.notify()
+            time.sleep(0.1)
+        time.sleep(1)
+        writer.stop()
+        checks["10_notifications_over_1s_updates (2 expected)"] = writer.updates
+
+        db.get_pool().close()
+
+    print(json.dumps({"posts": args.posts, "results": results, "checks": checks}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Measure the fragment cache on the HTML a home page and a post page build.
+
+Seeds a throwaway database, loads the rows once, then times building every
+card, hero and comment block of both pages with the render functions called
+directly (cold) and through ``post_fragment``/``comments_fragment`` once the
+cache is warm:
+
+    python benchmarks/bench_fragments.py --posts 200 --comments 20
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def seed(posts, comments, seed=7):
+    import db
+    db.init_db()
+
+    rng = random.Random(seed)
+    words = ["quantum", "learning", "research", "lorem", "ipsum", "education", "network", "physics"]
+    categories = ["AI", "Technology", "Quantum Physics", "Research"]
+
+    for i in range(posts):
+        content = " ".join(rng.choice(words) for _ in range(400))
+        tags = ", ".join(rng.sample(words, 3))
+        post_id = db.create_post(f"Post {i}", content, 1, rng.choice(categories), tags, "published")
+        for j in range(comments if i < 5 else 0):
+            db.add_comment(post_id, 1, f"Comment {j} on post {i}")
+
+
+def load_pages(db):
+    featured = db.get_post_summaries("card", status="published", limit=3)
+    recent = db.get_post_summaries("card", status="published", limit=5)
+    post = db.get_post(featured[0]["id"])
+    related = db.get_post_summaries("card", status="published", category=post["category"], limit=3)
+    comments = db.get_comments(post["id"], limit=20)
+    return featured, recent, post, related, comments
+
+
+def render_cold(fragments, pages):
+    featured, recent, post, related, comments = pages
+    parts = [fragments.featured_card_html(p) for p in featured]
+    parts += [fragments.recent_card_html(p) for p in recent]
+    parts.append(fragments.hero_html(post))
+    parts += [fragments.related_card_html(p) for p in related]
+    parts += [fragments.comment_html(c) for c in comments]
+    return parts
+
+
+def render_cached(fragments, pages, theme="light"):
+    featured, recent, post, related, comments = pages
+    parts = [fragments.post_fragment("featured", p, theme) for p in featured]
+    parts += [fragments.post_fragment("recent", p, theme) for p in recent]
+    parts.append(fragments.post_fragment("hero", post, theme))
+    parts += [fragments.post_fragment("related", p, theme) for p in related]
+    parts.append(fragments.comments_fragment(post["id"], comments, theme))
+    return parts
+
+
+def measure(render, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"median_ms": round(statistics.median(timings), 4),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the rendered HTML fragment cache.")
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--comments", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        seed(args.posts, args.comments)
+
+        import db
+        import fragments
+
+        pages = load_pages(db)
+        results = {"cold": measure(lambda: render_cold(fragments, pages), args.repeat)}
+        render_cached(fragments, pages)
+        results["warm"] = measure(lambda: render_cached(fragments, pages), args.repeat)
+        results["fragments"] = fragments.fragment_stats()
+        db.get_pool().close()
+
+    print(json.dumps({"posts": args.posts, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
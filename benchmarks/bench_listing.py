@@ -0,0 +1,100 @@
+"""
+Compare full-row and summary post listings.
+
+Seeds a throwaway database with posts that have long bodies and, for a share
+of them, inline base64 featured images, then measures wall time and peak
+Python memory for loading the listing with get_posts (full rows) and with
+get_post_summaries (card projection):
+
+    python benchmarks/bench_listing.py --posts 1000
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def seed(posts, content_bytes, image_bytes, image_share, seed=7):
+    import db
+    db.init_db()
+
+    rng = random.Random(seed)
+    image = "data:image/jpeg;base64," + base64.b64encode(rng.randbytes(image_bytes)).decode()
+    words = ["quantum", "learning", "research", "lorem", "ipsum", "education", "network", "physics"]
+
+    for i in range(posts):
+        content = " ".join(rng.choice(words) for _ in range(content_bytes // 8))
+        post_id = db.create_post(f"Post {i}", content, 1, "AI", "ai, research", "published")
+        if rng.random() < image_share:
+            # Written directly: create_post would move data URIs into the media
+            # store, but databases from before it still carry them inline
+            with db.get_connection() as conn:
+                conn.execute("UPDATE posts SET featured_image = ? WHERE id = ?", (image, post_id))
+
+
+def measure(label, load, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    rows = load()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return label, {
+        "rows": len(rows),
+        "median_ms": round(statistics.median(timings), 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-row and summary post listings.")
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--content-bytes", type=int, default=8000)
+    parser.add_argument("--image-bytes", type=int, default=60000)
+    parser.add_argument("--image-share", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        seed(args.posts, args.content_bytes, args.image_bytes, args.image_share)
+
+        import db
+        # Measure the queries themselves, not the query cache
+        get_posts, get_post_summaries = db.get_posts.uncached, db.get_post_summaries.uncached
+        cases = [
+            ("full listing: get_posts", lambda: get_posts(status="published")),
+            ("full listing: get_post_summaries(card)",
+             lambda: get_post_summaries("card", status="published")),
+            ("home page: get_posts(limit=3) + get_posts(limit=5)",
+             lambda: get_posts(status="published", limit=3) + get_posts(status="published", limit=5)),
+            ("home page: get_post_summaries(card, 3 + 5)",
+             lambda: get_post_summaries("card", status="published", limit=3)
+             + get_post_summaries("card", status="published", limit=5)),
+        ]
+        results = dict(measure(label, load, args.repeat) for label, load in cases)
+        db.get_pool().close()
+
+    print(json.dumps({"posts": args.posts, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
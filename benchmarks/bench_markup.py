@@ -0,0 +1,62 @@
+"""
+Time render_markdown on a post with highlighted and plain code blocks.
+
+The sanitizer and the code blocks' survival through show_post's second
+Markdown pass are covered by tests/test_markup.py.
+
+    python benchmarks/bench_markup.py --iterations 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+POST = """# Profiling a rerun
+
+Some prose with *emphasis* and a [link](https://example.org).
+
+```python
+def load(path):
+    with open(path) as f:
+        data = f.read()
+
+
+    return data.splitlines()
+```
+
+An indented block:
+
+    first paragraph
+
+    second paragraph
+
+<pre>raw HTML
+
+with a blank line</pre>
+
+The end.
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time render_markdown.")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    from markup import render_markdown
+
+    begin = time.perf_counter()
+    for _ in range(args.iterations):
+        render_markdown(POST)
+    per_render = (time.perf_counter() - begin) / args.iterations
+
+    print(json.dumps({"iterations": args.iterations, "ms_per_render": round(per_render * 1000, 3)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Benchmark and sanity-check newsletter delivery against a local SMTP sink.
+
+Seeds a throwaway database with subscribers and starts a minimal SMTP server
+on localhost that accepts everything except a first "451" for a share of
+recipients, and waits --latency-ms before acknowledging each message, as a
+remote server would. Then it reports:
+
+* throughput of a full send with different numbers of pooled connections,
+  against a baseline that opens a connection per message,
+* that every subscriber got exactly one copy, including recipients that
+  needed a retry,
+* resume: a send stopped part-way and taken over by a second sender after
+  its lease lapsed must still deliver each message exactly once.
+
+    python benchmarks/bench_newsletter.py --subscribers 100000
+"""
+
+import argparse
+import json
+import logging
+import os
+import smtplib
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    # Just enough SMTP for smtplib: no pipelining, no auth, no TLS
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        self.reply("220 sink ready")
+        recipients = []
+        for raw in self.rfile:
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif verb in ("HELO", "NOOP"):
+                self.reply("250 ok")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 ok")
+            elif verb == "RCPT":
+                address = command.partition(":")[2].strip().strip("<>")
+                if server.defer(address):
+                    self.reply("451 try again later")
+                else:
+                    recipients.append(address)
+                    self.reply("250 ok")
+            elif verb == "DATA":
+                self.reply("354 go ahead")
+                for line in self.rfile:
+                    if line in (b".\r\n", b".\n"):
+                        break
+                time.sleep(server.latency)
+                server.delivered(recipients)
+                recipients = []
+                self.reply("250 queued")
+            elif verb == "RSET":
+                recipients = []
+                self.reply("250 ok")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, defer_every=0, latency=0):
+        super().__init__(("127.0.0.1", 0), SinkHandler)
+        self.defer_every = defer_every
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.received = Counter()
+        self.deferred = set()
+        self.connections = 0
+
+    def get_request(self):
+        with self.lock:
+            self.connections += 1
+        return super().get_request()
+
+    def defer(self, address):
+        # Refuse each selected recipient once with a temporary error
+        if not self.defer_every or zlib.crc32(address.encode()) % self.defer_every:
+            return False
+        with self.lock:
+            if address in self.deferred:
+                return False
+            self.deferred.add(address)
+            return True
+
+    def delivered(self, recipients):
+        with self.lock:
+            self.received.update(recipients)
+
+    def reset(self):
+        with self.lock:
+            self.received.clear()
+            self.deferred.clear()
+            self.connections = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+def seed(conn, subscribers):
+    conn.execute("DELETE FROM subscribers")
+    conn.executemany("INSERT INTO subscribers (email, name) VALUES (?, ?)",
+                     ((f"reader{i}@example.org", f"Reader {i}") for i in range(subscribers)))
+
+def check(sink, subscribers, newsletter_id, progress):
+    copies = Counter(sink.received.values())
+    return {
+        "progress": progress,
+        "everyone_once": copies == Counter({1: subscribers}) and progress["sent"] == subscribers,
+        "duplicates": sum(count - 1 for count in sink.received.values() if count > 1),
+        "retried": len(sink.deferred),
+        "smtp_connections": sink.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark newsletter delivery against a local SMTP sink.")
+    parser.add_argument("--subscribers", type=int, default=100000)
+    parser.add_argument("--connections", default="4,16", help="comma-separated pool sizes to measure")
+    parser.add_argument("--baseline-sample", type=int, default=2000,
+                        help="messages sent with a connection per message, for the baseline")
+    parser.add_argument("--defer-every", type=int, default=100,
+                        help="answer 451 once to about one recipient in this many")
+    parser.add_argument("--latency-ms", type=float, default=2, help="sink delay before accepting a message")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    sink = SMTPSink(args.defer_every, args.latency_ms / 1000)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    connect = lambda: smtplib.SMTP("127.0.0.1", sink.port, timeout=30)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        import db
+        import newsletter
+
+        db.init_db()
+        with db.get_connection() as conn:
+            seed(conn, args.subscribers)
+
+        subject, body = "Monthly digest", "# This month\n\nNew posts on **quantum computing** and AI.\n" * 5
+        results = {}
+
+        # Baseline: a fresh connection, greeting and QUIT for every message
+        sink.reset()
+        message = newsletter.RenderedMessage(0, subject, body)
+        start = time.perf_counter()
+        for i in range(args.baseline_sample):
+            address = f"reader{i}@example.org"
+            smtp = connect()
+            try:
+                smtp.sendmail(message.sender, [address], message.for_recipient(i, address))
+            except smtplib.SMTPRecipientsRefused:
+                pass
+            smtp.quit()
+        elapsed = time.perf_counter() - start
+        results["connection per message"] = {
+            "messages_per_second": round(args.baseline_sample / elapsed),
+            "estimated_seconds": round(args.subscribers * elapsed / args.baseline_sample, 1),
+        }
+
+        for connections in [int(n) for n in args.connections.split(",")]:
+            sink.reset()
+            newsletter_id = newsletter.create_newsletter(subject, body)
+            sender = newsletter.NewsletterSender(newsletter_id, connect=connect, connections=connections,
+                                                 rate=0, retry_seconds=0.05)
+            start = time.perf_counter()
+            progress = sender.run()
+            elapsed = time.perf_counter() - start
+            results[f"{connections} pooled connections"] = dict(
+                check(sink, args.subscribers, newsletter_id, progress),
+                seconds=round(elapsed, 1), messages_per_second=round(args.subscribers / elapsed))
+
+        # Stop a send a third of the way in, let its lease lapse as if the
+        # process had died, and have a second sender finish it
+        sink.reset()
+        newsletter_id = newsletter.create_newsletter(subject, body)
+        first = newsletter.NewsletterSender(newsletter_id, connect=connect, connections=16, rate=0,
+                                            retry_seconds=0.05)
+        thread = threading.Thread(target=first.run)
+        thread.start()
+        while sum(sink.received.values()) < args.subscribers // 3:
+            time.sleep(0.01)
+        first.stop()
+        thread.join()
+        interrupted_at = newsletter.get_newsletter_progress(newsletter_id)
+        with db.get_connection() as conn:
+            conn.execute("UPDATE newsletters SET lease_owner = 'crashed', lease_expires_at = 0 WHERE id = ?",
+                         (newsletter_id,))
+        second = newsletter.NewsletterSender(newsletter_id, connect=connect, connections=16, rate=0,
+                                             retry_seconds=0.05)
+        results["resume after interruption"] = dict(check(sink, args.subscribers, newsletter_id, second.run()),
+                                                    interrupted_at=interrupted_at)
+
+        # The token bucket should hold a send to its rate
+        limiter = newsletter.RateLimiter(500)
+        start = time.perf_counter()
+        for _ in range(1500):
+            limiter.acquire()
+        results["rate limiter, 1500 tokens at 500/s"] = {"seconds": round(time.perf_counter() - start, 2)}
+
+        db.get_pool().close()
+
+    sink.shutdown()
+    print(json.dumps({"subscribers": args.subscribers, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Overhead of the per-rerun timing in perf.py and profiling in profiling.py.
+
+Times a cached data function (get_categories, the cheapest call a rerun
+makes) and an empty ``section`` block three ways: unwrapped, wrapped with
+no rerun being timed (sampling off), and wrapped inside a timed rerun.
+Reports nanoseconds per call, and checks that a timed rerun records the
+calls and reaches the ring buffer.
+
+Also times the per-rerun check profiling.py adds for sessions that are not
+being profiled, and profiles one simulated rerun to check that its files are
+written and that work on another thread stays out of its stats. Then checks
+the safety stop: memory tracing ends for a profile whose thread exits
+without finishing it, and for one running past PROFILE_MAX_SECONDS.
+
+    python benchmarks/bench_perf.py --calls 200000
+"""
+
+import argparse
+import json
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def ns_per_call(fn, calls):
+    begin = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return round((time.perf_counter() - begin) / calls * 1e9)
+
+
+def other_session_work():
+    return sum(i * i for i in range(100000))
+
+def stops_tracing(seconds):
+    deadline = time.monotonic() + seconds
+    while tracemalloc.is_tracing() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return not tracemalloc.is_tracing()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the overhead of per-rerun timing and profiling.")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        os.environ["FEEDS_ENABLED"] = "0"
+        os.environ["PROFILE_DIR"] = os.path.join(tmp, "profiles")
+        os.environ["PROFILE_MAX_SECONDS"] = "2"
+        import db
+        import perf
+
+        db.init_db()
+        db.get_categories()
+        empty_section = lambda: perf.section("bench").__enter__().__exit__(None, None, None)
+        results, checks = {}, {}
+
+        results["get_categories unwrapped ns"] = ns_per_call(db.get_categories.__wrapped__, args.calls)
+        perf.begin_rerun(sample_rate=0)
+        results["get_categories sampling off ns"] = ns_per_call(db.get_categories, args.calls)
+        results["empty section sampling off ns"] = ns_per_call(empty_section, args.calls)
+        checks["unsampled_rerun_not_recorded"] = perf.end_rerun() is None
+
+        perf.begin_rerun(sample_rate=1)
+        perf.set_route("bench")
+        results["get_categories timed ns"] = ns_per_call(db.get_categories, args.calls)
+        results["empty section timed ns"] = ns_per_call(empty_section, args.calls)
+        rerun = perf.end_rerun()
+        checks["timed_rerun_counts_calls"] = (rerun["functions"]["get_categories"][1] == args.calls
+                                              and rerun["sections"]["bench"][1] == args.calls)
+        checks["timed_rerun_in_buffer"] = perf.perf_summary()["routes"]["bench"]["reruns"] == 1
+        results["sampling off overhead ns"] = (results["get_categories sampling off ns"]
+                                               - results["get_categories unwrapped ns"])
+
+        import profiling
+
+        results["finish_profile, not profiling ns"] = ns_per_call(profiling.finish_profile, args.calls)
+        profiling.start_profile()
+        other = threading.Thread(target=other_session_work)
+        other.start()
+        other.join()
+        db.get_posts.uncached(status="published")
+        profile = profiling.finish_profile("bench")
+        stored = profiling.load_profile(profile["name"], os.environ["PROFILE_DIR"])
+        profiled = {function for _file, _line, function in pstats.Stats(stored["prof_path"]).stats}
+        checks["profile_written"] = stored["peak_kb"] is not None and bool(stored["memory"])
+        checks["profile_has_rerun_work"] = "get_posts" in profiled
+        checks["other_thread_not_profiled"] = "other_session_work" not in profiled
+
+        abandoned = threading.Thread(target=profiling.start_profile)
+        abandoned.start()
+        abandoned.join()
+        checks["abandoned_profile_stops_tracing"] = stops_tracing(3)
+        profiling.start_profile()
+        checks["overlong_profile_stops_tracing"] = tracemalloc.is_tracing() and stops_tracing(4)
+        checks["overlong_profile_still_written"] = profiling.finish_profile("bench")["peak_kb"] is not None
+        db.get_pool().close()
+
+    print(json.dumps({"calls": args.calls, "results": results, "checks": checks}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
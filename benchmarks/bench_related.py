@@ -0,0 +1,140 @@
+"""
+Benchmark the related posts index.
+
+Seeds a throwaway database with topic-clustered posts, then reports:
+
+* full rebuild time,
+* the cost of re-indexing one post, and of saving a post whose words
+  did not change,
+* topic precision: share of neighbours from the same seeded topic,
+* lookup latency of get_related_posts against the old category query.
+
+Rebuild stability and incremental agreement are covered by
+tests/test_related.py.
+
+    python benchmarks/bench_related.py --posts 20000
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_vocabulary(rng, topics, topic_words, general_words):
+    def word():
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+    return [[word() for _ in range(topic_words)] for _ in range(topics)], [word() for _ in range(general_words)]
+
+def seed(conn, posts, topics=40, words=300, seed=7):
+    """
+    Insert posts directly (not through create_post, which would index each one).
+
+    Returns:
+        dict: post_id -> topic
+    """
+    rng = random.Random(seed)
+    topic_vocab, general = make_vocabulary(rng, topics, 60, 5000)
+    categories = ["AI", "Technology", "Quantum Physics", "Research"]
+
+    rows = []
+    post_topics = {}
+    for i in range(posts):
+        topic = rng.randrange(topics)
+        body = [rng.choice(topic_vocab[topic]) if rng.random() < 0.3 else
+                general[min(int(rng.paretovariate(1.1)), len(general)) - 1] for _ in range(words)]
+        title = " ".join(rng.sample(topic_vocab[topic], 3))
+        tags = ", ".join(rng.sample(topic_vocab[topic], 2))
+        rows.append((f"{title} {i}", " ".join(body), 1, rng.choice(categories), tags, "published"))
+        post_topics[i + 1] = topic
+
+    conn.executemany("""
+    INSERT INTO posts (title, content, author_id, category, tags, status, published_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    """, rows)
+    return post_topics
+
+def snapshot(conn):
+    lists = {}
+    for post_id, related_id, score in conn.execute(
+            "SELECT post_id, related_id, score FROM related_posts ORDER BY post_id, score DESC, related_id"):
+        lists.setdefault(post_id, []).append((related_id, score))
+    return lists
+
+def measure(load, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the related posts index.")
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        import db
+        from related import index_post, rebuild_index, remove_post
+
+        db.init_db()
+        with db.get_connection() as conn:
+            conn.execute("DELETE FROM posts")
+            post_topics = seed(conn, args.posts)
+
+        results = {}
+        with db.get_connection() as conn:
+            results["rebuild"] = rebuild_index(conn)
+            first = snapshot(conn)
+
+        # Re-index posts through the incremental path (remove_post + index_post)
+        rng = random.Random(1)
+        sample = rng.sample(sorted(post_topics), args.updates)
+        start = time.perf_counter()
+        for post_id in sample:
+            with db.get_connection() as conn:
+                remove_post(conn, post_id)
+                index_post(conn, post_id)
+        results["incremental_reindex_ms"] = round((time.perf_counter() - start) * 1000 / args.updates, 2)
+
+        # Saving a post without changing its words skips the index entirely
+        start = time.perf_counter()
+        for post_id in sample:
+            post = db.get_post.uncached(post_id)
+            db.update_post(post_id, post["title"], post["content"], post["category"], post["tags"], "published")
+        results["update_post_unchanged_words_ms"] = round((time.perf_counter() - start) * 1000 / args.updates, 2)
+
+        same_topic = [post_topics[related_id] == post_topics[post_id]
+                      for post_id, neighbours in first.items() for related_id, _ in neighbours[:3]]
+        results["top3_same_topic"] = round(sum(same_topic) / len(same_topic), 3)
+
+        sample = rng.sample(sorted(post_topics), 50)
+        results["get_related_posts, 50 posts"] = measure(
+            lambda: [db.get_related_posts.uncached(post_id) for post_id in sample], args.repeat // 10)
+        results["category query (before), 50 posts"] = measure(
+            lambda: [db.get_post_summaries.uncached("card", status="published", category="AI", limit=4)
+                     for _ in sample], args.repeat // 10)
+        db.get_pool().close()
+
+    print(json.dumps({"posts": args.posts, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
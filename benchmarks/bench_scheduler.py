@@ -0,0 +1,84 @@
+"""
+Cost of the scheduled-post publisher (scheduler.py).
+
+Seeds a throwaway database with --scheduled far-future scheduled posts and
+drives a PostScheduler through the real db functions with a fixed clock,
+then reports:
+
+* a run_pending call with nothing due (what the thread does each wake-up),
+* a resync, which reloads the whole schedule from the database,
+* publishing one due post,
+* stopping the thread.
+
+The scheduler's behaviour is covered by tests/test_scheduler.py.
+
+    python benchmarks/bench_scheduler.py --scheduled 10000
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+START = datetime.datetime(2030, 1, 1, 9, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the scheduled-post publisher.")
+    parser.add_argument("--scheduled", type=int, default=10000, help="far-future scheduled posts waiting")
+    parser.add_argument("--calls", type=int, default=10000, help="run_pending calls to time")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DB_NAME=os.path.join(tmp, "bench.db"), FEEDS_ENABLED="0", SCHEDULER_ENABLED="0")
+        import db
+        from scheduler import PostScheduler
+
+        db.init_db()
+        far = db.format_timestamp(START + datetime.timedelta(days=365))
+        with db.get_connection() as conn:
+            conn.executemany("""
+            INSERT INTO posts (title, content, author_id, category, status, scheduled_for)
+            VALUES (?, ?, 1, 'AI', 'scheduled', ?)
+            """, [(f"Later {i}", "Not yet.", far) for i in range(args.scheduled)])
+
+        now = START
+        scheduler = PostScheduler(db.publish_due_posts, db.get_schedule, clock=lambda: now, resync_seconds=3600)
+        results = {}
+
+        scheduler.run_pending()
+        begin = time.perf_counter()
+        for _ in range(args.calls):
+            scheduler.run_pending()
+        results["run_pending, nothing due us"] = round((time.perf_counter() - begin) / args.calls * 1e6, 2)
+
+        begin = time.perf_counter()
+        scheduler.resync(now)
+        results[f"resync, {args.scheduled} scheduled ms"] = round((time.perf_counter() - begin) * 1000, 1)
+
+        due = db.create_post("Due post", "Goes out now.", 1, "AI", "qubit", "scheduled", scheduled_for=START)
+        scheduler.schedule(due, START)
+        begin = time.perf_counter()
+        scheduler.run_pending()
+        results["run_pending, one post due ms"] = round((time.perf_counter() - begin) * 1000, 2)
+
+        scheduler.start()
+        begin = time.perf_counter()
+        scheduler.stop()
+        results["stop ms"] = round((time.perf_counter() - begin) * 1000, 1)
+        db.get_pool().close()
+
+    print(json.dumps({"scheduled": args.scheduled, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compare FTS5 and LIKE search on a synthetic corpus.
+
+Builds a throwaway database of random posts (50,000 by default), then times
+search_posts() for a set of queries with the FTS5 index and with the LIKE
+fallback. Also checks that highlighted titles and snippets are escaped, so
+HTML in a post body cannot reach the result cards:
+
+    python benchmarks/bench_search.py --posts 50000 --repeat 3
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUERIES = ["quantum", "neural network", '"error correction"', "comp*", "education research india"]
+
+TOPIC_WORDS = [
+    "quantum", "qubit", "entanglement", "error", "correction", "neural", "network", "learning",
+    "education", "research", "india", "university", "computing", "compiler", "algorithm", "physics",
+]
+
+
+def build_corpus(path, posts, seed=42):
+    os.environ["DB_NAME"] = path
+
+    import db
+    db.init_db()
+
+    rng = random.Random(seed)
+    filler = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+              for _ in range(5000)]
+    vocabulary = filler + TOPIC_WORDS * 4
+
+    rows = []
+    for i in range(posts):
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(4, 9)))
+        content = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(150, 400)))
+        tags = ", ".join(rng.sample(TOPIC_WORDS, 3))
+        rows.append((title, content, 1, rng.choice(["AI", "Technology", "Research"]), tags, "published"))
+
+    with db.get_connection() as conn:
+        conn.executemany("""
+        INSERT INTO posts (title, content, author_id, category, tags, status)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+
+
+def time_queries(search, repeat):
+    results = {}
+    for query in QUERIES:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _posts, total = search.search_posts(query, per_page=10)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[query] = {"median_ms": round(statistics.median(samples), 2), "matches": total}
+    return results
+
+
+def check_escaping(db, search):
+    db.create_post("Unsafe <b>quantum</b> title", 'Intro quantum <img src=x onerror=alert(1)> and '
+                   '<div style="color:red', 1, "AI", "quantum", "published")
+    checks = {}
+    for mode, available in (("fts5", True), ("like", False)):
+        search._fts_available = available
+        post = next(post for post in search.search_posts("onerror", per_page=10)[0]
+                    if post["title"].startswith("Unsafe"))
+        text = post["title_highlight"] + post["snippet"]
+        checks[f"{mode}_escaped"] = "<img" not in text and "<div" not in text and "<b>" not in text
+        checks[f"{mode}_marks_matches"] = available is False or "<mark>onerror</mark>" in text
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FTS5 and LIKE search.")
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        build_corpus(os.path.join(tmp, "bench.db"), args.posts)
+        build_seconds = time.perf_counter() - start
+
+        import search
+        fts = time_queries(search, args.repeat)
+        search._fts_available = False
+        like = time_queries(search, args.repeat)
+
+        import db
+        checks = check_escaping(db, search)
+        db.get_pool().close()
+
+    print(json.dumps({
+        "posts": args.posts,
+        "corpus_build_seconds": round(build_seconds, 1),
+        "fts5": fts,
+        "like": like,
+        "checks": checks,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
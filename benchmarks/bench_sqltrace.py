@@ -0,0 +1,107 @@
+"""
+Overhead and output of the opt-in SQL tracer (sqltrace.py).
+
+Seeds a throwaway database with seed.py, then runs every get_posts filter
+combination through db.py with tracing on and reports:
+
+* the cost of tracing: the same statements (the get_posts shapes, and a
+  primary key lookup) run on a plain connection and on a TracedConnection,
+  in microseconds per statement,
+* how many statements and distinct fingerprints the run produced,
+* the slow-query log written with SQL_SLOW_MS set to --slow-ms, and that
+  its summary (python sqltrace.py) has a plan for the logged SELECTs.
+
+    python benchmarks/bench_sqltrace.py --posts 20000
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FILTERS = {"status": "published", "category": "AI", "tag": ["ai", "quantum"], "search_term": "quantum",
+           "author_id": 3}
+
+
+def filter_combinations():
+    for size in range(len(FILTERS) + 1):
+        for combo in itertools.combinations(FILTERS, size):
+            yield {field: FILTERS[field] for field in combo}
+
+def run_statements(conn, statements, rounds):
+    begin = time.perf_counter()
+    for _ in range(rounds):
+        for query, params in statements:
+            conn.execute(query, params).fetchall()
+    return round((time.perf_counter() - begin) / (rounds * len(statements)) * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the SQL tracer's overhead and output.")
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=20, help="passes over the get_posts statements")
+    parser.add_argument("--slow-ms", type=float, default=2.0, help="slow-query threshold for the run")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "logs", "slow.jsonl")
+        os.environ.update(DB_NAME=os.path.join(tmp, "bench.db"), FEEDS_ENABLED="0", SQL_TRACE_ENABLED="1",
+                          SQL_SLOW_MS=str(args.slow_ms), SQL_SLOW_LOG=log_path)
+        import db
+        import sqltrace
+        from seed import seed_database
+
+        db.init_db()
+        seed_database(100, args.posts, 2.0, seed=11, end=datetime.datetime(2025, 1, 1), rebuild_related=False)
+
+        statements = [db.build_posts_query(limit=10, **filters) for filters in filter_combinations()]
+        lookups = [("SELECT * FROM posts WHERE id = ?", (post_id,)) for post_id in range(1, 1001)]
+        plain = sqlite3.connect(os.environ["DB_NAME"])
+        traced = sqlite3.connect(os.environ["DB_NAME"], factory=sqltrace.TracedConnection)
+        run_statements(plain, statements, 1)
+        results = {}
+        for name, shapes, rounds in (("get_posts", statements, args.rounds), ("lookup by id", lookups, 20)):
+            results[name] = {"plain us/statement": run_statements(plain, shapes, rounds),
+                             "traced us/statement": run_statements(traced, shapes, rounds)}
+        plain.close()
+        traced.close()
+
+        sqltrace.sql_tracer.reset()
+        logged_before = len(sqltrace.read_slow_log(log_path))
+        for filters in filter_combinations():
+            db.get_posts.uncached(limit=10, **filters)
+            db.get_posts.uncached(limit=10, **dict(filters, tag=["ai", "quantum", "physics"]) if "tag" in filters
+                                  else filters)
+        stats = sqltrace.sql_tracer.stats()
+        results["get_posts calls"] = 2 * len(statements)
+        results["statements traced"] = sum(entry["count"] for entry in stats)
+        results["fingerprints"] = len(stats)
+        results["slowest fingerprints"] = [{"fingerprint": entry["fingerprint"][:120], "avg_ms": entry["avg_ms"],
+                                            "max_ms": entry["max_ms"]} for entry in stats[:5]]
+        db.get_pool().close()
+
+        records = sqltrace.read_slow_log(log_path)[logged_before:]
+        summary = sqltrace.summarize_slow_log(records)
+        checks = {
+            "tag_lists_share_a_fingerprint": len(stats) == len(statements),
+            "slow_queries_logged": len(records),
+            "logged_selects_have_plans": all(entry["plan"] for entry in summary
+                                             if entry["fingerprint"].startswith("SELECT")),
+        }
+
+    print(json.dumps({"posts": args.posts, "results": results, "checks": checks}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
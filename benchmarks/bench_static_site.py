@@ -0,0 +1,135 @@
+"""
+Benchmark and sanity-check the incremental static site export.
+
+Seeds a throwaway database with published posts, tags and comments, builds
+the related posts index, and reports:
+
+* a full build, rendered in this process and on a worker pool,
+* a build with nothing changed (should render nothing),
+* a build after editing one post through update_post: which pages were
+  rendered, by kind, and that the site then matches a fresh full build
+  file for file,
+* a build after unpublishing a post: its page is removed and nothing
+  links to it any more.
+
+    python benchmarks/bench_static_site.py --posts 10000
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ["quantum", "learning", "research", "network", "physics", "model", "qubit", "data", "theory",
+         "student", "university", "energy", "signal", "vector", "graph", "lattice", "neural", "python"]
+
+
+def seed(db, posts, comments_per_post, seed=7):
+    rng = random.Random(seed)
+    categories = ["AI", "Technology", "Quantum Physics", "Research"]
+    with db.get_connection() as conn:
+        conn.executemany("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
+                         [(f"author{i}", "x", f"author{i}@example.org", "user") for i in range(20)])
+        user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+        rows = []
+        for i in range(posts):
+            content = "\n\n".join(" ".join(rng.choice(WORDS) for _ in range(60)) for _ in range(3))
+            rows.append((i + 1, f"Post {i + 1}", content, db.render_markdown(content), db.RENDERER_VERSION,
+                         db.make_excerpt(content), rng.choice(user_ids), rng.choice(categories),
+                         ", ".join(rng.sample(WORDS, 3)), f"2024-01-01 00:00:{i % 60:02d}"))
+        conn.executemany("""
+        INSERT INTO posts (id, title, content, content_html, content_renderer, excerpt, author_id, category, tags,
+                           status, published_at, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'published', CURRENT_TIMESTAMP, ?)
+        """, rows)
+        for post_id, *_rest, tags, _created in rows:
+            db.sync_post_tags(conn, post_id, tags)
+        conn.executemany("INSERT INTO comments (post_id, user_id, content) VALUES (?, ?, ?)",
+                         [(post_id, rng.choice(user_ids), f"Comment {j} on post {post_id}")
+                          for post_id, *_ in rows for j in range(comments_per_post)])
+
+        from related import rebuild_index
+        rebuild_index(conn)
+
+def file_hashes(folder):
+    hashes = {}
+    for root, _dirs, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                hashes[os.path.relpath(path, folder)] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+def rendered_kinds(before, after):
+    # Which pages a build wrote, grouped by the first path segment
+    kinds = {}
+    for path, digest in after.items():
+        if before.get(path) != digest and path.endswith(".html"):
+            kind = path.split(os.sep)[0] if os.sep in path else "home"
+            kinds[kind] = kinds.get(kind, 0) + 1
+    return kinds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the incremental static site export.")
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=2, help="comments per post")
+    parser.add_argument("--workers", type=int, default=max(2, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        import db
+        from static_site import build_site
+
+        db.init_db()
+        seed(db, args.posts, args.comments)
+        site = os.path.join(tmp, "site")
+        results = {"cpus": os.cpu_count()}
+
+        results["full build, 1 process"] = build_site(os.path.join(tmp, "site-serial"), workers=1)
+        results[f"full build, {args.workers} workers"] = build_site(site, workers=args.workers)
+        results["no changes"] = build_site(site, workers=args.workers)
+
+        # Edit one post the way the editor does
+        post = db.get_post(args.posts // 2)
+        before = file_hashes(site)
+        db.update_post(post["id"], post["title"] + " (updated)", post["content"] + "\n\nA new paragraph.",
+                       post["category"], post["tags"], "published")
+        report = build_site(site, workers=args.workers)
+        report["pages_written_by_kind"] = rendered_kinds(before, file_hashes(site))
+        build_site(os.path.join(tmp, "site-fresh"), workers=args.workers)
+        report["matches_full_build"] = file_hashes(site) == file_hashes(os.path.join(tmp, "site-fresh"))
+        results["after editing one post"] = report
+
+        # Unpublish another post
+        post = db.get_post(args.posts // 3)
+        db.update_post(post["id"], post["title"], post["content"], post["category"], post["tags"], "draft")
+        report = build_site(site, workers=args.workers)
+        link = f"posts/{post['id']}.html"
+        still_linked = 0
+        for root, _dirs, files in os.walk(site):
+            for name in files:
+                if name.endswith(".html"):
+                    with open(os.path.join(root, name), encoding="utf-8") as f:
+                        still_linked += link in f.read()
+        report["page_removed"] = not os.path.exists(os.path.join(site, link))
+        report["pages_still_linking"] = still_linked
+        results["after unpublishing one post"] = report
+
+        db.get_pool().close()
+
+    print(json.dumps({"posts": args.posts, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark the streaming subscriber CSV import and export.
+
+Generates a CSV with a share of invalid addresses and of addresses repeated
+in different case, imports it into a throwaway database, exports it again,
+and reports for each step the time, rows per second and the peak Python
+heap (tracemalloc). Running at two sizes shows whether peak memory stays
+flat as the list grows. The old code paths are measured for comparison:
+one add_subscriber call per row, and get_subscribers() into a DataFrame
+for the export.
+
+    python benchmarks/bench_subscribers.py --rows 1000000
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def write_csv(path, rows, invalid=0.02, repeated=0.03, seed=7):
+    """
+    Returns:
+        dict: The counts an import should report
+    """
+    rng = random.Random(seed)
+    expected = {"rows": rows, "imported": 0, "duplicates": 0, "invalid": 0}
+    valid = []
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(["Email", "Name"])
+        for i in range(rows):
+            roll = rng.random()
+            if roll < invalid:
+                writer.writerow([f"reader{i}-at-example.org", f"Reader {i}"])
+                expected["invalid"] += 1
+            elif roll < invalid + repeated and valid:
+                # Someone already in the file, written in upper case
+                writer.writerow([f"READER{rng.choice(valid)}@EXAMPLE.ORG", ""])
+                expected["duplicates"] += 1
+            else:
+                writer.writerow([f"reader{i}@example.org", f"Reader {i}"])
+                expected["imported"] += 1
+                valid.append(i)
+    return expected
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"seconds": round(seconds, 2), "peak_mb": round(peak / 2 ** 20, 2)}
+
+def run_size(tmp, rows, db, subscribers):
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM subscribers")
+
+    source = os.path.join(tmp, f"import-{rows}.csv")
+    expected = write_csv(source, rows)
+    results = {}
+
+    rejected_path = os.path.join(tmp, f"rejected-{rows}.csv")
+    with open(source, "rb") as src, open(rejected_path, "w", newline="", encoding="utf-8") as rejected:
+        report, stats = measure(lambda: subscribers.import_subscribers_csv(src, rejected))
+    with open(rejected_path, newline="", encoding="utf-8") as rejected:
+        rejected_rows = sum(1 for _ in rejected) - 1
+    results["import"] = dict(stats, rows_per_second=round(rows / stats["seconds"]), report=report,
+                             matches_expected=report == expected,
+                             rejected_rows_listed=rejected_rows == report["duplicates"] + report["invalid"])
+
+    export_path = os.path.join(tmp, f"export-{rows}.csv")
+    with open(export_path, "w", newline="", encoding="utf-8") as out:
+        exported, stats = measure(lambda: subscribers.export_subscribers_csv(out))
+    results["export"] = dict(stats, rows=exported, rows_per_second=round(exported / stats["seconds"]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark subscriber CSV import and export.")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--baseline-rows", type=int, default=5000,
+                        help="rows added one add_subscriber call at a time, for the baseline")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        import db
+        import subscribers
+
+        db.init_db()
+        results = {}
+        for rows in (args.rows // 10, args.rows):
+            results[f"{rows} rows"] = run_size(tmp, rows, db, subscribers)
+
+        # Before: the page loaded every row as a dict, then built DataFrames
+        import pandas as pd
+
+        def old_export():
+            frame = pd.DataFrame(db.get_subscribers())[["email", "name", "subscribed_at"]]
+            frame.columns = ["Email", "Name", "Subscribed At"]
+            return len(frame.to_csv(index=False))
+        _size, stats = measure(old_export)
+        results[f"get_subscribers + DataFrame.to_csv (before), {args.rows} rows"] = stats
+
+        with db.get_connection() as conn:
+            conn.execute("DELETE FROM subscribers")
+        start = time.perf_counter()
+        for i in range(args.baseline_rows):
+            db.add_subscriber(f"single{i}@example.org", f"Single {i}")
+        elapsed = time.perf_counter() - start
+        results["add_subscriber per row (before)"] = {
+            "rows_per_second": round(args.baseline_rows / elapsed),
+            "estimated_seconds": round(args.rows * elapsed / args.baseline_rows, 1),
+        }
+        db.get_pool().close()
+
+    print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Process-wide query cache with generation-based invalidation.
+
+Streamlit keeps imported modules alive between reruns, so one cache serves
+every session. Each entry records the generation of the entities it was
+built from, e.g. ``("comments", 42)`` or ``"posts"``. Writes bump only the
+generations they touch, and a lookup whose recorded generations no longer
+match is a miss. A new comment on post 42 therefore only invalidates that
+post's comments, not every cached post.
+
+Entries are also bounded by count (least recently used is evicted first)
+and by age, so data changed outside this process is eventually reloaded.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from config import CACHE_ENABLED, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with TTL and per-entity generation counters.
+
+    Args:
+        max_entries (int): Entries kept before the least recently used is evicted
+        ttl (float): Seconds an entry stays valid regardless of generations
+        clock (callable): Monotonic time source, replaceable in tests
+    """
+
+    def __init__(self, max_entries, ttl, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, namespace, outcome):
+        counts = self._stats.setdefault(namespace, {"hits": 0, "misses": 0, "stale": 0, "evictions": 0})
+        counts[outcome] += 1
+
+    def _snapshot(self, depends):
+        return tuple(self._generations.get(dep, 0) for dep in depends)
+
+    def get_or_load(self, namespace, key, depends, loader):
+        """
+        Return the cached value for ``key`` or load and cache it.
+
+        Args:
+            namespace (str): Name used for statistics, usually the function name
+            key (hashable): Cache key, including the namespace
+            depends (list): Entity keys the value is built from
+            loader (callable): Called with no arguments on a miss
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        now = self.clock()
+        with self._lock:
+            snapshot = self._snapshot(depends)
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, generations, expires_at = entry
+                if generations == snapshot and now < expires_at:
+                    self._entries.move_to_end(key)
+                    self._count(namespace, "hits")
+                    return value
+                del self._entries[key]
+                self._count(namespace, "stale")
+            self._count(namespace, "misses")
+
+        # Load outside the lock. The snapshot was taken first, so if a write
+        # lands while loading, the stored entry is already out of date.
+        value = loader()
+
+        with self._lock:
+            self._entries[key] = (value, snapshot, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._count(evicted_key[0], "evictions")
+        return value
+
+    def invalidate(self, *entities):
+        """
+        Bump the generation of each entity so entries built from it go stale.
+
+        Call this after the write has been committed.
+        """
+        with self._lock:
+            for entity in entities:
+                self._generations[entity] = self._generations.get(entity, 0) + 1
+
+    def generations(self, *entities):
+        with self._lock:
+            return self._snapshot(entities)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Return hit/miss counters per namespace and in total.
+
+        Returns:
+            dict: ``{"entries": n, "total": {...}, "namespaces": {name: {...}}}``
+        """
+        with self._lock:
+            namespaces = {name: dict(counts) for name, counts in self._stats.items()}
+            entries = len(self._entries)
+
+        total = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+        for counts in namespaces.values():
+            for outcome, value in counts.items():
+                total[outcome] += value
+        lookups = total["hits"] + total["misses"]
+        total["hit_rate"] = total["hits"] / lookups if lookups else 0.0
+        return {"entries": entries, "max_entries": self.max_entries, "total": total, "namespaces": namespaces}
+
+
+query_cache = QueryCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+def _copy(value):
+    # Callers may modify the rows they get back; never hand out the cached objects
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+def cached(depends):
+    """
+    Cache a read function in ``query_cache``.
+
+    Args:
+        depends (callable): Called with the function's arguments, returns the
+            entity keys the result is built from, e.g.
+            ``lambda post_id, **kwargs: [("comments", post_id), "users"]``
+    """
+    def decorator(func):
+        namespace = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return func(*args, **kwargs)
+
+            key = (namespace, _freeze(args), _freeze(kwargs))
+            value = query_cache.get_or_load(namespace, key, depends(*args, **kwargs),
+                                            lambda: func(*args, **kwargs))
+            return _copy(value)
+
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+def invalidate(*entities):
+    query_cache.invalidate(*entities)
+
+def generations(*entities):
+    """
+    Current generation of each entity, for keying caches of derived data.
+    """
+    return query_cache.generations(*entities)
+
+def cache_stats():
+    return query_cache.stats()
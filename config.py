@@ -9,10 +9,12 @@ try:
     # For Streamlit Cloud deployment
     admin_config = st.secrets.get("admin", {})
     db_config = st.secrets.get("database", {})
+    smtp_config = st.secrets.get("smtp", {})
 except:
     # Fallback if secrets are not available
     admin_config = {}
     db_config = {}
+    smtp_config = {}
 
 # Application settings
 APP_NAME = os.environ.get("APP_NAME", "EduRishi Blog")
@@ -27,6 +29,150 @@ DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 os.makedirs(DB_DIR, exist_ok=True)
 DB_NAME = os.environ.get("DB_NAME", db_config.get("connection_string", os.path.join(DB_DIR, "blog.db")))
 
+# Media store: uploaded images live under Streamlit's static folder and are
+# served from MEDIA_URL_PATH (requires server.enableStaticServing = true)
+MEDIA_DIR = os.environ.get("MEDIA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "media"))
+MEDIA_URL_PATH = os.environ.get("MEDIA_URL_PATH", "app/static/media")
+MEDIA_QUALITY = int(os.environ.get("MEDIA_QUALITY", 80))
+MEDIA_MAX_UPLOAD_BYTES = int(os.environ.get("MEDIA_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+# Variant name -> ((max width, max height), crop to exactly that size)
+MEDIA_VARIANTS = {
+    "card": ((640, 400), False),
+    "hero": ((1600, 800), False),
+    "avatar": ((256, 256), True),
+}
+
+# Connection pool settings (shared by every session in the Streamlit process)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", db_config.get("pool_size", 8)))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", db_config.get("pool_timeout", 10)))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", db_config.get("busy_timeout_ms", 5000)))
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", db_config.get("cache_size_kb", 16384)))
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", db_config.get("mmap_size", 256 * 1024 * 1024)))
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", db_config.get("statement_cache_size", 256)))
+
+# Process-wide query cache (see cache.py)
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 2048))
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", 300))
+
+# Prebuilt theme stylesheets and self-hosted fonts (see theme_assets.py). Set
+# THEME_CSS_LINK=1 only if a proxy serves static/css with a text/css type.
+THEME_CSS_DIR = os.environ.get("THEME_CSS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "css"))
+THEME_CSS_URL_PATH = os.environ.get("THEME_CSS_URL_PATH", "app/static/css")
+THEME_CSS_LINK = os.environ.get("THEME_CSS_LINK", "0") == "1"
+FONTS_DIR = os.environ.get("FONTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "fonts"))
+FONTS_URL_PATH = os.environ.get("FONTS_URL_PATH", "app/static/fonts")
+
+# Related posts index (see related.py): neighbours stored per post, and
+# terms kept per post vector
+RELATED_POSTS_K = int(os.environ.get("RELATED_POSTS_K", 10))
+RELATED_MAX_TERMS = int(os.environ.get("RELATED_MAX_TERMS", 32))
+
+# Buffered post view counting (see views.py)
+VIEWS_ENABLED = os.environ.get("VIEWS_ENABLED", "1") != "0"
+VIEWS_FLUSH_SECONDS = float(os.environ.get("VIEWS_FLUSH_SECONDS", 10))
+VIEWS_FLUSH_EVENTS = int(os.environ.get("VIEWS_FLUSH_EVENTS", 500))
+
+# Rows per chunk when streaming the subscriber CSV export, and rows per
+# transaction when importing one (see subscribers.py)
+SUBSCRIBER_EXPORT_CHUNK_SIZE = int(os.environ.get("SUBSCRIBER_EXPORT_CHUNK_SIZE", 5000))
+SUBSCRIBER_IMPORT_BATCH_SIZE = int(os.environ.get("SUBSCRIBER_IMPORT_BATCH_SIZE", 5000))
+
+# Rows per transaction when importing a post archive (see archive.py)
+ARCHIVE_CHUNK_SIZE = int(os.environ.get("ARCHIVE_CHUNK_SIZE", 2000))
+
+# Static HTML export of published posts for anonymous readers (see static_site.py).
+# STATIC_SITE_APP_URL is the live app, linked from each page for comments.
+STATIC_SITE_DIR = os.environ.get("STATIC_SITE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "site"))
+STATIC_SITE_APP_URL = os.environ.get("STATIC_SITE_APP_URL", "")
+STATIC_SITE_PAGE_SIZE = int(os.environ.get("STATIC_SITE_PAGE_SIZE", 20))
+STATIC_SITE_WORKERS = int(os.environ.get("STATIC_SITE_WORKERS", os.cpu_count() or 1))
+
+# Pre-rendered RSS/Atom feeds and XML sitemap (see feeds.py), written next to
+# the static site by default. FEEDS_BASE_URL is the public address of the app,
+# which post links point to; FEEDS_PUBLIC_URL is where FEEDS_DIR is served,
+# for the sitemap index and feed self links. A sitemap file may list at most
+# 50,000 URLs.
+FEEDS_ENABLED = os.environ.get("FEEDS_ENABLED", "1") != "0"
+FEEDS_DIR = os.environ.get("FEEDS_DIR", STATIC_SITE_DIR)
+FEEDS_BASE_URL = os.environ.get("FEEDS_BASE_URL", STATIC_SITE_APP_URL or "http://localhost:8501")
+FEEDS_PUBLIC_URL = os.environ.get("FEEDS_PUBLIC_URL", FEEDS_BASE_URL)
+FEED_ITEMS = int(os.environ.get("FEED_ITEMS", 20))
+FEEDS_DEBOUNCE_SECONDS = float(os.environ.get("FEEDS_DEBOUNCE_SECONDS", 2))
+SITEMAP_CHUNK_SIZE = min(int(os.environ.get("SITEMAP_CHUNK_SIZE", 10000)), 50000)
+
+# Read-only JSON API process (see api.py)
+API_HOST = os.environ.get("API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("API_PORT", 8502))
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 20))
+API_CACHE_MAX_AGE = int(os.environ.get("API_CACHE_MAX_AGE", 60))
+API_CORS_ORIGIN = os.environ.get("API_CORS_ORIGIN", "*")
+API_GZIP_MIN_BYTES = int(os.environ.get("API_GZIP_MIN_BYTES", 1024))
+API_RESPONSE_CACHE_ENTRIES = int(os.environ.get("API_RESPONSE_CACHE_ENTRIES", 512))
+
+# Outgoing mail for newsletters (see newsletter.py). Sending is disabled
+# until SMTP_HOST is set.
+SMTP_HOST = os.environ.get("SMTP_HOST", smtp_config.get("host", ""))
+SMTP_PORT = int(os.environ.get("SMTP_PORT", smtp_config.get("port", 587)))
+SMTP_USERNAME = os.environ.get("SMTP_USERNAME", smtp_config.get("username", ""))
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", smtp_config.get("password", ""))
+# "starttls", "ssl" or "none"
+SMTP_SECURITY = os.environ.get("SMTP_SECURITY", smtp_config.get("security", "starttls"))
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", smtp_config.get("timeout", 30)))
+NEWSLETTER_SENDER = os.environ.get("NEWSLETTER_SENDER", smtp_config.get("sender", "EduRishi Blog <newsletter@edurishi.com>"))
+# Open SMTP connections per send, messages handed to a connection at a time,
+# and messages per second across all connections (0 = unlimited)
+NEWSLETTER_CONNECTIONS = int(os.environ.get("NEWSLETTER_CONNECTIONS", smtp_config.get("connections", 4)))
+NEWSLETTER_BATCH_SIZE = int(os.environ.get("NEWSLETTER_BATCH_SIZE", 50))
+NEWSLETTER_RATE_PER_SECOND = float(os.environ.get("NEWSLETTER_RATE_PER_SECOND", smtp_config.get("rate_per_second", 10)))
+# Reconnect after this many messages; many servers cap messages per session
+NEWSLETTER_MESSAGES_PER_CONNECTION = int(os.environ.get("NEWSLETTER_MESSAGES_PER_CONNECTION", 500))
+NEWSLETTER_MAX_ATTEMPTS = int(os.environ.get("NEWSLETTER_MAX_ATTEMPTS", 5))
+NEWSLETTER_RETRY_SECONDS = float(os.environ.get("NEWSLETTER_RETRY_SECONDS", 30))
+
+# Rendered HTML fragment cache size, in characters of HTML (see fragments.py)
+FRAGMENT_CACHE_MAX_CHARS = int(os.environ.get("FRAGMENT_CACHE_MAX_CHARS", 8 * 1024 * 1024))
+
+# Per-rerun timing for the admin Performance page (see perf.py): the share
+# of reruns timed (0 turns it off) and how many recent reruns are kept
+PERF_SAMPLE_RATE = float(os.environ.get("PERF_SAMPLE_RATE", 1.0))
+PERF_BUFFER_SIZE = int(os.environ.get("PERF_BUFFER_SIZE", 500))
+
+# Opt-in SQL statement tracing (see sqltrace.py): totals per statement
+# fingerprint, and statements slower than SQL_SLOW_MS written with their
+# query plan to a rotating JSONL log
+SQL_TRACE_ENABLED = os.environ.get("SQL_TRACE_ENABLED", "0") == "1"
+SQL_SLOW_MS = float(os.environ.get("SQL_SLOW_MS", 50))
+SQL_SLOW_LOG = os.environ.get("SQL_SLOW_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "slow_queries.jsonl"))
+SQL_SLOW_LOG_BYTES = int(os.environ.get("SQL_SLOW_LOG_BYTES", 5 * 1024 * 1024))
+SQL_SLOW_LOG_BACKUPS = int(os.environ.get("SQL_SLOW_LOG_BACKUPS", 3))
+
+# On-demand profiling of one admin rerun (see profiling.py): where the .prof
+# files and memory diffs go, how many profiles are kept, rows shown, and how
+# long a profile may trace memory before it is stopped regardless
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "profiles"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", 30))
+PROFILE_MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", 120))
+
+# Background publisher for scheduled posts; with it off, the app publishes
+# due posts on each rerun instead (see scheduler.py)
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "1") != "0"
+SCHEDULER_RESYNC_SECONDS = float(os.environ.get("SCHEDULER_RESYNC_SECONDS", 300))
+SCHEDULER_RETRY_SECONDS = float(os.environ.get("SCHEDULER_RETRY_SECONDS", 30))
+
+# Length of the excerpt stored with each post for list views
+EXCERPT_LENGTH = int(os.environ.get("EXCERPT_LENGTH", 200))
+
+# Page sizes for keyset-paginated listings; MAX_PAGE_SIZE caps any user-chosen size
+HOME_PAGE_SIZE = int(os.environ.get("HOME_PAGE_SIZE", 5))
+ADMIN_PAGE_SIZE = int(os.environ.get("ADMIN_PAGE_SIZE", 20))
+COMMENTS_PAGE_SIZE = int(os.environ.get("COMMENTS_PAGE_SIZE", 20))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 100))
+
+# Search settings
+SEARCH_RESULTS_PER_PAGE = int(os.environ.get("SEARCH_RESULTS_PER_PAGE", 10))
+
 # Admin user default credentials
 DEFAULT_ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", admin_config.get("username", "admin"))
 DEFAULT_ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", admin_config.get("password", "admin123"))
@@ -0,0 +1,997 @@
+"""
+Database access layer for the EduRishi Blog application.
+
+All queries go through a single process-wide connection pool. Streamlit keeps
+imported modules alive between reruns, so the pool (and the connections it
+holds) is shared by every session instead of being reopened on each call.
+"""
+
+import atexit
+import datetime
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from config import (
+    EXCERPT_LENGTH, DB_NAME, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB,
+    DB_MMAP_SIZE, DB_STATEMENT_CACHE_SIZE, SQL_TRACE_ENABLED, DEFAULT_ADMIN_USERNAME,
+    DEFAULT_ADMIN_PASSWORD, DEFAULT_ADMIN_EMAIL, DEFAULT_CATEGORIES, DEFAULT_TAGS
+)
+from cache import cached, invalidate
+from feeds import notify_feeds
+from markup import RENDERER_VERSION, plain_text, render_markdown
+from media import store_data_uri
+from migrations import COUNTER_QUERIES, migrate, restore_schema
+from perf import instrument
+from related import index_post, remove_post
+from scheduler import notify_scheduled
+from sqltrace import TracedConnection
+from utils import hash_password, parse_tags, truncate_text
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections.
+
+    A connection is checked out by one thread at a time. Nested checkouts on
+    the same thread reuse the connection that is already held, so helpers can
+    call each other without opening more connections, and the outermost
+    checkout commits (or rolls back) the whole unit of work.
+    """
+
+    def __init__(self, database, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.connections_opened = 0
+        self.checkouts = 0
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.database,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+            # Opt-in statement timing and slow-query log (sqltrace.py)
+            factory=TracedConnection if SQL_TRACE_ENABLED else sqlite3.Connection,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError("Timed out waiting for a database connection")
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._open()
+            except Exception:
+                self._slots.release()
+                raise
+
+        with self._lock:
+            self.checkouts += 1
+        return conn
+
+    def _release(self, conn):
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the current thread.
+
+        Yields:
+            sqlite3.Connection: Connection with ``sqlite3.Row`` rows
+        """
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._release(conn)
+
+    def close(self):
+        """
+        Close idle connections and stop pooling connections still in use.
+        """
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        """
+        Return pool counters.
+
+        Returns:
+            dict: Connections opened, checkouts served and idle connections
+        """
+        with self._lock:
+            return {
+                "connections_opened": self.connections_opened,
+                "checkouts": self.checkouts,
+                "idle": self._idle.qsize(),
+                "max_size": self.max_size,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_NAME)
+                atexit.register(_pool.close)
+    return _pool
+
+
+def get_connection():
+    """
+    Check out a pooled connection.
+
+    Usage::
+
+        with get_connection() as conn:
+            conn.execute(...)
+    """
+    return get_pool().connection()
+
+
+# Database setup
+_db_initialized = False
+_init_lock = threading.Lock()
+
+
+def init_db():
+    """
+    Bring the schema up to date and make sure the admin user exists.
+
+    Streamlit re-executes app.py on every interaction, so the work is done
+    once per process; later calls return immediately.
+    """
+    global _db_initialized
+    if _db_initialized:
+        return
+
+    with _init_lock:
+        if _db_initialized:
+            return
+
+        with get_connection() as conn:
+            migrate(conn)
+            # Put back indexes and triggers left out by an interrupted bulk import
+            restore_schema(conn)
+
+            # Check if admin user exists, if not create one
+            admin = conn.execute("SELECT id FROM users WHERE username = ?", (DEFAULT_ADMIN_USERNAME,)).fetchone()
+            if not admin:
+                hashed_password = hash_password(DEFAULT_ADMIN_PASSWORD)
+                conn.execute("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
+                             (DEFAULT_ADMIN_USERNAME, hashed_password, DEFAULT_ADMIN_EMAIL, 'admin'))
+
+        _db_initialized = True
+
+# Keyset pagination
+def keyset_sql(cursor, created_column, id_column):
+    """
+    Build the condition that continues a newest-first listing after a cursor.
+
+    Listings are ordered by (created_at, id) descending, so the next page is
+    everything strictly below the last row seen. Unlike OFFSET, the cost of a
+    page does not grow with how deep it is.
+
+    Args:
+        cursor (tuple, optional): (created_at, id) of the last row already shown
+        created_column (str): Timestamp column, e.g. ``p.created_at``
+        id_column (str): ID column, e.g. ``p.id``
+
+    Returns:
+        tuple: (sql, params); sql is empty when there is no cursor
+    """
+    if not cursor:
+        return "", []
+    return f" AND ({created_column}, {id_column}) < (?, ?)", [cursor[0], cursor[1]]
+
+def split_page(rows, page_size, created_key="created_at"):
+    """
+    Split rows fetched with ``limit=page_size + 1`` into a page and a cursor.
+
+    Returns:
+        tuple: (rows for this page, cursor for the next page or None)
+    """
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    return rows, (rows[-1][created_key], rows[-1]["id"])
+
+# User functions
+def authenticate(username, password):
+    with get_connection() as conn:
+        hashed_password = hash_password(password)
+        user = conn.execute("SELECT id, role FROM users WHERE username = ? AND password = ?",
+                            (username, hashed_password)).fetchone()
+
+    return dict(user) if user else None
+
+def register(username, password, email, role='user', bio=None):
+    try:
+        with get_connection() as conn:
+            hashed_password = hash_password(password)
+            conn.execute("""
+            INSERT INTO users (username, password, email, role, bio)
+            VALUES (?, ?, ?, ?, ?)
+            """, (username, hashed_password, email, role, bio))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def get_user_profile(user_id):
+    with get_connection() as conn:
+        user = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+
+    return dict(user) if user else None
+
+def update_user_profile(user_id, bio=None, profile_image=None):
+    profile_image = store_data_uri(profile_image)
+
+    with get_connection() as conn:
+        if bio is not None and profile_image is not None:
+            conn.execute("UPDATE users SET bio = ?, profile_image = ? WHERE id = ?",
+                         (bio, profile_image, user_id))
+        elif bio is not None:
+            conn.execute("UPDATE users SET bio = ? WHERE id = ?", (bio, user_id))
+        elif profile_image is not None:
+            conn.execute("UPDATE users SET profile_image = ? WHERE id = ?",
+                         (profile_image, user_id))
+
+    # Author bios and images are shown with posts and comments
+    invalidate("users")
+
+def get_users(limit=None, cursor=None):
+    cursor_sql, params = keyset_sql(cursor, "created_at", "id")
+    query = f"SELECT * FROM users WHERE 1=1{cursor_sql} ORDER BY created_at DESC, id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    return [dict(row) for row in rows]
+
+def update_user_role(user_id, role):
+    with get_connection() as conn:
+        conn.execute("UPDATE users SET role = ? WHERE id = ?", (role, user_id))
+
+    invalidate("users")
+
+def delete_user(user_id, reassign_posts_to=1):
+    with get_connection() as conn:
+        # Delete user's comments
+        conn.execute("DELETE FROM comments WHERE user_id = ?", (user_id,))
+
+        # Hand the user's posts over to another author (the admin by default)
+        conn.execute("UPDATE posts SET author_id = ? WHERE author_id = ?", (reassign_posts_to, user_id))
+
+        # Delete the user
+        conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+
+    invalidate("users", "posts", "comments")
+    # Their posts now show another author in the feeds
+    notify_feeds()
+
+# Blog post functions
+def sync_post_tags(conn, post_id, tags):
+    """
+    Replace the post_tags rows of a post with the given tags.
+
+    Args:
+        conn (sqlite3.Connection): Connection holding the current transaction
+        post_id (int): Post ID
+        tags (str or list): Comma-separated tags or list of tag names
+    """
+    names = parse_tags(tags)
+
+    conn.execute("DELETE FROM post_tags WHERE post_id = ?", (post_id,))
+    if not names:
+        return
+
+    conn.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for name in names])
+    conn.executemany("""
+    INSERT OR IGNORE INTO post_tags (post_id, tag_id)
+    SELECT ?, id FROM tags WHERE name = ?
+    """, [(post_id, name) for name in names])
+
+def make_excerpt(content, content_html=None):
+    """
+    Build the excerpt stored alongside a post for list views.
+
+    The excerpt is the text of the sanitized HTML, so it never ends inside
+    a tag or shows Markdown syntax. It is stored unescaped: escape it
+    wherever it is written into HTML.
+
+    Args:
+        content (str): Markdown source, rendered if content_html is not given
+        content_html (str): The post's HTML from render_markdown, if already rendered
+
+    Returns:
+        str: Plain text of at most EXCERPT_LENGTH characters plus an ellipsis
+    """
+    if content_html is None:
+        content_html = render_markdown(content)
+    return truncate_text(plain_text(content_html), EXCERPT_LENGTH)
+
+def create_post(title, content, author_id, category, tags, status, featured_image=None, scheduled_for=None):
+    published_at = datetime.datetime.now() if status == 'published' else None
+    content_html = render_markdown(content)
+    excerpt = make_excerpt(content, content_html)
+    featured_image = store_data_uri(featured_image)
+
+    with get_connection() as conn:
+        c = conn.execute("""
+        INSERT INTO posts (title, content, content_html, content_renderer, excerpt, author_id, category, tags,
+                           featured_image, status, published_at, scheduled_for)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (title, content, content_html, RENDERER_VERSION, excerpt, author_id, category, tags,
+              featured_image, status, published_at, scheduled_for))
+        post_id = c.lastrowid
+        sync_post_tags(conn, post_id, tags)
+        if status == 'published':
+            index_post(conn, post_id)
+
+    invalidate("posts", ("post", int(post_id)))
+    if status == 'published':
+        notify_feeds()
+    if status == 'scheduled' and scheduled_for:
+        notify_scheduled(post_id, scheduled_for)
+    return post_id
+
+def update_post(post_id, title, content, category, tags, status, featured_image=None, scheduled_for=None):
+    published_at = datetime.datetime.now() if status == 'published' else None
+    updated_at = datetime.datetime.now()
+    content_html = render_markdown(content)
+    excerpt = make_excerpt(content, content_html)
+    featured_image = store_data_uri(featured_image)
+
+    with get_connection() as conn:
+        if featured_image is not None:
+            conn.execute("""
+            UPDATE posts
+            SET title = ?, content = ?, content_html = ?, content_renderer = ?, excerpt = ?, category = ?, tags = ?,
+                featured_image = ?, status = ?, published_at = ?, scheduled_for = ?, updated_at = ?
+            WHERE id = ?
+            """, (title, content, content_html, RENDERER_VERSION, excerpt, category, tags, featured_image, status,
+                  published_at, scheduled_for, updated_at, post_id))
+        else:
+            conn.execute("""
+            UPDATE posts
+            SET title = ?, content = ?, content_html = ?, content_renderer = ?, excerpt = ?, category = ?, tags = ?,
+                status = ?, published_at = ?, scheduled_for = ?, updated_at = ?
+            WHERE id = ?
+            """, (title, content, content_html, RENDERER_VERSION, excerpt, category, tags, status,
+                  published_at, scheduled_for, updated_at, post_id))
+
+        sync_post_tags(conn, post_id, tags)
+        index_post(conn, post_id)
+
+    invalidate("posts", ("post", int(post_id)))
+    # Also when unpublishing: the post has to leave the feeds
+    notify_feeds()
+    if status == 'scheduled' and scheduled_for:
+        notify_scheduled(post_id, scheduled_for)
+
+@cached(depends=lambda post_id: [("post", int(post_id)), "users"])
+def get_post(post_id):
+    with get_connection() as conn:
+        post = conn.execute("""
+        SELECT p.*, u.username as author_name, u.bio as author_bio, u.profile_image as author_image
+        FROM posts p
+        JOIN users u ON p.author_id = u.id
+        WHERE p.id = ?
+        """, (post_id,)).fetchone()
+
+    if not post:
+        return None
+    post = dict(post)
+    if post.get('content_renderer') != RENDERER_VERSION:
+        # Not backfilled yet (see markup.py --backfill); render for this read only
+        post['content_html'] = render_markdown(post['content'])
+    return post
+
+def tag_filter_sql(tag, tag_mode="any", post_column="p.id"):
+    """
+    Build an SQL condition restricting posts to the given tags.
+
+    Args:
+        tag (str or list): One tag, a comma-separated string or a list of tags
+        tag_mode (str): "any" (OR) or "all" (AND)
+        post_column (str): Column holding the post ID in the outer query
+
+    Returns:
+        tuple: (sql, params); sql is empty when there are no tags
+    """
+    tag_names = parse_tags(tag)
+    if not tag_names:
+        return "", []
+
+    placeholders = ", ".join("?" for _ in tag_names)
+    sql = f"""
+    AND {post_column} IN (
+        SELECT pt.post_id
+        FROM post_tags pt
+        JOIN tags t ON t.id = pt.tag_id
+        WHERE t.name IN ({placeholders})
+        GROUP BY pt.post_id
+        HAVING COUNT(*) >= ?
+    )"""
+    return sql, tag_names + [len(tag_names) if tag_mode == "all" else 1]
+
+# Image reference for list views: media references and URLs are passed
+# through (render them with media.media_url); any inline data URI that
+# predates the media store is left out so list queries never carry image
+# payloads.
+IMAGE_URL_COLUMN = "CASE WHEN p.featured_image LIKE 'data:%' THEN NULL ELSE p.featured_image END AS image_url"
+
+# Columns selected by get_post_summaries for each kind of list view
+POST_SUMMARY_COLUMNS = {
+    # Cards with image, excerpt and metadata (home, search, related posts)
+    "card": ["p.id", "p.title", "p.excerpt", "p.category", "p.tags", "p.status", "p.published_at",
+             "p.created_at", "p.updated_at", IMAGE_URL_COLUMN, "u.username AS author_name"],
+    # Admin and profile rows (no excerpt or image)
+    "admin": ["p.id", "p.title", "p.category", "p.tags", "p.status", "p.published_at", "p.scheduled_for",
+              "p.created_at", "p.updated_at", "u.username AS author_name"],
+    # Title-only links
+    "link": ["p.id", "p.title", "p.published_at", "u.username AS author_name"],
+}
+
+def build_posts_query(status=None, category=None, tag=None, search_term=None, author_id=None, limit=None,
+                      tag_mode="any", offset=None, columns=None, cursor=None, order="created"):
+    """
+    Build the SQL and parameters used by get_posts.
+
+    ``status`` may be a single status or a list of statuses. ``tag`` may be
+    a single tag or a list of tags. With ``tag_mode="any"`` posts carrying
+    at least one of the tags match; with ``tag_mode="all"`` a post must
+    carry every tag.
+
+    Args:
+        columns (list, optional): Columns to select instead of the full post row
+        cursor (tuple, optional): (created_at, id) to continue after, see keyset_sql
+        order (str): "created" (newest first, the default) or "published"
+            (most recently published first, for feeds; ``cursor`` does not apply)
+
+    Returns:
+        tuple: (query, params)
+    """
+    select = ", ".join(columns) if columns else "p.*, u.username as author_name"
+    query = f"""
+    SELECT {select}
+    FROM posts p
+    JOIN users u ON p.author_id = u.id
+    WHERE 1=1
+    """
+    params = []
+
+    if isinstance(status, (list, tuple)):
+        query += f" AND p.status IN ({', '.join('?' for _ in status)})"
+        params.extend(status)
+    elif status:
+        query += " AND p.status = ?"
+        params.append(status)
+
+    if category:
+        query += " AND p.category = ?"
+        params.append(category)
+
+    tag_sql, tag_params = tag_filter_sql(tag, tag_mode)
+    query += tag_sql
+    params.extend(tag_params)
+
+    if search_term:
+        query += " AND (p.title LIKE ? OR p.content LIKE ?)"
+        params.extend([f"%{search_term}%", f"%{search_term}%"])
+
+    if author_id:
+        query += " AND p.author_id = ?"
+        params.append(author_id)
+
+    cursor_sql, cursor_params = keyset_sql(cursor, "p.created_at", "p.id")
+    query += cursor_sql
+    params.extend(cursor_params)
+
+    if order == "published":
+        query += " ORDER BY p.published_at DESC, p.id DESC"
+    else:
+        query += " ORDER BY p.created_at DESC, p.id DESC"
+
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+        if offset:
+            query += " OFFSET ?"
+            params.append(offset)
+
+    return query, params
+
+@cached(depends=lambda *args, **kwargs: ["posts", "users"])
+def get_posts(status=None, category=None, tag=None, search_term=None, author_id=None, limit=None,
+              tag_mode="any", cursor=None):
+    query, params = build_posts_query(status, category, tag, search_term, author_id, limit, tag_mode,
+                                      cursor=cursor)
+
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    return [dict(row) for row in rows]
+
+@cached(depends=lambda *args, **kwargs: ["posts", "users"])
+def get_post_summaries(view="card", status=None, category=None, tag=None, author_id=None, limit=None,
+                       tag_mode="any", offset=None, cursor=None):
+    """
+    List posts with only the columns a list view needs.
+
+    Unlike get_posts, the full content and inline image payloads are never
+    loaded: rows carry the stored ``excerpt`` and an ``image_url`` reference.
+
+    Args:
+        view (str): Projection from POST_SUMMARY_COLUMNS ("card", "admin" or "link")
+
+    Returns:
+        list: Post summary dicts
+    """
+    query, params = build_posts_query(status, category, tag, None, author_id, limit, tag_mode, offset,
+                                      columns=POST_SUMMARY_COLUMNS[view], cursor=cursor)
+
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    return [dict(row) for row in rows]
+
+def format_timestamp(value):
+    """
+    Format a datetime the way timestamps are stored, for comparisons in SQL.
+    """
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+RELATED_POSTS_QUERY = f"""
+SELECT {", ".join(POST_SUMMARY_COLUMNS["card"])}
+FROM related_posts r
+JOIN posts p ON p.id = r.related_id
+JOIN users u ON p.author_id = u.id
+WHERE r.post_id = ? AND p.status = 'published'
+ORDER BY r.score DESC, r.related_id
+LIMIT ?
+"""
+
+@cached(depends=lambda post_id, limit=3: ["posts", "users"])
+def get_related_posts(post_id, limit=3):
+    """
+    Get the posts most similar in content to a post, from the related posts index.
+
+    Args:
+        post_id (int): Post to find related posts for
+        limit (int): Maximum number of posts
+
+    Returns:
+        list: Post summary dicts ("card" columns), most similar first; empty
+            if the post is not indexed (e.g. not published)
+    """
+    with get_connection() as conn:
+        posts = conn.execute(RELATED_POSTS_QUERY, (post_id, limit)).fetchall()
+
+    return [dict(post) for post in posts]
+
+def get_scheduled_posts():
+    columns = ", ".join(POST_SUMMARY_COLUMNS["admin"])
+    # scheduled_for is stored in local time, so compare with local now
+    now = format_timestamp(datetime.datetime.now())
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+        SELECT {columns}
+        FROM posts p
+        JOIN users u ON p.author_id = u.id
+        WHERE p.status = 'scheduled' AND p.scheduled_for > ?
+        ORDER BY p.scheduled_for ASC
+        """, (now,)).fetchall()
+
+    return [dict(row) for row in rows]
+
+def get_schedule(until=None):
+    """
+    List (scheduled_for, post_id) for scheduled posts, earliest first.
+
+    Served by the partial index on scheduled posts, so the cost depends on
+    the number of scheduled posts rather than the size of the table.
+
+    Args:
+        until (datetime, optional): Only include posts due by this time
+    """
+    query = "SELECT scheduled_for, id FROM posts WHERE status = 'scheduled' AND scheduled_for IS NOT NULL"
+    params = []
+    if until is not None:
+        query += " AND scheduled_for <= ?"
+        params.append(format_timestamp(until))
+    query += " ORDER BY scheduled_for"
+
+    with get_connection() as conn:
+        return [(row[0], row[1]) for row in conn.execute(query, params)]
+
+def publish_due_posts(now, post_ids=None):
+    """
+    Publish scheduled posts whose time has come.
+
+    The status and time are re-checked in the UPDATE, so stale or duplicate
+    requests (a post rescheduled or already published by another process)
+    do nothing.
+
+    Args:
+        now (datetime): Current time
+        post_ids (list, optional): Restrict to these posts
+
+    Returns:
+        list: IDs of the posts that were published
+    """
+    now_str = format_timestamp(now)
+    with get_connection() as conn:
+        if post_ids is None:
+            post_ids = [post_id for _scheduled_for, post_id in get_schedule(until=now)]
+        if not post_ids:
+            return []
+
+        placeholders = ", ".join("?" for _ in post_ids)
+        published = [row[0] for row in conn.execute(f"""
+        SELECT id FROM posts
+        WHERE status = 'scheduled' AND scheduled_for <= ? AND id IN ({placeholders})
+        """, [now_str] + list(post_ids))]
+        if not published:
+            return []
+
+        placeholders = ", ".join("?" for _ in published)
+        conn.execute(f"""
+        UPDATE posts
+        SET status = 'published', published_at = ?
+        WHERE id IN ({placeholders})
+        """, [now_str] + published)
+        for post_id in published:
+            index_post(conn, post_id)
+
+    invalidate("posts", *[("post", post_id) for post_id in published])
+    notify_feeds()
+    return published
+
+def delete_post(post_id):
+    with get_connection() as conn:
+        # First delete all comments associated with the post
+        conn.execute("DELETE FROM comments WHERE post_id = ?", (post_id,))
+
+        conn.execute("DELETE FROM post_tags WHERE post_id = ?", (post_id,))
+        conn.execute("DELETE FROM post_views_daily WHERE post_id = ?", (post_id,))
+
+        # Then delete the post
+        conn.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+        remove_post(conn, post_id)
+
+    invalidate("posts", ("post", int(post_id)), ("comments", int(post_id)))
+    notify_feeds()
+
+# Comment functions
+def add_comment(post_id, user_id, content):
+    with get_connection() as conn:
+        conn.execute("""
+        INSERT INTO comments (post_id, user_id, content)
+        VALUES (?, ?, ?)
+        """, (post_id, user_id, content))
+
+    invalidate(("comments", int(post_id)))
+
+COMMENTS_QUERY = """
+SELECT c.*, u.username, u.profile_image
+FROM comments c
+JOIN users u ON c.user_id = u.id
+WHERE c.post_id = ?
+"""
+
+@cached(depends=lambda post_id, *args, **kwargs: [("comments", int(post_id)), "comments", "users"])
+def get_comments(post_id, limit=None, cursor=None):
+    cursor_sql, cursor_params = keyset_sql(cursor, "c.created_at", "c.id")
+    query = COMMENTS_QUERY + cursor_sql + " ORDER BY c.created_at DESC, c.id DESC"
+    params = [post_id] + cursor_params
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    return [dict(row) for row in rows]
+
+def get_user_comments(user_id, limit=None, cursor=None):
+    cursor_sql, cursor_params = keyset_sql(cursor, "c.created_at", "c.id")
+    query = f"""
+    SELECT c.*, p.title as post_title, p.id as post_id
+    FROM comments c
+    JOIN posts p ON c.post_id = p.id
+    WHERE c.user_id = ?{cursor_sql}
+    ORDER BY c.created_at DESC, c.id DESC
+    """
+    params = [user_id] + cursor_params
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    return [dict(row) for row in rows]
+
+def delete_comment(comment_id):
+    with get_connection() as conn:
+        row = conn.execute("SELECT post_id FROM comments WHERE id = ?", (comment_id,)).fetchone()
+        conn.execute("DELETE FROM comments WHERE id = ?", (comment_id,))
+
+    if row:
+        invalidate(("comments", row[0]))
+
+# Subscriber and contact functions
+def add_subscriber(email, name=None):
+    try:
+        with get_connection() as conn:
+            conn.execute("INSERT INTO subscribers (email, name) VALUES (?, ?)", (email, name))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+def get_subscribers(limit=None, cursor=None):
+    query = "SELECT * FROM subscribers WHERE 1=1"
+    params = []
+
+    cursor_sql, cursor_params = keyset_sql(cursor, "subscribed_at", "id")
+    query += cursor_sql + " ORDER BY subscribed_at DESC, id DESC"
+    params.extend(cursor_params)
+
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    return [dict(row) for row in rows]
+
+def add_contact_message(name, email, subject, message):
+    with get_connection() as conn:
+        conn.execute("""
+        INSERT INTO contact_messages (name, email, subject, message)
+        VALUES (?, ?, ?, ?)
+        """, (name, email, subject, message))
+
+def get_contact_messages(unread_only=False, limit=None, cursor=None):
+    query = "SELECT * FROM contact_messages WHERE 1=1"
+    params = []
+
+    if unread_only:
+        query += " AND read = 0"
+
+    cursor_sql, cursor_params = keyset_sql(cursor, "created_at", "id")
+    query += cursor_sql + " ORDER BY created_at DESC, id DESC"
+    params.extend(cursor_params)
+
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    return [dict(row) for row in rows]
+
+def mark_message_as_read(message_id):
+    with get_connection() as conn:
+        conn.execute("UPDATE contact_messages SET read = 1 WHERE id = ?", (message_id,))
+
+def delete_contact_message(message_id):
+    with get_connection() as conn:
+        conn.execute("DELETE FROM contact_messages WHERE id = ?", (message_id,))
+
+# Helper functions
+@cached(depends=lambda: ["posts"])
+def get_categories():
+    with get_connection() as conn:
+        categories = [row[0] for row in conn.execute("SELECT DISTINCT category FROM posts")]
+
+    # If no categories exist yet, return default categories
+    if not categories:
+        categories = list(DEFAULT_CATEGORIES)
+
+    return categories
+
+@cached(depends=lambda *args, **kwargs: ["posts"])
+def get_tag_counts(limit=None):
+    """
+    Return tags with the number of posts using each, most used first.
+
+    Returns:
+        list: (tag name, post count) tuples
+    """
+    query = """
+    SELECT t.name, COUNT(*) AS post_count
+    FROM post_tags pt
+    JOIN tags t ON t.id = pt.tag_id
+    GROUP BY pt.tag_id
+    ORDER BY post_count DESC, t.name
+    """
+    params = []
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with get_connection() as conn:
+        return [(row[0], row[1]) for row in conn.execute(query, params)]
+
+def get_tags():
+    unique_tags = [name for name, _count in get_tag_counts()]
+
+    # If no tags exist yet, return default tags
+    if not unique_tags:
+        unique_tags = list(DEFAULT_TAGS)
+
+    return unique_tags
+
+def get_dashboard_stats():
+    """
+    Read every dashboard counter in one query.
+
+    The counters table is kept current by triggers (see migrations.py), so
+    this costs the same however large the tables grow.
+
+    Returns:
+        dict: Counts keyed by name: posts, published_posts, users, comments,
+        subscribers, unread_messages and views
+    """
+    with get_connection() as conn:
+        stats = {name: 0 for name in COUNTER_QUERIES}
+        stats.update(conn.execute("SELECT name, value FROM counters").fetchall())
+    return stats
+
+# Post views (written in batches by views.py)
+def record_post_views(counts):
+    """
+    Add buffered view counts to post_views_daily in one transaction.
+
+    Args:
+        counts (dict): {(post_id, day): views}, day as YYYY-MM-DD
+    """
+    with get_connection() as conn:
+        conn.executemany("""
+        INSERT INTO post_views_daily (post_id, day, views) VALUES (?, ?, ?)
+        ON CONFLICT (post_id, day) DO UPDATE SET views = views + excluded.views
+        """, [(post_id, day, views) for (post_id, day), views in counts.items()])
+
+    invalidate("views", *{("views", post_id) for post_id, _day in counts})
+
+@cached(depends=lambda post_id: [("views", int(post_id))])
+def get_post_views(post_id):
+    with get_connection() as conn:
+        return conn.execute("SELECT COALESCE(SUM(views), 0) FROM post_views_daily WHERE post_id = ?",
+                            (post_id,)).fetchone()[0]
+
+@cached(depends=lambda post_ids: ["views"])
+def get_post_view_totals(post_ids):
+    """
+    Total views for several posts in one query.
+
+    Returns:
+        dict: post_id -> views (posts never viewed are missing)
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return {}
+    placeholders = ", ".join("?" for _ in post_ids)
+    with get_connection() as conn:
+        return dict(conn.execute(f"""
+        SELECT post_id, SUM(views) FROM post_views_daily
+        WHERE post_id IN ({placeholders})
+        GROUP BY post_id
+        """, post_ids).fetchall())
+
+@cached(depends=lambda days=30, top=10: ["views", "posts"])
+def get_view_stats(days=30, top=10):
+    """
+    View analytics for the admin dashboard.
+
+    Args:
+        days (int): Length of the recent window, including today
+        top (int): Number of most viewed posts to return
+
+    Returns:
+        dict: ``recent`` total, ``daily`` [(day, views)] and ``top_posts``
+        [{id, title, views}] for the window
+    """
+    since = (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat()
+    with get_connection() as conn:
+        daily = conn.execute("""
+        SELECT day, SUM(views) FROM post_views_daily
+        WHERE day >= ?
+        GROUP BY day ORDER BY day
+        """, (since,)).fetchall()
+        top_posts = conn.execute("""
+        SELECT p.id, p.title, v.views FROM (
+            SELECT post_id, SUM(views) AS views FROM post_views_daily
+            WHERE day >= ?
+            GROUP BY post_id ORDER BY views DESC LIMIT ?
+        ) v JOIN posts p ON p.id = v.post_id
+        ORDER BY v.views DESC
+        """, (since, top)).fetchall()
+
+    return {"recent": sum(views for _, views in daily),
+            "daily": [tuple(row) for row in daily],
+            "top_posts": [dict(row) for row in top_posts]}
+
+def get_post_count():
+    return get_dashboard_stats()["posts"]
+
+def get_published_post_count():
+    return get_dashboard_stats()["published_posts"]
+
+def get_user_count():
+    return get_dashboard_stats()["users"]
+
+def get_comment_count():
+    return get_dashboard_stats()["comments"]
+
+def get_subscriber_count():
+    return get_dashboard_stats()["subscribers"]
+
+def get_unread_message_count():
+    return get_dashboard_stats()["unread_messages"]
+
+
+# Time every data function per rerun for the admin Performance page (perf.py).
+# SQL builders and helpers that work inside a caller's transaction are left out.
+instrument(globals(), __name__, skip={
+    "get_pool", "get_connection", "init_db", "keyset_sql", "split_page", "sync_post_tags", "make_excerpt",
+    "tag_filter_sql", "build_posts_query", "format_timestamp",
+})
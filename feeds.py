@@ -0,0 +1,541 @@
+"""
+RSS 2.0 and Atom feeds and an XML sitemap, pre-rendered as files.
+
+Feed readers and crawlers poll these far more often than posts change, so
+they are written to FEEDS_DIR as static files instead of being built per
+request. There is a feed of the newest published posts for the whole blog,
+one per category and one per tag, each as ``rss.xml`` and ``atom.xml``:
+
+    feeds/rss.xml                 feeds/atom.xml
+    feeds/category/<slug>/rss.xml feeds/tag/<slug>/atom.xml ...
+    sitemap.xml                   (index of the files below)
+    sitemaps/posts-<n>.xml        (published posts with IDs in one range)
+
+Regeneration is incremental. Each feed's signature covers the rows it shows,
+so a publish, edit or delete rewrites only the feeds the post appears in.
+The sitemap is split by post ID range into files of at most
+SITEMAP_CHUNK_SIZE URLs; a cheap aggregate per range decides which files to
+rewrite, and each one is streamed to disk from a database cursor, so 100k
+posts never become one string in memory.
+
+db.py calls ``notify_feeds`` after publishing, editing or deleting posts;
+the writer thread started by ``start_feeds`` waits FEEDS_DEBOUNCE_SECONDS to
+collect a burst of changes and then calls ``update_feeds`` once.
+
+    python feeds.py              # bring feeds and sitemap up to date
+    python feeds.py --full       # rewrite every file
+"""
+
+import argparse
+import atexit
+import datetime
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from xml.sax.saxutils import escape, quoteattr
+
+from config import (
+    APP_NAME, APP_DESCRIPTION, FEED_ITEMS, FEEDS_BASE_URL, FEEDS_DEBOUNCE_SECONDS, FEEDS_DIR, FEEDS_ENABLED,
+    FEEDS_PUBLIC_URL, SITEMAP_CHUNK_SIZE
+)
+from utils import make_slugs, parse_tags
+
+logger = logging.getLogger(__name__)
+
+# Part of every file's inputs: bump when the templates below change
+FEEDS_VERSION = 1
+MANIFEST_NAME = ".feeds-manifest.json"
+SITEMAP_INDEX = "sitemap.xml"
+# Rows fetched at a time while streaming a sitemap file
+SITEMAP_FETCH_SIZE = 1000
+
+FEED_COLUMNS = ["p.id", "p.title", "p.excerpt", "p.category", "p.tags", "p.published_at", "p.updated_at",
+                "u.username AS author_name"]
+
+# Latest of a post's edit and publish times, as stored
+LASTMOD_SQL = "MAX(COALESCE(updated_at, ''), COALESCE(published_at, ''))"
+
+SITEMAP_CHUNKS_QUERY = f"""
+SELECT id / ? AS chunk, COUNT(*), TOTAL(id), MAX({LASTMOD_SQL})
+FROM posts
+WHERE status = 'published'
+GROUP BY chunk
+"""
+
+SITEMAP_URLS_QUERY = f"""
+SELECT id, {LASTMOD_SQL}
+FROM posts
+WHERE status = 'published' AND id >= ? AND id < ?
+ORDER BY id
+"""
+
+RSS = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/">
+<channel>
+<title>{title}</title>
+<link>{link}</link>
+<description>{description}</description>
+<atom:link href={self_link} rel="self" type="application/rss+xml"/>
+<lastBuildDate>{updated}</lastBuildDate>
+{items}</channel>
+</rss>
+"""
+
+RSS_ITEM = """\
+<item>
+<title>{title}</title>
+<link>{link}</link>
+<guid isPermaLink="true">{link}</guid>
+<pubDate>{published}</pubDate>
+<dc:creator>{author}</dc:creator>
+{categories}<description>{summary}</description>
+</item>
+"""
+
+ATOM = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<title>{title}</title>
+<subtitle>{description}</subtitle>
+<id>{link}</id>
+<link href={link_attr}/>
+<link href={self_link} rel="self" type="application/atom+xml"/>
+<updated>{updated}</updated>
+{entries}</feed>
+"""
+
+ATOM_ENTRY = """\
+<entry>
+<title>{title}</title>
+<id>{link}</id>
+<link href={link_attr}/>
+<published>{published}</published>
+<updated>{updated}</updated>
+<author><name>{author}</name></author>
+{categories}<summary>{summary}</summary>
+</entry>
+"""
+
+SITEMAP_HEADER = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+SITEMAP_FOOTER = "</urlset>\n"
+
+SITEMAP_INDEX_TEMPLATE = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+{sitemaps}</sitemapindex>
+"""
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+# Formatting
+def post_url(post_id, base_url=FEEDS_BASE_URL):
+    return f"{base_url.rstrip('/')}/?post_id={post_id}"
+
+def public_url(path, public=FEEDS_PUBLIC_URL):
+    return f"{public.rstrip('/')}/{path}"
+
+def _text(value):
+    return escape(_INVALID_XML.sub("", str(value or "")))
+
+def _timestamp(value):
+    # Stored timestamps are naive local time; give them the local offset
+    if not value:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    return parsed.astimezone() if parsed.tzinfo is None else parsed
+
+def _lastmod(value):
+    parsed = _timestamp(value)
+    return parsed.date().isoformat() if parsed else None
+
+def _signature(*parts):
+    return hashlib.sha256(json.dumps(parts, default=str, ensure_ascii=False).encode()).hexdigest()[:32]
+
+def feed_paths(prefix):
+    return f"{prefix}rss.xml", f"{prefix}atom.xml"
+
+def sitemap_path(chunk):
+    return f"sitemaps/posts-{chunk}.xml"
+
+
+# Planning
+def plan_feeds(conn, base_url=FEEDS_BASE_URL, items=FEED_ITEMS):
+    """
+    Work out every feed and the posts it shows.
+
+    Args:
+        conn: Database connection
+        base_url (str): Address of the app, for post links
+        items (int): Posts per feed
+
+    Returns:
+        dict: Output path prefix -> spec with the feed ``title``, its ``rows``
+            (newest published first) and an ``inputs`` signature
+    """
+    # Imported here because db imports this module for notify_feeds
+    from db import build_posts_query
+
+    categories = [row[0] for row in conn.execute(
+        "SELECT DISTINCT category FROM posts WHERE status = 'published' AND category IS NOT NULL")]
+    tags = [row[0] for row in conn.execute("""
+    SELECT t.name
+    FROM tags t
+    WHERE EXISTS (
+        SELECT 1 FROM post_tags pt JOIN posts p ON p.id = pt.post_id
+        WHERE pt.tag_id = t.id AND p.status = 'published'
+    )
+    """)]
+
+    feeds = [("feeds/", APP_NAME, {})]
+    category_slugs = make_slugs(categories)
+    feeds += [(f"feeds/category/{category_slugs[name]}/", f"{APP_NAME}: {name}", {"category": name})
+              for name in categories]
+    tag_slugs = make_slugs(tags)
+    feeds += [(f"feeds/tag/{tag_slugs[name]}/", f"{APP_NAME}: # {name}", {"tag": name}) for name in tags]
+
+    plan = {}
+    for prefix, title, filters in feeds:
+        query, params = build_posts_query(status="published", limit=items, columns=FEED_COLUMNS,
+                                          order="published", **filters)
+        rows = [dict(row) for row in conn.execute(query, params)]
+        plan[prefix] = {"title": title, "rows": rows,
+                        "inputs": _signature(FEEDS_VERSION, base_url, FEEDS_PUBLIC_URL, APP_DESCRIPTION, title, rows)}
+    return plan
+
+def plan_sitemap(conn, chunk_size=SITEMAP_CHUNK_SIZE, base_url=FEEDS_BASE_URL):
+    """
+    Summarise each sitemap file without reading its URLs.
+
+    Returns:
+        dict: Chunk number -> (inputs signature, latest lastmod); chunk 0
+            always exists because it also lists the home page
+    """
+    chunks = {0: (_signature(FEEDS_VERSION, base_url, 0, 0, None), None)}
+    for chunk, count, id_total, lastmod in conn.execute(SITEMAP_CHUNKS_QUERY, (chunk_size,)):
+        chunks[chunk] = (_signature(FEEDS_VERSION, base_url, count, id_total, lastmod), lastmod)
+    return chunks
+
+
+# Rendering
+def _categories(row, element):
+    names = [row["category"]] if row["category"] else []
+    names += [name for name in parse_tags(row["tags"]) if name.lower() != (row["category"] or "").lower()]
+    if element == "rss":
+        return "".join(f"<category>{_text(name)}</category>\n" for name in names)
+    return "".join(f"<category term={quoteattr(name)}/>\n" for name in names)
+
+def render_rss(spec, path, base_url=FEEDS_BASE_URL):
+    items, latest = [], _EPOCH
+    for row in spec["rows"]:
+        published = _timestamp(row["published_at"]) or _EPOCH
+        latest = max(latest, _timestamp(row["updated_at"]) or published, published)
+        items.append(RSS_ITEM.format(
+            title=_text(row["title"]), link=_text(post_url(row["id"], base_url)),
+            published=email.utils.format_datetime(published), author=_text(row["author_name"]),
+            categories=_categories(row, "rss"), summary=_text(row["excerpt"])))
+    return RSS.format(title=_text(spec["title"]), link=_text(base_url), description=_text(APP_DESCRIPTION),
+                      self_link=quoteattr(public_url(path)), updated=email.utils.format_datetime(latest),
+                      items="".join(items))
+
+def render_atom(spec, path, base_url=FEEDS_BASE_URL):
+    entries, latest = [], _EPOCH
+    for row in spec["rows"]:
+        link = post_url(row["id"], base_url)
+        published = _timestamp(row["published_at"]) or _EPOCH
+        updated = max(_timestamp(row["updated_at"]) or published, published)
+        latest = max(latest, updated)
+        entries.append(ATOM_ENTRY.format(
+            title=_text(row["title"]), link=_text(link), link_attr=quoteattr(link),
+            published=published.isoformat(timespec="seconds"), updated=updated.isoformat(timespec="seconds"),
+            author=_text(row["author_name"]), categories=_categories(row, "atom"), summary=_text(row["excerpt"])))
+    return ATOM.format(title=_text(spec["title"]), description=_text(APP_DESCRIPTION), link=_text(base_url),
+                       link_attr=quoteattr(base_url), self_link=quoteattr(public_url(path)),
+                       updated=latest.isoformat(timespec="seconds"), entries="".join(entries))
+
+def _sitemap_url(loc, lastmod=None):
+    lastmod = _lastmod(lastmod)
+    return f"<url><loc>{_text(loc)}</loc>" + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "</url>\n"
+
+def write_sitemap_chunk(conn, target, chunk, chunk_size=SITEMAP_CHUNK_SIZE, base_url=FEEDS_BASE_URL):
+    """
+    Stream one sitemap file to disk, a few rows at a time.
+
+    Returns:
+        int: URLs written
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(SITEMAP_HEADER)
+        if chunk == 0:
+            f.write(_sitemap_url(base_url.rstrip("/") + "/"))
+            count += 1
+        rows = conn.execute(SITEMAP_URLS_QUERY, (chunk * chunk_size, (chunk + 1) * chunk_size))
+        while True:
+            batch = rows.fetchmany(SITEMAP_FETCH_SIZE)
+            if not batch:
+                break
+            f.writelines(_sitemap_url(post_url(post_id, base_url), lastmod) for post_id, lastmod in batch)
+            count += len(batch)
+        f.write(SITEMAP_FOOTER)
+    os.replace(tmp_path, target)
+    return count
+
+def render_sitemap_index(chunks):
+    sitemaps = []
+    for chunk in sorted(chunks):
+        lastmod = _lastmod(chunks[chunk][1])
+        sitemaps.append(f"<sitemap><loc>{_text(public_url(sitemap_path(chunk)))}</loc>"
+                        + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "</sitemap>\n")
+    return SITEMAP_INDEX_TEMPLATE.format(sitemaps="".join(sitemaps))
+
+
+# Building
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def _remove_file(out_dir, path):
+    target = os.path.join(out_dir, path)
+    try:
+        os.remove(target)
+    except FileNotFoundError:
+        pass
+    # Drop folders left empty, e.g. a tag no published post carries any more
+    folder = os.path.dirname(target)
+    while os.path.abspath(folder) != os.path.abspath(out_dir):
+        try:
+            os.rmdir(folder)
+        except OSError:
+            break
+        folder = os.path.dirname(folder)
+
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+_update_lock = threading.Lock()
+
+def update_feeds(out_dir=FEEDS_DIR, full=False, base_url=FEEDS_BASE_URL):
+    """
+    Bring the feeds and sitemap in ``out_dir`` up to date with the database.
+
+    Args:
+        out_dir (str): Folder the files are served from
+        full (bool): Rewrite every file, even those whose inputs are unchanged
+        base_url (str): Address of the app, for post links
+
+    Returns:
+        dict: Feeds and sitemap files planned, written and removed, and seconds taken
+    """
+    from db import get_connection
+
+    start = time.perf_counter()
+    with _update_lock:
+        os.makedirs(out_dir, exist_ok=True)
+        previous = _load_manifest(out_dir).get("files", {})
+        files = {}
+        feeds_written = sitemaps_written = 0
+
+        with get_connection() as conn:
+            feeds = plan_feeds(conn, base_url)
+            for prefix, spec in feeds.items():
+                for path, render in zip(feed_paths(prefix), (render_rss, render_atom)):
+                    files[path] = spec["inputs"]
+                    if full or previous.get(path) != spec["inputs"]:
+                        _write_atomic(os.path.join(out_dir, path), render(spec, path, base_url))
+                        feeds_written += 1
+
+            chunks = plan_sitemap(conn, base_url=base_url)
+            for chunk, (inputs, _lastmod_value) in chunks.items():
+                path = sitemap_path(chunk)
+                files[path] = inputs
+                if full or previous.get(path) != inputs:
+                    write_sitemap_chunk(conn, os.path.join(out_dir, path), chunk, base_url=base_url)
+                    sitemaps_written += 1
+
+        index_inputs = _signature(FEEDS_VERSION, FEEDS_PUBLIC_URL, sorted(chunks.items()))
+        files[SITEMAP_INDEX] = index_inputs
+        if full or previous.get(SITEMAP_INDEX) != index_inputs:
+            _write_atomic(os.path.join(out_dir, SITEMAP_INDEX), render_sitemap_index(chunks))
+            sitemaps_written += 1
+
+        removed = [path for path in previous if path not in files]
+        for path in removed:
+            _remove_file(out_dir, path)
+        _write_atomic(os.path.join(out_dir, MANIFEST_NAME),
+                      json.dumps({"version": FEEDS_VERSION, "files": files}, indent=0))
+
+    return {
+        "feeds": len(feeds) * 2,
+        "feeds_written": feeds_written,
+        "sitemap_files": len(chunks) + 1,
+        "sitemap_written": sitemaps_written,
+        "removed": len(removed),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+# Background regeneration
+class FeedWriter:
+    """
+    Regenerates the feeds shortly after posts change.
+
+    Args:
+        update (callable): ``update()`` brings the files up to date
+        debounce_seconds (float): How long to wait for more changes before updating
+    """
+
+    def __init__(self, update, debounce_seconds=FEEDS_DEBOUNCE_SECONDS):
+        self.update = update
+        self.debounce_seconds = debounce_seconds
+        self._cond = threading.Condition()
+        self._dirty = False
+        self._stopped = False
+        self._thread = None
+        self.updates = 0
+
+    def notify(self):
+        with self._cond:
+            self._dirty = True
+            self._cond.notify()
+
+    def pending(self):
+        with self._cond:
+            return self._dirty
+
+    def _wait(self, seconds):
+        # Called with the condition held. notify() wakes a plain wait(), so
+        # keep waiting until the deadline passes or the writer is stopped.
+        deadline = time.monotonic() + seconds
+        while not self._stopped:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._cond.wait(remaining)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                # Let a burst of changes (a bulk edit, an import) settle first
+                self._wait(self.debounce_seconds)
+                if self._stopped:
+                    return
+                self._dirty = False
+
+            try:
+                self.update()
+                self.updates += 1
+            except Exception:
+                logger.exception("Feed regeneration failed")
+                with self._cond:
+                    self._dirty = True
+                    self._wait(self.debounce_seconds)
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="feed-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+            dirty = self._dirty
+        if thread is not None:
+            thread.join(timeout)
+        if dirty:
+            # Changes still waiting for the debounce: write them before exiting
+            try:
+                self.update()
+            except Exception:
+                logger.exception("Feed regeneration failed")
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def start_feeds():
+    """
+    Start the process-wide feed writer (once; later calls do nothing).
+
+    The first update runs straight away, so feeds missing or stale from
+    changes made while the app was down are brought up to date.
+
+    Returns:
+        FeedWriter: The running writer, or None if FEEDS_ENABLED is off
+    """
+    global _writer
+    if not FEEDS_ENABLED:
+        return None
+
+    with _writer_lock:
+        if _writer is None:
+            _writer = FeedWriter(update_feeds)
+            _writer.start()
+            _writer.notify()
+            atexit.register(_writer.stop)
+    return _writer
+
+def notify_feeds():
+    """
+    Tell the feed writer posts were published, edited or deleted.
+
+    Does nothing in processes that never started the writer (scripts,
+    benchmarks); they call update_feeds themselves if they need to.
+
+    Returns:
+        bool: True if a running writer was notified
+    """
+    if _writer is None:
+        return False
+    _writer.notify()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the RSS/Atom feeds and XML sitemap.")
+    parser.add_argument("--out", default=FEEDS_DIR, help="output folder (default: %(default)s)")
+    parser.add_argument("--full", action="store_true", help="rewrite every file, not only changed ones")
+    parser.add_argument("--base-url", default=FEEDS_BASE_URL, help="address of the app (default: %(default)s)")
+    args = parser.parse_args()
+
+    from db import init_db
+    init_db()
+    report = update_feeds(args.out, full=args.full, base_url=args.base_url)
+    print(f"{report['feeds']} feeds ({report['feeds_written']} written), {report['sitemap_files']} sitemap files "
+          f"({report['sitemap_written']} written), {report['removed']} removed in {report['seconds']}s -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+Rendered HTML fragments for post cards, hero blocks and comment lists.
+
+Building these strings formats dates and truncates text for every post on
+every rerun. ``post_fragment`` and ``comments_fragment`` keep the finished
+HTML in a process-wide cache keyed by what the markup depends on: the view,
+the post's ID and ``updated_at``, the theme, and the query-cache generations
+that post and comment writes bump (see cache.py). A warm home page rerun is
+then a string lookup per card.
+
+The cache is bounded by the total length of the stored HTML.
+
+Titles, names, tags, categories and comments are user input and are
+escaped here; the same fragments are served by the static site.
+"""
+
+import threading
+from collections import OrderedDict
+from html import escape
+
+from cache import generations
+from config import FRAGMENT_CACHE_MAX_CHARS
+from media import media_url
+from utils import format_datetime, truncate_text
+
+
+class FragmentCache:
+    """
+    LRU cache of HTML strings bounded by their total length in characters.
+    """
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = render()
+        if len(html) > self.max_chars:
+            return html
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = html
+            self._size += len(html)
+            while self._size > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "chars": self._size, "max_chars": self.max_chars,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+fragment_cache = FragmentCache(FRAGMENT_CACHE_MAX_CHARS)
+
+PLACEHOLDER_IMAGE = '<div style="width:100%; height:{height}px; background:linear-gradient(135deg, var(--accent-color) 0%, var(--secondary-color) 100%); border-radius:8px;{margin} display:flex; align-items:center; justify-content:center;"><span style="color:white; font-size:{size}rem;">📚</span></div>'
+
+FEATURED_CARD = """\
+<div class="card">
+    {image_html}
+    <span style="color:var(--secondary-color); font-size:0.8rem; text-transform:uppercase; letter-spacing:1px;">{category}</span>
+    <h3 style="margin-top:5px;">{title}</h3>
+    <p style="color:var(--highlight-color); font-size:0.9rem;"><em>By {author_name} • {published}</em></p>
+    <p>{excerpt}</p>
+    <a href="?post_id={id}" style="display:inline-block; margin-top:10px; font-weight:500;">Read more →</a>
+</div>"""
+
+RECENT_CARD = """\
+<div class="card">
+    <div style="display:flex; flex-wrap:wrap; gap:20px;">
+        <div style="flex:1; min-width:200px; max-width:300px;">
+            {image_html}
+        </div>
+        <div style="flex:2; min-width:300px;">
+            <span style="color:var(--secondary-color); font-size:0.8rem; text-transform:uppercase; letter-spacing:1px;">{category}</span>
+            <h2 style="margin-top:5px; margin-bottom:10px;">{title}</h2>
+            <p style="color:var(--highlight-color); font-size:0.9rem;"><em>By {author_name} • {published}</em></p>
+            <p>{excerpt}</p>
+            {tags_html}
+            <a href="?post_id={id}" style="display:inline-block; margin-top:15px; font-weight:500; padding:8px 15px; background-color:var(--accent-color); color:white; border-radius:5px; text-decoration:none;">Read more →</a>
+        </div>
+    </div>
+</div>"""
+
+RELATED_CARD = """\
+<div class="card">
+    {image_html}
+    <h4 style="margin-top:0;">{title}</h4>
+    <p><em>By {author_name}</em></p>
+    <a href="?post_id={id}" style="display:inline-block; margin-top:10px;">Read more →</a>
+</div>"""
+
+HERO_WITH_IMAGE = """\
+<div style="position: relative; margin-bottom: 30px;">
+    <img src="{image_url}" style="width: 100%; height: 350px; object-fit: cover; border-radius: 15px; filter: brightness(0.7);">
+    <div style="position: absolute; bottom: 0; left: 0; right: 0; padding: 30px; background: linear-gradient(0deg, rgba(0,0,0,0.7) 0%, rgba(0,0,0,0) 100%);">
+        <span style="color: white; font-size: 0.9rem; text-transform: uppercase; letter-spacing: 1px; background-color: var(--accent-color); padding: 5px 10px; border-radius: 4px;">{category}</span>
+        <h1 style="color: white; margin-top: 10px; margin-bottom: 5px; font-size: 2.5rem; text-shadow: 0 2px 4px rgba(0,0,0,0.5);">{title}</h1>
+        <p style="color: rgba(255,255,255,0.9); margin-bottom: 0;">By <strong>{author_name}</strong> • {published}</p>
+    </div>
+</div>"""
+
+HERO_GRADIENT = """\
+<div style="background: linear-gradient(135deg, var(--accent-color) 0%, var(--secondary-color) 100%); padding: 40px; border-radius: 15px; margin-bottom: 30px;">
+    <span style="color: white; font-size: 0.9rem; text-transform: uppercase; letter-spacing: 1px; background-color: rgba(255,255,255,0.2); padding: 5px 10px; border-radius: 4px;">{category}</span>
+    <h1 style="color: white; margin-top: 15px; margin-bottom: 10px; font-size: 2.5rem; text-shadow: 0 2px 4px rgba(0,0,0,0.3);">{title}</h1>
+    <p style="color: rgba(255,255,255,0.9); margin-bottom: 0;">By <strong>{author_name}</strong> • {published}</p>
+</div>"""
+
+COMMENT = """\
+<div class="card" style="margin-bottom:15px;">
+    <div style="display:flex; align-items:center;">
+        {profile_html}
+        <div>
+            <p style="margin:0; font-weight:500;">{username}</p>
+            <p style="margin:0; font-size:0.8rem; opacity:0.7;">{created}</p>
+        </div>
+    </div>
+    <div style="margin-top:15px; padding-left:65px;">
+        <p style="margin:0;">{content}</p>
+    </div>
+</div>"""
+
+SEARCH_CARD = """\
+<div class="card">
+    {image_html}
+    <h3>{title_highlight}</h3>
+    <p><em>By {author_name} on {published}</em></p>
+    <p>Category: {category} {tags_text}</p>
+    <p>{snippet}</p>
+    <div style="clear:both;"></div>
+    <a href="?post_id={id}">Read more</a>
+</div>"""
+
+ADMIN_CARD = """\
+<div class="card">
+    <h3>{title}</h3>
+    <p><em>By {author_name} | {details}</em></p>
+    <p>Category: {category}{tags_text}</p>
+    <a href="?post_id={id}">View</a>
+</div>"""
+
+STATUS_COLORS = {"published": "green", "draft": "gray", "scheduled": "blue"}
+
+
+def _card_image(post, height, margin, size):
+    if post.get('image_url'):
+        return (f'<img src="{media_url(post["image_url"], "card")}" style="width:100%; height:{height}px; '
+                f'object-fit:cover; border-radius:8px;{margin}">')
+    # Default image if none provided
+    return PLACEHOLDER_IMAGE.format(height=height, margin=margin, size=size)
+
+def featured_card_html(post):
+    return FEATURED_CARD.format(
+        image_html=_card_image(post, 180, " margin-bottom:15px;", 3),
+        category=escape(post['category']), title=escape(post['title']), author_name=escape(post['author_name']),
+        published=format_datetime(post['published_at'])[:10], excerpt=escape(truncate_text(post['excerpt'], 100)),
+        id=post['id'],
+    )
+
+def recent_card_html(post):
+    # Format tags with tech styling
+    tags_html = ""
+    if post.get('tags'):
+        tags_html = '<div style="margin-top:10px;">'
+        for tag in post['tags'].split(','):
+            tags_html += f'<span style="display:inline-block; background-color:rgba(0,0,0,0.1); padding:3px 8px; border-radius:15px; font-size:0.8rem; margin-right:5px; margin-bottom:5px;">{escape(tag.strip())}</span>'
+        tags_html += '</div>'
+
+    return RECENT_CARD.format(
+        image_html=_card_image(post, 200, "", 3),
+        category=escape(post['category']), title=escape(post['title']), author_name=escape(post['author_name']),
+        published=format_datetime(post['published_at'])[:10], excerpt=escape(post['excerpt'] or ""), tags_html=tags_html,
+        id=post['id'],
+    )
+
+def related_card_html(post):
+    return RELATED_CARD.format(image_html=_card_image(post, 120, " margin-bottom:10px;", 2),
+                               title=escape(post['title']), author_name=escape(post['author_name']), id=post['id'])
+
+def hero_html(post):
+    fields = dict(category=escape(post['category']), title=escape(post['title']), author_name=escape(post['author_name']),
+                  published=format_datetime(post['published_at']))
+    if post.get('featured_image'):
+        return HERO_WITH_IMAGE.format(image_url=media_url(post['featured_image'], "hero"), **fields)
+    # If no featured image, use a gradient background
+    return HERO_GRADIENT.format(**fields)
+
+def search_card_html(post):
+    image_html = ""
+    if post.get('image_url'):
+        image_html = f'<img src="{media_url(post["image_url"], "card")}" style="width:100px; height:100px; object-fit:cover; border-radius:5px; margin-right:15px; float:left;">'
+    return SEARCH_CARD.format(
+        image_html=image_html, title_highlight=post['title_highlight'], author_name=escape(post['author_name']),
+        published=format_datetime(post['published_at'])[:10], category=escape(post['category']),
+        tags_text=f"| Tags: {escape(post['tags'])}" if post.get('tags') else "", snippet=post['snippet'], id=post['id'],
+    )
+
+def admin_card_html(post):
+    status_color = STATUS_COLORS.get(post['status'], "gray")
+    return ADMIN_CARD.format(
+        title=escape(post['title']), author_name=escape(post['author_name']), category=escape(post['category']),
+        id=post['id'], details=f'Status: <span style="color:{status_color}">{post["status"].capitalize()}</span>',
+        tags_text=f" | Tags: {escape(post['tags'])}" if post.get('tags') else "",
+    )
+
+def admin_published_card_html(post):
+    return ADMIN_CARD.format(
+        title=escape(post['title']), author_name=escape(post['author_name']), category=escape(post['category']),
+        id=post['id'], details=f"Published: {format_datetime(post['published_at'])[:10]}", tags_text="",
+    )
+
+def admin_draft_card_html(post):
+    if post['status'] == "scheduled":
+        details = f"Scheduled for: {format_datetime(post['scheduled_for'])}"
+    else:
+        details = "Draft"
+    return ADMIN_CARD.format(title=escape(post['title']), author_name=escape(post['author_name']),
+                             category=escape(post['category']), id=post['id'], details=details, tags_text="")
+
+def comment_html(comment):
+    profile_img = comment.get('profile_image', '')
+    if profile_img:
+        profile_html = f'<img src="{media_url(profile_img, "avatar")}" style="width:50px; height:50px; border-radius:50%; margin-right:15px;">'
+    else:
+        profile_html = f'<div style="width:50px; height:50px; background-color:var(--accent-color); border-radius:50%; margin-right:15px; display:flex; align-items:center; justify-content:center; color:white; font-weight:bold;">{escape(comment["username"][0].upper())}</div>'
+    return COMMENT.format(profile_html=profile_html, username=escape(comment['username']),
+                          created=format_datetime(comment['created_at']), content=escape(comment['content']))
+
+VIEWS = {
+    "featured": featured_card_html,
+    "recent": recent_card_html,
+    "related": related_card_html,
+    "hero": hero_html,
+    "search": search_card_html,
+    "admin": admin_card_html,
+    "admin_published": admin_published_card_html,
+    "admin_draft": admin_draft_card_html,
+}
+
+
+def post_fragment(view, post, theme):
+    """
+    Get the HTML for one post in a given view, rendering it on a cache miss.
+
+    Args:
+        view (str): Key of VIEWS, e.g. "featured" or "hero"
+        post (dict): Post row as returned by the db module
+        theme (str): Current theme name
+
+    Returns:
+        str: HTML for st.markdown(..., unsafe_allow_html=True)
+    """
+    # Row fields make the key describe the row actually rendered, so a write
+    # racing with this render can never leave stale HTML under a fresh key
+    key = (view, post['id'], post.get('updated_at'), post.get('published_at'), post.get('status'),
+           post.get('author_name'), theme, generations(("post", int(post['id'])), "users"))
+    if view == "search":
+        # Highlights depend on the query, so they are part of the key
+        key += (post['title_highlight'], post['snippet'])
+    return fragment_cache.get_or_render(key, lambda: VIEWS[view](post))
+
+def comments_fragment(post_id, comments, theme):
+    """
+    Get the HTML for the visible comments of a post as one block.
+    """
+    key = ("comments", int(post_id), tuple(comment['id'] for comment in comments), theme,
+           generations(("comments", int(post_id)), "comments", "users"))
+    return fragment_cache.get_or_render(key, lambda: "\n".join(comment_html(c) for c in comments))
+
+def fragment_stats():
+    return fragment_cache.stats()
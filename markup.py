@@ -0,0 +1,330 @@
+"""
+Markdown rendering for post content.
+
+Posts are written in Markdown and rendered to HTML once, when they are
+saved: create_post and update_post store the result in ``content_html``
+together with the ``RENDERER_VERSION`` that produced it, so viewing a post
+is a column read. Fenced code blocks with a language are highlighted with
+Pygments, and the HTML is passed through an allowlist sanitizer before it is
+stored, since show_post injects it with ``unsafe_allow_html``.
+
+Bump ``RENDERER_VERSION`` whenever the output changes (new Markdown rules,
+sanitizer changes, a different highlighter) and re-render stored posts:
+
+    python markup.py --backfill
+"""
+
+import argparse
+import functools
+import html
+import re
+import sys
+from html.parser import HTMLParser
+
+from markdown_it import MarkdownIt
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
+
+RENDERER_VERSION = 2
+
+# Pygments style for code blocks in each app theme
+HIGHLIGHT_STYLES = {"light": "friendly", "dark": "monokai"}
+
+ALLOWED_TAGS = {
+    "a", "abbr", "b", "blockquote", "br", "code", "dd", "del", "div", "dl", "dt", "em",
+    "figcaption", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img", "ins",
+    "kbd", "li", "mark", "ol", "p", "pre", "s", "small", "span", "strong", "sub", "sup",
+    "table", "tbody", "td", "tfoot", "th", "thead", "tr", "u", "ul",
+}
+VOID_TAGS = {"br", "hr", "img"}
+# Tags that do not separate words when the text is extracted (plain_text)
+INLINE_TAGS = {
+    "a", "abbr", "b", "code", "del", "em", "i", "ins", "kbd", "mark", "s", "small", "span", "strong",
+    "sub", "sup", "u",
+}
+# Removed together with everything inside them
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript", "textarea", "select"}
+
+ALLOWED_ATTRIBUTES = {
+    "*": {"title"},
+    "a": {"href"},
+    "img": {"src", "alt", "width", "height"},
+    "code": {"class"},
+    "span": {"class"},
+    "div": {"class"},
+    "pre": {"class"},
+    "td": {"style"},
+    "th": {"style"},
+    "ol": {"start"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+URL_SCHEMES = {"http", "https", "mailto"}
+
+_SCHEME_PATTERN = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*):")
+_DATA_IMAGE_PATTERN = re.compile(r"^data:image/(png|jpeg|gif|webp);base64,[A-Za-z0-9+/=\s]*$")
+# markdown-it writes table alignment as an inline style; nothing else is kept
+_ALIGN_STYLE_PATTERN = re.compile(r"^text-align:\s*(left|right|center)$")
+_CLASS_PATTERN = re.compile(r"^[\w -]*$")
+_IGNORED_URL_CHARS = re.compile(r"[\x00-\x20\x7f]")
+_PRE_BLOCK = re.compile(r"<pre\b[^>]*>.*?</pre>", re.S | re.I)
+
+
+_code_formatter = HtmlFormatter(nowrap=True)
+
+@functools.lru_cache(maxsize=64)
+def _lexer(lang):
+    # Looking a lexer up by name costs about a millisecond, so keep them
+    try:
+        return get_lexer_by_name(lang)
+    except ClassNotFound:
+        return None
+
+def _highlight(code, lang, attrs):
+    # An empty string tells markdown-it to escape the block itself
+    lexer = _lexer(lang.lower()) if lang else None
+    if lexer is None:
+        return ""
+    return highlight(code, lexer, _code_formatter)
+
+_markdown = (
+    MarkdownIt("commonmark", {"html": True, "linkify": False, "typographer": False, "highlight": _highlight})
+    .enable(["table", "strikethrough"])
+)
+
+
+def _safe_url(value, attribute):
+    # Browsers ignore tabs, newlines and control characters inside a scheme
+    value = _IGNORED_URL_CHARS.sub("", value)
+    match = _SCHEME_PATTERN.match(value)
+    if match is None:
+        return True  # Relative URL or fragment
+    if attribute == "src" and _DATA_IMAGE_PATTERN.match(value):
+        return True
+    return match.group(1).lower() in URL_SCHEMES
+
+def _allowed_attribute(tag, name, value):
+    if name not in ALLOWED_ATTRIBUTES.get(tag, set()) | ALLOWED_ATTRIBUTES["*"]:
+        return False
+    if value is None:
+        return False
+    if name in URL_ATTRIBUTES:
+        return _safe_url(value, name)
+    if name == "style":
+        return bool(_ALIGN_STYLE_PATTERN.match(value.strip()))
+    if name == "class":
+        return bool(_CLASS_PATTERN.match(value))
+    return True
+
+
+class _Sanitizer(HTMLParser):
+    """
+    Re-serializes HTML keeping only allowlisted tags and attributes.
+
+    Disallowed tags are dropped but their text is kept (escaped), except for
+    DROP_CONTENT_TAGS whose contents are removed too. Unclosed tags are
+    closed at the end so stored HTML cannot swallow the rest of the page.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+
+        kept = "".join(f' {name}="{html.escape(value, quote=True)}"'
+                       for name, value in attrs if _allowed_attribute(tag, name, value))
+        if tag == "a" and any(name == "href" for name, value in attrs if _allowed_attribute(tag, name, value)):
+            kept += ' rel="nofollow noopener"'
+        self.out.append(f"<{tag}{kept}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # Close anything left open inside this element first
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.out.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(html.escape(data, quote=False))
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.out.append(f"</{self.open_tags.pop()}>")
+        return "".join(self.out)
+
+
+def sanitize_html(value):
+    """
+    Strip everything but allowlisted tags, attributes and URL schemes.
+
+    Args:
+        value (str): Untrusted HTML
+
+    Returns:
+        str: HTML that is safe to inject with unsafe_allow_html
+    """
+    sanitizer = _Sanitizer()
+    sanitizer.feed(value or "")
+    return sanitizer.close()
+
+class _TextExtractor(HTMLParser):
+    """
+    Collects the text of sanitized HTML, with a space at each block boundary.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in INLINE_TAGS:
+            self.out.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag not in INLINE_TAGS:
+            self.out.append(" ")
+
+    def handle_data(self, data):
+        self.out.append(data)
+
+    def close(self):
+        super().close()
+        return " ".join("".join(self.out).split())
+
+
+def plain_text(value):
+    """
+    Text of stored post HTML, for excerpts.
+
+    Args:
+        value (str): HTML from render_markdown
+
+    Returns:
+        str: Unescaped text with whitespace collapsed; escape it before
+        writing it into HTML
+    """
+    extractor = _TextExtractor()
+    extractor.feed(value or "")
+    return extractor.close()
+
+def _keep_on_one_line(match):
+    # show_post passes the HTML through st.markdown, which parses it as
+    # CommonMark again: a blank line would end the HTML block mid-<pre>
+    return match.group(0).replace("\n", "&#10;")
+
+def render_markdown(source):
+    """
+    Render post Markdown to sanitized HTML.
+
+    Inline HTML in the source is allowed through the sanitizer, so posts
+    written as HTML before Markdown rendering existed keep their formatting.
+
+    Args:
+        source (str): Markdown source
+
+    Returns:
+        str: Sanitized HTML
+    """
+    return _PRE_BLOCK.sub(_keep_on_one_line, sanitize_html(_markdown.render(source or "")))
+
+@functools.lru_cache(maxsize=None)
+def highlight_css(theme):
+    """
+    CSS for highlighted code blocks inside ``.blog-content``.
+
+    Args:
+        theme (str): "light" or "dark"
+
+    Returns:
+        str: Style rules, without a <style> tag
+    """
+    style = HIGHLIGHT_STYLES.get(theme, HIGHLIGHT_STYLES["light"])
+    return HtmlFormatter(style=style).get_style_defs(".blog-content pre")
+
+def backfill(batch_size=200):
+    """
+    Render every post whose stored HTML is missing or from an older renderer.
+
+    The excerpt is rebuilt from the new HTML as well.
+
+    Each batch is committed separately. A post edited while its batch was
+    rendering is skipped, since update_post has already stored fresh HTML.
+
+    Returns:
+        int: Number of posts re-rendered
+    """
+    from cache import invalidate
+    from db import get_connection, make_excerpt
+
+    rendered = 0
+    last_id = 0
+    while True:
+        with get_connection() as conn:
+            rows = conn.execute("""
+            SELECT id, content FROM posts
+            WHERE id > ? AND (content_renderer IS NULL OR content_renderer != ?)
+            ORDER BY id LIMIT ?
+            """, (last_id, RENDERER_VERSION, batch_size)).fetchall()
+        if not rows:
+            break
+
+        updates = []
+        for row in rows:
+            content_html = render_markdown(row["content"])
+            updates.append((content_html, RENDERER_VERSION, make_excerpt(row["content"], content_html),
+                            row["id"], row["content"]))
+        with get_connection() as conn:
+            conn.executemany("""
+            UPDATE posts SET content_html = ?, content_renderer = ?, excerpt = ?
+            WHERE id = ? AND content = ?
+            """, updates)
+        invalidate(*[("post", int(row["id"])) for row in rows])
+
+        rendered += len(rows)
+        last_id = rows[-1]["id"]
+    return rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render stored post Markdown to HTML.")
+    parser.add_argument("--backfill", action="store_true",
+                        help=f"render posts not yet rendered by renderer version {RENDERER_VERSION}")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    if not args.backfill:
+        parser.print_help()
+        return 0
+
+    from db import init_db
+    init_db()
+    print(f"Rendered {backfill(args.batch_size)} posts with renderer version {RENDERER_VERSION}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Content-addressed media store for featured and profile images.
+
+Images are stored once under the SHA-256 of their bytes in ``MEDIA_DIR``
+(inside Streamlit's ``static/`` folder) together with resized variants for
+each place they are shown. The database keeps only a short reference of the
+form ``media:<sha256>.<ext>``; use ``media_url`` to turn a stored value into
+something an ``<img>`` tag can load.
+
+    python media.py --regenerate   # rebuild variants after changing MEDIA_VARIANTS
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import sys
+from io import BytesIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from config import MEDIA_DIR, MEDIA_URL_PATH, MEDIA_VARIANTS, MEDIA_QUALITY, MEDIA_MAX_UPLOAD_BYTES
+
+MEDIA_PREFIX = "media:"
+
+# Variants are WebP when Pillow was built with it, JPEG otherwise
+VARIANT_FORMAT = "WEBP" if features.check("webp") else "JPEG"
+VARIANT_EXTENSION = ".webp" if VARIANT_FORMAT == "WEBP" else ".jpg"
+
+_FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+_DATA_URI_PATTERN = re.compile(r"^data:image/[\w.+-]+;base64,(.*)$", re.DOTALL)
+_REF_PATTERN = re.compile(r"^media:([0-9a-f]{64})(\.\w+)$")
+
+_static_serving = None
+
+
+def is_media_ref(value):
+    return bool(value) and value.startswith(MEDIA_PREFIX)
+
+def _parse_ref(ref):
+    match = _REF_PATTERN.match(ref)
+    if not match:
+        raise ValueError(f"Not a media reference: {ref!r}")
+    return match.group(1), match.group(2)
+
+def _media_path(digest, suffix):
+    return os.path.join(MEDIA_DIR, digest[:2], digest + suffix)
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _render_variant(img, size, crop):
+    img = ImageOps.exif_transpose(img)
+    if crop:
+        img = ImageOps.fit(img, size, Image.LANCZOS)
+    else:
+        img = img.copy()
+        img.thumbnail(size, Image.LANCZOS)
+
+    if VARIANT_FORMAT == "JPEG" or img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if VARIANT_FORMAT == "WEBP" and "A" in img.getbands() else "RGB")
+
+    out = BytesIO()
+    img.save(out, format=VARIANT_FORMAT, quality=MEDIA_QUALITY, optimize=True)
+    return out.getvalue()
+
+def store_image(data):
+    """
+    Store image bytes and generate their variants.
+
+    Storing the same bytes twice is a no-op and returns the same reference.
+
+    Args:
+        data (bytes): Raw image file contents
+
+    Returns:
+        str: Media reference to save in the database
+
+    Raises:
+        ValueError: If the data is too large or is not a supported image
+    """
+    if len(data) > MEDIA_MAX_UPLOAD_BYTES:
+        raise ValueError(f"Image is larger than {MEDIA_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+
+    try:
+        img = Image.open(BytesIO(data))
+        img.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Not a valid image: {e}") from e
+
+    suffix = _FORMAT_EXTENSIONS.get(img.format)
+    if suffix is None:
+        raise ValueError(f"Unsupported image format: {img.format}")
+
+    digest = hashlib.sha256(data).hexdigest()
+    original_path = _media_path(digest, suffix)
+    if not os.path.exists(original_path):
+        _write_atomic(original_path, data)
+
+    for variant in MEDIA_VARIANTS:
+        variant_path = _media_path(digest, f"-{variant}{VARIANT_EXTENSION}")
+        if not os.path.exists(variant_path):
+            size, crop = MEDIA_VARIANTS[variant]
+            _write_atomic(variant_path, _render_variant(img, size, crop))
+
+    return f"{MEDIA_PREFIX}{digest}{suffix}"
+
+def store_data_uri(value):
+    """
+    Move a ``data:image/...;base64`` value into the media store.
+
+    Any other value (external URLs, existing references, None) is returned
+    unchanged, so this is safe to apply to every image column write.
+
+    Returns:
+        str: Media reference, or the original value
+    """
+    if not value or not value.startswith("data:"):
+        return value
+
+    match = _DATA_URI_PATTERN.match(value)
+    if not match:
+        raise ValueError("Unsupported data URI")
+    try:
+        data = base64.b64decode(match.group(1), validate=False)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 image data: {e}") from e
+    return store_image(data)
+
+def static_serving_enabled():
+    global _static_serving
+    if _static_serving is None:
+        try:
+            import streamlit as st
+            _static_serving = bool(st.get_option("server.enableStaticServing"))
+        except Exception:
+            _static_serving = False
+    return _static_serving
+
+def media_file(value, variant):
+    """
+    Get a local file path for a stored image variant, for use with st.image.
+
+    Returns:
+        str: File path for media references, otherwise the value unchanged
+    """
+    if not is_media_ref(value):
+        return value
+    digest, _ = _parse_ref(value)
+    return _media_path(digest, f"-{variant}{VARIANT_EXTENSION}")
+
+def media_original(value):
+    """
+    Get the path of the original file behind a media reference.
+
+    Returns:
+        str: File path, or None if the value is not a media reference
+    """
+    if not is_media_ref(value):
+        return None
+    digest, suffix = _parse_ref(value)
+    return _media_path(digest, suffix)
+
+def media_url(value, variant):
+    """
+    Get the URL to use in an ``<img src>`` for an image column value.
+
+    Media references resolve to the static URL of the requested variant.
+    The file name is the content hash, so the ``v`` parameter lets the
+    browser cache it for good. If static serving is turned off the variant
+    is inlined as a data URI, which is still far smaller than the original.
+
+    Args:
+        value (str): featured_image or profile_image column value
+        variant (str): Key of MEDIA_VARIANTS, e.g. "card"
+
+    Returns:
+        str: URL, or the value unchanged if it is not a media reference
+    """
+    if not is_media_ref(value):
+        return value
+
+    digest, _ = _parse_ref(value)
+    name = f"{digest}-{variant}{VARIANT_EXTENSION}"
+    if static_serving_enabled():
+        return f"{MEDIA_URL_PATH}/{digest[:2]}/{name}?v={digest[:8]}"
+
+    try:
+        with open(_media_path(digest, f"-{variant}{VARIANT_EXTENSION}"), "rb") as f:
+            encoded = base64.b64encode(f.read()).decode()
+    except OSError:
+        return None
+    return f"data:image/{VARIANT_EXTENSION[1:].replace('jpg', 'jpeg')};base64,{encoded}"
+
+def regenerate_variants():
+    """
+    Rebuild every variant from the stored originals.
+
+    Returns:
+        int: Number of originals processed
+    """
+    count = 0
+    for root, _, files in os.walk(MEDIA_DIR):
+        for name in files:
+            digest, suffix = os.path.splitext(name)
+            if len(digest) != 64 or suffix not in _FORMAT_EXTENSIONS.values():
+                continue
+            with Image.open(os.path.join(root, name)) as img:
+                img.load()
+                for variant, (size, crop) in MEDIA_VARIANTS.items():
+                    _write_atomic(_media_path(digest, f"-{variant}{VARIANT_EXTENSION}"),
+                                  _render_variant(img, size, crop))
+            count += 1
+    return count
+
+
+if __name__ == "__main__":
+    if "--regenerate" in sys.argv[1:]:
+        print(f"Regenerated variants for {regenerate_variants()} images")
+    else:
+        print(__doc__)
@@ -0,0 +1,732 @@
+"""
+Versioned schema migrations for the EduRishi Blog database.
+
+Each migration is applied once, in order, and the schema version is recorded
+in SQLite's ``PRAGMA user_version``. Run this module directly to inspect the
+database:
+
+    python migrations.py --status
+    python migrations.py --plans
+"""
+
+import argparse
+import sqlite3
+import sys
+
+
+def _initial_schema(conn):
+    """
+    Create the original tables (a no-op for databases created by init_db).
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        role TEXT NOT NULL,
+        bio TEXT,
+        profile_image TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS posts (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        content TEXT NOT NULL,
+        author_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        tags TEXT,
+        featured_image TEXT,
+        status TEXT NOT NULL,
+        published_at TIMESTAMP,
+        scheduled_for TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (author_id) REFERENCES users (id)
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS comments (
+        id INTEGER PRIMARY KEY,
+        post_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (post_id) REFERENCES posts (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS subscribers (
+        id INTEGER PRIMARY KEY,
+        email TEXT UNIQUE NOT NULL,
+        name TEXT,
+        subscribed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS contact_messages (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        message TEXT NOT NULL,
+        read BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+def _hot_query_indexes(conn):
+    """
+    Index the columns used by the listing, comment and admin queries.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_status_created ON posts (status, created_at DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_category_status ON posts (category, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_author ON posts (author_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_post_created ON comments (post_id, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_comments_user ON comments (user_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contact_messages_read_created ON contact_messages (read, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_subscribers_subscribed_at ON subscribers (subscribed_at)")
+
+
+def _normalized_tags(conn):
+    """
+    Move tags into a tags table joined to posts, backfilled from posts.tags.
+    """
+    from db import sync_post_tags
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL COLLATE NOCASE
+    )
+    ''')
+
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS post_tags (
+        post_id INTEGER NOT NULL,
+        tag_id INTEGER NOT NULL,
+        PRIMARY KEY (post_id, tag_id),
+        FOREIGN KEY (post_id) REFERENCES posts (id),
+        FOREIGN KEY (tag_id) REFERENCES tags (id)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_post_tags_tag ON post_tags (tag_id, post_id)")
+
+    rows = conn.execute("SELECT id, tags FROM posts WHERE tags IS NOT NULL AND tags != ''").fetchall()
+    for post_id, tags in rows:
+        sync_post_tags(conn, post_id, tags)
+
+
+def _full_text_search(conn):
+    """
+    Index posts in an FTS5 table kept current by triggers.
+
+    SQLite builds without FTS5 skip this step; search falls back to LIKE.
+    """
+    try:
+        conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5 (
+            title, content, category, tags,
+            content='posts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''')
+    except sqlite3.OperationalError:
+        return
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts (rowid, title, content, category, tags)
+        VALUES (new.id, new.title, new.content, new.category, new.tags);
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, content, category, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.category, old.tags);
+    END
+    ''')
+
+    conn.execute('''
+    CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content, category, tags ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, content, category, tags)
+        VALUES ('delete', old.id, old.title, old.content, old.category, old.tags);
+        INSERT INTO posts_fts (rowid, title, content, category, tags)
+        VALUES (new.id, new.title, new.content, new.category, new.tags);
+    END
+    ''')
+
+    conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+
+
+def _post_excerpts(conn):
+    """
+    Store a precomputed excerpt with each post for list views.
+    """
+    from db import make_excerpt
+
+    conn.execute("ALTER TABLE posts ADD COLUMN excerpt TEXT")
+
+    rows = conn.execute("SELECT id, content FROM posts").fetchall()
+    conn.executemany("UPDATE posts SET excerpt = ? WHERE id = ?",
+                     [(make_excerpt(content), post_id) for post_id, content in rows])
+
+
+def _keyset_indexes(conn):
+    """
+    Index every newest-first listing on (..., created_at) for keyset paging.
+
+    The rowid is the implicit last column of every index, so a reverse scan
+    of an ascending (..., created_at) index yields rows ordered by
+    created_at DESC, id DESC with no sort step.
+    """
+    conn.execute("DROP INDEX IF EXISTS idx_posts_status_created")
+    conn.execute("CREATE INDEX idx_posts_status_created ON posts (status, created_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_posts_category_status")
+    conn.execute("CREATE INDEX idx_posts_category_status ON posts (category, status, created_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_posts_author")
+    conn.execute("CREATE INDEX idx_posts_author ON posts (author_id, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (created_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_comments_user")
+    conn.execute("CREATE INDEX idx_comments_user ON comments (user_id, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_created ON users (created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_contact_messages_created ON contact_messages (created_at)")
+
+
+def _extract_inline_images(conn):
+    """
+    Move base64 data URIs in image columns into the media store.
+
+    Values that cannot be decoded as images are left untouched.
+    """
+    from media import store_data_uri
+
+    for table, column in (("posts", "featured_image"), ("users", "profile_image")):
+        rows = conn.execute(f"SELECT id, {column} FROM {table} WHERE {column} LIKE 'data:%'").fetchall()
+        for row_id, value in rows:
+            try:
+                ref = store_data_uri(value)
+            except ValueError:
+                continue
+            conn.execute(f"UPDATE {table} SET {column} = ? WHERE id = ?", (ref, row_id))
+
+
+def _scheduled_posts_index(conn):
+    # Partial index: only scheduled posts are in it, so the scheduler's
+    # lookups stay small however many published posts there are. The status
+    # column comes first so the planner prefers it to idx_posts_status_created.
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_posts_scheduled
+    ON posts (status, scheduled_for) WHERE status = 'scheduled'
+    """)
+
+
+# Counters kept in the counters table, with the query that computes each from scratch
+COUNTER_QUERIES = {
+    "posts": "SELECT COUNT(*) FROM posts",
+    "published_posts": "SELECT COUNT(*) FROM posts WHERE status = 'published'",
+    "users": "SELECT COUNT(*) FROM users",
+    "comments": "SELECT COUNT(*) FROM comments",
+    "subscribers": "SELECT COUNT(*) FROM subscribers",
+    "unread_messages": "SELECT COUNT(*) FROM contact_messages WHERE read = 0",
+    "views": "SELECT COALESCE(SUM(views), 0) FROM post_views_daily",
+}
+
+def _bump(name, delta, condition=None):
+    sql = f"UPDATE counters SET value = value + ({delta}) WHERE name = '{name}'"
+    if condition:
+        sql += f" AND ({condition})"
+    return sql + ";"
+
+# (trigger name, event, counter statements)
+_COUNTER_TRIGGERS = [
+    ("counters_posts_insert", "AFTER INSERT ON posts",
+     [_bump("posts", 1), _bump("published_posts", 1, "NEW.status = 'published'")]),
+    ("counters_posts_delete", "AFTER DELETE ON posts",
+     [_bump("posts", -1), _bump("published_posts", -1, "OLD.status = 'published'")]),
+    ("counters_posts_status", "AFTER UPDATE OF status ON posts",
+     [_bump("published_posts", "(NEW.status = 'published') - (OLD.status = 'published')")]),
+    ("counters_users_insert", "AFTER INSERT ON users", [_bump("users", 1)]),
+    ("counters_users_delete", "AFTER DELETE ON users", [_bump("users", -1)]),
+    ("counters_comments_insert", "AFTER INSERT ON comments", [_bump("comments", 1)]),
+    ("counters_comments_delete", "AFTER DELETE ON comments", [_bump("comments", -1)]),
+    ("counters_subscribers_insert", "AFTER INSERT ON subscribers", [_bump("subscribers", 1)]),
+    ("counters_subscribers_delete", "AFTER DELETE ON subscribers", [_bump("subscribers", -1)]),
+    ("counters_messages_insert", "AFTER INSERT ON contact_messages",
+     [_bump("unread_messages", 1, "NEW.read = 0")]),
+    ("counters_messages_delete", "AFTER DELETE ON contact_messages",
+     [_bump("unread_messages", -1, "OLD.read = 0")]),
+    ("counters_messages_read", "AFTER UPDATE OF read ON contact_messages",
+     [_bump("unread_messages", "(NEW.read = 0) - (OLD.read = 0)")]),
+]
+
+_VIEW_COUNTER_TRIGGERS = [
+    ("counters_views_insert", "AFTER INSERT ON post_views_daily", [_bump("views", "NEW.views")]),
+    ("counters_views_update", "AFTER UPDATE OF views ON post_views_daily",
+     [_bump("views", "NEW.views - OLD.views")]),
+    ("counters_views_delete", "AFTER DELETE ON post_views_daily", [_bump("views", "-OLD.views")]),
+]
+
+def recount(conn, names=None):
+    """
+    Recompute counters (all by default) from their tables, returning {name: (stored, actual)}.
+    """
+    drift = {}
+    stored = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+    for name in names or COUNTER_QUERIES:
+        query = COUNTER_QUERIES[name]
+        actual = conn.execute(query).fetchone()[0]
+        conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, actual))
+        drift[name] = (stored.get(name), actual)
+    return drift
+
+def _stat_counters(conn):
+    """
+    Materialize dashboard counts in a counters table kept current by triggers.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """)
+    for name, event, statements in _COUNTER_TRIGGERS:
+        body = "\n        ".join(statements)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN
+        {body}
+        END
+        """)
+    # Counters added by later migrations are counted there, once their tables exist
+    recount(conn, [name for name in COUNTER_QUERIES if name != "views"])
+
+
+def _rendered_content(conn):
+    """
+    Add columns for the HTML rendered from each post's Markdown.
+
+    Existing posts are left unrendered here; ``python markup.py --backfill``
+    renders them, and get_post renders any it has not reached yet on read.
+    """
+    conn.execute("ALTER TABLE posts ADD COLUMN content_html TEXT")
+    conn.execute("ALTER TABLE posts ADD COLUMN content_renderer INTEGER")
+
+
+def _related_posts(conn):
+    """
+    Tables for the related posts index (see related.py), built from scratch.
+    """
+    from related import rebuild_index
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS related_terms (
+        term TEXT PRIMARY KEY,
+        idf REAL NOT NULL
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS post_vectors (
+        term TEXT NOT NULL,
+        post_id INTEGER NOT NULL,
+        weight REAL NOT NULL,
+        PRIMARY KEY (term, post_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_post_vectors_post ON post_vectors (post_id)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS related_posts (
+        post_id INTEGER NOT NULL,
+        related_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (post_id, related_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_related_posts_related ON related_posts (related_id)")
+    rebuild_index(conn)
+
+def _post_views(conn):
+    """
+    Daily view counts per post, flushed in batches by views.py.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS post_views_daily (
+        post_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        views INTEGER NOT NULL,
+        PRIMARY KEY (post_id, day)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_post_views_day ON post_views_daily (day, post_id, views)")
+    for name, event, statements in _VIEW_COUNTER_TRIGGERS:
+        body = "\n        ".join(statements)
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN
+        {body}
+        END
+        """)
+    recount(conn, ["views"])
+
+def _newsletters(conn):
+    """
+    Newsletter sends and their per-subscriber delivery log (see newsletter.py).
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS newsletters (
+        id INTEGER PRIMARY KEY,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'sending',
+        recipients INTEGER NOT NULL DEFAULT 0,
+        lease_owner TEXT,
+        lease_expires_at REAL NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS newsletter_deliveries (
+        newsletter_id INTEGER NOT NULL,
+        subscriber_id INTEGER NOT NULL,
+        email TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL DEFAULT 0,
+        last_error TEXT,
+        sent_at TIMESTAMP,
+        PRIMARY KEY (newsletter_id, subscriber_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE INDEX IF NOT EXISTS idx_newsletter_deliveries_status
+    ON newsletter_deliveries (newsletter_id, status, subscriber_id)
+    """)
+
+def _subscriber_email_nocase(conn):
+    """
+    Make subscriber emails unique regardless of case.
+
+    Earlier sign-ups that differ only in case are folded into the first one.
+    """
+    conn.execute("""
+    DELETE FROM subscribers
+    WHERE id NOT IN (SELECT MIN(id) FROM subscribers GROUP BY email COLLATE NOCASE)
+    """)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_subscribers_email_nocase ON subscribers (email COLLATE NOCASE)")
+
+def _archive_imports(conn):
+    """
+    Bookkeeping for archive.py: imports, their ID remapping table, and the
+    indexes and triggers set aside during a bulk load.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS archive_imports (
+        archive_id TEXT PRIMARY KEY,
+        source TEXT,
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        finished_at TIMESTAMP,
+        counts TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS archive_id_map (
+        archive_id TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        old_id TEXT NOT NULL,
+        new_id INTEGER NOT NULL,
+        PRIMARY KEY (archive_id, kind, old_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS deferred_schema (
+        name TEXT PRIMARY KEY,
+        sql TEXT NOT NULL
+    ) WITHOUT ROWID
+    """)
+
+def _posts_updated_index(conn):
+    """
+    Let api.py read MAX(updated_at) from an index instead of scanning posts.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_updated ON posts (updated_at)")
+
+def _posts_published_index(conn):
+    """
+    Serve the newest-published-first queries behind feeds.py from an index.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_status_published ON posts (status, published_at)")
+
+def _users_updated_at(conn):
+    """
+    Stamp users with the time their name, bio or picture last changed.
+
+    Authors are shown with their posts, so api.py puts this in its data
+    version and post ETags. The trigger keeps it current for every writer.
+    """
+    conn.execute("ALTER TABLE users ADD COLUMN updated_at TIMESTAMP")
+    conn.execute("UPDATE users SET updated_at = created_at")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_updated ON users (updated_at)")
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS users_updated_at AFTER UPDATE OF username, bio, profile_image ON users BEGIN
+        UPDATE users SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = NEW.id;
+    END
+    """)
+
+def _plain_text_excerpts(conn):
+    """
+    Rebuild excerpts from the text of each post's sanitized HTML.
+
+    Excerpts used to be the first characters of the raw Markdown, which
+    could end inside a tag. Rendered HTML is reused where it is current.
+    """
+    from db import make_excerpt
+    from markup import RENDERER_VERSION
+
+    rows = conn.execute("SELECT id, content, content_html, content_renderer FROM posts").fetchall()
+    conn.executemany("UPDATE posts SET excerpt = ? WHERE id = ?", [
+        (make_excerpt(content, content_html if renderer == RENDERER_VERSION else None), post_id)
+        for post_id, content, content_html, renderer in rows
+    ])
+
+# (version, description, function) - append new migrations, never reorder
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "indexes for hot queries", _hot_query_indexes),
+    (3, "normalized tags", _normalized_tags),
+    (4, "full-text search", _full_text_search),
+    (5, "post excerpts", _post_excerpts),
+    (6, "keyset pagination indexes", _keyset_indexes),
+    (7, "extract inline images", _extract_inline_images),
+    (8, "scheduled posts index", _scheduled_posts_index),
+    (9, "stat counters", _stat_counters),
+    (10, "rendered post content", _rendered_content),
+    (11, "related posts index", _related_posts),
+    (12, "post views", _post_views),
+    (13, "newsletter delivery log", _newsletters),
+    (14, "case-insensitive subscriber emails", _subscriber_email_nocase),
+    (15, "archive imports", _archive_imports),
+    (16, "posts updated_at index", _posts_updated_index),
+    (17, "posts published_at index", _posts_published_index),
+    (18, "users updated_at", _users_updated_at),
+    (19, "plain-text excerpts", _plain_text_excerpts),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """
+    Return the schema version recorded in the database.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """
+    Apply every pending migration.
+
+    Each migration runs in its own IMMEDIATE transaction together with the
+    ``user_version`` bump, so a failure leaves the schema at the last good
+    version and concurrent processes cannot apply the same step twice.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection
+
+    Returns:
+        list: Versions applied by this call
+    """
+    applied = []
+
+    if get_schema_version(conn) >= LATEST_VERSION:
+        return applied
+
+    conn.commit()
+    for version, _description, apply in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock in case another process got here first
+            if get_schema_version(conn) >= version:
+                conn.rollback()
+                continue
+
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(version)
+
+    if applied:
+        conn.execute("PRAGMA optimize")
+    return applied
+
+def defer_schema(conn, tables):
+    """
+    Drop the triggers and non-unique indexes on ``tables`` ahead of a bulk load.
+
+    Their SQL is saved in ``deferred_schema`` in the same transaction, so
+    restore_schema can put them back even if the load never finishes
+    (init_db calls it on every start). Unique indexes stay, since they
+    enforce constraints.
+
+    Returns:
+        list: Names of the objects dropped
+    """
+    placeholders = ", ".join("?" for _ in tables)
+    rows = conn.execute(f"""
+    SELECT name, type, sql FROM sqlite_master
+    WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL
+      AND (type = 'trigger' OR (type = 'index' AND sql NOT LIKE 'CREATE UNIQUE%'))
+    ORDER BY type, name
+    """, list(tables)).fetchall()
+
+    conn.executemany("INSERT OR IGNORE INTO deferred_schema (name, sql) VALUES (?, ?)",
+                     [(name, sql) for name, _type, sql in rows])
+    for name, object_type, _sql in rows:
+        conn.execute(f'DROP {object_type.upper()} IF EXISTS "{name}"')
+    return [name for name, _type, _sql in rows]
+
+def restore_schema(conn):
+    """
+    Recreate everything defer_schema dropped, then rebuild what the dropped
+    triggers would have maintained: the search index and the counters.
+
+    Returns:
+        list: Names of the objects recreated
+    """
+    try:
+        rows = conn.execute("SELECT name, sql FROM deferred_schema").fetchall()
+    except sqlite3.OperationalError:
+        return []  # Not migrated yet
+    if not rows:
+        return []
+
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    for name, sql in rows:
+        if name not in existing:
+            conn.execute(sql)
+    conn.execute("DELETE FROM deferred_schema")
+
+    if "posts_fts" in existing:
+        conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    recount(conn)
+    return [name for name, _sql in rows]
+
+def explain(conn, query, params=()):
+    """
+    Return the EXPLAIN QUERY PLAN rows for a query.
+
+    Returns:
+        list: Plan detail strings, e.g. ``SEARCH p USING INDEX ...``
+    """
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+
+def full_table_scans(plan, tables):
+    """
+    Return the plan lines that scan one of ``tables`` without an index.
+
+    Args:
+        plan (list): Output of explain()
+        tables (tuple): Table names or aliases to check
+
+    Returns:
+        list: Offending plan lines
+    """
+    offending = []
+    for line in plan:
+        words = line.split()
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in tables and "INDEX" not in words:
+            offending.append(line)
+    return offending
+
+
+# Tables (and the aliases the queries give them) a hot query must reach through an index
+INDEXED_TABLES = ("posts", "p", "comments", "c", "related_posts", "r", "mine", "other", "post_views_daily")
+
+def hot_queries():
+    """
+    The hot read queries, as built by db.py, for plan checks.
+
+    tests/test_query_plans.py checks that none scans INDEXED_TABLES;
+    ``python migrations.py --plans`` prints their plans.
+
+    Returns:
+        dict: Name -> (query, params)
+    """
+    from db import build_posts_query, COMMENTS_QUERY, POST_SUMMARY_COLUMNS, RELATED_POSTS_QUERY
+    from related import SIMILAR_POSTS_QUERY
+
+    cursor = ("2024-01-01 00:00:00", 100)
+    return {
+        "get_posts(status)": build_posts_query(status="published", limit=5),
+        "get_posts(status, cursor)": build_posts_query(status="published", limit=21, cursor=cursor),
+        "get_posts(cursor)": build_posts_query(limit=21, cursor=cursor),
+        "get_posts(status, category)": build_posts_query(status="published", category="AI", limit=5),
+        "get_posts(author_id)": build_posts_query(author_id=1),
+        "get_posts(status, tags any)": build_posts_query(status="published", tag=["ai", "quantum"]),
+        "get_posts(status, tags all)": build_posts_query(status="published", tag=["ai", "quantum"], tag_mode="all"),
+        "feed(status)": build_posts_query(status="published", limit=20, order="published"),
+        "feed(status, category)": build_posts_query(status="published", category="AI", limit=20, order="published"),
+        "feed(status, tag)": build_posts_query(status="published", tag="ai", limit=20, order="published"),
+        "get_comments(post_id)": (COMMENTS_QUERY + " ORDER BY c.created_at DESC, c.id DESC", (1,)),
+        "get_schedule(until)": (
+            "SELECT scheduled_for, id FROM posts WHERE status = 'scheduled' AND scheduled_for IS NOT NULL"
+            " AND scheduled_for <= ? ORDER BY scheduled_for", ("2024-01-01 00:00:00",)),
+        "get_scheduled_posts()": (
+            f"SELECT {', '.join(POST_SUMMARY_COLUMNS['admin'])} FROM posts p JOIN users u ON p.author_id = u.id"
+            " WHERE p.status = 'scheduled' AND p.scheduled_for > ? ORDER BY p.scheduled_for ASC",
+            ("2024-01-01 00:00:00",)),
+        "get_related_posts(post_id)": (RELATED_POSTS_QUERY, (1, 3)),
+        "related index: similar posts": (SIMILAR_POSTS_QUERY, (1,)),
+        "get_post_views(post_id)": ("SELECT SUM(views) FROM post_views_daily WHERE post_id = ?", (1,)),
+        "get_view_stats(daily)": (
+            "SELECT day, SUM(views) FROM post_views_daily WHERE day >= ? GROUP BY day", ("2024-01-01",)),
+    }
+
+def _print_plans(conn):
+    for name, (query, params) in hot_queries().items():
+        plan = explain(conn, query, params)
+        print(f"{'SCAN' if full_table_scans(plan, INDEXED_TABLES) else 'ok  '}  {name}")
+        for line in plan:
+            print(f"      {line}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and migrate the blog database.")
+    parser.add_argument("--status", action="store_true", help="show the schema version and exit")
+    parser.add_argument("--plans", action="store_true",
+                        help="print the query plan of each hot query, marking full table scans")
+    parser.add_argument("--recount", action="store_true",
+                        help="recompute the stat counters and report any drift")
+    args = parser.parse_args()
+
+    from db import get_connection, init_db
+
+    if args.status:
+        with get_connection() as conn:
+            print(f"schema version {get_schema_version(conn)} (latest {LATEST_VERSION})")
+        return 0
+
+    init_db()
+    if args.plans:
+        with get_connection() as conn:
+            _print_plans(conn)
+        return 0
+    if args.recount:
+        with get_connection() as conn:
+            for name, (stored, actual) in recount(conn).items():
+                print(f"{'ok   ' if stored == actual else 'fixed'}  {name}: {actual}" +
+                      ("" if stored == actual else f" (was {stored})"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
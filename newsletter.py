@@ -0,0 +1,628 @@
+"""
+Newsletter delivery.
+
+``create_newsletter`` stores the message and copies the current subscriber
+list into ``newsletter_deliveries``, which is also the send log: each row
+stays 'pending' until a worker reports it 'sent' or 'failed'.
+``NewsletterSender`` then works through the pending rows:
+
+* the message is serialized once per send; only the To and Message-ID
+  headers are written per recipient,
+* a coordinator reads pending rows NEWSLETTER_BATCH_SIZE at a time and hands
+  them to NEWSLETTER_CONNECTIONS worker threads, each keeping one SMTP
+  connection open across batches,
+* a token bucket shared by the workers holds the send to
+  NEWSLETTER_RATE_PER_SECOND,
+* temporary failures (4xx replies, dropped connections) are retried with
+  exponential backoff up to NEWSLETTER_MAX_ATTEMPTS; 5xx replies fail the
+  recipient at once,
+* results are written back a batch at a time, so a send cut short by a
+  crash or restart resumes from the rows still pending. Only batches in
+  flight at the moment of the crash can reach someone twice.
+
+A send holds a lease on its ``newsletters`` row and renews it while it runs,
+so two processes never deliver the same newsletter. ``start_newsletters``
+resumes sends whose lease has lapsed. Sends run on daemon threads; the admin
+page polls progress from the log instead of waiting.
+
+    python newsletter.py --status
+    python newsletter.py --resume      # finish interrupted sends in the foreground
+"""
+
+import argparse
+import atexit
+import email.utils
+import html
+import logging
+import os
+import queue
+import random
+import smtplib
+import socket
+import sys
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
+
+from config import (
+    APP_NAME, SMTP_HOST, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, SMTP_SECURITY, SMTP_TIMEOUT,
+    NEWSLETTER_SENDER, NEWSLETTER_CONNECTIONS, NEWSLETTER_BATCH_SIZE, NEWSLETTER_RATE_PER_SECOND,
+    NEWSLETTER_MESSAGES_PER_CONNECTION, NEWSLETTER_MAX_ATTEMPTS, NEWSLETTER_RETRY_SECONDS
+)
+from db import get_connection
+from markup import render_markdown
+
+logger = logging.getLogger(__name__)
+
+# A send that stops renewing its lease for this long is presumed dead
+LEASE_SECONDS = 60
+MAX_RETRY_SECONDS = 3600
+
+
+def smtp_configured():
+    return bool(SMTP_HOST)
+
+def smtp_connect():
+    """
+    Open and authenticate a connection to the configured SMTP server.
+
+    Returns:
+        smtplib.SMTP: Connected client
+    """
+    if SMTP_SECURITY == "ssl":
+        smtp = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    else:
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        if SMTP_SECURITY == "starttls":
+            smtp.starttls()
+    if SMTP_USERNAME:
+        smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+    return smtp
+
+def _quit(smtp):
+    if smtp is None:
+        return
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+
+class RenderedMessage:
+    """
+    A newsletter serialized once for every recipient.
+
+    Args:
+        newsletter_id (int): Used in the per-recipient Message-ID
+        subject (str): Subject line
+        body (str): Markdown body, sent as the text part and rendered for the HTML part
+        sender (str): From header
+    """
+
+    def __init__(self, newsletter_id, subject, body, sender=NEWSLETTER_SENDER):
+        message = EmailMessage(policy=SMTP_POLICY)
+        message["From"] = sender
+        message["Subject"] = subject
+        message["Date"] = email.utils.formatdate(localtime=True)
+        message.set_content(body)
+        message.add_alternative(
+            f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(subject)}</title></head>"
+            f"<body>{render_markdown(body)}<hr><p><small>{html.escape(APP_NAME)}</small></p></body></html>",
+            subtype="html")
+
+        self.newsletter_id = newsletter_id
+        self.sender = email.utils.parseaddr(sender)[1]
+        self.domain = self.sender.rpartition("@")[2] or "localhost"
+        self.body = message.as_bytes()
+
+    def for_recipient(self, subscriber_id, address):
+        """
+        Returns:
+            bytes: The full message addressed to one subscriber
+        """
+        if "\r" in address or "\n" in address:
+            raise ValueError(f"Invalid address {address!r}")
+        headers = (f"To: {address}\r\n"
+                   f"Message-ID: <newsletter-{self.newsletter_id}-{subscriber_id}@{self.domain}>\r\n")
+        return headers.encode("utf-8") + self.body
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the workers of one send.
+
+    Callers take a token each and sleep off any shortfall outside the lock,
+    so a burst of up to ``rate`` messages goes out at once and the rest are
+    spaced evenly.
+
+    Args:
+        rate (float): Messages per second; 0 or less means unlimited
+    """
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = max(rate, 1)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            self.sleep(wait)
+
+
+def _classify(error):
+    # 'retry' for failures worth another attempt, 'failed' for permanent ones
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _message in error.recipients.values()]
+        return "retry" if codes and all(400 <= code < 500 for code in codes) else "failed"
+    if isinstance(error, smtplib.SMTPResponseException):
+        return "retry" if 400 <= error.smtp_code < 500 else "failed"
+    if isinstance(error, ValueError):
+        return "failed"
+    return "retry"
+
+def _keeps_connection(error):
+    # smtplib resets the session after a refused recipient or a rejected message
+    return isinstance(error, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused, ValueError))
+
+
+class NewsletterSender:
+    """
+    Delivers the pending rows of one newsletter.
+
+    Args:
+        newsletter_id (int): Newsletter to send
+        connect (callable): Returns a connected smtplib.SMTP-like client
+        connections (int): Worker threads, each with its own connection
+        batch_size (int): Rows handed to a worker at a time
+        rate (float): Messages per second across all workers (0 = unlimited)
+        max_attempts (int): Attempts before a temporarily failing recipient is given up
+        retry_seconds (float): Delay before the first retry; doubles with each attempt
+        messages_per_connection (int): Reconnect after this many messages
+    """
+
+    def __init__(self, newsletter_id, connect=smtp_connect, connections=NEWSLETTER_CONNECTIONS,
+                 batch_size=NEWSLETTER_BATCH_SIZE, rate=NEWSLETTER_RATE_PER_SECOND,
+                 max_attempts=NEWSLETTER_MAX_ATTEMPTS, retry_seconds=NEWSLETTER_RETRY_SECONDS,
+                 messages_per_connection=NEWSLETTER_MESSAGES_PER_CONNECTION, lease_seconds=LEASE_SECONDS):
+        self.newsletter_id = newsletter_id
+        self.connect = connect
+        self.connections = max(connections, 1)
+        self.batch_size = max(batch_size, 1)
+        self.rate = rate
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.messages_per_connection = messages_per_connection
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stopped = threading.Event()
+        self._renewed_at = 0
+
+    def stop(self):
+        """
+        Stop after the messages already being sent; the rest stay pending.
+        """
+        self._stopped.set()
+
+    def stopped(self):
+        """
+        Whether the sender was stopped or has finished; its thread may still be winding down.
+        """
+        return self._stopped.is_set()
+
+    def run(self):
+        """
+        Send until no pending rows are left, the sender is stopped, or the
+        newsletter is paused.
+
+        Returns:
+            dict: Delivery counts by status, or None if another process holds the lease
+        """
+        if not self._acquire_lease():
+            return None
+        try:
+            with get_connection() as conn:
+                row = conn.execute("SELECT subject, body FROM newsletters WHERE id = ?",
+                                   (self.newsletter_id,)).fetchone()
+            self._deliver(RenderedMessage(self.newsletter_id, row["subject"], row["body"]))
+        finally:
+            self._release_lease()
+        return get_newsletter_progress(self.newsletter_id)
+
+    def _acquire_lease(self):
+        now = time.time()
+        with get_connection() as conn:
+            acquired = conn.execute("""
+            UPDATE newsletters SET lease_owner = ?, lease_expires_at = ?
+            WHERE id = ? AND status = 'sending'
+              AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires_at < ?)
+            """, (self.owner, now + self.lease_seconds, self.newsletter_id, self.owner, now)).rowcount
+        self._renewed_at = now
+        return acquired == 1
+
+    def _renew_lease(self):
+        # Renewing fails once the newsletter is paused or the lease was taken over
+        now = time.time()
+        if now - self._renewed_at < self.lease_seconds / 3:
+            return True
+        with get_connection() as conn:
+            renewed = conn.execute("""
+            UPDATE newsletters SET lease_expires_at = ?
+            WHERE id = ? AND lease_owner = ? AND status = 'sending'
+            """, (now + self.lease_seconds, self.newsletter_id, self.owner)).rowcount
+        self._renewed_at = now
+        return renewed == 1
+
+    def _release_lease(self):
+        with get_connection() as conn:
+            conn.execute("""
+            UPDATE newsletters SET lease_owner = NULL, lease_expires_at = 0
+            WHERE id = ? AND lease_owner = ?
+            """, (self.newsletter_id, self.owner))
+
+    def _deliver(self, message):
+        work = queue.Queue(maxsize=self.connections)
+        results = queue.Queue()
+        limiter = RateLimiter(self.rate)
+        workers = [threading.Thread(target=self._work, args=(message, work, results, limiter),
+                                    name=f"newsletter-{self.newsletter_id}-{i}", daemon=True)
+                   for i in range(self.connections)]
+        for worker in workers:
+            worker.start()
+
+        outstanding = 0
+        after = 0
+        try:
+            while not self._stopped.is_set() and self._renew_lease():
+                batch = self._ready_batch(after)
+                if batch:
+                    # Rows handed out stay 'pending' until their results are
+                    # written, so the keyset keeps this pass from re-reading them
+                    after = batch[-1][0]
+                    while True:
+                        try:
+                            work.put(batch, timeout=0.5)
+                            break
+                        except queue.Full:
+                            outstanding -= self._write_results(results)
+                    outstanding += 1 - self._write_results(results)
+                elif outstanding:
+                    outstanding -= self._write_results(results, timeout=0.5)
+                else:
+                    pending, next_attempt_at = self._pending_summary()
+                    if not pending:
+                        self._finish()
+                        break
+                    # Only retries are left; wait for the earliest, then start a new pass
+                    self._stopped.wait(min(max(next_attempt_at - time.time(), 0.05), self.lease_seconds / 3))
+                    after = 0
+        finally:
+            self._stopped.set()
+            for _worker in workers:
+                work.put(None)
+            for worker in workers:
+                worker.join()
+            self._write_results(results)
+
+    def _ready_batch(self, after):
+        with get_connection() as conn:
+            return conn.execute("""
+            SELECT subscriber_id, email, attempts FROM newsletter_deliveries
+            WHERE newsletter_id = ? AND status = 'pending' AND subscriber_id > ? AND next_attempt_at <= ?
+            ORDER BY subscriber_id LIMIT ?
+            """, (self.newsletter_id, after, time.time(), self.batch_size)).fetchall()
+
+    def _pending_summary(self):
+        with get_connection() as conn:
+            return conn.execute("""
+            SELECT COUNT(*), MIN(next_attempt_at) FROM newsletter_deliveries
+            WHERE newsletter_id = ? AND status = 'pending'
+            """, (self.newsletter_id,)).fetchone()
+
+    def _finish(self):
+        with get_connection() as conn:
+            conn.execute("""
+            UPDATE newsletters SET status = 'completed', finished_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND lease_owner = ?
+            """, (self.newsletter_id, self.owner))
+
+    def _work(self, message, work, results, limiter):
+        smtp = None
+        sent_on_connection = 0
+        try:
+            while True:
+                batch = work.get()
+                if batch is None:
+                    return
+
+                outcomes = []
+                for index, (subscriber_id, address, attempts) in enumerate(batch):
+                    if self._stopped.is_set():
+                        break  # The rest of the batch stays pending
+
+                    if smtp is None or sent_on_connection >= self.messages_per_connection:
+                        _quit(smtp)
+                        smtp, sent_on_connection = None, 0
+                        try:
+                            smtp = self.connect()
+                        except Exception as error:
+                            # Leave the rest of the batch for the retry pass
+                            # rather than reconnecting once per recipient
+                            outcomes.extend((sid, tries, "retry", f"connect: {error}"[:500])
+                                            for sid, _address, tries in batch[index:])
+                            break
+
+                    limiter.acquire()
+                    try:
+                        smtp.sendmail(message.sender, [address], message.for_recipient(subscriber_id, address))
+                        sent_on_connection += 1
+                        outcomes.append((subscriber_id, attempts, "sent", None))
+                    except Exception as error:
+                        outcomes.append((subscriber_id, attempts, _classify(error), str(error)[:500]))
+                        if not _keeps_connection(error):
+                            smtp.close()
+                            smtp = None
+                results.put(outcomes)
+        finally:
+            _quit(smtp)
+
+    def _write_results(self, results, timeout=None):
+        """
+        Write every batch of outcomes the workers have reported.
+
+        Args:
+            timeout (float): Wait this long for the first batch (None = don't wait)
+
+        Returns:
+            int: Batches written
+        """
+        batches = []
+        try:
+            if timeout is not None:
+                batches.append(results.get(timeout=timeout))
+            while True:
+                batches.append(results.get_nowait())
+        except queue.Empty:
+            pass
+        if not batches:
+            return 0
+
+        now = time.time()
+        sent, retry, failed = [], [], []
+        for outcomes in batches:
+            for subscriber_id, attempts, outcome, error in outcomes:
+                key = (self.newsletter_id, subscriber_id)
+                if outcome == "sent":
+                    sent.append(key)
+                elif outcome == "retry" and attempts + 1 < self.max_attempts:
+                    delay = min(self.retry_seconds * 2 ** attempts, MAX_RETRY_SECONDS) * random.uniform(0.8, 1.2)
+                    retry.append((error, now + delay) + key)
+                else:
+                    failed.append((error,) + key)
+
+        with get_connection() as conn:
+            conn.executemany("""
+            UPDATE newsletter_deliveries
+            SET status = 'sent', attempts = attempts + 1, last_error = NULL, sent_at = CURRENT_TIMESTAMP
+            WHERE newsletter_id = ? AND subscriber_id = ?
+            """, sent)
+            conn.executemany("""
+            UPDATE newsletter_deliveries SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?
+            WHERE newsletter_id = ? AND subscriber_id = ?
+            """, retry)
+            conn.executemany("""
+            UPDATE newsletter_deliveries SET status = 'failed', attempts = attempts + 1, last_error = ?
+            WHERE newsletter_id = ? AND subscriber_id = ?
+            """, failed)
+        return len(batches)
+
+
+def create_newsletter(subject, body):
+    """
+    Store a newsletter and queue it for every current subscriber.
+
+    Returns:
+        int: The new newsletter's ID
+    """
+    with get_connection() as conn:
+        newsletter_id = conn.execute("INSERT INTO newsletters (subject, body) VALUES (?, ?)",
+                                     (subject, body)).lastrowid
+        recipients = conn.execute("""
+        INSERT INTO newsletter_deliveries (newsletter_id, subscriber_id, email)
+        SELECT ?, id, email FROM subscribers
+        """, (newsletter_id,)).rowcount
+        conn.execute("UPDATE newsletters SET recipients = ? WHERE id = ?", (recipients, newsletter_id))
+    return newsletter_id
+
+def get_newsletter_progress(newsletter_id):
+    """
+    Returns:
+        dict: Delivery counts for 'pending', 'sent' and 'failed'
+    """
+    progress = {"pending": 0, "sent": 0, "failed": 0}
+    with get_connection() as conn:
+        progress.update(conn.execute("""
+        SELECT status, COUNT(*) FROM newsletter_deliveries
+        WHERE newsletter_id = ? GROUP BY status
+        """, (newsletter_id,)).fetchall())
+    return progress
+
+def get_newsletters(limit=10):
+    """
+    Most recent newsletters with their delivery counts.
+    """
+    with get_connection() as conn:
+        rows = conn.execute("""
+        SELECT id, subject, status, recipients, created_at, finished_at FROM newsletters
+        ORDER BY id DESC LIMIT ?
+        """, (limit,)).fetchall()
+    return [dict(row, **get_newsletter_progress(row["id"]), running=is_sending(row["id"])) for row in rows]
+
+def get_failed_deliveries(newsletter_id, limit=100):
+    with get_connection() as conn:
+        rows = conn.execute("""
+        SELECT email, attempts, last_error FROM newsletter_deliveries
+        WHERE newsletter_id = ? AND status = 'failed'
+        ORDER BY subscriber_id LIMIT ?
+        """, (newsletter_id, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+def pause_newsletter(newsletter_id):
+    """
+    Pause a send. Its sender notices at the next lease renewal, in this or any process.
+    """
+    with get_connection() as conn:
+        conn.execute("UPDATE newsletters SET status = 'paused' WHERE id = ? AND status = 'sending'",
+                     (newsletter_id,))
+    with _senders_lock:
+        sender, _thread = _senders.get(newsletter_id, (None, None))
+    if sender is not None:
+        sender.stop()
+
+def resume_newsletter(newsletter_id, **options):
+    with get_connection() as conn:
+        conn.execute("UPDATE newsletters SET status = 'sending' WHERE id = ? AND status = 'paused'",
+                     (newsletter_id,))
+    return start_newsletter_send(newsletter_id, **options)
+
+def send_test_email(subject, body, address, connect=smtp_connect):
+    """
+    Send one copy of a newsletter straight away, without logging it.
+    """
+    message = RenderedMessage(0, subject, body)
+    smtp = connect()
+    try:
+        smtp.sendmail(message.sender, [address], message.for_recipient(0, address))
+    finally:
+        _quit(smtp)
+
+
+_senders = {}
+_senders_lock = threading.Lock()
+_started = False
+
+
+def _run_sender(sender, previous=None):
+    if previous is not None:
+        # Resumed while the paused sender was still finishing its in-flight
+        # batches: it holds the lease until it exits
+        previous.join()
+    try:
+        sender.run()
+    except Exception:
+        logger.exception("Sending newsletter %s failed", sender.newsletter_id)
+
+def start_newsletter_send(newsletter_id, **options):
+    """
+    Send a newsletter on a background thread of this process.
+
+    If an earlier send of it was stopped (paused) but its thread has not
+    exited yet, the new thread waits for it before taking the lease.
+
+    Args:
+        newsletter_id (int): Newsletter to send
+        **options: Passed to NewsletterSender
+
+    Returns:
+        bool: False if this process is already sending it
+    """
+    with _senders_lock:
+        previous_sender, previous = _senders.get(newsletter_id, (None, None))
+        if previous is not None and previous.is_alive():
+            if not previous_sender.stopped():
+                return False
+        else:
+            previous = None
+        sender = NewsletterSender(newsletter_id, **options)
+        thread = threading.Thread(target=_run_sender, args=(sender, previous),
+                                  name=f"newsletter-{newsletter_id}", daemon=True)
+        _senders[newsletter_id] = (sender, thread)
+    thread.start()
+    return True
+
+def is_sending(newsletter_id):
+    with _senders_lock:
+        _sender, thread = _senders.get(newsletter_id, (None, None))
+    return thread is not None and thread.is_alive()
+
+def stop_newsletter_sends(timeout=10):
+    """
+    Stop this process's sends, letting in-flight batches finish and be logged.
+    """
+    with _senders_lock:
+        running = list(_senders.values())
+    for sender, _thread in running:
+        sender.stop()
+    for _sender, thread in running:
+        thread.join(timeout)
+
+def start_newsletters():
+    """
+    Resume interrupted sends (once per process; later calls do nothing).
+
+    Returns:
+        list: IDs of the newsletters resumed
+    """
+    global _started
+    with _senders_lock:
+        if _started or not smtp_configured():
+            return []
+        _started = True
+    atexit.register(stop_newsletter_sends)
+
+    with get_connection() as conn:
+        rows = conn.execute("""
+        SELECT id FROM newsletters
+        WHERE status = 'sending' AND (lease_owner IS NULL OR lease_expires_at < ?)
+        """, (time.time(),)).fetchall()
+    return [row["id"] for row in rows if start_newsletter_send(row["id"])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send and inspect newsletters.")
+    parser.add_argument("--status", action="store_true", help="show recent newsletters and their progress")
+    parser.add_argument("--resume", action="store_true",
+                        help="finish every interrupted send in the foreground")
+    args = parser.parse_args()
+
+    if not (args.status or args.resume):
+        parser.print_help()
+        return 0
+
+    from db import init_db
+    init_db()
+
+    if args.resume:
+        if not smtp_configured():
+            print("SMTP_HOST is not set")
+            return 1
+        with get_connection() as conn:
+            ids = [row["id"] for row in conn.execute("SELECT id FROM newsletters WHERE status = 'sending'")]
+        for newsletter_id in ids:
+            progress = NewsletterSender(newsletter_id).run()
+            print(f"Newsletter {newsletter_id}: " +
+                  ("sent by another process" if progress is None else
+                   ", ".join(f"{count} {status}" for status, count in progress.items())))
+
+    if args.status:
+        for newsletter in get_newsletters(20):
+            print(f"{newsletter['id']:>5}  {newsletter['status']:<9}  {newsletter['sent']:>7} sent  "
+                  f"{newsletter['failed']:>6} failed  {newsletter['pending']:>7} pending  {newsletter['subject']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
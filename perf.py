@@ -0,0 +1,245 @@
+"""
+Per-rerun timing of app sections and data functions.
+
+Streamlit runs app.py top to bottom on every interaction, each session on
+its own thread. ``begin_rerun`` starts a trace for the current thread (for
+PERF_SAMPLE_RATE of reruns), ``section`` and ``timed`` add wall time and a
+call count under a name, and ``end_rerun`` files the trace, with its route,
+in a ring buffer of the last PERF_BUFFER_SIZE reruns shared by every
+session. ``instrument`` wraps a module's functions the same way, which is
+how db.py times each data function.
+
+With no trace running (sampling off, background threads, scripts) a timed
+call costs one thread-local lookup. A rerun cut short by st.rerun() or
+st.stop() never reaches end_rerun; its trace is dropped.
+"""
+
+import functools
+import random
+import threading
+import time
+from collections import deque
+
+from config import PERF_BUFFER_SIZE, PERF_SAMPLE_RATE
+
+_local = threading.local()
+
+
+class RerunTrace:
+    """
+    Timings collected during one rerun.
+
+    Attributes:
+        route (str): Page the rerun rendered, set by set_route
+        sections (dict): Section name -> [seconds, calls]
+        functions (dict): Data function name -> [seconds, calls]
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = time.time()
+        self.start = clock()
+        self.route = None
+        self.sections = {}
+        self.functions = {}
+
+    def add(self, table, name, seconds):
+        entry = table.get(name)
+        if entry is None:
+            table[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def finish(self):
+        return {
+            "route": self.route or "unknown",
+            "started": self.started,
+            "seconds": self.clock() - self.start,
+            "sections": {name: tuple(value) for name, value in self.sections.items()},
+            "functions": {name: tuple(value) for name, value in self.functions.items()},
+        }
+
+
+class RerunBuffer:
+    """
+    Ring buffer of finished rerun traces, shared across sessions.
+
+    Args:
+        size (int): Reruns kept; the oldest is dropped first
+    """
+
+    def __init__(self, size=PERF_BUFFER_SIZE):
+        self.size = size
+        self._reruns = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, rerun):
+        with self._lock:
+            self._reruns.append(rerun)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._reruns)
+
+    def clear(self):
+        with self._lock:
+            self._reruns.clear()
+
+rerun_buffer = RerunBuffer()
+
+
+# Recording
+def begin_rerun(sample_rate=PERF_SAMPLE_RATE):
+    """
+    Start timing this rerun, for a random ``sample_rate`` share of reruns.
+
+    Replaces any trace left on this thread by a rerun that never finished.
+    """
+    _local.trace = RerunTrace() if sample_rate > 0 and random.random() < sample_rate else None
+    _local.route = None
+
+def set_route(route):
+    _local.route = route
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.route = route
+
+def current_route():
+    """
+    Return the route of this thread's current (or last) rerun, sampled or not.
+    """
+    return getattr(_local, "route", None)
+
+def end_rerun():
+    """
+    File this rerun's timings in the ring buffer.
+
+    Returns:
+        dict: The rerun as recorded, or None if it was not sampled
+    """
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return None
+    _local.trace = None
+    rerun = trace.finish()
+    rerun_buffer.append(rerun)
+    return rerun
+
+class section:
+    """
+    Time a block as a named section of the current rerun.
+
+        with section("sidebar"):
+            ...
+    """
+
+    __slots__ = ("name", "trace", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.trace = getattr(_local, "trace", None)
+        if self.trace is not None:
+            self.start = self.trace.clock()
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace is not None:
+            self.trace.add(self.trace.sections, self.name, self.trace.clock() - self.start)
+        return False
+
+def timed(name=None, kind="sections"):
+    """
+    Decorator form of ``section``; the name defaults to the function's.
+
+    Args:
+        kind (str): "sections" for page code, "functions" for data functions
+    """
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = getattr(_local, "trace", None)
+            if trace is None:
+                return fn(*args, **kwargs)
+            start = trace.clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                trace.add(getattr(trace, kind), label, trace.clock() - start)
+        return wrapper
+    return decorate
+
+def instrument(namespace, module, skip=()):
+    """
+    Wrap every public function defined in a module with ``timed``.
+
+    Call it at the end of the module with ``globals()``, so code importing
+    the functions afterwards gets the timed versions.
+
+    Args:
+        namespace (dict): The module's globals
+        module (str): Module name; functions imported from elsewhere are left alone
+        skip (iterable): Names to leave unwrapped (SQL builders, helpers taking a connection)
+    """
+    for name, value in list(namespace.items()):
+        if (callable(value) and not isinstance(value, type) and not name.startswith("_")
+                and getattr(value, "__module__", None) == module and name not in skip):
+            namespace[name] = timed(name, "functions")(value)
+
+
+# Reporting
+def _percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+def _distribution(samples):
+    return {"p50_ms": round(_percentile(samples, 0.50) * 1000, 1),
+            "p95_ms": round(_percentile(samples, 0.95) * 1000, 1),
+            "max_ms": round(max(samples) * 1000, 1) if samples else 0.0}
+
+def perf_summary(reruns=None, slowest=10):
+    """
+    Roll the buffered reruns up for the admin Performance page.
+
+    Section and function figures are per rerun that used them: a function
+    called three times in a rerun contributes its total time once.
+
+    Returns:
+        dict: ``reruns`` (count), ``routes``, ``sections`` and ``functions``
+            (name -> reruns, calls per rerun and p50/p95/max) and the
+            ``slowest`` reruns with their largest sections
+    """
+    reruns = rerun_buffer.snapshot() if reruns is None else reruns
+
+    def roll_up(key):
+        totals = {}
+        for rerun in reruns:
+            for name, (seconds, calls) in rerun[key].items():
+                entry = totals.setdefault(name, ([], []))
+                entry[0].append(seconds)
+                entry[1].append(calls)
+        return {name: dict(reruns=len(seconds), calls_per_rerun=round(sum(calls) / len(calls), 1),
+                           **_distribution(seconds))
+                for name, (seconds, calls) in sorted(totals.items(), key=lambda item: -sum(item[1][0]))}
+
+    routes = {}
+    for rerun in reruns:
+        routes.setdefault(rerun["route"], []).append(rerun["seconds"])
+
+    return {
+        "reruns": len(reruns),
+        "routes": {route: dict(reruns=len(seconds), **_distribution(seconds))
+                   for route, seconds in sorted(routes.items())},
+        "sections": roll_up("sections"),
+        "functions": roll_up("functions"),
+        "slowest": [
+            {"started": rerun["started"], "route": rerun["route"], "ms": round(rerun["seconds"] * 1000, 1),
+             "top": sorted(((name, round(seconds * 1000, 1)) for name, (seconds, _calls)
+                            in rerun["sections"].items()), key=lambda item: -item[1])[:3]}
+            for rerun in sorted(reruns, key=lambda rerun: -rerun["seconds"])[:slowest]
+        ],
+    }
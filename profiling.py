@@ -0,0 +1,225 @@
+"""
+On-demand CPU and memory profiling of a single rerun.
+
+When a page is slow and the Performance page's aggregates do not say why,
+an admin can open it with ``?profile_rerun=1`` (or press "Profile Next
+Rerun" on the Performance page). app.py then calls ``start_profile`` at the
+top of that session's next rerun and ``finish_profile`` at the bottom.
+Between the two, cProfile records every call on the session's thread and
+tracemalloc records allocations.
+
+``finish_profile`` writes two files to PROFILE_DIR, keeping the newest
+PROFILE_KEEP profiles:
+
+    <stamp>-<route>.prof    cProfile stats (pstats, snakeviz, ...)
+    <stamp>-<route>.json    route, wall time, peak traced memory and the
+                            tracemalloc snapshot diff by allocation site
+
+app.py finishes the profile in a finally block, so a page that raises or
+calls st.rerun() or st.stop() still writes one. As a safety stop, a
+watchdog thread stops memory tracing if the profiled thread has gone
+without finishing, or after PROFILE_MAX_SECONDS; the CPU profile is kept
+until the thread finishes it.
+
+cProfile only hooks the profiled thread. tracemalloc is process-wide, so
+only one profile traces memory at a time, and allocations other sessions
+make while it runs appear in its diff. Sessions that are not profiled pay
+one thread-local lookup per rerun.
+"""
+
+import cProfile
+import datetime
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+from config import PROFILE_DIR, PROFILE_KEEP, PROFILE_MAX_SECONDS, PROFILE_TOP
+from perf import current_route
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+# Held by the one profile that is tracing memory
+_memory_lock = threading.Lock()
+
+
+class RerunProfile:
+    """
+    A profile in progress on one thread.
+    """
+
+    def __init__(self, max_seconds=PROFILE_MAX_SECONDS):
+        self.thread = threading.current_thread()
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.profiler = cProfile.Profile()
+        self.traces_memory = _memory_lock.acquire(blocking=False)
+        if self.traces_memory and tracemalloc.is_tracing():
+            # Started outside this module (PYTHONTRACEMALLOC); leave it alone
+            _memory_lock.release()
+            self.traces_memory = False
+        self.before = None
+        self.memory = None
+        self._stopped = threading.Event()
+        self._memory_stop_lock = threading.Lock()
+        if self.traces_memory:
+            tracemalloc.start()
+            self.before = tracemalloc.take_snapshot()
+            threading.Thread(target=self._watch, args=(max_seconds,), name="profile-watchdog",
+                             daemon=True).start()
+        self.profiler.enable()
+
+    def _watch(self, max_seconds):
+        deadline = self.start + max_seconds
+        while not self._stopped.wait(min(1.0, max_seconds)):
+            gone = not self.thread.is_alive()
+            if (gone or time.perf_counter() >= deadline) and self._stop_memory():
+                logger.warning("Stopped tracing memory for a profile on %s: %s", self.thread.name,
+                               "the thread ended without finishing it" if gone
+                               else f"still running after {max_seconds:g}s")
+                return
+
+    def _stop_memory(self):
+        """
+        Take the closing snapshot and stop tracemalloc, once.
+
+        Returns:
+            bool: True if this call stopped it
+        """
+        with self._memory_stop_lock:
+            if self.memory is not None:
+                return False
+            try:
+                self.memory = (tracemalloc.take_snapshot(), tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+                _memory_lock.release()
+            return True
+
+    def stop(self):
+        """
+        Stop profiling.
+
+        Returns:
+            tuple: (seconds, peak traced bytes or None, memory diff rows)
+        """
+        self._stopped.set()
+        self.profiler.disable()
+        seconds = time.perf_counter() - self.start
+        if not self.traces_memory:
+            return seconds, None, []
+        self._stop_memory()
+        after, peak = self.memory
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        diff = after.filter_traces(ignore).compare_to(self.before.filter_traces(ignore), "lineno")
+        return seconds, peak, [{
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count_diff": stat.count_diff,
+        } for stat in diff if stat.size_diff or stat.count_diff][:PROFILE_TOP]
+
+
+def start_profile():
+    """
+    Profile the rest of this thread's rerun, until ``finish_profile``.
+    """
+    finish_profile()
+    _local.profile = RerunProfile()
+
+def finish_profile(route=None, out_dir=PROFILE_DIR):
+    """
+    Stop this thread's profile, if any, and write it to ``out_dir``.
+
+    Args:
+        route (str, optional): Page profiled; defaults to perf's current route
+
+    Returns:
+        dict: The profile's metadata, or None if none was running
+    """
+    profile = getattr(_local, "profile", None)
+    if profile is None:
+        return None
+    _local.profile = None
+    seconds, peak, memory = profile.stop()
+
+    route = route or current_route() or "unknown"
+    stamp = datetime.datetime.fromtimestamp(profile.started).strftime("%Y%m%d-%H%M%S-%f")
+    name = f"{stamp}-{re.sub(r'[^a-z0-9]+', '-', route.lower()).strip('-')}"
+    os.makedirs(out_dir, exist_ok=True)
+    profile.profiler.dump_stats(os.path.join(out_dir, f"{name}.prof"))
+    meta = {
+        "name": name,
+        "route": route,
+        "started": profile.started,
+        "ms": round(seconds * 1000, 1),
+        "peak_kb": None if peak is None else round(peak / 1024, 1),
+        "memory": memory,
+    }
+    with open(os.path.join(out_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+
+    for old in list_profiles(out_dir)[PROFILE_KEEP:]:
+        for extension in (".prof", ".json"):
+            try:
+                os.remove(os.path.join(out_dir, old["name"] + extension))
+            except FileNotFoundError:
+                pass
+    return meta
+
+
+# Viewer
+def list_profiles(out_dir=PROFILE_DIR):
+    """
+    Return stored profiles, newest first.
+
+    Returns:
+        list: Metadata dicts without the memory diff
+    """
+    if not os.path.isdir(out_dir):
+        return []
+    profiles = []
+    for entry in sorted(os.listdir(out_dir), reverse=True):
+        if entry.endswith(".json") and os.path.exists(os.path.join(out_dir, entry[:-5] + ".prof")):
+            try:
+                with open(os.path.join(out_dir, entry), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            meta.pop("memory", None)
+            profiles.append(meta)
+    return profiles
+
+def load_profile(name, out_dir=PROFILE_DIR, top=PROFILE_TOP):
+    """
+    Load a stored profile for display.
+
+    Args:
+        name (str): Profile name from list_profiles
+
+    Returns:
+        dict: Metadata, ``functions`` (top by cumulative time), ``memory``
+            (top allocation sites) and ``prof_path``; None if it is gone
+    """
+    path = os.path.join(out_dir, os.path.basename(name))
+    try:
+        with open(path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        stats = pstats.Stats(path + ".prof")
+    except (OSError, ValueError):
+        return None
+
+    meta["prof_path"] = path + ".prof"
+    meta["functions"] = [{
+        "function": pstats.func_std_string(func),
+        "calls": str(calls) if calls == primitive_calls else f"{calls}/{primitive_calls}",
+        "tottime_ms": round(tottime * 1000, 2),
+        "cumtime_ms": round(cumtime * 1000, 2),
+    } for func, (primitive_calls, calls, tottime, cumtime, _callers)
+        in sorted(stats.stats.items(), key=lambda item: -item[1][3])[:top]]
+    return meta
@@ -0,0 +1,300 @@
+"""
+Content-based related posts.
+
+Every published post is turned into a TF-IDF vector over the words of its
+title, tags and content (title and tag words count triple). Only the
+RELATED_MAX_TERMS heaviest terms are kept and the vector is normalized, so
+vectors stay sparse and common words drop out. Vectors are stored in
+``post_vectors``; the RELATED_POSTS_K most similar posts by cosine
+similarity are precomputed into ``related_posts``, so showing related
+posts is one indexed lookup.
+
+create_post, update_post, delete_post and publish_due_posts keep the index
+current incrementally, in the same transaction as the post write. New
+posts are weighted with the IDF values from the last full rebuild, which
+drift as the blog grows; rebuild periodically (or after bulk imports):
+
+    python related.py --rebuild
+"""
+
+import argparse
+import math
+import re
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from config import RELATED_POSTS_K, RELATED_MAX_TERMS
+
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 3
+# Scores are rounded before storing so rebuilds and incremental updates agree
+SCORE_DECIMALS = 6
+# Size of the dense score blocks a rebuild works in (documents x documents)
+_BLOCK_CELLS = 4_000_000
+
+STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same she should so some such than
+that the their theirs them themselves then there these they this those through to too under until up very
+was we were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+_MARKUP_PATTERN = re.compile(r"<[^>]+>|https?://\S+")
+_WORD_PATTERN = re.compile(r"[a-z][a-z0-9]+")
+
+
+def _words(text):
+    text = _MARKUP_PATTERN.sub(" ", (text or "").lower())
+    return [word for word in _WORD_PATTERN.findall(text) if word not in STOP_WORDS]
+
+def term_counts(title, tags, content):
+    """
+    Count the weighted terms of a post.
+
+    Returns:
+        Counter: Term to weighted occurrence count
+    """
+    counts = Counter(_words(content))
+    for word in _words(title):
+        counts[word] += TITLE_WEIGHT
+    for word in _words((tags or "").replace(",", " ")):
+        counts[word] += TAG_WEIGHT
+    return counts
+
+def idf(doc_count, doc_freq):
+    return math.log((1 + doc_count) / (1 + doc_freq)) + 1
+
+def post_vector(counts, idfs, default_idf):
+    """
+    Build a post's pruned, normalized TF-IDF vector.
+
+    Args:
+        counts (Counter): From term_counts
+        idfs (dict): Term to IDF; terms not in it get ``default_idf``
+
+    Returns:
+        list: (term, weight) pairs, heaviest first
+    """
+    weighted = [(term, (1 + math.log(count)) * idfs.get(term, default_idf)) for term, count in counts.items()]
+    # Ties broken by term so the kept terms do not depend on dict order
+    weighted.sort(key=lambda item: (-item[1], item[0]))
+    weighted = weighted[:RELATED_MAX_TERMS]
+    norm = math.sqrt(sum(weight * weight for _, weight in weighted))
+    return [(term, weight / norm) for term, weight in weighted] if norm else []
+
+
+def _top_neighbours(candidate_ids, scores, k):
+    # Highest score first, then lowest post ID, so equal scores always rank the same
+    scores = np.round(scores, SCORE_DECIMALS)
+    order = np.lexsort((candidate_ids, -scores))[:k]
+    return [(int(candidate_ids[i]), float(scores[i])) for i in order]
+
+def rebuild_index(conn):
+    """
+    Recompute every vector, IDF and neighbour list from the published posts.
+
+    Args:
+        conn: Open database connection; the caller commits
+
+    Returns:
+        dict: ``posts``, ``terms`` and ``seconds`` taken
+    """
+    start = time.perf_counter()
+    rows = conn.execute("""
+    SELECT id, title, tags, content FROM posts WHERE status = 'published' ORDER BY id
+    """).fetchall()
+
+    post_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    counts = [term_counts(row[1], row[2], row[3]) for row in rows]
+    doc_freq = Counter()
+    for post_counts in counts:
+        doc_freq.update(post_counts.keys())
+    idfs = {term: idf(len(rows), df) for term, df in doc_freq.items()}
+
+    vectors = [post_vector(post_counts, idfs, idf(len(rows), 1)) for post_counts in counts]
+
+    # Sparse doc-term matrix in coordinate form, then grouped by term (postings)
+    vocabulary = {}
+    doc_index, term_index, weights = [], [], []
+    for doc, vector in enumerate(vectors):
+        for term, weight in vector:
+            doc_index.append(doc)
+            term_index.append(vocabulary.setdefault(term, len(vocabulary)))
+            weights.append(weight)
+    doc_index = np.array(doc_index, dtype=np.int64)
+    term_index = np.array(term_index, dtype=np.int64)
+    weights = np.array(weights, dtype=np.float64)
+
+    by_term = np.argsort(term_index, kind="stable")
+    posting_docs = doc_index[by_term]
+    posting_weights = weights[by_term]
+    posting_starts = np.searchsorted(term_index[by_term], np.arange(len(vocabulary) + 1))
+    doc_starts = np.searchsorted(doc_index, np.arange(len(vectors) + 1))
+
+    # Multiply blocks of document rows by the postings: every (document, term)
+    # entry is expanded into one product per posting of that term, and the
+    # products are summed into a dense block of scores with bincount
+    n_docs = len(vectors)
+    block_size = max(1, _BLOCK_CELLS // max(n_docs, 1))
+    shortlist = min(RELATED_POSTS_K * 2, n_docs - 1)
+    neighbours = []
+    for block_start in range(0, n_docs if shortlist > 0 else 0, block_size):
+        block_end = min(block_start + block_size, n_docs)
+        entries = slice(doc_starts[block_start], doc_starts[block_end])
+        terms = term_index[entries]
+        lengths = posting_starts[terms + 1] - posting_starts[terms]
+        positions = (np.repeat(posting_starts[terms] - np.cumsum(lengths) + lengths, lengths)
+                     + np.arange(lengths.sum()))
+        block_rows = np.repeat(doc_index[entries] - block_start, lengths)
+        products = np.repeat(weights[entries], lengths) * posting_weights[positions]
+        scores = np.bincount(block_rows * n_docs + posting_docs[positions], weights=products,
+                             minlength=(block_end - block_start) * n_docs).reshape(-1, n_docs)
+        scores[np.arange(block_end - block_start), np.arange(block_start, block_end)] = 0
+
+        # Preselect by raw score like _refill does, then rank exactly
+        top = np.argpartition(-scores, shortlist - 1, axis=1)[:, :shortlist]
+        for row, candidates in enumerate(top):
+            candidates = candidates[scores[row, candidates] > 0]
+            for related_id, score in _top_neighbours(post_ids[candidates], scores[row, candidates],
+                                                     RELATED_POSTS_K):
+                neighbours.append((int(post_ids[block_start + row]), related_id, score))
+
+    conn.execute("DELETE FROM related_posts")
+    conn.execute("DELETE FROM post_vectors")
+    conn.execute("DELETE FROM related_terms")
+    conn.executemany("INSERT INTO related_terms (term, idf) VALUES (?, ?)", sorted(idfs.items()))
+    # Inserted in primary key order, which is much faster for large indexes
+    conn.executemany("INSERT INTO post_vectors (term, post_id, weight) VALUES (?, ?, ?)",
+                     sorted((term, int(post_ids[doc]), weight)
+                            for doc, vector in enumerate(vectors) for term, weight in vector))
+    conn.executemany("INSERT INTO related_posts (post_id, related_id, score) VALUES (?, ?, ?)", neighbours)
+
+    return {"posts": len(rows), "terms": len(idfs), "seconds": round(time.perf_counter() - start, 3)}
+
+
+# Cosine similarity of one post against every post sharing a term with it
+SIMILAR_POSTS_QUERY = """
+SELECT other.post_id, SUM(mine.weight * other.weight) AS score
+FROM post_vectors mine
+JOIN post_vectors other ON other.term = mine.term
+WHERE mine.post_id = ? AND other.post_id != mine.post_id
+GROUP BY other.post_id
+"""
+
+# Margin for comparing unrounded SQL sums with rounded stored scores
+_SCORE_SLACK = 10 ** -SCORE_DECIMALS
+
+def _rank(similar, k):
+    # Same rounding and ordering as _top_neighbours
+    similar = [(related_id, round(score, SCORE_DECIMALS)) for related_id, score in similar]
+    return sorted(similar, key=lambda item: (-item[1], item[0]))[:k]
+
+def _refill(conn, post_id):
+    # A few extra rows cover candidates whose order changes once rounded
+    similar = conn.execute(SIMILAR_POSTS_QUERY + " ORDER BY score DESC LIMIT ?",
+                           (post_id, RELATED_POSTS_K * 2)).fetchall()
+    conn.execute("DELETE FROM related_posts WHERE post_id = ?", (post_id,))
+    conn.executemany("INSERT INTO related_posts (post_id, related_id, score) VALUES (?, ?, ?)",
+                     [(post_id, related_id, score) for related_id, score in _rank(similar, RELATED_POSTS_K)])
+
+def remove_post(conn, post_id):
+    """
+    Take a post out of the index and refill the lists it appeared in.
+    """
+    affected = [row[0] for row in conn.execute(
+        "SELECT post_id FROM related_posts WHERE related_id = ?", (post_id,))]
+    conn.execute("DELETE FROM post_vectors WHERE post_id = ?", (post_id,))
+    conn.execute("DELETE FROM related_posts WHERE post_id = ?", (post_id,))
+    conn.execute("DELETE FROM related_posts WHERE related_id = ?", (post_id,))
+    for other_id in affected:
+        _refill(conn, other_id)
+
+def index_post(conn, post_id):
+    """
+    Add or refresh one post in the index.
+
+    Unpublished posts are removed and unchanged vectors are left alone.
+    Otherwise the post gets a fresh neighbour list and joins the lists of
+    the posts it now ranks in the top RELATED_POSTS_K for.
+
+    Args:
+        conn: Open database connection, inside the transaction that wrote the post
+        post_id (int): Post to index
+    """
+    row = conn.execute("SELECT title, tags, content, status FROM posts WHERE id = ?", (post_id,)).fetchone()
+    if row is None or row[3] != 'published':
+        remove_post(conn, post_id)
+        return
+
+    counts = term_counts(row[0], row[1], row[2])
+    terms = list(counts)
+    idfs = {}
+    for chunk_start in range(0, len(terms), 500):
+        chunk = terms[chunk_start:chunk_start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        idfs.update(conn.execute(f"SELECT term, idf FROM related_terms WHERE term IN ({placeholders})", chunk))
+    # A term unseen at the last rebuild occurs in one document: this one
+    default_idf = conn.execute("SELECT MAX(idf) FROM related_terms").fetchone()[0] or 1.0
+    vector = post_vector(counts, idfs, default_idf)
+
+    # Edits that leave the words alone (status, category, images) change nothing
+    stored = conn.execute("SELECT term, weight FROM post_vectors WHERE post_id = ?", (post_id,)).fetchall()
+    if vector and sorted(vector) == sorted(tuple(item) for item in stored):
+        return
+
+    remove_post(conn, post_id)
+    conn.executemany("INSERT INTO post_vectors (term, post_id, weight) VALUES (?, ?, ?)",
+                     [(term, post_id, weight) for term, weight in vector])
+    _refill(conn, post_id)
+
+    # Similarity is symmetric, so this post may now belong in other posts'
+    # lists: those not yet full, or whose weakest entry it beats
+    candidates = conn.execute(f"""
+    WITH similar AS ({SIMILAR_POSTS_QUERY}),
+    lists AS (
+        SELECT post_id, COUNT(*) AS size, MIN(score) AS weakest FROM related_posts
+        WHERE post_id IN (SELECT post_id FROM similar)
+        GROUP BY post_id
+    )
+    SELECT s.post_id, s.score FROM similar s LEFT JOIN lists l ON l.post_id = s.post_id
+    WHERE l.size IS NULL OR l.size < ? OR s.score >= l.weakest - ?
+    """, (post_id, RELATED_POSTS_K, _SCORE_SLACK)).fetchall()
+
+    for other_id, score in _rank(candidates, len(candidates)):
+        current = conn.execute("SELECT related_id, score FROM related_posts WHERE post_id = ?",
+                               (other_id,)).fetchall()
+        if len(current) >= RELATED_POSTS_K:
+            weakest_id, weakest_score = min(current, key=lambda item: (item[1], -item[0]))
+            if (score, -post_id) <= (weakest_score, -weakest_id):
+                continue
+            conn.execute("DELETE FROM related_posts WHERE post_id = ? AND related_id = ?", (other_id, weakest_id))
+        conn.execute("INSERT INTO related_posts (post_id, related_id, score) VALUES (?, ?, ?)",
+                     (other_id, post_id, score))
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the related posts index.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the whole index")
+    args = parser.parse_args()
+
+    if not args.rebuild:
+        parser.print_help()
+        return 0
+
+    from cache import invalidate
+    from db import get_connection, init_db
+
+    init_db()
+    with get_connection() as conn:
+        stats = rebuild_index(conn)
+    invalidate("posts")
+    print(f"Indexed {stats['posts']} posts ({stats['terms']} terms) in {stats['seconds']} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Background publisher for scheduled posts.
+
+One daemon thread per process keeps a heap of (scheduled_for, post_id) and
+sleeps until the earliest one is due. create_post and update_post call
+``notify_scheduled`` so a newly (re)scheduled post wakes the thread at once.
+The heap is also reloaded from the database every SCHEDULER_RESYNC_SECONDS
+to pick up posts scheduled by other processes.
+
+Entries are never removed when a post is rescheduled or edited: the publish
+query re-checks status and time, so a stale entry simply publishes nothing.
+
+With SCHEDULER_ENABLED=0 no thread is started; app.py then calls
+``utils.check_scheduled_posts`` on every rerun, as it did before this module.
+"""
+
+import atexit
+import datetime
+import heapq
+import logging
+import threading
+
+from config import SCHEDULER_ENABLED, SCHEDULER_RESYNC_SECONDS, SCHEDULER_RETRY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        return datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+class PostScheduler:
+    """
+    Publishes scheduled posts when they fall due.
+
+    Args:
+        publish (callable): ``publish(now, post_ids)`` publishes whichever of
+            the posts are still due and returns the IDs it published
+        load_schedule (callable): Returns (scheduled_for, post_id) pairs
+        clock (callable): Returns the current local datetime
+        resync_seconds (float): How often to reload the schedule from the database
+    """
+
+    def __init__(self, publish, load_schedule, clock=datetime.datetime.now,
+                 resync_seconds=SCHEDULER_RESYNC_SECONDS):
+        self.publish = publish
+        self.load_schedule = load_schedule
+        self.clock = clock
+        self.resync_seconds = resync_seconds
+        self._heap = []
+        self._recent = []
+        self._next_resync = None
+        self._cond = threading.Condition()
+        self._woken = False
+        self._stopped = False
+        self._thread = None
+
+    def schedule(self, post_id, scheduled_for):
+        """
+        Add a post to the schedule and wake the thread to re-plan its sleep.
+        """
+        scheduled_for = _to_datetime(scheduled_for)
+        if scheduled_for is None:
+            return
+
+        with self._cond:
+            heapq.heappush(self._heap, (scheduled_for, post_id))
+            self._recent.append((scheduled_for, post_id))
+            self._woken = True
+            self._cond.notify()
+
+    def resync(self, now):
+        """
+        Replace the heap with the schedule stored in the database.
+        """
+        with self._cond:
+            self._recent = []
+
+        entries = []
+        for scheduled_for, post_id in self.load_schedule():
+            scheduled_for = _to_datetime(scheduled_for)
+            if scheduled_for is not None:
+                entries.append((scheduled_for, post_id))
+
+        with self._cond:
+            # Keep posts scheduled while the query ran; it may not have seen them
+            entries.extend(self._recent)
+            heapq.heapify(entries)
+            self._heap = entries
+        self._next_resync = now + datetime.timedelta(seconds=self.resync_seconds)
+
+    def run_pending(self):
+        """
+        Publish everything that is due and work out how long to sleep.
+
+        Returns:
+            float: Seconds until the next scheduled post or resync
+        """
+        now = self.clock()
+        if self._next_resync is None or now >= self._next_resync:
+            self.resync(now)
+
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+            next_due = self._heap[0][0] if self._heap else None
+
+        if due:
+            published = self.publish(now, sorted(set(due)))
+            if published:
+                logger.info("Published scheduled posts %s", published)
+
+        wake_at = self._next_resync if next_due is None else min(next_due, self._next_resync)
+        return max((wake_at - now).total_seconds(), 0.0)
+
+    def pending(self):
+        with self._cond:
+            return sorted(self._heap)
+
+    def _run(self):
+        while True:
+            try:
+                timeout = self.run_pending()
+            except Exception:
+                logger.exception("Scheduled post publishing failed")
+                timeout = SCHEDULER_RETRY_SECONDS
+
+            with self._cond:
+                if not self._woken and not self._stopped:
+                    self._cond.wait(timeout)
+                self._woken = False
+                if self._stopped:
+                    return
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="post-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler():
+    """
+    Start the process-wide scheduler thread (once; later calls do nothing).
+
+    Returns:
+        PostScheduler: The running scheduler, or None if SCHEDULER_ENABLED is off
+    """
+    global _scheduler
+    if not SCHEDULER_ENABLED:
+        return None
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            # Imported here because db imports this module for notify_scheduled
+            from db import get_schedule, publish_due_posts
+
+            _scheduler = PostScheduler(publish_due_posts, get_schedule)
+            _scheduler.start()
+            atexit.register(_scheduler.stop)
+    return _scheduler
+
+def notify_scheduled(post_id, scheduled_for):
+    """
+    Tell the scheduler a post was scheduled or rescheduled.
+
+    Does nothing in processes that never started the scheduler (scripts,
+    benchmarks); the post is picked up by whichever app process resyncs.
+    """
+    if _scheduler is not None:
+        _scheduler.schedule(post_id, scheduled_for)
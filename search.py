@@ -0,0 +1,193 @@
+"""
+Full-text search over blog posts.
+
+Uses the ``posts_fts`` FTS5 index (see migrations.py) ranked with BM25, and
+falls back to the original LIKE scan when FTS5 is unavailable.
+"""
+
+import html
+import re
+
+from db import get_connection, build_posts_query, tag_filter_sql, POST_SUMMARY_COLUMNS
+from utils import truncate_text
+
+# BM25 column weights: title, content, category, tags
+BM25_WEIGHTS = (10.0, 1.0, 2.0, 4.0)
+
+# highlight() and snippet() return the raw stored text, so matches are
+# wrapped in control characters and turned into <mark> after escaping
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+SNIPPET_TOKENS = 32
+
+_TOKEN_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_PATTERN = re.compile(r"\w+")
+
+# Search results are rendered as cards, so they never load full post bodies
+SUMMARY_COLUMNS = ", ".join(POST_SUMMARY_COLUMNS["card"])
+
+_fts_available = None
+
+
+def mark_matches(text):
+    """
+    Escape FTS5 highlight()/snippet() output for HTML, with matches in <mark>.
+
+    Args:
+        text (str): Text with matches between HIGHLIGHT_START and HIGHLIGHT_END
+
+    Returns:
+        str: HTML-safe text
+    """
+    return html.escape(text or "").replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>")
+
+def fts_available():
+    """
+    Check whether the posts_fts index exists in the database.
+
+    Returns:
+        bool: True if full-text search can be used
+    """
+    global _fts_available
+    if _fts_available is None:
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'"
+            ).fetchone()
+        _fts_available = row is not None
+    return _fts_available
+
+def build_match_query(search_term):
+    """
+    Turn user input into an FTS5 MATCH expression.
+
+    Quoted text becomes a phrase query and a trailing ``*`` makes a prefix
+    query; every other character that FTS5 would treat as syntax is dropped,
+    so arbitrary input can never raise a query syntax error.
+
+    Args:
+        search_term (str): Text typed by the user, e.g. ``quantum "error correction" comp*``
+
+    Returns:
+        str: MATCH expression, or an empty string if nothing searchable remains
+    """
+    clauses = []
+    for phrase, word in _TOKEN_PATTERN.findall(search_term or ""):
+        if phrase:
+            words = _WORD_PATTERN.findall(phrase)
+            if words:
+                clauses.append('"' + " ".join(words) + '"')
+            continue
+
+        words = _WORD_PATTERN.findall(word)
+        if not words:
+            continue
+        clause = '"' + " ".join(words) + '"'
+        if word.endswith("*"):
+            clause += "*"
+        clauses.append(clause)
+
+    return " ".join(clauses)
+
+def search_posts(search_term, status="published", category=None, tag=None, tag_mode="any", page=1, per_page=10):
+    """
+    Search posts by relevance.
+
+    Args:
+        search_term (str): Words, "quoted phrases" and prefix* terms
+        status (str): Post status to search
+        category (str, optional): Restrict to a category
+        tag (str or list, optional): Restrict to one or more tags
+        tag_mode (str): "any" or "all" for multiple tags
+        page (int): 1-based page number
+        per_page (int): Results per page
+
+    Returns:
+        tuple: (results, total) where each result is a post dict with
+        ``title_highlight`` and ``snippet`` HTML fields
+    """
+    page = max(int(page), 1)
+    offset = (page - 1) * per_page
+    match_query = build_match_query(search_term)
+
+    if match_query and fts_available():
+        return _search_fts(match_query, status, category, tag, tag_mode, per_page, offset)
+    return _search_like(search_term, status, category, tag, tag_mode, per_page, offset)
+
+def _search_fts(match_query, status, category, tag, tag_mode, limit, offset):
+    where = " WHERE posts_fts MATCH ?"
+    params = [match_query]
+
+    if status:
+        where += " AND p.status = ?"
+        params.append(status)
+
+    if category:
+        where += " AND p.category = ?"
+        params.append(category)
+
+    tag_sql, tag_params = tag_filter_sql(tag, tag_mode)
+    where += tag_sql
+    params.extend(tag_params)
+
+    # CROSS JOIN pins posts_fts as the outer loop; otherwise the planner may
+    # walk the posts status index and evaluate MATCH once per post.
+    from_clause = """
+    FROM posts_fts
+    CROSS JOIN posts p ON p.id = posts_fts.rowid
+    """
+    weights = ", ".join(str(weight) for weight in BM25_WEIGHTS)
+
+    # Rank first and build excerpts afterwards: highlight() and snippet()
+    # are expensive, so they only run for the rows on the requested page.
+    page_query = f"""
+    SELECT p.id
+    {from_clause}
+    {where}
+    ORDER BY bm25(posts_fts, {weights})
+    LIMIT ? OFFSET ?
+    """
+
+    with get_connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) {from_clause} {where}", params).fetchone()[0]
+        page_ids = [row[0] for row in conn.execute(page_query, params + [limit, offset])]
+        if not page_ids:
+            return [], total
+
+        placeholders = ", ".join("?" for _ in page_ids)
+        rows = conn.execute(f"""
+        SELECT {SUMMARY_COLUMNS},
+               highlight(posts_fts, 0, ?, ?) AS title_highlight,
+               snippet(posts_fts, 1, ?, ?, '…', ?) AS snippet
+        FROM posts_fts
+        CROSS JOIN posts p ON p.id = posts_fts.rowid
+        JOIN users u ON u.id = p.author_id
+        WHERE posts_fts MATCH ? AND posts_fts.rowid IN ({placeholders})
+        """, [HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_TOKENS,
+              match_query] + page_ids).fetchall()
+
+    posts_by_id = {}
+    for row in rows:
+        post = dict(row)
+        post["title_highlight"] = mark_matches(post["title_highlight"])
+        post["snippet"] = mark_matches(post["snippet"])
+        posts_by_id[post["id"]] = post
+    return [posts_by_id[post_id] for post_id in page_ids if post_id in posts_by_id], total
+
+def _search_like(search_term, status, category, tag, tag_mode, limit, offset):
+    count_query, count_params = build_posts_query(status, category, tag, search_term or None, tag_mode=tag_mode)
+    query, params = build_posts_query(status, category, tag, search_term or None,
+                                      limit=limit, tag_mode=tag_mode, offset=offset,
+                                      columns=POST_SUMMARY_COLUMNS["card"])
+
+    with get_connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM ({count_query})", count_params).fetchone()[0]
+        rows = conn.execute(query, params).fetchall()
+
+    results = []
+    for row in rows:
+        post = dict(row)
+        post["title_highlight"] = html.escape(post["title"] or "")
+        post["snippet"] = html.escape(truncate_text(post["excerpt"] or "", 150))
+        results.append(post)
+    return results, total
@@ -0,0 +1,321 @@
+"""
+Fill a database with a deterministic synthetic blog for local testing.
+
+A fresh database holds only the admin created by init_db, which says little
+about how the app behaves with tens of thousands of posts. ``seed_database``
+generates users, posts, comments, subscribers and contact messages at any
+scale, shaped roughly like a real blog:
+
+* post bodies are Markdown (headings, lists, code, links, emphasis) with
+  log-normally distributed lengths around SEED_MEDIAN_WORDS words,
+* a few authors write most posts, and tags and categories follow a Zipf
+  distribution, so some filters match thousands of posts and others a few,
+* most posts are published, some are drafts, and some are scheduled after
+  ``end``; popular posts get more comments,
+* timestamps are spread over the ``days`` before ``end``.
+
+The same arguments always produce the same rows, so benchmark runs stay
+comparable. Rows are written in batches with the triggers and secondary
+indexes set aside, as archive.py does for imports. Every generated account
+logs in with the password SEED_PASSWORD.
+
+    python seed.py --posts 50000 --comments 5
+    python seed.py --posts 2000 --end 2024-06-30 --no-render
+"""
+
+import argparse
+import datetime
+import math
+import random
+import sys
+import time
+
+from cache import invalidate
+from config import DEFAULT_CATEGORIES, DEFAULT_TAGS
+from db import get_connection, make_excerpt, sync_post_tags
+from markup import RENDERER_VERSION, render_markdown
+from migrations import defer_schema, restore_schema
+from utils import hash_password
+
+SEED_PASSWORD = "password"
+SEED_MEDIAN_WORDS = 600
+SEED_CHUNK_SIZE = 2000
+# Share of posts by status; the rest are published
+DRAFT_SHARE = 0.08
+SCHEDULED_SHARE = 0.03
+
+# Tables whose triggers and secondary indexes are set aside while seeding
+DEFERRED_TABLES = ("posts", "comments", "post_tags")
+
+WORDS = """
+quantum entanglement qubit superposition decoherence lattice photon electron field theory model neural
+network gradient descent transformer attention embedding dataset training inference benchmark latency
+throughput cache index query database student university faculty research paper journal lecture course
+semester laboratory experiment measurement signal noise vector matrix tensor graph algorithm complexity
+python compiler runtime kernel memory processor cluster cloud energy battery material semiconductor
+crystal spectrum frequency wave particle symmetry topology education learning curriculum assessment
+innovation startup industry policy india campus seminar workshop thesis analysis result method
+""".split()
+CONNECTORS = ["and", "of", "with", "for", "in", "on", "the", "a", "to", "from", "by", "is", "are", "can"]
+FIRST_NAMES = ["aarav", "priya", "rohan", "ananya", "vikram", "meera", "arjun", "kavya", "ishaan", "diya",
+               "alex", "sam", "jordan", "taylor", "maria", "chen", "fatima", "lucas", "nina", "omar"]
+
+
+def _zipf_weights(count, exponent=1.1):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+def _timestamp(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class CorpusGenerator:
+    """
+    Deterministic generator for the synthetic rows.
+
+    Sentences are drawn from a fixed pool built up front, which keeps
+    generating a few hundred thousand posts fast.
+
+    Args:
+        seed (int): Random seed; the same seed gives the same corpus
+        end (datetime): Latest creation time; scheduled posts fall after it
+        days (int): Span of creation times before ``end``
+        tags (int): Size of the tag vocabulary
+    """
+
+    def __init__(self, seed=42, end=None, days=730, tags=200):
+        self.rng = random.Random(seed)
+        self.end = end or datetime.datetime.combine(datetime.date.today(), datetime.time())
+        self.start = self.end - datetime.timedelta(days=days)
+        self.span_seconds = days * 86400
+
+        extra = sorted({f"{self.rng.choice(WORDS)} {self.rng.choice(WORDS)}" for _ in range(tags * 2)})
+        self.tags = (list(DEFAULT_TAGS) + [tag for tag in extra if tag not in DEFAULT_TAGS])[:tags]
+        self.tag_weights = _zipf_weights(len(self.tags))
+        self.category_weights = _zipf_weights(len(DEFAULT_CATEGORIES), 0.8)
+        self.sentences = [self._sentence() for _ in range(4000)]
+
+    def _sentence(self):
+        words = [self.rng.choice(WORDS if self.rng.random() < 0.7 else CONNECTORS)
+                 for _ in range(self.rng.randint(6, 22))]
+        return " ".join(words).capitalize() + "."
+
+    def created_at(self):
+        return self.start + datetime.timedelta(seconds=self.rng.randrange(self.span_seconds))
+
+    def paragraph(self, words):
+        sentences = self.rng.choices(self.sentences, k=max(1, words // 14))
+        if self.rng.random() < 0.3:
+            i = self.rng.randrange(len(sentences))
+            sentences[i] = f"**{sentences[i]}**" if self.rng.random() < 0.5 else f"*{sentences[i]}*"
+        if self.rng.random() < 0.15:
+            sentences.append(f"See [{self.rng.choice(WORDS)}](https://example.org/{self.rng.choice(WORDS)}).")
+        return " ".join(sentences)
+
+    def markdown(self):
+        # Log-normal length: most posts near the median, a long tail of long reads
+        total = int(min(6000, max(60, self.rng.lognormvariate(math.log(SEED_MEDIAN_WORDS), 0.6))))
+        blocks, written = [], 0
+        while written < total:
+            roll = self.rng.random()
+            if roll < 0.12 and blocks:
+                blocks.append("## " + " ".join(self.rng.choices(WORDS, k=self.rng.randint(2, 5))).capitalize())
+            elif roll < 0.2:
+                items = [f"- {self.rng.choice(self.sentences)}" for _ in range(self.rng.randint(2, 6))]
+                blocks.append("\n".join(items))
+                written += 12 * len(items)
+            elif roll < 0.24:
+                lines = [f"{self.rng.choice(WORDS)} = {self.rng.choice(WORDS)}({self.rng.randint(0, 99)})"
+                         for _ in range(self.rng.randint(2, 8))]
+                blocks.append("```python\n" + "\n".join(lines) + "\n```")
+                written += 3 * len(lines)
+            else:
+                words = self.rng.randint(40, 140)
+                blocks.append(self.paragraph(words))
+                written += words
+        return "\n\n".join(blocks)
+
+    def title(self):
+        return " ".join(self.rng.choices(WORDS, k=self.rng.randint(3, 8))).title()
+
+    def post_tags(self):
+        count = self.rng.choices([1, 2, 3, 4, 5], weights=[10, 25, 35, 20, 10])[0]
+        return list(dict.fromkeys(self.rng.choices(self.tags, weights=self.tag_weights, k=count)))
+
+    def category(self):
+        return self.rng.choices(DEFAULT_CATEGORIES, weights=self.category_weights)[0]
+
+    def comment(self):
+        return " ".join(self.rng.choices(self.sentences, k=self.rng.randint(1, 4)))
+
+
+def seed_database(users=200, posts=5000, comments=5.0, subscribers=2000, messages=500, seed=42, end=None,
+                  days=730, tags=200, render=True, rebuild_related=True, chunk_size=SEED_CHUNK_SIZE,
+                  progress=None):
+    """
+    Add a synthetic corpus to the database.
+
+    Args:
+        users (int): Accounts to create (``user1`` ... ``userN``)
+        posts (int): Posts to create
+        comments (float): Average comments per published post
+        subscribers (int): Newsletter subscribers
+        messages (int): Contact messages
+        seed (int): Random seed
+        end (datetime, optional): Latest creation time (default: today at midnight)
+        days (int): Span of creation times before ``end``
+        tags (int): Size of the tag vocabulary
+        render (bool): Store rendered post HTML now; otherwise it is rendered on
+            first view or by ``python markup.py --backfill``. Excerpts are
+            built from the rendered HTML either way
+        rebuild_related (bool): Rebuild the related posts index afterwards
+        chunk_size (int): Rows per transaction
+        progress (callable): ``progress(stage, done)`` after each chunk
+
+    Returns:
+        dict: Rows created per table and seconds taken
+
+    Raises:
+        ValueError: If the database was already seeded
+    """
+    start_time = time.perf_counter()
+    gen = CorpusGenerator(seed, end, days, tags)
+    password = hash_password(SEED_PASSWORD)
+
+    with get_connection() as conn:
+        if conn.execute("SELECT 1 FROM users WHERE username = 'user1'").fetchone():
+            raise ValueError("The database already holds seeded users")
+        first_user = conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0] + 1
+        first_post = conn.execute("SELECT COALESCE(MAX(id), 0) FROM posts").fetchone()[0] + 1
+
+        conn.execute("BEGIN IMMEDIATE")
+        defer_schema(conn, DEFERRED_TABLES)
+
+    report = {"users": users, "posts": 0, "comments": 0, "subscribers": subscribers, "messages": messages}
+    try:
+        user_rows = []
+        for i in range(1, users + 1):
+            bio = gen.paragraph(30) if gen.rng.random() < 0.4 else None
+            user_rows.append((first_user + i - 1, f"user{i}", password, f"user{i}@example.org",
+                              "admin" if i <= max(1, users // 100) else "user", bio, _timestamp(gen.created_at())))
+        with get_connection() as conn:
+            conn.executemany("""
+            INSERT INTO users (id, username, password, email, role, bio, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, user_rows)
+        user_ids = [row[0] for row in user_rows] or [1]
+        # A few prolific authors write most of the posts
+        author_ids = user_ids[:max(1, len(user_ids) // 5)]
+        author_weights = _zipf_weights(len(author_ids), 0.9)
+
+        post_id = first_post
+        while report["posts"] < posts:
+            count = min(chunk_size, posts - report["posts"])
+            post_rows, comment_rows, post_tags = [], [], []
+            for _ in range(count):
+                content = gen.markdown()
+                tags_list = gen.post_tags()
+                created = gen.created_at()
+                roll = gen.rng.random()
+                published_at = scheduled_for = None
+                if roll < DRAFT_SHARE:
+                    status = "draft"
+                elif roll < DRAFT_SHARE + SCHEDULED_SHARE:
+                    status = "scheduled"
+                    scheduled_for = _timestamp(gen.end + datetime.timedelta(minutes=gen.rng.randrange(1, 43200)))
+                else:
+                    status = "published"
+                    published_at = _timestamp(created + datetime.timedelta(minutes=gen.rng.randrange(0, 120)))
+                updated = created + datetime.timedelta(days=gen.rng.randrange(0, 30)) \
+                    if gen.rng.random() < 0.2 else created
+                content_html = render_markdown(content) if render else None
+                post_rows.append((post_id, gen.title(), content, content_html,
+                                  RENDERER_VERSION if render else None, make_excerpt(content, content_html),
+                                  gen.rng.choices(author_ids, weights=author_weights)[0], gen.category(),
+                                  ", ".join(tags_list), status, published_at, scheduled_for,
+                                  _timestamp(created), _timestamp(min(updated, gen.end))))
+                post_tags.append((post_id, tags_list))
+
+                if status == "published":
+                    # Exponential spread: most posts get a few comments, some get many
+                    for _ in range(int(gen.rng.expovariate(1 / comments)) if comments else 0):
+                        comment_rows.append((post_id, gen.rng.choice(user_ids), gen.comment(), _timestamp(
+                            created + datetime.timedelta(minutes=120 + gen.rng.randrange(0, 60 * 24 * 30)))))
+                post_id += 1
+
+            with get_connection() as conn:
+                conn.executemany("""
+                INSERT INTO posts (id, title, content, content_html, content_renderer, excerpt, author_id, category,
+                                   tags, status, published_at, scheduled_for, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, post_rows)
+                for tagged_post, tags_list in post_tags:
+                    sync_post_tags(conn, tagged_post, tags_list)
+                conn.executemany("INSERT INTO comments (post_id, user_id, content, created_at) VALUES (?, ?, ?, ?)",
+                                 comment_rows)
+            report["posts"] += count
+            report["comments"] += len(comment_rows)
+            if progress is not None:
+                progress("posts", report["posts"])
+
+        with get_connection() as conn:
+            conn.executemany("INSERT INTO subscribers (email, name, subscribed_at) VALUES (?, ?, ?)",
+                             [(f"reader{i}@example.net", gen.rng.choice(FIRST_NAMES).title(),
+                               _timestamp(gen.created_at())) for i in range(1, subscribers + 1)])
+            conn.executemany("""
+            INSERT INTO contact_messages (name, email, subject, message, read, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, [(gen.rng.choice(FIRST_NAMES).title(), f"visitor{i}@example.com", gen.title(), gen.paragraph(60),
+                   int(gen.rng.random() < 0.7), _timestamp(gen.created_at())) for i in range(1, messages + 1)])
+    finally:
+        with get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            restore_schema(conn)
+
+    if rebuild_related:
+        from related import rebuild_index
+        with get_connection() as conn:
+            rebuild_index(conn)
+
+    invalidate("posts", "users")
+    report["seconds"] = round(time.perf_counter() - start_time, 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the database with a deterministic synthetic blog.")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--comments", type=float, default=5.0, help="average comments per published post")
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=500, help="contact messages")
+    parser.add_argument("--tags", type=int, default=200, help="size of the tag vocabulary")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=datetime.date.fromisoformat,
+                        help="latest creation date, YYYY-MM-DD (default: today); fix it for identical runs")
+    parser.add_argument("--days", type=int, default=730, help="days of history before --end")
+    parser.add_argument("--no-render", action="store_true",
+                        help="leave HTML rendering to first view or `python markup.py --backfill`")
+    parser.add_argument("--no-related", action="store_true", help="skip rebuilding the related posts index")
+    args = parser.parse_args()
+
+    from db import init_db
+    init_db()
+
+    def show(stage, done):
+        print(f"\r{stage}: {done} of {args.posts}", end="", flush=True)
+
+    end = datetime.datetime.combine(args.end, datetime.time()) if args.end else None
+    try:
+        report = seed_database(args.users, args.posts, args.comments, args.subscribers, args.messages, args.seed,
+                               end, args.days, args.tags, render=not args.no_render,
+                               rebuild_related=not args.no_related, progress=show)
+    except ValueError as e:
+        print(e)
+        return 1
+    print("\n" + ", ".join(f"{count} {name}" for name, count in report.items() if name != "seconds")
+          + f" in {report['seconds']}s (password for every account: {SEED_PASSWORD})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,5 +11,9 @@ echo "\
 [server]\n\
 headless = true\n\
 enableCORS = false\n\
+enableStaticServing = true\n\
 port = $PORT\n\
-" > ~/.streamlit/config.toml
\ No newline at end of file
+" > ~/.streamlit/config.toml
+
+# Self-hosted fonts for the theme stylesheets
+python theme_assets.py --fetch-fonts || echo "Font download failed; falling back to system fonts"
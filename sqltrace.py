@@ -0,0 +1,367 @@
+"""
+Opt-in SQL statement tracing and a slow-query log.
+
+get_posts and friends build their SQL from whichever filters are set, so
+one function runs many query shapes. With SQL_TRACE_ENABLED=1 the pool in
+db.py opens its connections as ``TracedConnection``, whose cursors time
+every statement, including the time spent fetching its rows. Statements are
+reduced to a fingerprint (literals and ``IN (?, ?, ...)`` lists collapsed,
+whitespace normalized) and ``sql_tracer`` keeps the count, total and
+maximum time and rows for each. A statement slower than SQL_SLOW_MS is also
+written to SQL_SLOW_LOG, a rotating JSONL file, with its EXPLAIN QUERY PLAN
+taken on the same connection. Parameters are not logged.
+
+Summarize the log, slowest fingerprints first, with the plan lines that
+suggest a missing index:
+
+    python sqltrace.py                # SQL_SLOW_LOG and its rotated files
+    python sqltrace.py --top 10 --json
+"""
+
+import argparse
+import datetime
+import functools
+import glob
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from config import SQL_SLOW_LOG, SQL_SLOW_LOG_BACKUPS, SQL_SLOW_LOG_BYTES, SQL_SLOW_MS
+
+# Statements whose plan can be explained; others (PRAGMA, BEGIN, DDL) are logged without one
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_VALUES_LISTS = re.compile(r"(\([?,\s]*\))(?:\s*,\s*\([?,\s]*\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """
+    Reduce a statement to its shape.
+
+    Args:
+        sql (str): Statement as executed
+
+    Returns:
+        tuple: (12-character ID, normalized statement)
+    """
+    text = _COMMENTS.sub(" ", sql)
+    text = _STRINGS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _IN_LISTS.sub("IN (...)", text)
+    text = _VALUES_LISTS.sub(r"\1, ...", text)
+    text = _SPACE.sub(" ", text).strip()
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12], text
+
+def explain(conn, sql, parameters):
+    """
+    Return the EXPLAIN QUERY PLAN detail lines for a statement, or None.
+
+    Runs on a plain cursor so the EXPLAIN itself is not traced.
+    """
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    try:
+        return [row[3] for row in sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+    except (sqlite3.Error, ValueError, TypeError):
+        return None
+
+def index_hints(plan):
+    """
+    Return the plan lines that point at a missing index: full scans and
+    temporary B-trees for sorting or grouping.
+    """
+    hints = []
+    for line in plan or ():
+        words = line.split()
+        if (words[:1] == ["SCAN"] and "INDEX" not in words and "CONSTANT" not in words) or "TEMP B-TREE" in line:
+            hints.append(line)
+    return hints
+
+
+class SqlTracer:
+    """
+    Per-fingerprint statement totals and the slow-query log.
+
+    Args:
+        slow_ms (float): Statements at least this slow are logged
+        log_path (str): JSONL file, rotated at ``log_bytes`` with ``log_backups`` old files kept
+    """
+
+    def __init__(self, slow_ms=SQL_SLOW_MS, log_path=SQL_SLOW_LOG, log_bytes=SQL_SLOW_LOG_BYTES,
+                 log_backups=SQL_SLOW_LOG_BACKUPS):
+        self.slow_seconds = slow_ms / 1000
+        self.log_path = log_path
+        self.log_bytes = log_bytes
+        self.log_backups = log_backups
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._log = None
+
+    def record(self, conn, sql, parameters, seconds, rows, many=False):
+        """
+        Add one statement to its fingerprint's totals, and log it if slow.
+
+        Args:
+            conn (sqlite3.Connection): Connection it ran on, for the plan
+            many (bool): executemany/executescript; logged without a plan
+        """
+        statement_id, text = fingerprint(sql)
+        slow = seconds >= self.slow_seconds
+        with self._lock:
+            entry = self._stats.get(statement_id)
+            if entry is None:
+                entry = self._stats[statement_id] = {"id": statement_id, "fingerprint": text, "count": 0,
+                                                     "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "slow": 0}
+            entry["count"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+            entry["rows"] += rows
+            entry["slow"] += slow
+        if slow:
+            self._write_slow({
+                "time": datetime.datetime.now().isoformat(timespec="milliseconds"),
+                "id": statement_id,
+                "fingerprint": text,
+                "ms": round(seconds * 1000, 2),
+                "rows": rows,
+                "sql": sql.strip(),
+                "plan": None if many else explain(conn, sql, parameters),
+            })
+
+    def _write_slow(self, record):
+        # The handler is used directly, not through a logger, so the app's
+        # logging configuration cannot silence or redirect the log
+        with self._lock:
+            if self._log is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+                self._log = logging.handlers.RotatingFileHandler(
+                    self.log_path, maxBytes=self.log_bytes, backupCount=self.log_backups, encoding="utf-8")
+        self._log.handle(logging.makeLogRecord({"msg": json.dumps(record)}))
+
+    def stats(self, top=None):
+        """
+        Return fingerprint totals, largest total time first.
+
+        Returns:
+            list: Dicts with id, fingerprint, count, total_ms, avg_ms, max_ms, rows and slow
+        """
+        with self._lock:
+            entries = [dict(entry) for entry in self._stats.values()]
+        for entry in entries:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            entry["total_ms"] = round(entry["total_ms"], 2)
+            entry["max_ms"] = round(entry["max_ms"], 2)
+        entries.sort(key=lambda entry: -entry["total_ms"])
+        return entries[:top] if top else entries
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+sql_tracer = SqlTracer()
+
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    Cursor that reports each statement to ``sql_tracer`` once its rows have
+    been fetched (or the cursor is reused, closed or dropped).
+    """
+
+    _statement = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._statement = [sql, parameters, 0.0, 0]
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except BaseException:
+            self._statement[2] = time.perf_counter() - start
+            self._finish()
+            raise
+        self._statement[2] = time.perf_counter() - start
+        if self.description is None:
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            sql_tracer.record(self.connection, sql, (), time.perf_counter() - start, max(self.rowcount, 0),
+                              many=True)
+
+    def executescript(self, sql_script):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            sql_tracer.record(self.connection, sql_script, (), time.perf_counter() - start, 0, many=True)
+
+    def _fetched(self, start, rows, done):
+        statement = self._statement
+        if statement is not None:
+            statement[2] += time.perf_counter() - start
+            statement[3] += rows
+            if done:
+                self._finish()
+
+    def _finish(self):
+        statement, self._statement = self._statement, None
+        if statement is not None:
+            sql, parameters, seconds, rows = statement
+            sql_tracer.record(self.connection, sql, parameters, seconds, rows)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(start, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class TracedConnection(sqlite3.Connection):
+    """
+    Connection whose cursors, including the ones behind ``execute``, are
+    TracedCursors. Pass it as ``factory`` to ``sqlite3.connect``.
+    """
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or TracedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# Log summary
+def read_slow_log(path=SQL_SLOW_LOG):
+    """
+    Read the slow-query log and its rotated files, oldest first.
+
+    Returns:
+        list: Logged statements; lines that are not valid JSON are skipped
+    """
+    rotated = [name for name in glob.glob(glob.escape(path) + ".*") if name.rsplit(".", 1)[1].isdigit()]
+    paths = sorted(rotated, key=lambda name: -int(name.rsplit(".", 1)[1])) + [path]
+    records = []
+    for name in paths:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+def summarize_slow_log(records):
+    """
+    Group logged statements by fingerprint, largest total time first.
+
+    Returns:
+        list: Dicts with id, fingerprint, count, total/p50/max ms, the most
+            recent plan and its index hints
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(record["id"], []).append(record)
+
+    summary = []
+    for statement_id, group in groups.items():
+        times = sorted(record["ms"] for record in group)
+        plan = next((record["plan"] for record in reversed(group) if record.get("plan")), None)
+        summary.append({
+            "id": statement_id,
+            "fingerprint": group[-1]["fingerprint"],
+            "count": len(group),
+            "total_ms": round(sum(times), 2),
+            "p50_ms": times[len(times) // 2],
+            "max_ms": times[-1],
+            "last_seen": group[-1]["time"],
+            "plan": plan,
+            "index_hints": index_hints(plan),
+        })
+    summary.sort(key=lambda entry: -entry["total_ms"])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize the slow-query log.")
+    parser.add_argument("--log", default=SQL_SLOW_LOG, help="log file (rotated files next to it are included)")
+    parser.add_argument("--top", type=int, default=20, help="fingerprints to show")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    summary = summarize_slow_log(read_slow_log(args.log))[:args.top]
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return 0
+    if not summary:
+        print(f"no slow queries logged in {args.log}")
+        return 0
+
+    for entry in summary:
+        print(f"{entry['id']}  {entry['count']} slow, total {entry['total_ms']} ms, "
+              f"p50 {entry['p50_ms']} ms, max {entry['max_ms']} ms (last {entry['last_seen']})")
+        print(f"    {entry['fingerprint']}")
+        for line in entry["plan"] or ["(no plan captured)"]:
+            print(f"      {'NEEDS INDEX? ' if line in entry['index_hints'] else ''}{line}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,540 @@
+"""
+Static HTML export of the published blog for anonymous readers.
+
+Readers who are not logged in do not need a Streamlit session, a websocket
+and a rerun of app.py per click. ``build_site`` writes every published post,
+the home page and the category and tag listings to STATIC_SITE_DIR as plain
+HTML that any web server or CDN can serve, using the same card and hero
+markup as the app (fragments.py). Links between pages are relative, so the
+folder can be served under any path.
+
+Builds are incremental. Planning reads only post metadata (``updated_at``,
+author, related posts, comment counts) and gives every page a signature of
+its inputs; only pages whose signature differs from the build manifest are
+rendered. A rendered page is written only if its content hash changed, so
+unchanged files keep their modification time and any ETag derived from it.
+Editing one post rebuilds its own page, the listing pages it appears on and
+the pages showing it as a related post. Pages of posts that were
+unpublished or deleted are removed.
+
+Rendering runs on a pool of STATIC_SITE_WORKERS processes when there are
+enough pages to make starting them worthwhile.
+
+    python static_site.py              # bring the site up to date
+    python static_site.py --full       # render every page again
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from html import escape
+
+from config import (
+    APP_NAME, APP_DESCRIPTION, COMMENTS_PAGE_SIZE, FONTS_DIR, STATIC_SITE_APP_URL, STATIC_SITE_DIR,
+    STATIC_SITE_PAGE_SIZE, STATIC_SITE_WORKERS
+)
+from db import POST_SUMMARY_COLUMNS, get_comments, get_connection, get_pool, get_post
+from fragments import comment_html, featured_card_html, hero_html, recent_card_html, related_card_html
+from media import is_media_ref, media_file
+from theme_assets import FONT_FILES, build_theme_css
+from utils import generate_social_share_links, make_slugs, parse_tags
+
+# Part of every page's inputs: bump when the templates below change
+SITE_VERSION = 2
+MANIFEST_NAME = ".build-manifest.json"
+RELATED_COUNT = 3
+FEATURED_COUNT = 3
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 200
+
+_POST_LINK = re.compile(r'href="\?post_id=(\d+)"')
+
+PAGE = """\
+<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<meta name="description" content="{description}">
+<link rel="stylesheet" href="{root}{stylesheet}">
+</head>
+<body class="stApp" style="margin:0;">
+<header style="padding:20px; border-bottom:1px solid rgba(128,128,128,0.2);">
+    <div style="max-width:1100px; margin:0 auto; display:flex; flex-wrap:wrap; align-items:center; gap:20px;">
+        <a href="{root}index.html" style="font-size:1.4rem; font-weight:700; text-decoration:none;">{app_name}</a>
+        <nav style="display:flex; flex-wrap:wrap; gap:15px;">{nav}</nav>
+    </div>
+</header>
+<main style="max-width:1100px; margin:0 auto; padding:20px;">
+{body}
+</main>
+<footer class="footer">
+    <p>© 2024 EduRishi. All rights reserved.</p>
+    {app_link}
+</footer>
+</body>
+</html>
+"""
+
+HOME_HERO = """\
+<div style="text-align: center; padding: 40px 20px; margin-bottom: 30px; background: linear-gradient(135deg, rgba(0,102,255,0.1) 0%, rgba(102,16,242,0.1) 100%); border-radius: 15px;">
+    <h1 class="blog-title">{app_name}</h1>
+    <p class="blog-subtitle">{description}</p>
+</div>"""
+
+SECTION_HEADING = """\
+<h2 class="tech-accent" style="display: inline-block; margin: 30px 0 20px 0;">
+    <span style="background: linear-gradient(90deg, var(--accent-color), var(--secondary-color)); -webkit-background-clip: text; -webkit-text-fill-color: transparent;">
+        {title}
+    </span>
+</h2>"""
+
+GRID = '<div style="display:grid; grid-template-columns:repeat(auto-fit, minmax(250px, 1fr)); gap:20px;">\n{cards}\n</div>'
+
+AUTHOR = """\
+<div style="display: flex; gap: 20px; align-items: center; margin-bottom: 30px;">
+    {avatar}
+    <div>
+        <h3 style="margin-top: 0; margin-bottom: 5px;">{author_name}</h3>
+        <p style="color: var(--secondary-color); margin-bottom: 10px;">Author</p>
+        <p>{bio}</p>
+    </div>
+</div>"""
+
+AVATAR_PLACEHOLDER = '<div style="flex: none; width: 120px; height: 120px; background-color: var(--accent-color); border-radius: 50%; display: flex; align-items: center; justify-content: center; color: white; font-size: 2.5rem;">👤</div>'
+
+TAG_LINK = '<a href="{href}" style="display: inline-block; background-color: rgba(0,0,0,0.05); padding: 5px 12px; border-radius: 20px; font-size: 0.9rem; margin-right: 8px; margin-bottom: 8px; text-decoration: none;"># {name}</a>'
+
+SHARE_LINK = '<a href="{href}" target="_blank" rel="noopener" style="display: inline-block; padding: 8px 15px; background-color: {color}; color: white; border-radius: 5px; text-decoration: none;">{name}</a>'
+SHARE_COLORS = {"Twitter": "#1DA1F2", "Facebook": "#4267B2", "LinkedIn": "#0077B5", "Email": "#EA4335"}
+
+EMPTY = """\
+<div style="background-color: var(--card-background); padding: 20px; border-radius: 10px; text-align: center; margin-bottom: 30px;">
+    <p style="margin: 0;">{message}</p>
+</div>"""
+
+
+# Paths
+def post_path(post_id):
+    return f"posts/{post_id}.html"
+
+def listing_path(prefix, page):
+    return f"{prefix}index.html" if page == 1 else f"{prefix}page/{page}.html"
+
+def _root(path):
+    # Relative prefix from a page back to the top of the site
+    return "../" * path.count("/")
+
+def _signature(*parts):
+    return hashlib.sha256(json.dumps(parts, default=str, ensure_ascii=False).encode()).hexdigest()[:32]
+
+
+# Planning
+def plan_site(conn, stylesheet, page_size=STATIC_SITE_PAGE_SIZE):
+    """
+    Work out every page of the site and what each one shows.
+
+    Only metadata is read; no post content.
+
+    Args:
+        conn: Database connection
+        stylesheet (str): Site path of the stylesheet the pages link
+
+    Returns:
+        tuple: (pages, nav) where pages maps each output path to its spec
+            (``kind``, what to show and an ``inputs`` signature) and nav is
+            the list of (category, listing path) for the header
+    """
+    posts = [dict(row) for row in conn.execute("""
+    SELECT p.id, p.category, p.tags, p.published_at, p.updated_at,
+           u.username AS author_name, u.bio AS author_bio, u.profile_image AS author_image
+    FROM posts p
+    JOIN users u ON p.author_id = u.id
+    WHERE p.status = 'published'
+    ORDER BY p.created_at DESC, p.id DESC
+    """)]
+    comments = {post_id: (count, last) for post_id, count, last in conn.execute(
+        "SELECT post_id, COUNT(*), MAX(id) FROM comments GROUP BY post_id")}
+    related = {}
+    for post_id, related_id in conn.execute("""
+    SELECT r.post_id, r.related_id
+    FROM related_posts r
+    JOIN posts p ON p.id = r.related_id
+    WHERE p.status = 'published'
+    ORDER BY r.post_id, r.score DESC, r.related_id
+    """):
+        shown = related.setdefault(post_id, [])
+        if len(shown) < RELATED_COUNT:
+            shown.append(related_id)
+
+    # What a card shows changes only with these (the same fields key the fragment cache)
+    cards = {post["id"]: (post["id"], post["updated_at"], post["published_at"], post["author_name"])
+             for post in posts}
+
+    by_category, by_tag, tag_names = {}, {}, {}
+    for post in posts:
+        by_category.setdefault(post["category"], []).append(post["id"])
+        post["tag_names"] = parse_tags(post["tags"])
+        for name in post["tag_names"]:
+            key = name.lower()
+            tag_names.setdefault(key, name)
+            by_tag.setdefault(key, []).append(post["id"])
+
+    category_slugs = make_slugs(by_category)
+    tag_slugs = make_slugs(tag_names.values())
+    nav = [(name, listing_path(f"category/{category_slugs[name]}/", 1)) for name in sorted(by_category)]
+    site = (SITE_VERSION, stylesheet, nav, STATIC_SITE_APP_URL)
+
+    pages = {}
+
+    def add_listing(prefix, heading, ids, featured=False):
+        page_count = max(1, math.ceil(len(ids) / page_size))
+        for page in range(1, page_count + 1):
+            shown = ids[(page - 1) * page_size:page * page_size]
+            spec = {"kind": "listing", "heading": heading, "ids": shown, "prefix": prefix,
+                    "page": page, "pages": page_count,
+                    "featured": ids[:FEATURED_COUNT] if featured and page == 1 else []}
+            spec["inputs"] = _signature(site, "listing", heading, page, page_count,
+                                        [cards[post_id] for post_id in shown + spec["featured"]])
+            pages[listing_path(prefix, page)] = spec
+
+    add_listing("", "Recent Posts", [post["id"] for post in posts], featured=True)
+    for name, ids in by_category.items():
+        add_listing(f"category/{category_slugs[name]}/", name, ids)
+    for key, ids in by_tag.items():
+        add_listing(f"tag/{tag_slugs[tag_names[key]]}/", f"# {tag_names[key]}", ids)
+
+    for post in posts:
+        shown = related.get(post["id"])
+        if not shown:
+            # Not in the related posts index: newest in the same category, as show_post does
+            shown = [post_id for post_id in by_category[post["category"]][:RELATED_COUNT + 1]
+                     if post_id != post["id"]][:RELATED_COUNT]
+        tags = [(name, listing_path(f"tag/{tag_slugs[tag_names[name.lower()]]}/", 1))
+                for name in post["tag_names"]]
+        spec = {"kind": "post", "id": post["id"], "related": shown, "tags": tags}
+        spec["inputs"] = _signature(site, "post", cards[post["id"]], post["author_bio"], post["author_image"],
+                                    tags, comments.get(post["id"]), [cards[post_id] for post_id in shown])
+        pages[post_path(post["id"])] = spec
+
+    return pages, nav
+
+
+# Rendering
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _copy_atomic(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+class SiteRenderer:
+    """
+    Renders and writes pages of a plan into an output folder.
+
+    Args:
+        out_dir (str): Site folder
+        stylesheet (str): Site path of the stylesheet
+        nav (list): (category, listing path) pairs for the header
+    """
+
+    def __init__(self, out_dir, stylesheet, nav):
+        self.out_dir = out_dir
+        self.stylesheet = stylesheet
+        self.nav = nav
+
+    def image(self, value, variant, root):
+        # Copy a stored image variant into the site; URLs and data URIs are used as they are
+        if not is_media_ref(value):
+            return value
+        source = media_file(value, variant)
+        name = os.path.basename(source)
+        target = os.path.join(self.out_dir, "media", name)
+        if not os.path.exists(target):
+            if not os.path.exists(source):
+                return None
+            _copy_atomic(source, target)
+        return f"{root}media/{name}"
+
+    def cards(self, conn, ids):
+        """
+        Load card rows for post IDs, keyed by ID.
+        """
+        cards = {}
+        ids = list(ids)
+        columns = ", ".join(POST_SUMMARY_COLUMNS["card"])
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cards.update((row["id"], dict(row)) for row in conn.execute(f"""
+            SELECT {columns}
+            FROM posts p
+            JOIN users u ON p.author_id = u.id
+            WHERE p.id IN ({placeholders})
+            """, chunk))
+        return cards
+
+    def card(self, render, post, root):
+        post = dict(post, image_url=self.image(post.get("image_url"), "card", root))
+        return render(post)
+
+    def page(self, path, title, body, description=APP_DESCRIPTION):
+        root = _root(path)
+        nav = "".join(f'<a href="{root}{href}" style="text-decoration:none;">{escape(name)}</a>'
+                      for name, href in self.nav)
+        app_link = ""
+        if STATIC_SITE_APP_URL:
+            app_link = (f'<p style="font-size: 0.8rem; opacity: 0.7;"><a href="{escape(STATIC_SITE_APP_URL)}">'
+                        'Sign in to comment and subscribe</a></p>')
+        html = PAGE.format(title=escape(title), description=escape(description or ""), root=root,
+                           stylesheet=self.stylesheet, app_name=APP_NAME, nav=nav, body=body, app_link=app_link)
+        # Cards link to ?post_id=N in the app; here they point at the post's page
+        return _POST_LINK.sub(lambda match: f'href="{root}{post_path(match.group(1))}"', html)
+
+    def listing(self, path, spec, cards):
+        root = _root(path)
+        parts = []
+        if spec["featured"]:
+            parts.append(HOME_HERO.format(app_name=APP_NAME, description=APP_DESCRIPTION))
+            parts.append(SECTION_HEADING.format(title="Featured Posts"))
+            parts.append(GRID.format(cards="\n".join(
+                self.card(featured_card_html, cards[post_id], root) for post_id in spec["featured"])))
+        parts.append(SECTION_HEADING.format(title=escape(spec["heading"])))
+        if spec["ids"]:
+            parts.extend(self.card(recent_card_html, cards[post_id], root) for post_id in spec["ids"])
+        else:
+            parts.append(EMPTY.format(message="No posts available yet"))
+
+        links = []
+        if spec["page"] > 1:
+            links.append(f'<a href="{root}{listing_path(spec["prefix"], spec["page"] - 1)}">← Newer posts</a>')
+        if spec["pages"] > 1:
+            links.append(f'<span>Page {spec["page"]} of {spec["pages"]}</span>')
+        if spec["page"] < spec["pages"]:
+            links.append(f'<a href="{root}{listing_path(spec["prefix"], spec["page"] + 1)}">Older posts →</a>')
+        if links:
+            parts.append(f'<div style="display:flex; justify-content:space-between; margin:30px 0;">{"".join(links)}</div>')
+
+        title = APP_NAME if not spec["prefix"] else f"{spec['heading']} | {APP_NAME}"
+        if spec["page"] > 1:
+            title = f"{title} (page {spec['page']})"
+        return self.page(path, title, "\n".join(parts))
+
+    def post(self, path, spec, cards):
+        root = _root(path)
+        post = get_post(spec["id"])
+        parts = [hero_html(dict(post, featured_image=self.image(post.get("featured_image"), "hero", root)))]
+
+        avatar = AVATAR_PLACEHOLDER
+        author_image = self.image(post.get("author_image"), "avatar", root)
+        if author_image:
+            avatar = (f'<img src="{author_image}" alt="" style="flex: none; width: 120px; height: 120px; '
+                      'object-fit: cover; border-radius: 50%;">')
+        parts.append(AUTHOR.format(avatar=avatar, author_name=escape(post["author_name"]),
+                                   bio=escape(post.get("author_bio") or "This author hasn't added a bio yet.")))
+
+        if spec["tags"]:
+            parts.append('<div style="margin-bottom: 30px;">' + "".join(
+                TAG_LINK.format(href=f"{root}{href}", name=escape(name)) for name, href in spec["tags"]) + "</div>")
+
+        parts.append('<div class="blog-content" style="font-size: 1.1rem; line-height: 1.7; margin-bottom: 40px;">\n\n'
+                     f"{post['content_html']}\n\n</div>")
+
+        share = generate_social_share_links(post["title"], post["id"])
+        parts.append('<div style="background-color: var(--card-background); padding: 20px; border-radius: 10px; '
+                     'margin-bottom: 30px;">\n<h3 style="margin-top: 0;">Share this post</h3>\n'
+                     '<div style="display: flex; gap: 10px; flex-wrap: wrap;">' + "".join(
+                         SHARE_LINK.format(href=escape(href), color=SHARE_COLORS[name], name=name)
+                         for name, href in share.items()) + "</div>\n</div>")
+
+        parts.append(SECTION_HEADING.format(title="Related Posts"))
+        related = [cards[post_id] for post_id in spec["related"] if post_id in cards]
+        if related:
+            parts.append(GRID.format(cards="\n".join(self.card(related_card_html, card, root) for card in related)))
+        else:
+            parts.append(EMPTY.format(message="No related posts found"))
+
+        parts.append(SECTION_HEADING.format(title="Comments"))
+        comments = get_comments(post["id"], limit=COMMENTS_PAGE_SIZE)
+        for comment in comments:
+            parts.append(comment_html(dict(comment, profile_image=self.image(comment.get("profile_image"),
+                                                                            "avatar", root))))
+        if not comments:
+            parts.append(EMPTY.format(message="No comments yet"))
+        if STATIC_SITE_APP_URL:
+            parts.append(EMPTY.format(message=f'<a href="{escape(STATIC_SITE_APP_URL)}?post_id={post["id"]}">'
+                                              "Join the discussion</a>"))
+
+        return self.page(path, f"{post['title']} | {APP_NAME}", "\n".join(parts), post.get("excerpt"))
+
+    def render_batch(self, items):
+        """
+        Render pages and write those whose content changed.
+
+        Args:
+            items (list): (path, spec, previous content hash) tuples
+
+        Returns:
+            list: (path, inputs, content hash, written) per page
+        """
+        with get_connection() as conn:
+            ids = set()
+            for _path, spec, _hash in items:
+                ids.update(spec.get("ids", ()))
+                ids.update(spec.get("featured", ()))
+                ids.update(spec.get("related", ()))
+            cards = self.cards(conn, ids)
+
+        results = []
+        for path, spec, previous in items:
+            render = self.post if spec["kind"] == "post" else self.listing
+            data = render(path, spec, cards).encode("utf-8")
+            digest = hashlib.sha256(data).hexdigest()[:32]
+            target = os.path.join(self.out_dir, path)
+            written = digest != previous or not os.path.exists(target)
+            if written:
+                _write_atomic(target, data)
+            results.append((path, spec["inputs"], digest, written))
+        return results
+
+
+_worker_renderer = None
+
+
+def _init_worker(database, out_dir, stylesheet, nav):
+    global _worker_renderer
+    # Read the database the parent process is building from
+    import db
+    db.DB_NAME = database
+    _worker_renderer = SiteRenderer(out_dir, stylesheet, nav)
+
+def _render_in_worker(items):
+    return _worker_renderer.render_batch(items)
+
+
+# Building
+def _write_assets(out_dir):
+    # Light theme stylesheet, named by content hash, plus any self-hosted fonts
+    css = build_theme_css("light", "../fonts").encode("utf-8")
+    name = f"assets/theme-light-{hashlib.sha256(css).hexdigest()[:12]}.css"
+    target = os.path.join(out_dir, name)
+    if not os.path.exists(target):
+        _write_atomic(target, css)
+    for _family, _weight, _style, font, _url in FONT_FILES:
+        source = os.path.join(FONTS_DIR, font)
+        if os.path.exists(source) and not os.path.exists(os.path.join(out_dir, "fonts", font)):
+            _copy_atomic(source, os.path.join(out_dir, "fonts", font))
+    return name
+
+def _remove_page(out_dir, path):
+    target = os.path.join(out_dir, path)
+    try:
+        os.remove(target)
+    except FileNotFoundError:
+        pass
+    # Drop folders left empty, e.g. a category with no posts left
+    folder = os.path.dirname(target)
+    while os.path.abspath(folder) != os.path.abspath(out_dir):
+        try:
+            os.rmdir(folder)
+        except OSError:
+            break
+        folder = os.path.dirname(folder)
+
+def _load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def build_site(out_dir=STATIC_SITE_DIR, full=False, workers=STATIC_SITE_WORKERS):
+    """
+    Bring the static site in ``out_dir`` up to date with the database.
+
+    Args:
+        out_dir (str): Site folder
+        full (bool): Render every page, even those whose inputs are unchanged
+        workers (int): Rendering processes; 1 renders in this process
+
+    Returns:
+        dict: Pages planned, rendered, written and removed, and seconds taken
+    """
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    stylesheet = _write_assets(out_dir)
+    with get_connection() as conn:
+        plan, nav = plan_site(conn, stylesheet)
+
+    previous = _load_manifest(out_dir).get("pages", {})
+    todo = [(path, spec, previous.get(path, {}).get("hash")) for path, spec in plan.items()
+            if full or previous.get(path, {}).get("inputs") != spec["inputs"]]
+
+    results = []
+    if todo and (workers <= 1 or len(todo) < PARALLEL_MIN_PAGES):
+        results = SiteRenderer(out_dir, stylesheet, nav).render_batch(todo)
+    elif todo:
+        batch_size = max(25, math.ceil(len(todo) / (workers * 4)))
+        batches = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+        # spawn rather than fork: a forked child would inherit the parent's open SQLite connections
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(get_pool().database, out_dir, stylesheet, nav)) as pool:
+            for batch in pool.map(_render_in_worker, batches):
+                results.extend(batch)
+
+    pages = {path: previous[path] for path in plan if path in previous}
+    for path, inputs, digest, _written in results:
+        pages[path] = {"inputs": inputs, "hash": digest}
+
+    removed = [path for path in previous if path not in plan]
+    for path in removed:
+        _remove_page(out_dir, path)
+    for name in os.listdir(os.path.join(out_dir, "assets")):
+        if name.startswith("theme-") and f"assets/{name}" != stylesheet:
+            os.remove(os.path.join(out_dir, "assets", name))
+
+    _write_atomic(os.path.join(out_dir, MANIFEST_NAME),
+                  json.dumps({"version": SITE_VERSION, "pages": pages}, indent=0).encode("utf-8"))
+    return {
+        "pages": len(plan),
+        "rendered": len(results),
+        "written": sum(1 for result in results if result[3]),
+        "removed": len(removed),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export published posts as a static HTML site.")
+    parser.add_argument("--out", default=STATIC_SITE_DIR, help="site folder (default: %(default)s)")
+    parser.add_argument("--full", action="store_true", help="render every page, not only changed ones")
+    parser.add_argument("--workers", type=int, default=STATIC_SITE_WORKERS, help="rendering processes")
+    args = parser.parse_args()
+
+    from db import init_db
+    init_db()
+    report = build_site(args.out, full=args.full, workers=args.workers)
+    print(f"{report['pages']} pages: {report['rendered']} rendered, {report['written']} written, "
+          f"{report['removed']} removed in {report['seconds']}s -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
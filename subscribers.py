@@ -0,0 +1,233 @@
+"""
+Bulk subscriber import and export as CSV.
+
+Both directions stream, so memory use does not depend on the size of the
+list: ``export_subscribers_csv`` writes rows from a cursor
+SUBSCRIBER_EXPORT_CHUNK_SIZE at a time, and ``import_subscribers_csv``
+reads, validates and inserts SUBSCRIBER_IMPORT_BATCH_SIZE rows per
+transaction.
+
+Emails are unique regardless of case (see migration 14). An import checks
+each batch against that index before inserting it, so a row repeating an
+existing subscriber, an earlier batch or an earlier line of its own batch is
+reported as a duplicate. Rejected rows go to a CSV of their own (line,
+email, name, reason) rather than into memory.
+
+    python subscribers.py --export subscribers.csv
+    python subscribers.py --import new.csv --rejected rejected.csv
+"""
+
+import argparse
+import csv
+import io
+import os
+import sys
+
+from config import SUBSCRIBER_EXPORT_CHUNK_SIZE, SUBSCRIBER_IMPORT_BATCH_SIZE
+from db import get_connection
+from utils import is_valid_email
+
+EXPORT_HEADER = ["Email", "Name", "Subscribed At"]
+REJECTED_HEADER = ["Line", "Email", "Name", "Reason"]
+
+# Longest address SMTP can deliver to (RFC 5321); longer names are truncated
+MAX_EMAIL_LENGTH = 254
+MAX_NAME_LENGTH = 200
+
+
+def export_subscribers_csv(out, chunk_size=SUBSCRIBER_EXPORT_CHUNK_SIZE):
+    """
+    Write every subscriber, newest first, as CSV.
+
+    Args:
+        out: Text file opened with ``newline=""``
+
+    Returns:
+        int: Number of subscribers written
+    """
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_HEADER)
+
+    written = 0
+    with get_connection() as conn:
+        # Walks idx_subscribers_subscribed_at backwards; no sort of the whole table
+        cursor = conn.execute("SELECT email, name, subscribed_at FROM subscribers ORDER BY subscribed_at DESC, id DESC")
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+            written += len(rows)
+    return written
+
+def _columns(header):
+    # Index of the email and name columns, or None if the first row is data
+    cells = [cell.strip().lower() for cell in header]
+    for email_name in ("email", "e-mail", "email address"):
+        if email_name in cells:
+            name = cells.index("name") if "name" in cells else None
+            return cells.index(email_name), name
+    return None
+
+def _size(source):
+    try:
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def _prepend(row, rows):
+    yield row
+    yield from rows
+
+
+class _Import:
+    """
+    State of one import: counts, the rejected-rows writer and the pending batch.
+    """
+
+    def __init__(self, rejected, batch_size):
+        self.report = {"rows": 0, "imported": 0, "duplicates": 0, "invalid": 0}
+        self.rejected = csv.writer(rejected) if rejected is not None else None
+        if self.rejected is not None:
+            self.rejected.writerow(REJECTED_HEADER)
+        self.batch_size = batch_size
+        self.batch = []
+
+    def reject(self, line, email, name, reason):
+        self.report["duplicates" if reason == "duplicate" else "invalid"] += 1
+        if self.rejected is not None:
+            self.rejected.writerow([line, email, name or "", reason])
+
+    def add(self, line, email, name):
+        self.report["rows"] += 1
+        if not email:
+            self.reject(line, email, name, "missing email")
+        elif len(email) > MAX_EMAIL_LENGTH or not is_valid_email(email):
+            self.reject(line, email, name, "invalid email")
+        else:
+            self.batch.append((line, email, name[:MAX_NAME_LENGTH] if name else None))
+        return len(self.batch) >= self.batch_size
+
+    def flush(self):
+        """
+        Insert the pending batch in one transaction.
+        """
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+
+        with get_connection() as conn:
+            keys = list({email.lower() for _line, email, _name in batch})
+            existing = set()
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                existing.update(row[0].lower() for row in conn.execute(
+                    f"SELECT email FROM subscribers WHERE email COLLATE NOCASE IN ({placeholders})", chunk))
+
+            rows = []
+            for line, email, name in batch:
+                key = email.lower()
+                if key in existing:
+                    self.reject(line, email, name, "duplicate")
+                else:
+                    existing.add(key)
+                    rows.append((email, name))
+
+            # OR IGNORE covers anyone who subscribed through the form meanwhile
+            inserted = conn.executemany("INSERT OR IGNORE INTO subscribers (email, name) VALUES (?, ?)",
+                                        rows).rowcount
+        self.report["imported"] += inserted
+        self.report["duplicates"] += len(rows) - inserted
+
+
+def import_subscribers_csv(source, rejected=None, batch_size=SUBSCRIBER_IMPORT_BATCH_SIZE, progress=None):
+    """
+    Add subscribers from a CSV file.
+
+    The file may have a header row naming an ``email`` column (and
+    optionally ``name``), like the export does; without one, the first
+    column is the email and the second the name.
+
+    Args:
+        source: Binary file object, e.g. a Streamlit UploadedFile
+        rejected: Text file (opened with ``newline=""``) that receives the
+            rejected rows, or None
+        batch_size (int): Rows validated and inserted per transaction
+        progress (callable): ``progress(report, fraction)`` after each batch;
+            fraction is None when the size of ``source`` is unknown
+
+    Returns:
+        dict: Counts of rows read, imported, duplicates and invalid
+    """
+    size = _size(source)
+    text = io.TextIOWrapper(source, encoding="utf-8-sig", errors="replace", newline="")
+    reader = csv.reader(text)
+    state = _Import(rejected, batch_size)
+
+    def report_progress():
+        if progress is not None:
+            fraction = min(source.tell() / size, 1.0) if size else None
+            progress(dict(state.report), fraction)
+
+    try:
+        first = next(reader, None)
+        columns = _columns(first) if first is not None else None
+        email_column, name_column = columns or (0, 1)
+        rows = reader if columns or first is None else _prepend(first, reader)
+
+        for row in rows:
+            if not any(cell.strip() for cell in row):
+                continue
+            email = row[email_column].strip() if len(row) > email_column else ""
+            name = row[name_column].strip() if name_column is not None and len(row) > name_column else ""
+            if state.add(reader.line_num, email, name or None):
+                state.flush()
+                report_progress()
+        state.flush()
+        report_progress()
+    finally:
+        # Leave the caller's file open
+        text.detach()
+    return state.report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export newsletter subscribers as CSV.")
+    parser.add_argument("--export", metavar="PATH", help="write every subscriber to PATH ('-' for stdout)")
+    parser.add_argument("--import", dest="import_path", metavar="PATH", help="add the subscribers listed in PATH")
+    parser.add_argument("--rejected", metavar="PATH", help="with --import, write rejected rows to PATH")
+    args = parser.parse_args()
+
+    if not (args.export or args.import_path):
+        parser.print_help()
+        return 0
+
+    from db import init_db
+    init_db()
+
+    if args.export == "-":
+        export_subscribers_csv(sys.stdout)
+    elif args.export:
+        with open(args.export, "w", newline="", encoding="utf-8") as out:
+            print(f"Exported {export_subscribers_csv(out)} subscribers to {args.export}")
+
+    if args.import_path:
+        rejected = open(args.rejected, "w", newline="", encoding="utf-8") if args.rejected else None
+        try:
+            with open(args.import_path, "rb") as source:
+                report = import_subscribers_csv(source, rejected)
+        finally:
+            if rejected is not None:
+                rejected.close()
+        print(", ".join(f"{count} {name}" for name, count in report.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Shared setup for the test suite.
+
+The app's modules read their settings from the environment when they are
+first imported, so everything that writes files (database, media, feeds,
+static site, logs) is pointed at a scratch directory before any test
+imports db. Background workers stay off; tests drive them directly.
+
+    python -m pytest -q
+"""
+
+import logging
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRATCH = tempfile.mkdtemp(prefix="edurishi-tests-")
+os.environ.update(
+    DB_NAME=os.path.join(SCRATCH, "blog.db"),
+    MEDIA_DIR=os.path.join(SCRATCH, "media"),
+    STATIC_SITE_DIR=os.path.join(SCRATCH, "site"),
+    FEEDS_DIR=os.path.join(SCRATCH, "feeds"),
+    PROFILE_DIR=os.path.join(SCRATCH, "profiles"),
+    SQL_SLOW_LOG=os.path.join(SCRATCH, "slow_queries.jsonl"),
+    FEEDS_ENABLED="0",
+    SCHEDULER_ENABLED="0",
+)
+logging.disable(logging.WARNING)
+
+
+@pytest.fixture
+def db(tmp_path):
+    """
+    The db module, pointed at a fresh database file for this test.
+    """
+    import db as db_module
+    from cache import query_cache
+    from fragments import fragment_cache
+
+    db_module.get_pool().close()
+    db_module._pool = None
+    db_module.DB_NAME = str(tmp_path / "blog.db")
+    db_module._db_initialized = False
+    query_cache.clear()
+    fragment_cache.clear()
+    db_module.init_db()
+    yield db_module
+    db_module.get_pool().close()
+    db_module._pool = None
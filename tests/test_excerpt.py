@@ -0,0 +1,43 @@
+"""
+Post excerpts: plain text of the sanitized HTML, escaped where it is shown.
+"""
+
+from config import EXCERPT_LENGTH
+from fragments import featured_card_html, recent_card_html
+from migrations import migrate
+
+HOSTILE = "**Bold** start <img src=x onerror=alert(1)> and <b>tags</b>. " + "word " * 100
+
+
+def excerpt(db, post_id):
+    with db.get_connection() as conn:
+        return conn.execute("SELECT excerpt FROM posts WHERE id = ?", (post_id,)).fetchone()[0]
+
+
+def test_excerpt_is_text_of_the_html(db):
+    text = db.make_excerpt("# Title\n\nFirst *para*graph.\n\n- one\n- two\n\n<p>1 &lt; 2</p>")
+    assert text == "Title First paragraph. one two 1 < 2"
+
+def test_excerpt_never_ends_inside_a_tag(db):
+    long_tag = "x " * (EXCERPT_LENGTH // 2 - 5) + '<a href="https://example.org/' + "a" * 100 + '">link</a>'
+    text = db.make_excerpt(long_tag)
+    assert "<" not in text and "href" not in text
+    assert len(text) <= EXCERPT_LENGTH + 3
+
+def test_post_excerpt_is_escaped_in_cards(db):
+    post_id = db.create_post("Title", HOSTILE, 1, "AI", "qubit", "published")
+    assert excerpt(db, post_id).startswith("Bold start and tags.")
+
+    with db.get_connection() as conn:
+        conn.execute("UPDATE posts SET excerpt = ? WHERE id = ?", ("<script>alert(1)</script>", post_id))
+    post = db.get_post.uncached(post_id)
+    for card in (featured_card_html(post), recent_card_html(post)):
+        assert "<script>" not in card and "&lt;script&gt;" in card
+
+def test_migration_backfills_raw_excerpts(db):
+    post_id = db.create_post("Title", HOSTILE, 1, "AI", "qubit", "published")
+    with db.get_connection() as conn:
+        conn.execute("UPDATE posts SET excerpt = ? WHERE id = ?", (HOSTILE[:EXCERPT_LENGTH], post_id))
+        conn.execute("PRAGMA user_version = 18")
+        migrate(conn)
+    assert excerpt(db, post_id) == db.make_excerpt(HOSTILE)
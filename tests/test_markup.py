@@ -0,0 +1,76 @@
+"""
+render_markdown: the sanitizer, and HTML that survives show_post's second
+Markdown pass.
+"""
+
+import pytest
+from markdown_it import MarkdownIt
+
+from markup import render_markdown, sanitize_html
+
+CODE_POST = """# Profiling a rerun
+
+```python
+def load(path):
+    with open(path) as f:
+        data = f.read()
+
+
+    return data.splitlines()
+```
+
+An indented block:
+
+    first paragraph
+
+    second paragraph
+
+<pre>raw HTML
+
+with a blank line</pre>
+"""
+
+
+def shown(content_html):
+    # show_post hands this to st.markdown, which parses it as CommonMark again
+    wrapper = f'<div class="blog-content">\n\n{content_html}\n\n</div>'
+    return MarkdownIt("commonmark", {"html": True}).render(wrapper)
+
+
+@pytest.mark.parametrize("source", [
+    "<script>alert(1)</script>",
+    "<img src=x onerror=alert(1)>",
+    '<a href="javascript:alert(1)">link</a>',
+    '<a href="jav&#x09;ascript:alert(1)">link</a>',
+    "[link](javascript:alert(1))",
+    '<iframe src="https://example.org"></iframe>',
+    '<div style="position:fixed">x</div>',
+    '<svg onload=alert(1)><circle/></svg>',
+])
+def test_sanitizer_removes_scripts(source):
+    rendered = render_markdown(source).lower()
+    assert "<script" not in rendered
+    assert "onerror" not in rendered and "onload" not in rendered
+    assert 'href="javascript' not in rendered.replace("\t", "")
+    assert "<iframe" not in rendered and "<svg" not in rendered
+    assert "position:fixed" not in rendered
+
+def test_sanitizer_keeps_formatting():
+    assert sanitize_html('<p><strong>bold</strong> <a href="https://example.org">x</a></p>') == \
+        '<p><strong>bold</strong> <a href="https://example.org" rel="nofollow noopener">x</a></p>'
+
+def test_sanitizer_closes_open_tags():
+    assert sanitize_html("<div><em>unclosed") == "<div><em>unclosed</em></div>"
+
+def test_text_is_escaped():
+    assert sanitize_html("<p>1 &lt; 2 &amp;&amp; <b>3</b></p>") == "<p>1 &lt; 2 &amp;&amp; <b>3</b></p>"
+
+def test_code_blocks_survive_second_pass():
+    page = shown(render_markdown(CODE_POST))
+    assert page.count("<pre") == page.count("</pre>") == 3
+    assert "&lt;" not in page
+    assert "<p></code></pre></p>" not in page and "<p></pre></p>" not in page
+
+def test_code_blocks_keep_their_lines():
+    page = shown(render_markdown(CODE_POST))
+    assert page.count("&#10;") >= 8
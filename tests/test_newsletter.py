@@ -0,0 +1,76 @@
+"""
+Newsletter sends on background threads, against a fake SMTP server.
+"""
+
+import threading
+import time
+
+import pytest
+
+import newsletter
+from newsletter import (
+    create_newsletter, get_newsletter_progress, is_sending, pause_newsletter, resume_newsletter,
+    start_newsletter_send,
+)
+
+
+class FakeSMTP:
+    def __init__(self, delay):
+        self.delay = delay
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        return self
+
+    def sendmail(self, sender, recipients, message):
+        time.sleep(self.delay)
+        with self.lock:
+            self.sent.extend(recipients)
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def newsletter_id(db):
+    for i in range(40):
+        db.add_subscriber(f"reader{i}@example.org")
+    yield create_newsletter("Weekly", "Hello **readers**.")
+    newsletter.stop_newsletter_sends()
+    newsletter._senders.clear()
+
+
+def test_send_delivers_to_every_subscriber(newsletter_id):
+    smtp = FakeSMTP(0)
+    assert start_newsletter_send(newsletter_id, connect=smtp, connections=2, batch_size=5, rate=0)
+    assert wait_for(lambda: not is_sending(newsletter_id))
+    assert get_newsletter_progress(newsletter_id) == {"pending": 0, "sent": 40, "failed": 0}
+    assert sorted(smtp.sent) == sorted(f"reader{i}@example.org" for i in range(40))
+
+def test_second_start_while_sending_is_refused(newsletter_id):
+    smtp = FakeSMTP(0.02)
+    assert start_newsletter_send(newsletter_id, connect=smtp, connections=1, batch_size=2, rate=0)
+    assert not start_newsletter_send(newsletter_id, connect=smtp)
+
+def test_quick_pause_and_resume_finishes_the_send(newsletter_id):
+    smtp = FakeSMTP(0.02)
+    start_newsletter_send(newsletter_id, connect=smtp, connections=1, batch_size=2, rate=0)
+    assert wait_for(lambda: smtp.sent)
+
+    pause_newsletter(newsletter_id)
+    # The paused sender is still finishing its batch
+    assert resume_newsletter(newsletter_id, connect=smtp, connections=1, batch_size=2, rate=0)
+    assert wait_for(lambda: get_newsletter_progress(newsletter_id)["pending"] == 0)
+    assert get_newsletter_progress(newsletter_id)["sent"] == 40
+    assert len(set(smtp.sent)) == 40
@@ -0,0 +1,20 @@
+"""
+Every hot query reaches posts, comments and the index tables through an
+index, never a full table scan.
+"""
+
+import pytest
+
+from migrations import INDEXED_TABLES, explain, full_table_scans, hot_queries
+
+
+@pytest.mark.parametrize("name", list(hot_queries()))
+def test_hot_query_uses_an_index(db, name):
+    query, params = hot_queries()[name]
+    with db.get_connection() as conn:
+        assert full_table_scans(explain(conn, query, params), INDEXED_TABLES) == []
+
+def test_full_table_scans_flags_unindexed_reads(db):
+    with db.get_connection() as conn:
+        plan = explain(conn, "SELECT * FROM posts WHERE content LIKE '%x%'")
+    assert full_table_scans(plan, INDEXED_TABLES)
@@ -0,0 +1,87 @@
+"""
+The related posts index: rebuilds are deterministic and the incremental
+path (index_post / remove_post) agrees with them.
+"""
+
+import random
+
+import pytest
+
+from related import index_post, rebuild_index, remove_post
+
+TOPICS = [
+    ["qubit", "entanglement", "superposition", "decoherence", "photon", "interference"],
+    ["neural", "gradient", "transformer", "embedding", "training", "attention"],
+    ["compiler", "bytecode", "parser", "register", "optimizer", "linker"],
+    ["galaxy", "telescope", "nebula", "redshift", "supernova", "orbit"],
+]
+GENERAL = ["system", "result", "method", "value", "process", "model", "paper", "study", "change", "level"]
+
+
+def seed(conn, posts=60, seed=7):
+    """
+    Insert published posts directly (create_post would index each one).
+
+    Returns:
+        dict: post_id -> topic
+    """
+    rng = random.Random(seed)
+    rows, topics = [], {}
+    for i in range(posts):
+        topic = i % len(TOPICS)
+        body = " ".join(rng.choice(TOPICS[topic]) if rng.random() < 0.4 else rng.choice(GENERAL)
+                        for _ in range(80))
+        rows.append((f"{' '.join(rng.sample(TOPICS[topic], 2))} {i}", body, ", ".join(rng.sample(TOPICS[topic], 2))))
+        topics[i + 1] = topic
+    conn.execute("DELETE FROM posts")
+    conn.executemany("""
+    INSERT INTO posts (title, content, author_id, category, tags, status, published_at)
+    VALUES (?, ?, 1, 'AI', ?, 'published', CURRENT_TIMESTAMP)
+    """, rows)
+    return topics
+
+def snapshot(conn):
+    lists = {}
+    for post_id, related_id, score in conn.execute(
+            "SELECT post_id, related_id, score FROM related_posts ORDER BY post_id, score DESC, related_id"):
+        lists.setdefault(post_id, []).append((related_id, score))
+    return lists
+
+
+@pytest.fixture
+def indexed(db):
+    with db.get_connection() as conn:
+        topics = seed(conn)
+        rebuild_index(conn)
+        return topics, snapshot(conn)
+
+
+def test_rebuild_is_stable(db, indexed):
+    _topics, first = indexed
+    with db.get_connection() as conn:
+        rebuild_index(conn)
+        assert snapshot(conn) == first
+
+def test_incremental_reindex_matches_rebuild(db, indexed):
+    topics, first = indexed
+    for post_id in random.Random(1).sample(sorted(topics), 15):
+        with db.get_connection() as conn:
+            remove_post(conn, post_id)
+            index_post(conn, post_id)
+    with db.get_connection() as conn:
+        assert snapshot(conn) == first
+
+def test_neighbours_share_a_topic(indexed):
+    topics, first = indexed
+    same = [topics[related_id] == topics[post_id]
+            for post_id, neighbours in first.items() for related_id, _score in neighbours[:3]]
+    assert sum(same) / len(same) > 0.9
+
+def test_unpublished_post_leaves_every_list(db, indexed):
+    _topics, first = indexed
+    post_id = next(iter(first))
+    with db.get_connection() as conn:
+        conn.execute("UPDATE posts SET status = 'draft' WHERE id = ?", (post_id,))
+        index_post(conn, post_id)
+        assert conn.execute("SELECT COUNT(*) FROM related_posts WHERE ? IN (post_id, related_id)",
+                            (post_id,)).fetchone()[0] == 0
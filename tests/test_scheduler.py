@@ -0,0 +1,127 @@
+"""
+PostScheduler against the real db functions and a clock moved by hand.
+"""
+
+import datetime
+import time
+
+import pytest
+
+from scheduler import PostScheduler
+
+START = datetime.datetime(2030, 1, 1, 9, 0)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **delta):
+        self.now += datetime.timedelta(**delta)
+
+
+def at(minutes):
+    return START + datetime.timedelta(minutes=minutes)
+
+def status(db, post_id):
+    with db.get_connection() as conn:
+        return conn.execute("SELECT status FROM posts WHERE id = ?", (post_id,)).fetchone()[0]
+
+def schedule_post(db, name, minutes):
+    return db.create_post(f"Post {name}", "Goes out on time.", 1, "AI", "qubit", "scheduled",
+                          scheduled_for=at(minutes))
+
+def reschedule(db, scheduler, post_id, minutes):
+    # update_post, plus the notify_scheduled call that would reach a running scheduler
+    post = db.get_post.uncached(post_id)
+    db.update_post(post_id, post["title"], post["content"], post["category"], post["tags"], "scheduled",
+                   scheduled_for=at(minutes))
+    scheduler.schedule(post_id, at(minutes))
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(START)
+
+@pytest.fixture
+def scheduler(db, clock):
+    scheduler = PostScheduler(db.publish_due_posts, db.get_schedule, clock=clock, resync_seconds=3600)
+    yield scheduler
+    scheduler.stop()
+
+
+def test_sleeps_until_first_due_and_publishes_nothing_early(db, clock, scheduler):
+    first, second = schedule_post(db, "A", 10), schedule_post(db, "B", 20)
+
+    assert scheduler.run_pending() == 600
+    assert status(db, first) == status(db, second) == "scheduled"
+
+def test_publishes_at_due_time_and_skips_later_posts(db, clock, scheduler):
+    first, second = schedule_post(db, "A", 10), schedule_post(db, "B", 20)
+    scheduler.run_pending()
+
+    clock.advance(minutes=10)
+    assert scheduler.run_pending() == 600
+    assert status(db, first) == "published"
+    assert status(db, second) == "scheduled"
+
+def test_rescheduled_posts_publish_at_their_new_time(db, clock, scheduler):
+    later, earlier = schedule_post(db, "B", 20), schedule_post(db, "C", 60)
+    scheduler.run_pending()
+    reschedule(db, scheduler, later, 40)
+    reschedule(db, scheduler, earlier, 30)
+
+    # The heap still holds B at 09:20; the publish query re-checks the time
+    clock.advance(minutes=20)
+    scheduler.run_pending()
+    assert status(db, later) == "scheduled"
+
+    clock.advance(minutes=10)
+    scheduler.run_pending()
+    assert status(db, earlier) == "published"
+    assert status(db, later) == "scheduled"
+
+    clock.advance(minutes=10)
+    scheduler.run_pending()
+    assert status(db, later) == "published"
+
+def test_post_from_another_process_waits_for_resync(db, clock, scheduler):
+    scheduler.run_pending()
+    # No schedule() call: the scheduler only finds it by reloading the database
+    elsewhere = schedule_post(db, "D", 50)
+
+    clock.advance(minutes=55)
+    scheduler.run_pending()
+    assert status(db, elsewhere) == "scheduled"
+
+    clock.advance(minutes=6)
+    scheduler.run_pending()
+    assert status(db, elsewhere) == "published"
+
+def test_stop_ends_thread_and_restart_publishes(db, clock, scheduler):
+    scheduler.start()
+    thread = scheduler._thread
+    scheduler.stop()
+    assert not thread.is_alive()
+
+    post_id = schedule_post(db, "E", 1)
+    scheduler.start()
+    clock.advance(minutes=1)
+    scheduler.schedule(post_id, at(1))
+    deadline = time.monotonic() + 5
+    while status(db, post_id) != "published" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert status(db, post_id) == "published"
+
+def test_check_scheduled_posts_publishes_without_the_thread(db):
+    from utils import check_scheduled_posts
+
+    due = db.create_post("Post F", "Was due yesterday.", 1, "AI", "qubit", "scheduled",
+                         scheduled_for=datetime.datetime.now() - datetime.timedelta(days=1))
+    later = schedule_post(db, "G", 10)
+    assert check_scheduled_posts() == 1
+    assert status(db, due) == "published"
+    assert status(db, later) == "scheduled"
@@ -0,0 +1,33 @@
+"""
+The static site escapes everything users can write.
+"""
+
+import os
+
+from static_site import build_site, post_path
+
+HOSTILE = '<img src=x onerror=alert(document.cookie)>'
+
+
+def read(out_dir, path):
+    with open(os.path.join(out_dir, path), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_hostile_input_is_escaped(db, tmp_path):
+    db.register(f"user{HOSTILE}", "password", "reader@example.org", bio=HOSTILE)
+    reader = db.authenticate(f"user{HOSTILE}", "password")
+    db.update_user_profile(1, bio=HOSTILE)
+    post_id = db.create_post(f"Title {HOSTILE}", "Body text.", 1, "AI", f"qubit, tag{HOSTILE}", "published")
+    db.add_comment(post_id, reader["id"], f"Comment {HOSTILE}")
+
+    out_dir = str(tmp_path / "site")
+    build_site(out_dir, workers=1)
+    page = read(out_dir, post_path(post_id))
+    home = read(out_dir, "index.html")
+
+    for html in (page, home):
+        assert "<img src=x" not in html
+        assert "&lt;img src=x onerror=alert(document.cookie)&gt;" in html
+    assert "Comment &lt;img" in page
+    assert "Title &lt;img" in home
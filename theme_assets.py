@@ -0,0 +1,427 @@
+"""
+Prebuilt theme stylesheets.
+
+Each theme's stylesheet (style.css, the themed rules below, self-hosted
+@font-face rules and the code highlighting CSS from markup.py) is built and
+minified once per process, named by its content hash and written to
+``THEME_CSS_DIR``. apply_theme then only has to emit ``theme_snippet``.
+
+By default the snippet inlines the prebuilt stylesheet: Streamlit's static
+file handler serves anything but images as text/plain with ``nosniff``,
+which browsers refuse to apply as CSS. The string is the same object on
+every rerun, so a rerun does no file reads or formatting and triggers no
+CDN requests. Deployments whose proxy serves ``static/css`` with a CSS
+content type can set THEME_CSS_LINK=1 to emit a ``<link>`` to the hashed
+file instead, which browsers cache.
+
+Fonts are served from ``FONTS_DIR`` rather than Google Fonts and the Font
+Awesome CDN. Download them once per deployment with:
+
+    python theme_assets.py --fetch-fonts
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import threading
+import urllib.request
+
+from config import (
+    LIGHT_THEME, DARK_THEME, THEME_CSS_DIR, THEME_CSS_URL_PATH, THEME_CSS_LINK, FONTS_DIR, FONTS_URL_PATH
+)
+from markup import highlight_css
+
+STYLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "style.css")
+
+# Fallbacks for keys missing from LIGHT_THEME / DARK_THEME, plus per-theme effects
+THEME_DEFAULTS = {
+    "light": {
+        "background_color": "#FFFFFF", "text_color": "#333333", "card_background": "#F9F9F9",
+        "accent_color": "#0066FF", "secondary_color": "#6610F2", "highlight_color": "#00B8D9",
+        "success_color": "#36B37E", "warning_color": "#FFAB00", "error_color": "#FF5630",
+        "shadow_intensity": "0.1", "glow_intensity": "0.3",
+    },
+    "dark": {
+        "background_color": "#121212", "text_color": "#F0F0F0", "card_background": "#1E1E1E",
+        "accent_color": "#2979FF", "secondary_color": "#7C4DFF", "highlight_color": "#00E5FF",
+        "success_color": "#00E676", "warning_color": "#FFEA00", "error_color": "#FF1744",
+        "shadow_intensity": "0.3", "glow_intensity": "0.8",
+    },
+}
+THEMES = {"light": LIGHT_THEME, "dark": DARK_THEME}
+
+# (family, weight, style, file name, download URL); only the Latin subset is hosted
+FONT_FILES = [
+    ("Roboto", 300, "normal", "roboto-latin-300-normal.woff2",
+     "https://cdn.jsdelivr.net/npm/@fontsource/roboto@5.0.8/files/roboto-latin-300-normal.woff2"),
+    ("Roboto", 400, "normal", "roboto-latin-400-normal.woff2",
+     "https://cdn.jsdelivr.net/npm/@fontsource/roboto@5.0.8/files/roboto-latin-400-normal.woff2"),
+    ("Roboto", 500, "normal", "roboto-latin-500-normal.woff2",
+     "https://cdn.jsdelivr.net/npm/@fontsource/roboto@5.0.8/files/roboto-latin-500-normal.woff2"),
+    ("Roboto", 700, "normal", "roboto-latin-700-normal.woff2",
+     "https://cdn.jsdelivr.net/npm/@fontsource/roboto@5.0.8/files/roboto-latin-700-normal.woff2"),
+    ("Source Code Pro", 400, "normal", "source-code-pro-latin-400-normal.woff2",
+     "https://cdn.jsdelivr.net/npm/@fontsource/source-code-pro@5.0.8/files/source-code-pro-latin-400-normal.woff2"),
+    ("Source Code Pro", 500, "normal", "source-code-pro-latin-500-normal.woff2",
+     "https://cdn.jsdelivr.net/npm/@fontsource/source-code-pro@5.0.8/files/source-code-pro-latin-500-normal.woff2"),
+    ("Font Awesome 6 Brands", 400, "normal", "fa-brands-400.woff2",
+     "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/fa-brands-400.woff2"),
+]
+
+# The footer only uses these brand icons, so only they get classes
+ICON_CODEPOINTS = {"linkedin": "f08c", "twitter": "f099", "facebook": "f09a", "github": "f09b"}
+
+FONT_FACE = """\
+@font-face {{
+    font-family: '{family}';
+    font-style: {style};
+    font-weight: {weight};
+    font-display: swap;
+    src: local('{family}'), url('{url}') format('woff2');
+}}
+"""
+
+ICON_RULES = """\
+.fab {
+    font-family: 'Font Awesome 6 Brands';
+    font-style: normal;
+    font-weight: 400;
+    display: inline-block;
+    line-height: 1;
+    -webkit-font-smoothing: antialiased;
+}
+"""
+
+THEME_TEMPLATE = """\
+:root {{
+    --background-color: {background_color};
+    --text-color: {text_color};
+    --card-background: {card_background};
+    --accent-color: {accent_color};
+    --secondary-color: {secondary_color};
+    --highlight-color: {highlight_color};
+    --success-color: {success_color};
+    --warning-color: {warning_color};
+    --error-color: {error_color};
+}}
+
+.stApp {{
+    background-color: var(--background-color);
+    color: var(--text-color);
+    font-family: 'Roboto', sans-serif;
+}}
+
+/* Modern input fields */
+.stTextInput > div > div > input,
+.stTextArea > div > div > textarea,
+.stSelectbox > div > div,
+.stMultiselect > div > div {{
+    background-color: var(--card-background);
+    color: var(--text-color);
+    border-radius: 8px;
+    border: 1px solid rgba(128, 128, 128, 0.2);
+    transition: all 0.3s ease;
+}}
+
+.stTextInput > div > div > input:focus,
+.stTextArea > div > div > textarea:focus {{
+    border-color: var(--accent-color);
+    box-shadow: 0 0 0 2px rgba(var(--accent-color), 0.2);
+}}
+
+/* Buttons with hover effects */
+.stButton>button {{
+    background-color: var(--accent-color);
+    color: white;
+    border-radius: 8px;
+    border: none;
+    padding: 0.5rem 1rem;
+    font-weight: 500;
+    transition: all 0.3s ease;
+    box-shadow: 0 2px 5px rgba(0, 0, 0, {shadow_intensity});
+}}
+
+.stButton>button:hover {{
+    transform: translateY(-2px);
+    box-shadow: 0 4px 8px rgba(0, 0, 0, {shadow_intensity});
+    filter: brightness(110%);
+}}
+
+.stButton>button:active {{
+    transform: translateY(0);
+}}
+
+/* Secondary button style */
+.secondary-button > button {{
+    background-color: var(--secondary-color);
+}}
+
+/* Success button style */
+.success-button > button {{
+    background-color: var(--success-color);
+}}
+
+/* Warning button style */
+.warning-button > button {{
+    background-color: var(--warning-color);
+}}
+
+/* Error button style */
+.error-button > button {{
+    background-color: var(--error-color);
+}}
+
+/* Modern cards with hover effect */
+.card {{
+    background-color: var(--card-background);
+    padding: 20px;
+    border-radius: 12px;
+    margin-bottom: 20px;
+    box-shadow: 0 4px 6px rgba(0, 0, 0, {shadow_intensity});
+    transition: transform 0.3s ease, box-shadow 0.3s ease;
+    border: 1px solid rgba(128, 128, 128, 0.1);
+}}
+
+.card:hover {{
+    transform: translateY(-5px);
+    box-shadow: 0 8px 15px rgba(0, 0, 0, {shadow_intensity});
+}}
+
+/* Tech-themed glowing accents */
+.tech-accent {{
+    position: relative;
+}}
+
+.tech-accent::after {{
+    content: '';
+    position: absolute;
+    left: 0;
+    bottom: -2px;
+    width: 100%;
+    height: 2px;
+    background-color: var(--highlight-color);
+    box-shadow: 0 0 8px rgba(var(--highlight-color), {glow_intensity});
+}}
+
+/* Links with hover effect */
+a {{
+    color: var(--accent-color);
+    text-decoration: none;
+    transition: all 0.2s ease;
+    position: relative;
+}}
+
+a:hover {{
+    color: var(--highlight-color);
+}}
+
+a:hover::after {{
+    content: '';
+    position: absolute;
+    left: 0;
+    bottom: -2px;
+    width: 100%;
+    height: 1px;
+    background-color: var(--highlight-color);
+}}
+
+/* Headings with tech accent */
+h1, h2, h3, h4, h5, h6 {{
+    color: var(--text-color);
+    font-weight: 500;
+}}
+
+/* Blog title with tech styling */
+.blog-title {{
+    font-size: 2.5rem;
+    font-weight: 700;
+    color: var(--accent-color);
+    margin-bottom: 1rem;
+    text-shadow: 0 0 10px rgba(var(--accent-color), 0.3);
+}}
+
+.blog-subtitle {{
+    font-size: 1.2rem;
+    color: var(--secondary-color);
+    margin-bottom: 2rem;
+    font-weight: 300;
+}}
+
+/* Code blocks with tech styling */
+code {{
+    font-family: 'Source Code Pro', monospace;
+    background-color: rgba(0, 0, 0, 0.1);
+    padding: 2px 5px;
+    border-radius: 4px;
+    font-size: 0.9em;
+}}
+
+/* Sidebar styling */
+.css-1d391kg, .css-163ttbj {{  /* Target sidebar */
+    background-color: var(--card-background);
+    border-right: 1px solid rgba(128, 128, 128, 0.1);
+}}
+
+/* User profile section in sidebar */
+.user-profile {{
+    background: linear-gradient(135deg, var(--accent-color) 0%, var(--secondary-color) 100%);
+    padding: 15px;
+    border-radius: 10px;
+    color: white;
+    margin-bottom: 20px;
+    box-shadow: 0 4px 6px rgba(0, 0, 0, {shadow_intensity});
+}}
+
+/* Footer styling */
+.footer {{
+    text-align: center;
+    padding: 2rem 0;
+    margin-top: 3rem;
+    border-top: 1px solid rgba(128, 128, 128, 0.2);
+    font-size: 0.9rem;
+}}
+"""
+
+_COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+_SPACE_PATTERN = re.compile(r"\s+")
+_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,>])\s*")
+
+_bundles = {}
+_bundles_lock = threading.Lock()
+
+
+def minify_css(css):
+    """
+    Remove comments and insignificant whitespace from a stylesheet.
+
+    Args:
+        css (str): Stylesheet source
+
+    Returns:
+        str: Minified stylesheet
+    """
+    css = _COMMENT_PATTERN.sub("", css)
+    css = _SPACE_PATTERN.sub(" ", css)
+    css = _PUNCTUATION_PATTERN.sub(r"\1", css)
+    css = css.replace(": ", ":").replace(";}", "}")
+    return css.strip()
+
+def _font_css(fonts_url):
+    rules = [FONT_FACE.format(family=family, weight=weight, style=style, url=f"{fonts_url}/{name}")
+             for family, weight, style, name, _ in FONT_FILES]
+    rules.append(ICON_RULES)
+    rules += [f".fa-{name}::before {{ content: '\\{codepoint}'; }}\n" for name, codepoint in ICON_CODEPOINTS.items()]
+    return "".join(rules)
+
+def build_theme_css(theme, fonts_url=FONTS_URL_PATH):
+    """
+    Build the complete, minified stylesheet for a theme.
+
+    Args:
+        theme (str): "light" or "dark"
+        fonts_url (str): URL of FONTS_DIR as seen from where the CSS is loaded
+
+    Returns:
+        str: Minified CSS
+    """
+    with open(STYLE_FILE, "r") as f:
+        base_css = f.read()
+
+    values = dict(THEME_DEFAULTS[theme])
+    values.update(THEMES[theme])
+    return minify_css("\n".join([
+        _font_css(fonts_url),
+        base_css,
+        THEME_TEMPLATE.format(**values),
+        highlight_css(theme),
+    ]))
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def get_theme_bundle(theme):
+    """
+    Get a theme's prebuilt stylesheet, building it on first use.
+
+    Returns:
+        dict: ``css``, content ``hash``, file ``path`` and static ``url``
+    """
+    theme = theme if theme in THEMES else "light"
+    with _bundles_lock:
+        bundle = _bundles.get(theme)
+        if bundle is None:
+            # A linked stylesheet resolves font URLs relative to itself
+            css = build_theme_css(theme, "../fonts" if THEME_CSS_LINK else FONTS_URL_PATH)
+            digest = hashlib.sha256(css.encode()).hexdigest()[:12]
+            name = f"theme-{theme}-{digest}.css"
+            path = os.path.join(THEME_CSS_DIR, name)
+            if not os.path.exists(path):
+                _write_atomic(path, css)
+            bundle = {"css": css, "hash": digest, "path": path, "url": f"{THEME_CSS_URL_PATH}/{name}"}
+            _bundles[theme] = bundle
+    return bundle
+
+def build_theme_assets():
+    """
+    Build every theme's stylesheet now rather than on the first rerun.
+
+    Returns:
+        dict: Bundle per theme name
+    """
+    return {theme: get_theme_bundle(theme) for theme in THEMES}
+
+def theme_snippet(theme):
+    """
+    HTML to emit on each rerun to apply a theme.
+
+    Returns:
+        str: ``<link>`` to the hashed stylesheet, or the stylesheet inline
+    """
+    bundle = get_theme_bundle(theme)
+    if THEME_CSS_LINK:
+        return f'<link rel="stylesheet" href="{bundle["url"]}">'
+    return f"<style>{bundle['css']}</style>"
+
+def fetch_fonts():
+    """
+    Download any missing FONT_FILES into FONTS_DIR.
+
+    Returns:
+        int: Number of files downloaded
+    """
+    os.makedirs(FONTS_DIR, exist_ok=True)
+    fetched = 0
+    for _, _, _, name, url in FONT_FILES:
+        path = os.path.join(FONTS_DIR, name)
+        if os.path.exists(path):
+            continue
+        with urllib.request.urlopen(url, timeout=30) as response:
+            data = response.read()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        fetched += 1
+    return fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build theme stylesheets and fetch self-hosted fonts.")
+    parser.add_argument("--fetch-fonts", action="store_true", help="download missing font files")
+    args = parser.parse_args()
+
+    if args.fetch_fonts:
+        print(f"Downloaded {fetch_fonts()} font files to {FONTS_DIR}")
+    for theme, bundle in build_theme_assets().items():
+        print(f"{theme}: {bundle['path']} ({len(bundle['css'])} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,12 +5,13 @@ Utility functions for the EduRishi Blog application.
 import re
 import hashlib
 import datetime
-import sqlite3
 import streamlit as st
 from PIL import Image
 from io import BytesIO
 import base64
 
+from config import FEEDS_ENABLED
+
 def is_valid_email(email):
     """
     Validate email format.
@@ -72,6 +73,57 @@ def get_image_as_base64(image_file):
     encoded = base64.b64encode(img_byte_arr).decode()
     return f"data:image/{img.format.lower()};base64,{encoded}"
 
+def parse_tags(tags):
+    """
+    Split a comma-separated tag string into clean, unique tag names.
+    
+    Args:
+        tags (str or list): Comma-separated tags, or an iterable of tags
+        
+    Returns:
+        list: Tag names in their original order, without blanks or duplicates
+    """
+    if not tags:
+        return []
+    
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    
+    names = []
+    seen = set()
+    for tag in tags:
+        name = " ".join(tag.split())
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    
+    return names
+
+def make_slugs(names):
+    """
+    Give each name a URL-safe slug.
+
+    Names that would share a slug get a short hash suffix, so the mapping
+    is stable for a given set of names.
+
+    Args:
+        names (iterable): Category or tag names
+
+    Returns:
+        dict: Slug for each name
+    """
+    slugs, taken = {}, {}
+    for name in sorted(names):
+        slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+        digest = hashlib.sha1(name.encode()).hexdigest()[:6]
+        if not slug:
+            slug = digest
+        elif slug in taken:
+            slug = f"{slug}-{digest}"
+        taken[slug] = name
+        slugs[name] = slug
+    return slugs
+
 def truncate_text(text, max_length=150):
     """
     Truncate text to specified length and add ellipsis.
@@ -148,25 +200,24 @@ def create_card_html(title, content, author=None, date=None, category=None, tags
 
 def check_scheduled_posts():
     """
-    Check for scheduled posts that should be published.
-    """
-    conn = sqlite3.connect('blog.db')
-    c = conn.cursor()
-    
-    current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Find scheduled posts that should now be published
-    c.execute("""
-    UPDATE posts
-    SET status = 'published', published_at = ?
-    WHERE status = 'scheduled' AND scheduled_for <= ?
-    """, (current_time, current_time))
-    
-    updated_count = c.rowcount
-    conn.commit()
-    conn.close()
+    Publish scheduled posts that are due, once.
+
+    The app relies on the background scheduler (scheduler.py); this is for
+    scripts and deployments that run with SCHEDULER_ENABLED=0. Feeds and
+    the sitemap are regenerated before returning if anything was published,
+    since such scripts usually have no feed writer thread running.
     
-    return updated_count
+    Returns:
+        int: Number of posts published
+    """
+    # Imported here because db imports utils for hash_password
+    from db import publish_due_posts
+    from feeds import update_feeds
+
+    published = publish_due_posts(datetime.datetime.now())
+    if published and FEEDS_ENABLED:
+        update_feeds()
+    return len(published)
 
 def load_css(css_file):
     """
@@ -0,0 +1,155 @@
+"""
+Buffered post view counting.
+
+Counting a view with an UPDATE on every page load would take SQLite's
+write lock on the busiest read path. Instead ``record_view`` only bumps a
+per-(post, day) count in memory; a daemon thread writes the counts to
+``post_views_daily`` in one transaction every VIEWS_FLUSH_SECONDS, or
+sooner once VIEWS_FLUSH_EVENTS views are waiting, and once more when the
+process exits. A failed flush keeps the counts for the next attempt.
+
+Views not yet flushed are lost if the process is killed outright, which
+is an acceptable trade for analytics.
+"""
+
+import atexit
+import datetime
+import logging
+import threading
+from collections import Counter
+
+from config import VIEWS_ENABLED, VIEWS_FLUSH_SECONDS, VIEWS_FLUSH_EVENTS
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    """
+    Aggregates view events in memory and flushes them in batches.
+
+    Args:
+        flush (callable): ``flush(counts)`` persists a {(post_id, day): views} dict
+        flush_seconds (float): Longest time a view waits before being flushed
+        flush_events (int): Flush early once this many views are waiting
+        today (callable): Returns the current local date
+    """
+
+    def __init__(self, flush, flush_seconds=VIEWS_FLUSH_SECONDS, flush_events=VIEWS_FLUSH_EVENTS,
+                 today=datetime.date.today):
+        self.flush = flush
+        self.flush_seconds = flush_seconds
+        self.flush_events = flush_events
+        self.today = today
+        self._counts = Counter()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def record(self, post_id, views=1):
+        with self._cond:
+            self._counts[(int(post_id), self.today().isoformat())] += views
+            self._pending += views
+            if self._pending >= self.flush_events:
+                self._cond.notify()
+
+    def pending(self, post_id=None):
+        """
+        Views recorded but not yet flushed, for one post or in total.
+        """
+        with self._cond:
+            if post_id is None:
+                return self._pending
+            return sum(views for (pid, _day), views in self._counts.items() if pid == int(post_id))
+
+    def flush_now(self):
+        """
+        Write out everything recorded so far.
+
+        Returns:
+            int: Number of views written
+        """
+        with self._cond:
+            counts, self._counts = self._counts, Counter()
+            pending, self._pending = self._pending, 0
+        if not counts:
+            return 0
+
+        try:
+            self.flush(dict(counts))
+        except Exception:
+            # Put the counts back so the next flush retries them
+            with self._cond:
+                self._counts.update(counts)
+                self._pending += pending
+            raise
+        return pending
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopped and self._pending < self.flush_events:
+                    self._cond.wait(self.flush_seconds)
+                stopped = self._stopped
+
+            try:
+                self.flush_now()
+            except Exception:
+                logger.exception("Flushing post views failed")
+
+            if stopped:
+                return
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="view-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        Stop the thread after a final flush.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def start_view_buffer():
+    """
+    Start the process-wide view buffer (once; later calls do nothing).
+
+    Returns:
+        ViewBuffer: The running buffer, or None if VIEWS_ENABLED is off
+    """
+    global _buffer
+    if not VIEWS_ENABLED:
+        return None
+
+    with _buffer_lock:
+        if _buffer is None:
+            from db import record_post_views
+
+            _buffer = ViewBuffer(record_post_views)
+            _buffer.start()
+            atexit.register(_buffer.stop)
+    return _buffer
+
+def record_view(post_id):
+    if _buffer is not None:
+        _buffer.record(post_id)
+
+def pending_views(post_id=None):
+    """
+    Views this process has recorded but not yet written to the database.
+    """
+    return _buffer.pending(post_id) if _buffer is not None else 0